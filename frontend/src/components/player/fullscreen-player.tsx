@@ -38,6 +38,7 @@ import {
   getComments,
   getShareFriends,
   getVideoDetail,
+  loadCommentTree,
   mediaProxyUrl,
   publishComment,
   sendFriendVideoShare,
@@ -274,6 +275,7 @@ export function FullscreenPlayer({
   const surfaceHitRef = useRef<HTMLDivElement>(null);
   const bgmRef = useRef<HTMLAudioElement>(null);
   const bgmSourceKeyRef = useRef("");
+  const commentsAwemeIdRef = useRef("");
   const touchStart = useRef({ x: 0, y: 0 });
   const wheelLocked = useRef(false);
   const wheelAccumulatedDeltaRef = useRef(0);
@@ -1042,7 +1044,29 @@ export function FullscreenPlayer({
     setCommentsLoading(true);
     setCommentsError("");
     try {
-      const result = await getComments(currentVideo.aweme_id, 20, isMore ? commentsCursor : 0);
+      const awemeId = currentVideo.aweme_id;
+      const result = isMore
+        ? await getComments(awemeId, 20, commentsCursor)
+        : await loadCommentTree(awemeId, 20, 0, (commentId, replies) => {
+            // 预取的回复直接放进展开状态，已手动加载过的不覆盖
+            if (!replies.success || !commentId || commentsAwemeIdRef.current !== awemeId) return;
+            const nextReplies = Array.isArray(replies.comments) ? replies.comments : [];
+            setCommentReplies((prev) => {
+              if (prev[commentId]?.loaded || prev[commentId]?.loading) return prev;
+              return {
+                ...prev,
+                [commentId]: {
+                  items: nextReplies,
+                  cursor: Number(replies.cursor || 0),
+                  hasMore: Boolean(replies.has_more),
+                  loading: false,
+                  error: "",
+                  total: Number(replies.total || nextReplies.length || 0),
+                  loaded: true,
+                },
+              };
+            });
+          });
       if (!result.success) {
         throw new Error(result.message || "获取评论失败");
       }
@@ -1754,6 +1778,7 @@ export function FullscreenPlayer({
   }, [initialIndex, initialMediaIndex, initialVideoKey, open]);
 
   useEffect(() => {
+    commentsAwemeIdRef.current = currentVideo?.aweme_id || "";
     setOpenPanel(null);
     setComments([]);
     setCommentsError("");
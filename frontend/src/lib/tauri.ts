@@ -64,6 +64,7 @@ type BrowserSocketListener = (payload: unknown) => void;
 type BrowserSocket = {
   on: (event: string, listener: BrowserSocketListener) => void;
   off: (event: string, listener: BrowserSocketListener) => void;
+  emit: (event: string, payload?: unknown) => void;
   connected?: boolean;
 };
 
@@ -1140,6 +1141,72 @@ export async function getComments(awemeId: string, count: number, cursor = 0): P
   return invoke("get_comments", { awemeId, count, cursor });
 }
 
+export type CommentTreeRepliesHandler = (commentId: string, result: CommentsResponse) => void;
+
+let commentTreeRequestSeq = 0;
+
+// 一级评论页走 Socket.IO 的 load_comment_tree：评论页先返回，热门评论的首页回复随后逐条推送。
+// 桌面端或 socket 未连接时退回普通的 getComments。
+export async function loadCommentTree(
+  awemeId: string,
+  count: number,
+  cursor = 0,
+  onReplies?: CommentTreeRepliesHandler
+): Promise<CommentsResponse> {
+  const socket = shouldUseBrowserBridge() ? getBrowserSocket() : null;
+  if (!socket?.connected) {
+    return getComments(awemeId, count, cursor);
+  }
+
+  commentTreeRequestSeq += 1;
+  const requestId = `${Date.now()}-${commentTreeRequestSeq}`;
+  return new Promise<CommentsResponse>((resolve) => {
+    let settled = false;
+    const settle = (result: CommentsResponse | Promise<CommentsResponse>) => {
+      if (settled) return;
+      settled = true;
+      resolve(result);
+    };
+    const ownPayload = (payload: unknown) => {
+      const data = payload && typeof payload === "object" ? (payload as Record<string, unknown>) : null;
+      return data && data.request_id === requestId ? data : null;
+    };
+    const handleComments: BrowserSocketListener = (payload) => {
+      const data = ownPayload(payload);
+      if (!data) return;
+      emitCookieInvalidIfNeeded(data);
+      settle(data as CommentsResponse);
+    };
+    const handleReplies: BrowserSocketListener = (payload) => {
+      const data = ownPayload(payload);
+      if (!data) return;
+      onReplies?.(String(data.comment_id || ""), data as CommentsResponse);
+    };
+    const handleDone: BrowserSocketListener = (payload) => {
+      const data = ownPayload(payload);
+      if (!data) return;
+      unbind();
+      settle({ success: false, message: String(data.message || "获取评论失败，请稍后重试") });
+    };
+    const handleDisconnect: BrowserSocketListener = () => {
+      unbind();
+      settle(getComments(awemeId, count, cursor));
+    };
+    const unbind = () => {
+      socket.off("comment_tree_comments", handleComments);
+      socket.off("comment_tree_replies", handleReplies);
+      socket.off("comment_tree_done", handleDone);
+      socket.off("disconnect", handleDisconnect);
+    };
+
+    socket.on("comment_tree_comments", handleComments);
+    socket.on("comment_tree_replies", handleReplies);
+    socket.on("comment_tree_done", handleDone);
+    socket.on("disconnect", handleDisconnect);
+    socket.emit("load_comment_tree", { aweme_id: awemeId, request_id: requestId, count, cursor });
+  });
+}
+
 export async function getCommentReplies(
   awemeId: string,
   commentId: string,
@@ -2,8 +2,6 @@ from __future__ import annotations
 
 import asyncio
 import requests
-import requests.adapters
-import urllib3.util.retry
 import urllib.parse
 import urllib.request
 import os
@@ -14,20 +12,32 @@ import binascii
 import sys
 import random
 import string
-import threading
 import time
 import hmac
 import hashlib
 import logging
 import uuid
 from src.api import sign as douyin_sign
+from src.api import sign_executor
+from src.api import request_template
+from src.api import transport
+from src.api.comment_tree import CommentTreeLoader
+from src.api.request_template import PreparedRequestTemplate
+from src.api.rate_governor import get_rate_governor
+from src.api.response_cache import ResponseCache
+from src.api.hedged_request import mark_dispatched
+from src.api.single_flight import SingleFlight
+from src.api.token_manager import TokenManager, cookie_scope, token_cache_path
+from src.config.config import Config
+from src.utils import json_codec
+from src.utils import metrics
 from src.api import douyin_im_proto
 
 logger = logging.getLogger('api')
 
-# Configure a session with retry/SSL resilience
-_retry = urllib3.util.retry.Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
-_thread_local = threading.local()
+API_REQUESTS = metrics.counter('douyin_api_requests_total', 'common_request 上游请求数', ('uri', 'outcome'))
+API_REQUEST_SECONDS = metrics.histogram('douyin_api_request_seconds', 'common_request 上游请求耗时（含签名，不含限速等待）', ('uri',))
+API_CACHE_LOOKUPS = metrics.counter('douyin_api_cache_lookups_total', 'common_request 响应缓存查询结果', ('uri', 'result'))
 
 
 def _splice_params(params: dict) -> str:
@@ -39,31 +49,25 @@ def _splice_params(params: dict) -> str:
     return '&'.join(parts)
 
 
-def _sign_spider_a_bogus(query: str, data: str) -> str:
+async def _sign_spider_a_bogus(query: str, data: str) -> str:
     """Use the Spider request shape for endpoints whose body participates in a_bogus."""
-    return douyin_sign.sign_spider_publish(query, data)
-
-
-def _create_api_session():
-    session = requests.Session()
-    session.mount('https://', requests.adapters.HTTPAdapter(max_retries=_retry))
-    return session
-
-
-def _get_api_session():
-    session = getattr(_thread_local, 'api_session', None)
-    if session is None:
-        session = _create_api_session()
-        _thread_local.api_session = session
-    return session
+    return await sign_executor.sign_spider_publish(query, data)
 
 
 def _api_get(*args, **kwargs):
-    return _get_api_session().get(*args, **kwargs)
+    return transport.get_requests_session().get(*args, **kwargs)
 
 
 def _api_post(*args, **kwargs):
-    return _get_api_session().post(*args, **kwargs)
+    return transport.get_requests_session().post(*args, **kwargs)
+
+
+_WEBID_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'\\"user_unique_id\\":\\"(\d+)\\"',
+    r'"user_unique_id":"(\d+)"',
+    r'"webid":"(\d+)"',
+    r'webid=(\d+)',
+))
 
 
 def _redact_headers(headers: dict) -> dict:
@@ -88,11 +92,17 @@ class DouyinAPI:
     
     def __init__(self, cookie: str):
         self.cookie = cookie
-        self.host = 'https://www.douyin.com'
-        self._cached_webid = None
-        self._webid_time = 0
-        self._cached_csrf_token = None
-        self._csrf_time = 0
+        self.host = Config.OFFLINE_HOST or 'https://www.douyin.com'
+        self._prepared_template = None
+        self.tokens = TokenManager(token_cache_path(), cookie_scope(cookie))
+        self.response_cache = ResponseCache(Config.bounded_int(Config.RESPONSE_CACHE_MAX_MB, 32, 0, 1024) * 1024 * 1024)
+        self._revalidating = set()
+        self.request_flights = SingleFlight('common_request')
+        self.comment_tree = CommentTreeLoader(
+            self,
+            reply_prefetch=Config.bounded_int(Config.COMMENT_REPLY_PREFETCH, 10, 0, 50),
+            concurrency=Config.bounded_int(Config.COMMENT_PREFETCH_CONCURRENCY, 4, 1, 16),
+        )
 
         # 检查是否启用调试模式
         self.debug_mode = os.environ.get('DEBUG_MODE', '').lower() in ('true', '1', 'yes')
@@ -149,12 +159,13 @@ class DouyinAPI:
         }
 
     async def _get_webid(self, headers: dict, url: str = '') -> str:
-        """获取webid（缓存10分钟）"""
-        import time
-        if self._cached_webid and (time.time() - self._webid_time) < 600:
-            return self._cached_webid
+        """获取webid（持久化缓存10分钟，临近过期后台刷新）"""
+        return await self.tokens.get('webid', lambda: self._fetch_webid(headers, url))
+
+    async def _fetch_webid(self, headers: dict, url: str = '') -> str:
+        """下载页面并提取 webid。"""
         try:
-            url = url or 'https://www.douyin.com/?recommend=1'
+            url = url or f'{self._resolve_host()}/?recommend=1'
             h = headers.copy()
             h['sec-fetch-dest'] = 'document'
             h['sec-fetch-mode'] = 'navigate'
@@ -164,7 +175,7 @@ class DouyinAPI:
             if self.cookie:
                 h['Cookie'] = self.cookie
 
-            response = await asyncio.to_thread(_api_get, url, headers=h, timeout=10, verify=False)
+            response = await transport.request('GET', url, headers=h, timeout=10, verify=False)
             if self.debug_mode:
                 print(f"\033[93m[API] _get_webid 响应状态: {response.status_code}, 内容长度: {len(response.text)}\033[0m")
             if response.status_code != 200 or not response.text:
@@ -172,18 +183,11 @@ class DouyinAPI:
                     print(f"\033[91m[API] 获取webid失败: {response.status_code}\033[0m")
                 return None
 
-            # Try multiple patterns
-            for pattern in [
-                r'\\"user_unique_id\\":\\"(\d+)\\"',
-                r'"user_unique_id":"(\d+)"',
-                r'"webid":"(\d+)"',
-                r'webid=(\d+)',
-            ]:
-                match = re.search(pattern, response.text)
+            text = response.text
+            for pattern in _WEBID_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     webid = match.group(1)
-                    self._cached_webid = webid
-                    self._webid_time = time.time()
                     if self.debug_mode:
                         print(f"\033[93m[API] 获取到webid: {webid}\033[0m")
                     return webid
@@ -200,11 +204,15 @@ class DouyinAPI:
         return ''.join(random.choices(string.digits, k=random_length))
 
     async def _get_csrf_token(self, headers: dict, force_refresh: bool = False) -> str:
-        """获取抖音动作接口需要的 csrf token（缓存10分钟）。"""
-        import time
-        if not force_refresh and self._cached_csrf_token and (time.time() - self._csrf_time) < 600:
-            return self._cached_csrf_token
+        """获取抖音动作接口需要的 csrf token（持久化缓存10分钟）。"""
+        token = await self.tokens.get(
+            'csrf_token',
+            lambda: self._fetch_csrf_token(headers),
+            force_refresh=force_refresh,
+        )
+        return token or ''
 
+    async def _fetch_csrf_token(self, headers: dict) -> str:
         h = dict(headers or {})
         h.update({
             'accept': '*/*',
@@ -226,9 +234,9 @@ class DouyinAPI:
         h.pop('content-type', None)
         h.pop('Content-Type', None)
         try:
-            response = await asyncio.to_thread(
-                _get_api_session().head,
-                'https://www.douyin.com/service/2/abtest_config/',
+            response = await transport.request(
+                'HEAD',
+                f'{self._resolve_host()}/service/2/abtest_config/',
                 headers=h,
                 timeout=(10, 30),
             )
@@ -236,8 +244,6 @@ class DouyinAPI:
             parts = [part.strip() for part in raw_token.split(',')]
             token = parts[1] if len(parts) > 1 and parts[1] else next((part for part in parts if len(part) > 16), '')
             if token:
-                self._cached_csrf_token = token
-                self._csrf_time = time.time()
                 return token
         except Exception as e:
             if self.debug_mode:
@@ -245,6 +251,23 @@ class DouyinAPI:
 
         return ''
     
+    def _resolve_host(self, host: str = None) -> str:
+        """离线压测模式下所有接口（包括 www-hj 等自定义 host）都发往假服务器。"""
+        return Config.OFFLINE_HOST or host or self.host
+
+    def _request_template(self) -> PreparedRequestTemplate:
+        """返回当前 Cookie/User-Agent 对应的请求模板，变化时重建。"""
+        template = self._prepared_template
+        if template is None or not template.matches(self.cookie, self.common_params, self.common_headers):
+            template = PreparedRequestTemplate(
+                self.cookie,
+                self.common_params,
+                self.common_headers,
+                self._generate_s_v_web_id,
+            )
+            self._prepared_template = template
+        return template
+
     async def _deal_params(self, params: dict, headers: dict) -> dict:
         """处理请求参数"""
         try:
@@ -256,15 +279,20 @@ class DouyinAPI:
             if not cookie:
                 return params
 
-            cookie_dict = self._cookies_to_dict(cookie)
+            template = self._request_template()
+            if cookie == template.cookie:
+                cookie_dict = template.cookie_dict
+                s_v_web_id = template.verify_fp
+            else:
+                cookie_dict = self._cookies_to_dict(cookie)
+                s_v_web_id = cookie_dict.get('s_v_web_id') or self._generate_s_v_web_id()
 
             # 从cookie中提取参数
             params['msToken'] = self._get_ms_token()
-            params['screen_width'] = cookie_dict.get('dy_swidth', params.get('screen_width', 1680))
-            params['screen_height'] = cookie_dict.get('dy_sheight', params.get('screen_height', 1050))
-            params['cpu_core_num'] = cookie_dict.get('device_web_cpu_core', params.get('cpu_core_num', 8))
-            params['device_memory'] = cookie_dict.get('device_web_memory_size', params.get('device_memory', 8))
-            s_v_web_id = cookie_dict.get('s_v_web_id') or self._generate_s_v_web_id()
+            for param, cookie_key in request_template.DEVICE_COOKIE_PARAMS:
+                params[param] = cookie_dict.get(
+                    cookie_key, params.get(param, request_template.DEVICE_PARAM_DEFAULTS[param])
+                )
             params['verifyFp'] = s_v_web_id
             params['fp'] = s_v_web_id
 
@@ -603,7 +631,16 @@ class DouyinAPI:
         )
         return sensitive_uri and '请求失败' in text
 
-    async def common_request(self, uri: str, params: dict, headers: dict, host: str = None, skip_sign: bool = False, method: str = 'GET') -> tuple[dict, bool]:
+    async def common_request(
+        self,
+        uri: str,
+        params: dict,
+        headers: dict,
+        host: str = None,
+        skip_sign: bool = False,
+        method: str = 'GET',
+        use_cache: bool = True,
+    ) -> tuple[dict, bool]:
         """
         请求 douyin
         :param uri: 请求路径
@@ -612,24 +649,120 @@ class DouyinAPI:
         :param host: 可选的自定义host
         :param skip_sign: 跳过a_bogus签名（部分接口不需要）
         :param method: 请求方法 ('GET' 或 'POST')
+        :param use_cache: 允许使用响应缓存（仅对配置了 TTL 的 GET 接口生效）
         :return: 返回数据和是否成功
         """
-        base_host = host or self.host
+        if method.upper() != 'GET':
+            return await self._send_common_request(uri, params, headers, host, skip_sign, method)
+
+        policy = self.response_cache.policy_for(uri) if use_cache else None
+        cache_key = self.response_cache.make_key(self._resolve_host(host), uri, params)
+        if policy is not None:
+            cached, fresh = self.response_cache.get(cache_key)
+            API_CACHE_LOOKUPS.inc(uri=uri, result='miss' if cached is None else ('hit' if fresh else 'stale'))
+            if cached is not None:
+                if not fresh:
+                    self._schedule_revalidate(cache_key, policy, uri, dict(params), dict(headers), host, skip_sign)
+                return cached, True
+
+        # 相同的 GET 请求在途时共享同一次签名与上游调用
+        flight_key = (cache_key, skip_sign, tuple(sorted((str(k), str(v)) for k, v in headers.items())))
+
+        async def send():
+            result, success = await self._send_common_request(uri, params, headers, host, skip_sign, method)
+            if policy is not None:
+                self._store_cached_response(cache_key, policy, result, success)
+            return result, success
+
+        return await self.request_flights.do(flight_key, send)
+
+    def _store_cached_response(self, cache_key: tuple, policy, result: dict, success: bool) -> None:
+        # 失败、需要验证或登录的响应不写缓存
+        if success and isinstance(result, dict) and not result.get('_need_verify') and not result.get('_need_login'):
+            self.response_cache.set(cache_key, result, policy)
+        else:
+            self.response_cache.record_bypass()
+
+    def _schedule_revalidate(self, cache_key: tuple, policy, uri: str, params: dict, headers: dict, host, skip_sign: bool) -> None:
+        """stale-while-revalidate：先返回旧值，同一个键只在后台刷新一次。"""
+        if cache_key in self._revalidating:
+            return
+        self._revalidating.add(cache_key)
+
+        async def revalidate():
+            try:
+                result, success = await self._send_common_request(uri, params, headers, host, skip_sign, 'GET')
+                self._store_cached_response(cache_key, policy, result, success)
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"\033[91m[API] 后台刷新缓存失败: {e}\033[0m")
+            finally:
+                self._revalidating.discard(cache_key)
+
+        asyncio.get_running_loop().create_task(revalidate())
+
+    def invalidate_aweme_detail(self, aweme_id: str) -> None:
+        """点赞、收藏等写操作成功后丢弃该作品的详情缓存，重新读取时拿到新的状态与计数。"""
+        self.response_cache.invalidate('/aweme/v1/web/aweme/detail/', {'aweme_id': aweme_id})
+
+    def _invalidate_comment_cache(self) -> None:
+        """评论写操作后丢弃评论列表缓存，避免界面看到旧数据。"""
+        self.comment_tree.invalidate()
+
+    async def _send_common_request(self, uri: str, params: dict, headers: dict, host: str = None, skip_sign: bool = False, method: str = 'GET') -> tuple[dict, bool]:
+        """经过接口族限速后发出请求，并把结果反馈给限速器。"""
+        governor = get_rate_governor()
+        await governor.acquire(uri)
+        # 对冲请求从这里开始计算延迟，限速排队时间不算
+        mark_dispatched()
+        started_at = time.perf_counter()
+        result, success = await self._perform_common_request(uri, params, headers, host, skip_sign, method)
+        API_REQUEST_SECONDS.observe(time.perf_counter() - started_at, uri=uri)
+        outcome = self._rate_outcome(result, success)
+        API_REQUESTS.inc(uri=uri, outcome='failure' if outcome == 'ignored' else outcome)
+        governor.record(uri, outcome)
+        return result, success
+
+    @staticmethod
+    def _rate_outcome(result: dict, success: bool) -> str:
+        if success:
+            return 'success'
+        if not isinstance(result, dict):
+            return 'ignored'
+        if result.get('_need_verify') or result.get('_need_login'):
+            return 'throttled'
+        # -1 是本地签名/网络失败，不代表被限流
+        if result.get('status_code') not in (None, 0, -1):
+            return 'error'
+        return 'ignored'
+
+    async def _perform_common_request(self, uri: str, params: dict, headers: dict, host: str = None, skip_sign: bool = False, method: str = 'GET') -> tuple[dict, bool]:
+        """实际发出请求，不经过响应缓存与限速。"""
+        base_host = self._resolve_host(host)
         url = f'{base_host}{uri}'
-        params.update(self.common_params)
-        # 先应用通用头，再用自定义头覆盖
-        merged_headers = dict(self.common_headers)
-        merged_headers.update(headers)
-        headers = merged_headers
-        params = await self._deal_params(params, headers)
+        template = self._request_template()
+        if template.cookie or not any(key.lower() == 'cookie' for key in headers):
+            headers = template.merge_headers(headers)
+            dynamic_params = {}
+            if template.cookie:
+                webid = await self._get_webid(headers) or self._generate_fake_webid()
+                dynamic_params = template.dynamic_params(self._get_ms_token(), webid)
+            params, query = template.build(params, dynamic_params)
+        else:
+            # 调用方自带 Cookie 头时走逐项合并的旧流程
+            params.update(self.common_params)
+            merged_headers = dict(self.common_headers)
+            merged_headers.update(headers)
+            headers = merged_headers
+            params = await self._deal_params(params, headers)
+            query = request_template.encode_query(params)
 
         if not skip_sign:
-            query = '&'.join([f'{k}={urllib.parse.quote(str(v))}' for k, v in params.items()])
             try:
                 if 'reply' in uri:
-                    a_bogus = douyin_sign.sign_reply(query, headers["User-Agent"])
+                    a_bogus = await sign_executor.sign_reply(query, headers["User-Agent"])
                 else:
-                    a_bogus = douyin_sign.sign_detail(query, headers["User-Agent"])
+                    a_bogus = await sign_executor.sign_detail(query, headers["User-Agent"])
             except Exception as e:
                 if self.debug_mode:
                     print(f"\033[91m[API] 生成 a_bogus 失败: {e}\033[0m")
@@ -639,6 +772,7 @@ class DouyinAPI:
                     'message': f'签名生成失败: {e}',
                 }, False
             params["a_bogus"] = a_bogus
+            query = f'{query}&a_bogus={urllib.parse.quote(a_bogus, safe="")}'
 
         if self.debug_mode:
             print(f'\033[94m[API] 请求URL: {url}\033[0m')
@@ -649,18 +783,18 @@ class DouyinAPI:
         try:
             # 根据方法选择 GET 或 POST
             if method.upper() == 'POST':
-                response = await asyncio.to_thread(
-                    _api_post,
+                response = await transport.request(
+                    'POST',
                     url,
                     data=params,
                     headers=headers,
                     timeout=(10, 30),
                 )
             else:
-                response = await asyncio.to_thread(
-                    _api_get,
-                    url,
-                    params=params,
+                # 直接发送签名时使用的查询串，避免二次编码导致与 a_bogus 不一致
+                response = await transport.request(
+                    'GET',
+                    f'{url}?{query}' if query else url,
                     headers=headers,
                     timeout=(10, 30),
                 )
@@ -717,7 +851,7 @@ class DouyinAPI:
             return failure_payload, False
             
         try:
-            json_response = response.json()
+            json_response = json_codec.loads(response.content)
         except Exception:
             try:
                 text = response.text.lstrip()
@@ -784,7 +918,7 @@ class DouyinAPI:
         query_overrides: dict | None = None,
     ) -> tuple[dict, bool]:
         """POST 动作接口：公共参数放 query 并签名，动作参数放 form body。"""
-        base_host = host or self.host
+        base_host = self._resolve_host(host)
         url = f'{base_host}{uri}'
         query_params = dict(self.common_params)
         if (
@@ -843,7 +977,7 @@ class DouyinAPI:
 
         query = urllib.parse.urlencode(query_params)
         try:
-            query_params['a_bogus'] = douyin_sign.sign_detail(query, headers["User-Agent"])
+            query_params['a_bogus'] = await sign_executor.sign_detail(query, headers["User-Agent"])
         except Exception as e:
             if self.debug_mode:
                 print(f"\033[91m[API] 生成动作接口 a_bogus 失败: {e}\033[0m")
@@ -1009,7 +1143,7 @@ class DouyinAPI:
         params = await self._deal_params(params, headers)
         query = urllib.parse.urlencode(params)
         try:
-            params["a_bogus"] = douyin_sign.sign_detail(query, headers["User-Agent"])
+            params["a_bogus"] = await sign_executor.sign_detail(query, headers["User-Agent"])
         except Exception as e:
             return {
                 'status_code': -1,
@@ -1020,8 +1154,8 @@ class DouyinAPI:
         url = f'https://www-hj.douyin.com{uri}'
         try:
             if method.upper() == 'POST':
-                response = await asyncio.to_thread(
-                    _api_post,
+                response = await transport.request(
+                    'POST',
                     url,
                     params=params,
                     data=body_params,
@@ -1029,8 +1163,8 @@ class DouyinAPI:
                     timeout=(10, 30),
                 )
             else:
-                response = await asyncio.to_thread(
-                    _api_get,
+                response = await transport.request(
+                    'GET',
                     url,
                     params=params,
                     headers=headers,
@@ -1505,7 +1639,7 @@ class DouyinAPI:
         headers.update(self._relation_ticket_guard_headers(uri))
         params = await self._deal_params(params, headers)
         query = urllib.parse.urlencode(params)
-        params['a_bogus'] = douyin_sign.sign_detail(query, headers.get('User-Agent') or '')
+        params['a_bogus'] = await sign_executor.sign_detail(query, headers.get('User-Agent') or '')
 
         try:
             response = await asyncio.to_thread(
@@ -1554,11 +1688,11 @@ class DouyinAPI:
                 'msToken': self._get_ms_token(),
             }
             query = urllib.parse.urlencode(params)
-            params['a_bogus'] = douyin_sign.sign_detail(query, headers['User-Agent'])
+            params['a_bogus'] = await sign_executor.sign_detail(query, headers['User-Agent'])
 
         try:
-            response = await asyncio.to_thread(
-                _api_post,
+            response = await transport.request(
+                'POST',
                 url,
                 params=params,
                 headers=headers,
@@ -2345,6 +2479,14 @@ class DouyinAPI:
         if not comment_id:
             return {'message': '评论ID不能为空'}, False
 
+        self._invalidate_comment_cache()
+        try:
+            return await self._send_comment_digg(aweme_id, comment_id, liked, level)
+        finally:
+            # 写请求期间别的请求可能又把旧列表写回缓存，返回后再丢弃一次
+            self._invalidate_comment_cache()
+
+    async def _send_comment_digg(self, aweme_id: str, comment_id: str, liked: bool, level: int) -> tuple[dict, bool]:
         return await self.signed_form_action_request(
             '/aweme/v1/web/comment/digg',
             {},
@@ -2386,6 +2528,14 @@ class DouyinAPI:
         if not text:
             return {'message': '评论内容不能为空'}, False
 
+        self._invalidate_comment_cache()
+        try:
+            return await self._send_comment_publish(aweme_id, text, reply_id, reply_to_reply_id)
+        finally:
+            # 同 set_comment_liked：发布返回后再丢弃一次期间写回的旧列表
+            self._invalidate_comment_cache()
+
+    async def _send_comment_publish(self, aweme_id: str, text: str, reply_id: str, reply_to_reply_id: str) -> tuple[dict, bool]:
         current_user, logged_in = await self.get_current_user(strict_profile=True)
         if not logged_in:
             return self._build_login_required_error(current_user if isinstance(current_user, dict) else None), False
@@ -2466,7 +2616,7 @@ class DouyinAPI:
         query = _splice_params(query_params)
         body_query = _splice_params(body_params)
         try:
-            query_params['a_bogus'] = _sign_spider_a_bogus(query, body_query)
+            query_params['a_bogus'] = await _sign_spider_a_bogus(query, body_query)
         except Exception as e:
             return {
                 'status_code': -1,
@@ -2595,7 +2745,7 @@ class DouyinAPI:
             rust_headers['Cookie'] = '; '.join([f'{key}={value}' for key, value in rust_cookie_dict.items()])
             rust_params_str = urllib.parse.urlencode(rust_query_params)
             try:
-                rust_query_params['a_bogus'] = douyin_sign.sign_detail(
+                rust_query_params['a_bogus'] = await sign_executor.sign_detail(
                     rust_params_str,
                     rust_headers.get('User-Agent') or rust_headers.get('user-agent') or '',
                 )
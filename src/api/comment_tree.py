@@ -0,0 +1,204 @@
+"""评论树加载：一级评论页 + 热门评论的首页回复并发预取。
+
+评论页只在这里缓存（响应缓存不再缓存评论接口）。页面按 ``(aweme_id, comment_id, cursor)``
+缓存（一级评论的 comment_id 为空），同一页不区分 count，前端展开回复时直接命中预取结果。
+并发请求相同页面时只发出一次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from src.api.single_flight import SingleFlight
+from src.utils.metrics import counter
+
+PAGE_TTL_SECONDS = 120
+MAX_CACHED_PAGES = 2000
+REPLY_PAGE_SIZE = 6
+
+logger = logging.getLogger('api')
+
+COMMENT_TREE_LOOKUPS = counter('douyin_comment_tree_lookups_total', '评论树缓存查询', ('kind', 'result'))
+
+
+def comment_block(resp: dict) -> dict:
+    """评论接口有时把数据包在 ``data`` 里。"""
+    if isinstance(resp, dict) and isinstance(resp.get('data'), dict):
+        return resp['data']
+    return resp if isinstance(resp, dict) else {}
+
+
+def comment_items(resp: dict) -> list[dict]:
+    block = comment_block(resp)
+    items = block.get('comments') or block.get('reply_comments') or []
+    return [item for item in items if isinstance(item, dict)]
+
+
+class CommentTreeLoader:
+    """带 TTL 缓存与回复预取的评论加载器。"""
+
+    def __init__(self, api, *, reply_prefetch: int = 10, concurrency: int = 4, ttl: float = PAGE_TTL_SECONDS):
+        self.api = api
+        self.reply_prefetch = max(0, reply_prefetch)
+        self.concurrency = max(1, concurrency)
+        self.ttl = ttl
+        self._pages: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight('comment_tree')
+        self._prefetched = 0
+
+    # ---------- 缓存 ----------
+
+    def _cached(self, key: tuple):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._pages[key]
+                return None
+            self._pages.move_to_end(key)
+            return copy.deepcopy(entry[1])
+
+    def _store(self, key: tuple, resp: dict) -> None:
+        with self._lock:
+            self._pages[key] = (time.monotonic() + self.ttl, copy.deepcopy(resp))
+            self._pages.move_to_end(key)
+            while len(self._pages) > MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+
+    def invalidate(self, aweme_id: str | None = None) -> None:
+        """丢弃某个作品（或全部）的评论缓存，写操作后调用。"""
+        with self._lock:
+            if aweme_id is None:
+                self._pages.clear()
+                return
+            for key in [key for key in self._pages if key[0] == str(aweme_id)]:
+                del self._pages[key]
+
+    async def _load(self, kind: str, key: tuple, fetch) -> tuple[dict, bool]:
+        cached = self._cached(key)
+        COMMENT_TREE_LOOKUPS.inc(kind=kind, result='miss' if cached is None else 'hit')
+        if cached is not None:
+            return cached, True
+
+        async def fetch_and_store():
+            resp, success = await fetch()
+            if success:
+                self._store(key, resp)
+            return resp, success
+
+        return await self._flights.do(key, fetch_and_store)
+
+    # ---------- 对外接口 ----------
+
+    async def get_comments(self, aweme_id: str, count: int = 20, cursor: int = 0) -> tuple[dict, bool]:
+        aweme_id = str(aweme_id or '')
+        key = (aweme_id, '', int(cursor or 0))
+        return await self._load('comments', key, lambda: self.api.get_comments(aweme_id, count, cursor))
+
+    async def get_replies(self, aweme_id: str, comment_id: str, count: int = REPLY_PAGE_SIZE, cursor: int = 0) -> tuple[dict, bool]:
+        aweme_id = str(aweme_id or '')
+        comment_id = str(comment_id or '')
+        key = (aweme_id, comment_id, int(cursor or 0))
+        return await self._load('replies', key, lambda: self.api.get_comment_replies(aweme_id, comment_id, count, cursor))
+
+    def prefetch_targets(self, comments: list[dict], limit: int | None = None) -> list[str]:
+        """按页面顺序选出前 N 条有回复的一级评论。"""
+        limit = self.reply_prefetch if limit is None else max(0, limit)
+        targets = []
+        for item in comments:
+            if len(targets) >= limit:
+                break
+            cid = str(item.get('cid') or '')
+            if cid and int(item.get('reply_comment_total') or 0) > 0:
+                targets.append(cid)
+        return targets
+
+    async def prefetch_replies(self, aweme_id: str, comments: list[dict], on_replies=None, limit: int | None = None) -> int:
+        """并发拉取热门评论的首页回复；每拿到一页调用 ``on_replies(comment_id, resp, success)``。"""
+        targets = self.prefetch_targets(comments, limit)
+        if not targets:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(comment_id: str):
+            async with semaphore:
+                try:
+                    resp, success = await self.get_replies(aweme_id, comment_id)
+                except Exception as error:
+                    resp, success = {'message': str(error)}, False
+            return comment_id, resp, success
+
+        loaded = 0
+        tasks = [asyncio.ensure_future(fetch(comment_id)) for comment_id in targets]
+        try:
+            for future in asyncio.as_completed(tasks):
+                comment_id, resp, success = await future
+                if success:
+                    loaded += 1
+                if on_replies is not None:
+                    on_replies(comment_id, resp, success)
+                # 需要验证或登录时剩余请求也会失败，直接取消
+                if isinstance(resp, dict) and (resp.get('_need_verify') or resp.get('_need_login')):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        with self._lock:
+            self._prefetched += loaded
+        return loaded
+
+    async def load_tree(self, aweme_id: str, count: int = 20, cursor: int = 0, on_comments=None, on_replies=None) -> tuple[dict, bool]:
+        """拉取一级评论页，先回调 ``on_comments(resp, success)``，再并发预取回复。"""
+        resp, success = await self.get_comments(aweme_id, count, cursor)
+        if on_comments is not None:
+            on_comments(resp, success)
+        if success:
+            await self.prefetch_replies(aweme_id, comment_items(resp), on_replies)
+        return resp, success
+
+    async def stream_tree(self, aweme_id: str, emit, page_payload, *, request_id: str = '', count: int = 20, cursor: int = 0) -> bool:
+        """按 Socket.IO 事件推送评论树。
+
+        依次 ``emit`` ``comment_tree_comments``、每条预取回复一次 ``comment_tree_replies``，
+        最后 ``comment_tree_done``。``page_payload(resp, success, fallback)`` 负责把上游响应
+        转成前端结构。
+        """
+        aweme_id = str(aweme_id or '')
+        base = {'request_id': request_id, 'aweme_id': aweme_id}
+
+        def on_comments(resp, success):
+            emit('comment_tree_comments', {**base, **page_payload(resp, success, '获取评论失败，请稍后重试')})
+
+        def on_replies(comment_id, resp, success):
+            emit('comment_tree_replies', {
+                **base,
+                'comment_id': comment_id,
+                **page_payload(resp, success, '获取评论回复失败，请稍后重试'),
+            })
+
+        try:
+            _, success = await self.load_tree(aweme_id, count, cursor, on_comments, on_replies)
+        except Exception as error:
+            logger.exception(f"加载评论树失败: {error}")
+            success = False
+        emit('comment_tree_done', {**base, 'success': success})
+        return success
+
+    def stats(self) -> dict:
+        with self._lock:
+            pages = len(self._pages)
+            prefetched = self._prefetched
+        return {
+            'cached_pages': pages,
+            'prefetched_reply_pages': prefetched,
+            'reply_prefetch': self.reply_prefetch,
+            'concurrency': self.concurrency,
+            'flights': self._flights.stats(),
+        }
@@ -0,0 +1,162 @@
+"""对冲请求（hedged request）。
+
+同一份数据有多种取法（例如作品详情的免签名 / 签名请求）时，先发出历史成功率最高的
+一种；超过对冲延迟仍未返回，或者返回了无效结果，再发出下一种。第一个有效结果胜出，
+其余仍在进行的请求被取消（经过 ``SingleFlight`` 合并的请求，没有其他等待者时上游调用
+一并取消）。每种取法的成功率持续记录，下次按成功率排序。
+
+``wait_dispatch=True`` 时对冲延迟从请求真正发往上游（``mark_dispatched``）开始计时，
+在限速器里排队的时间不算作上游延迟，避免限速时对冲请求反而翻倍。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+
+_dispatch_callback: contextvars.ContextVar = contextvars.ContextVar('hedged_request_dispatch', default=None)
+
+
+def mark_dispatched() -> None:
+    """请求通过限速、即将发往上游时调用；不在对冲请求里时什么也不做。"""
+    callback = _dispatch_callback.get()
+    if callback is not None:
+        callback()
+
+
+class _VariantStats:
+    __slots__ = ('attempts', 'successes', 'failures', 'wins', 'cancelled')
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+        self.cancelled = 0
+
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑，没有样本时视为 0.5
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+
+class HedgedRequest:
+    """按成功率排序、延迟对冲的多取法请求。"""
+
+    def __init__(self, name: str, variants: tuple[str, ...]):
+        self.name = name
+        self.variants = tuple(variants)
+        self._lock = threading.Lock()
+        self._stats = {variant: _VariantStats() for variant in self.variants}
+
+    def order(self) -> list[str]:
+        """按成功率从高到低排列；成功率相同保持声明顺序。"""
+        with self._lock:
+            rates = {variant: self._stats[variant].success_rate() for variant in self.variants}
+        return sorted(self.variants, key=lambda variant: -rates[variant])
+
+    def _record(self, variant: str, field: str) -> None:
+        with self._lock:
+            stats = self._stats[variant]
+            setattr(stats, field, getattr(stats, field) + 1)
+
+    async def run(self, factories: dict, delay: float, is_good, wait_dispatch: bool = False):
+        """执行对冲请求，返回 ``(variant, result)``。
+
+        ``factories`` 是取法名到无参协程函数的映射，``is_good(result)`` 判断结果是否有效。
+        ``wait_dispatch`` 为真时，最近发出的取法调用 ``mark_dispatched`` 之后才开始计算对冲延迟。
+        全部无效时返回最后一个完成的结果；全部抛异常时抛出最后一个异常。
+        """
+        loop = asyncio.get_running_loop()
+        pending_variants = [variant for variant in self.order() if variant in factories]
+        running: dict[asyncio.Task, str] = {}
+        last_result = None
+        last_variant = None
+        last_error = None
+        # 最近发出的取法：开始计时的时间（None 表示仍在排队）与通知事件
+        clock = {'started_at': None, 'dispatched': None}
+
+        async def call(variant: str):
+            if wait_dispatch:
+                _dispatch_callback.set(mark)
+            return await factories[variant]()
+
+        def launch() -> None:
+            variant = pending_variants.pop(0)
+            self._record(variant, 'attempts')
+            clock['started_at'] = None if wait_dispatch else loop.time()
+            clock['dispatched'] = asyncio.Event()
+            running[asyncio.ensure_future(call(variant))] = variant
+
+        def mark() -> None:
+            if clock['started_at'] is None:
+                clock['started_at'] = loop.time()
+                clock['dispatched'].set()
+
+        try:
+            launch()
+            while running:
+                if not pending_variants:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                elif clock['started_at'] is None:
+                    # 还在限速器里排队，等它发出或完成，不计入对冲延迟
+                    waiter = asyncio.ensure_future(clock['dispatched'].wait())
+                    try:
+                        done, _ = await asyncio.wait([*running, waiter], return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        waiter.cancel()
+                    done = done - {waiter}
+                    if not done:
+                        continue
+                else:
+                    timeout = max(0.0, delay - (loop.time() - clock['started_at']))
+                    done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        # 对冲延迟内没有返回，发出下一种取法
+                        launch()
+                        continue
+                for task in done:
+                    variant = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self._record(variant, 'failures')
+                        last_error = e
+                        continue
+                    if is_good(result):
+                        self._record(variant, 'successes')
+                        self._record(variant, 'wins')
+                        return variant, result
+                    self._record(variant, 'failures')
+                    last_variant, last_result = variant, result
+                # 已完成的都无效，立即发出下一种，不再等待对冲延迟
+                if pending_variants and len(running) == 0:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                # 等落败的取法真正结束；取消前已经完成的不算作取消
+                await asyncio.gather(*running, return_exceptions=True)
+                for task, variant in running.items():
+                    if task.cancelled():
+                        self._record(variant, 'cancelled')
+
+        if last_variant is None and last_error is not None:
+            raise last_error
+        return last_variant, last_result
+
+    def stats(self) -> dict:
+        with self._lock:
+            variants = {
+                variant: {
+                    'attempts': stats.attempts,
+                    'successes': stats.successes,
+                    'failures': stats.failures,
+                    'wins': stats.wins,
+                    'cancelled': stats.cancelled,
+                    'success_rate': round(stats.success_rate(), 4),
+                }
+                for variant, stats in self._stats.items()
+            }
+        return {'name': self.name, 'order': self.order(), 'variants': variants}
@@ -0,0 +1,245 @@
+"""按接口族自适应限速（令牌桶 + AIMD）。
+
+每个接口族一个令牌桶。接口族一开始不限速，第一次遇到验证/登录拦截后才从
+``INITIAL_RATE`` 开始限速：之后请求成功时线性提高速率，再遇到拦截时速率减半，
+遇到其他 status_code 错误时小幅下调。学到的速率保存在 ``Config.CONFIG_FILE``
+同目录的 ``rate_governor.json``，重启后沿用；在事件循环里记录结果时写文件交给线程池。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from src.config.config import Config
+
+logger = logging.getLogger('api')
+
+RATE_GOVERNOR_FILENAME = 'rate_governor.json'
+
+# URI 片段 -> 接口族，按顺序匹配
+ENDPOINT_FAMILIES = (
+    ('aweme/post', 'user_posts'),
+    ('user/profile', 'user_profile'),
+    ('aweme/detail', 'aweme_detail'),
+    ('comment/list', 'comments'),
+    ('discover/search', 'search'),
+    ('general/search', 'search'),
+    ('aweme/favorite', 'favorites'),
+    ('module/feed', 'feed'),
+)
+DEFAULT_FAMILY = 'default'
+
+# 速率为每秒请求数，0 表示不限速
+INITIAL_RATE = 2.0  # 接口族第一次触发验证后的起始速率
+MIN_RATE = 0.2
+MAX_RATE = 10.0
+ADDITIVE_INCREASE = 0.05
+VERIFY_DECREASE = 0.5
+ERROR_DECREASE = 0.8
+# 同一批并发请求同时失败只降一次速
+DECREASE_COOLDOWN_SECONDS = 2.0
+SAVE_INTERVAL_SECONDS = 30.0
+
+
+def endpoint_family(uri: str) -> str:
+    for fragment, family in ENDPOINT_FAMILIES:
+        if fragment in (uri or ''):
+            return family
+    return DEFAULT_FAMILY
+
+
+def rate_governor_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(Config.CONFIG_FILE)), RATE_GOVERNOR_FILENAME)
+
+
+class _Bucket:
+    __slots__ = (
+        'rate', 'tokens', 'updated_at', 'last_decrease', 'successes', 'throttled', 'errors', 'waited_seconds'
+    )
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.waited_seconds = 0.0
+
+
+class RateGovernor:
+    """所有 common_request 调用共享的接口族限速器。"""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # 串行写文件，后写入的一定是较新的快照
+        self._save_lock = threading.Lock()
+        self._buckets: dict[str, _Bucket] = {}
+        self._learned = self._load()
+        self._last_saved = time.monotonic()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning('读取限速状态失败: %s', e)
+            return {}
+        rates = data.get('rates', {}) if isinstance(data, dict) else {}
+        learned = {}
+        for family, rate in rates.items():
+            try:
+                learned[str(family)] = max(MIN_RATE, min(MAX_RATE, float(rate)))
+            except (TypeError, ValueError):
+                continue
+        return learned
+
+    def _bucket(self, family: str) -> _Bucket:
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            bucket = _Bucket(self._learned.get(family, 0.0))
+            self._buckets[family] = bucket
+        return bucket
+
+    def reserve(self, uri: str) -> float:
+        """预约一个令牌，返回需要等待的秒数。"""
+        family = endpoint_family(uri)
+        with self._lock:
+            bucket = self._bucket(family)
+            if bucket.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            burst = max(1.0, bucket.rate)
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * bucket.rate)
+            bucket.updated_at = now
+            bucket.tokens -= 1.0
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            bucket.waited_seconds += wait
+            return wait
+
+    async def acquire(self, uri: str) -> None:
+        if not getattr(Config, 'RATE_GOVERNOR', True):
+            return
+        wait = self.reserve(uri)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, uri: str, outcome: str) -> None:
+        """记录请求结果：``success`` / ``throttled``（验证、登录拦截）/ ``error``（其他 status_code 错误）。"""
+        family = endpoint_family(uri)
+        with self._lock:
+            bucket = self._bucket(family)
+            now = time.monotonic()
+            if outcome == 'success':
+                bucket.successes += 1
+                if bucket.rate <= 0:
+                    return
+                bucket.rate = min(MAX_RATE, bucket.rate + ADDITIVE_INCREASE)
+            elif outcome in ('throttled', 'error'):
+                if outcome == 'throttled':
+                    bucket.throttled += 1
+                else:
+                    bucket.errors += 1
+                if bucket.rate <= 0:
+                    # 不限速的接口族只在触发验证后开始限速，普通错误不算
+                    if outcome != 'throttled':
+                        return
+                    bucket.rate = INITIAL_RATE
+                    bucket.last_decrease = now
+                    bucket.tokens = 0.0
+                    bucket.updated_at = now
+                elif now - bucket.last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    factor = VERIFY_DECREASE if outcome == 'throttled' else ERROR_DECREASE
+                    bucket.rate = max(MIN_RATE, bucket.rate * factor)
+                    bucket.last_decrease = now
+                    # 降速后清空积攒的令牌，立即按新速率排队
+                    bucket.tokens = min(bucket.tokens, 0.0)
+            else:
+                return
+            self._learned[family] = bucket.rate
+            self._dirty = True
+            should_save = outcome != 'success' or now - self._last_saved >= SAVE_INTERVAL_SECONDS
+        if should_save:
+            self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        """record 通常在全局事件循环里调用，写文件放到线程池，不阻塞循环。"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        loop.run_in_executor(None, self.save)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = json.dumps(
+                    {'rates': {family: round(rate, 3) for family, rate in sorted(self._learned.items())}},
+                    ensure_ascii=False,
+                    indent=2,
+                )
+                self._dirty = False
+                self._last_saved = time.monotonic()
+            temp_file = f'{self.path}.tmp'
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                    f.write('\n')
+                os.replace(temp_file, self.path)
+            except Exception as e:
+                logger.warning('保存限速状态失败: %s', e)
+                try:
+                    os.remove(temp_file)
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            families = {}
+            for family in sorted(set(self._buckets) | set(self._learned)):
+                bucket = self._buckets.get(family)
+                families[family] = {
+                    'rate_per_second': round(bucket.rate if bucket else self._learned[family], 3),
+                    'successes': bucket.successes if bucket else 0,
+                    'throttled': bucket.throttled if bucket else 0,
+                    'errors': bucket.errors if bucket else 0,
+                    'waited_seconds': round(bucket.waited_seconds, 3) if bucket else 0.0,
+                }
+            return {
+                'enabled': bool(getattr(Config, 'RATE_GOVERNOR', True)),
+                'families': families,
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    """返回全局限速器；配置文件位置变化时重建。"""
+    global _governor
+    path = rate_governor_path()
+    with _governor_lock:
+        if _governor is None or _governor.path != path:
+            if _governor is not None:
+                _governor.save()
+            _governor = RateGovernor(path)
+        return _governor
@@ -0,0 +1,126 @@
+"""普通 Web 接口的请求预处理模板。
+
+Cookie 解析结果、从 Cookie 派生的设备参数（屏幕尺寸、CPU、内存、s_v_web_id、UIFID）
+以及通用参数的查询串只在 Cookie 或 User-Agent 变化时计算一次；单个请求只需编码
+自己的业务参数和每次变化的 msToken/webid。
+"""
+
+from __future__ import annotations
+
+import urllib.parse
+
+# 查询参数 -> 提供该值的 Cookie 名
+DEVICE_COOKIE_PARAMS = (
+    ('screen_width', 'dy_swidth'),
+    ('screen_height', 'dy_sheight'),
+    ('cpu_core_num', 'device_web_cpu_core'),
+    ('device_memory', 'device_web_memory_size'),
+)
+DEVICE_PARAM_DEFAULTS = {
+    'screen_width': 1680,
+    'screen_height': 1050,
+    'cpu_core_num': 8,
+    'device_memory': 8,
+}
+
+
+def encode_query(params: dict) -> str:
+    """与签名使用的编码一致：``key=quote(str(value))`` 以 & 连接。"""
+    quote = urllib.parse.quote
+    return '&'.join(f'{key}={quote(str(value))}' for key, value in params.items())
+
+
+def parse_cookie(cookie: str) -> dict:
+    cookie_dict = {}
+    for item in (cookie or '').split(';'):
+        if '=' in item:
+            key, value = item.strip().split('=', 1)
+            cookie_dict[key] = value
+    return cookie_dict
+
+
+class PreparedRequestTemplate:
+    """一个 Cookie + User-Agent 组合下不变的请求参数与请求头。"""
+
+    __slots__ = (
+        'cookie',
+        'user_agent',
+        'common_params',
+        'cookie_dict',
+        'verify_fp',
+        'uifid',
+        'static_params',
+        'static_query',
+        'base_headers',
+        'forced_headers',
+    )
+
+    def __init__(self, cookie: str, common_params: dict, common_headers: dict, verify_fp_factory):
+        self.cookie = cookie or ''
+        self.user_agent = common_headers.get('User-Agent', '')
+        self.common_params = common_params
+        self.cookie_dict = parse_cookie(self.cookie)
+
+        static_params = dict(common_params)
+        self.verify_fp = ''
+        self.uifid = ''
+        self.forced_headers = {}
+        if self.cookie:
+            for param, cookie_key in DEVICE_COOKIE_PARAMS:
+                static_params[param] = self.cookie_dict.get(
+                    cookie_key, static_params.get(param, DEVICE_PARAM_DEFAULTS[param])
+                )
+            self.verify_fp = self.cookie_dict.get('s_v_web_id') or verify_fp_factory()
+            self.uifid = self.cookie_dict.get('UIFID', '')
+            self.forced_headers['Cookie'] = self.cookie
+            if self.uifid:
+                self.forced_headers['uifid'] = self.uifid
+
+        self.static_params = static_params
+        self.static_query = encode_query(static_params)
+        self.base_headers = dict(common_headers)
+
+    def matches(self, cookie: str, common_params: dict, common_headers: dict) -> bool:
+        return (
+            self.cookie == (cookie or '')
+            and self.common_params is common_params
+            and self.user_agent == common_headers.get('User-Agent', '')
+        )
+
+    def merge_headers(self, headers: dict) -> dict:
+        merged = dict(self.base_headers)
+        merged.update(headers)
+        merged.update(self.forced_headers)
+        return merged
+
+    def dynamic_params(self, ms_token: str, webid: str) -> dict:
+        """每次请求变化的参数，顺序与旧版 _deal_params 一致。"""
+        if not self.cookie:
+            return {}
+        params = {
+            'msToken': ms_token,
+            'verifyFp': self.verify_fp,
+            'fp': self.verify_fp,
+        }
+        if self.uifid:
+            params['uifid'] = self.uifid
+        params['webid'] = webid
+        return params
+
+    def build(self, endpoint_params: dict, dynamic_params: dict) -> tuple[dict, str]:
+        """返回完整参数字典与待签名/发送的查询串；通用参数覆盖同名业务参数。"""
+        static_params = self.static_params
+        endpoint_only = {
+            key: value
+            for key, value in endpoint_params.items()
+            if key not in static_params and key not in dynamic_params
+        }
+        params = dict(endpoint_only)
+        params.update(static_params)
+        params.update(dynamic_params)
+        query = '&'.join(
+            part
+            for part in (encode_query(endpoint_only), self.static_query, encode_query(dynamic_params))
+            if part
+        )
+        return params, query
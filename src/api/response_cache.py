@@ -0,0 +1,135 @@
+"""幂等 GET 接口的响应缓存（TTL + 按字节数 LRU 淘汰）。
+
+缓存键只包含 host、URI 与业务参数，``msToken``/``a_bogus``/``verifyFp`` 等每次变化的
+参数不参与；值以 JSON 字节保存，命中时重新解析，调用方修改返回值不会污染缓存。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils import json_codec
+
+# 不参与缓存键的易变参数
+VOLATILE_PARAMS = frozenset({'msToken', 'a_bogus', 'verifyFp', 'fp', 'webid', 'uifid'})
+
+# URI -> (新鲜期秒数, 过期后仍可先返回旧值并后台刷新的秒数)
+ENDPOINT_TTLS = {
+    '/aweme/v1/web/aweme/detail/': (300, 1800),
+    '/aweme/v1/web/user/profile/other/': (300, 1800),
+    '/aweme/v1/web/aweme/post/': (60, 300),
+    '/aweme/v1/web/mix/listcollection/': (120, 600),
+    '/aweme/v1/web/series/aweme/': (300, 1800),
+}
+
+
+class _Entry:
+    __slots__ = ('payload', 'fresh_until', 'stale_until')
+
+    def __init__(self, payload: bytes, fresh_until: float, stale_until: float):
+        self.payload = payload
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """按 URI 配置 TTL 的响应缓存，总字节数超出上限时淘汰最久未使用的条目。"""
+
+    def __init__(self, max_bytes: int, ttls: dict | None = None):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttls = dict(ENDPOINT_TTLS if ttls is None else ttls)
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+
+    def policy_for(self, uri: str):
+        if self.max_bytes <= 0:
+            return None
+        return self.ttls.get(uri)
+
+    @staticmethod
+    def make_key(host: str, uri: str, params: dict) -> tuple:
+        items = tuple(sorted(
+            (str(key), '' if value is None else str(value))
+            for key, value in (params or {}).items()
+            if key not in VOLATILE_PARAMS
+        ))
+        return host, uri, items
+
+    def get(self, key: tuple):
+        """返回 ``(data, fresh)``；未命中或已超出 stale 窗口时返回 ``(None, False)``。"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry.stale_until:
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = now < entry.fresh_until
+            if fresh:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+            payload = entry.payload
+        return json_codec.loads(payload), fresh
+
+    def set(self, key: tuple, data: dict, policy) -> bool:
+        ttl, stale_ttl = policy
+        try:
+            payload = json_codec.dumps_bytes(data)
+        except (TypeError, ValueError):
+            return False
+        if len(payload) > self.max_bytes:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(payload, now + ttl, now + ttl + stale_ttl)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        return True
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._bypassed += 1
+
+    def invalidate(self, uri: str | None = None, params: dict | None = None) -> None:
+        """丢弃 ``uri`` 的缓存；给出 ``params`` 时只丢弃业务参数包含这些值的条目。"""
+        wanted = {(str(key), str(value)) for key, value in (params or {}).items()}
+        with self._lock:
+            for key in [
+                key for key in self._entries
+                if (uri is None or key[1] == uri) and wanted.issubset(key[2])
+            ]:
+                self._remove(key)
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.payload)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'misses': self._misses,
+                'bypassed': self._bypassed,
+                'evictions': self._evictions,
+                'hit_rate': round((self._hits + self._stale_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -1,12 +1,18 @@
 """Pure Python implementation of Douyin a_bogus signing.
 
 Ported from the Rust implementation in better-douyin-R/src-tauri/src/sign/mod.rs.
+SM3 uses OpenSSL through ``hashlib`` when available and falls back to Python;
+``DOUYIN_SM3_BACKEND`` (auto/openssl/python) forces a backend.
 """
 
 from __future__ import annotations
 
 import base64
+import functools
+import hashlib
+import os
 import random
+import struct
 import time
 
 _U32_MASK = 0xFFFFFFFF
@@ -21,6 +27,8 @@ _IV = (
     0xB0FB0E4E,
 )
 _TJ = tuple([0x79CC4519] * 16 + [0x7A879D8A] * 48)
+_BLOCK_STRUCT = struct.Struct(">16I")
+_DIGEST_STRUCT = struct.Struct(">8I")
 _S4 = b"Dkdpgh2ZmsQB80/MfvV36XI1R45-WUAlEixNLwoqYTOPuzKFjJnry79HbGcaStCe="
 _S3 = b"ckdp1h4ZKsUB80/Mfvw36XIgR25+WQAlEi7NLboqYTOPuzmFjJnryx9HVGDaStCe"
 _WINDOW_ENV_STR = "1536|747|1536|834|0|30|0|0|1536|834|1536|864|1525|747|24|24|Win32"
@@ -41,127 +49,199 @@ def _rotate_left(value: int, bits: int) -> int:
     return _u32((value << bits) | (value >> (32 - bits)))
 
 
-def _ff(x: int, y: int, z: int, index: int) -> int:
-    if index < 16:
-        return x ^ y ^ z
-    return (x & y) | (x & z) | (y & z)
+_TJ_ROTATED = tuple(_rotate_left(_TJ[i], i) for i in range(64))
+_SM3_ABC_DIGEST = bytes.fromhex("66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0")
+
+
+def _sm3_pad(data: bytes) -> bytes:
+    bit_len = len(data) * 8
+    return data + b"\x80" + b"\x00" * ((55 - len(data)) % 64) + bit_len.to_bytes(8, "big")
+
+
+def _sm3_hash_python(data: bytes) -> bytes:
+    """Pure Python SM3 with the hot loop kept on local variables."""
+    message = _sm3_pad(bytes(data))
+    mask = _U32_MASK
+    tj = _TJ_ROTATED
+    unpack = _BLOCK_STRUCT.unpack_from
+    v0, v1, v2, v3, v4, v5, v6, v7 = _IV
+
+    for offset in range(0, len(message), 64):
+        w = list(unpack(message, offset))
+        append = w.append
+        for j in range(16, 68):
+            x = w[j - 3]
+            x = w[j - 16] ^ w[j - 9] ^ (((x << 15) | (x >> 17)) & mask)
+            y = w[j - 13]
+            append(
+                x
+                ^ (((x << 15) | (x >> 17)) & mask)
+                ^ (((x << 23) | (x >> 9)) & mask)
+                ^ (((y << 7) | (y >> 25)) & mask)
+                ^ w[j - 6]
+            )
 
+        a, b, c, d, e, f, g, h = v0, v1, v2, v3, v4, v5, v6, v7
+        for j in range(16):
+            a12 = ((a << 12) | (a >> 20)) & mask
+            ss1 = (a12 + e + tj[j]) & mask
+            ss1 = ((ss1 << 7) | (ss1 >> 25)) & mask
+            wj = w[j]
+            tt1 = ((a ^ b ^ c) + d + (ss1 ^ a12) + (wj ^ w[j + 4])) & mask
+            tt2 = ((e ^ f ^ g) + h + ss1 + wj) & mask
+            d = c
+            c = ((b << 9) | (b >> 23)) & mask
+            b = a
+            a = tt1
+            h = g
+            g = ((f << 19) | (f >> 13)) & mask
+            f = e
+            e = tt2 ^ (((tt2 << 9) | (tt2 >> 23)) & mask) ^ (((tt2 << 17) | (tt2 >> 15)) & mask)
+        for j in range(16, 64):
+            a12 = ((a << 12) | (a >> 20)) & mask
+            ss1 = (a12 + e + tj[j]) & mask
+            ss1 = ((ss1 << 7) | (ss1 >> 25)) & mask
+            wj = w[j]
+            tt1 = (((a & b) | (a & c) | (b & c)) + d + (ss1 ^ a12) + (wj ^ w[j + 4])) & mask
+            tt2 = (((e & f) | ((e ^ mask) & g)) + h + ss1 + wj) & mask
+            d = c
+            c = ((b << 9) | (b >> 23)) & mask
+            b = a
+            a = tt1
+            h = g
+            g = ((f << 19) | (f >> 13)) & mask
+            f = e
+            e = tt2 ^ (((tt2 << 9) | (tt2 >> 23)) & mask) ^ (((tt2 << 17) | (tt2 >> 15)) & mask)
+
+        v0 ^= a
+        v1 ^= b
+        v2 ^= c
+        v3 ^= d
+        v4 ^= e
+        v5 ^= f
+        v6 ^= g
+        v7 ^= h
+
+    return _DIGEST_STRUCT.pack(v0, v1, v2, v3, v4, v5, v6, v7)
+
+
+def _sm3_hash_openssl(data: bytes) -> bytes:
+    return hashlib.new("sm3", data).digest()
+
+
+def _openssl_sm3_available() -> bool:
+    try:
+        return _sm3_hash_openssl(b"abc") == _SM3_ABC_DIGEST
+    except (ValueError, TypeError):
+        return False
 
-def _gg(x: int, y: int, z: int, index: int) -> int:
-    if index < 16:
-        return x ^ y ^ z
-    return (x & y) | ((~x & _U32_MASK) & z)
 
+def available_sm3_backends() -> tuple[str, ...]:
+    """Return the SM3 backends usable in this interpreter, fastest first."""
+    if _openssl_sm3_available():
+        return ("openssl", "python")
+    return ("python",)
 
-def _p0(value: int) -> int:
-    return _u32(value ^ _rotate_left(value, 9) ^ _rotate_left(value, 17))
 
+_SM3_BACKENDS = {
+    "openssl": _sm3_hash_openssl,
+    "python": _sm3_hash_python,
+}
+_sm3_backend = "python"
+_sm3_impl = _sm3_hash_python
 
-def _p1(value: int) -> int:
-    return _u32(value ^ _rotate_left(value, 15) ^ _rotate_left(value, 23))
 
+def set_sm3_backend(name: str = "auto") -> str:
+    """Select the SM3 backend: ``auto``, ``openssl`` or ``python``."""
+    global _sm3_backend, _sm3_impl
+    requested = str(name or "auto").strip().lower()
+    available = available_sm3_backends()
+    if requested == "auto":
+        requested = available[0]
+    if requested not in available:
+        raise ValueError(f"SM3 backend unavailable: {requested}")
+    _sm3_backend = requested
+    _sm3_impl = _SM3_BACKENDS[requested]
+    return requested
 
-def sm3_hash(data: bytes) -> bytes:
-    state = list(_IV)
-    total_len = len(data)
-    buffer = bytearray(data)
-    bit_len = total_len * 8
-    buffer.append(0x80)
-    while len(buffer) % 64 != 56:
-        buffer.append(0)
-    buffer.extend(bit_len.to_bytes(8, "big"))
-
-    for offset in range(0, len(buffer), 64):
-        block = buffer[offset : offset + 64]
-        w = [0] * 68
-        w_prime = [0] * 64
-
-        for i in range(16):
-            w[i] = int.from_bytes(block[i * 4 : i * 4 + 4], "big")
-
-        for i in range(16, 68):
-            w[i] = _u32(
-                _p1(w[i - 16] ^ w[i - 9] ^ _rotate_left(w[i - 3], 15))
-                ^ _rotate_left(w[i - 13], 7)
-                ^ w[i - 6]
-            )
 
-        for i in range(64):
-            w_prime[i] = w[i] ^ w[i + 4]
+def get_sm3_backend() -> str:
+    return _sm3_backend
 
-        a = state[:]
-        for i in range(64):
-            ss1 = _rotate_left(
-                _u32(_rotate_left(a[0], 12) + a[4] + _rotate_left(_TJ[i], i)),
-                7,
-            )
-            ss2 = ss1 ^ _rotate_left(a[0], 12)
-            tt1 = _u32(_ff(a[0], a[1], a[2], i) + a[3] + ss2 + w_prime[i])
-            tt2 = _u32(_gg(a[4], a[5], a[6], i) + a[7] + ss1 + w[i])
 
-            a[3] = a[2]
-            a[2] = _rotate_left(a[1], 9)
-            a[1] = a[0]
-            a[0] = tt1
-            a[7] = a[6]
-            a[6] = _rotate_left(a[5], 19)
-            a[5] = a[4]
-            a[4] = _p0(tt2)
+def sm3_hash(data: bytes) -> bytes:
+    return _sm3_impl(data)
 
-        state = [_u32(current ^ value) for current, value in zip(state, a)]
 
-    return b"".join(word.to_bytes(4, "big") for word in state)
+try:
+    set_sm3_backend(os.environ.get("DOUYIN_SM3_BACKEND", "auto"))
+except ValueError:
+    set_sm3_backend("auto")
 
 
-def rc4_encrypt(plaintext: bytes, key: bytes) -> bytes:
+def _rc4_ksa(key: bytes) -> list[int]:
     if not key:
         raise ValueError("RC4 key cannot be empty")
 
     state = list(range(256))
+    key_len = len(key)
     j = 0
     for i in range(256):
-        j = (j + state[i] + key[i % len(key)]) & 0xFF
+        j = (j + state[i] + key[i % key_len]) & 0xFF
         state[i], state[j] = state[j], state[i]
+    return state
+
 
+def _rc4_prga(state: list[int], plaintext: bytes) -> bytes:
+    """Run the RC4 keystream over ``plaintext``; ``state`` is consumed."""
+    output = bytearray(plaintext)
     i = 0
     j = 0
-    output = bytearray()
-    for byte in plaintext:
+    for index in range(len(output)):
         i = (i + 1) & 0xFF
-        j = (j + state[i]) & 0xFF
-        state[i], state[j] = state[j], state[i]
-        t = (state[i] + state[j]) & 0xFF
-        output.append(state[t] ^ byte)
+        si = state[i]
+        j = (j + si) & 0xFF
+        sj = state[j]
+        state[i] = sj
+        state[j] = si
+        output[index] ^= state[(si + sj) & 0xFF]
     return bytes(output)
 
 
+def rc4_encrypt(plaintext: bytes, key: bytes) -> bytes:
+    return _rc4_prga(_rc4_ksa(key), plaintext)
+
+
+# The final a_bogus payload is always encrypted with the fixed key b"y".
+_RC4_Y_STATE = tuple(_rc4_ksa(b"y"))
+
+
+def _rc4_encrypt_y(plaintext: bytes) -> bytes:
+    return _rc4_prga(list(_RC4_Y_STATE), plaintext)
+
+
+_STANDARD_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_B64_TRANSLATIONS = {table: bytes.maketrans(_STANDARD_B64_ALPHABET, table[:64]) for table in (_S3, _S4)}
+
+
+def _b64_translation(table: bytes) -> bytes:
+    translation = _B64_TRANSLATIONS.get(table)
+    if translation is None:
+        translation = bytes.maketrans(_STANDARD_B64_ALPHABET, table[:64])
+        _B64_TRANSLATIONS[table] = translation
+    return translation
+
+
 def _custom_base64_encode(data: bytes, table: bytes = _S4, pad: bool = True) -> str:
-    result: list[str] = []
-    data_len = len(data) - (len(data) % 3)
-
-    for offset in range(0, data_len, 3):
-        n = (data[offset] << 16) | (data[offset + 1] << 8) | data[offset + 2]
-        result.append(chr(table[(n >> 18) & 0x3F]))
-        result.append(chr(table[(n >> 12) & 0x3F]))
-        result.append(chr(table[(n >> 6) & 0x3F]))
-        result.append(chr(table[n & 0x3F]))
-
-    remainder = len(data) - data_len
-    if remainder == 1:
-        n = data[data_len] << 16
-        result.append(chr(table[(n >> 18) & 0x3F]))
-        result.append(chr(table[(n >> 12) & 0x3F]))
-        if pad:
-            result.extend(("=", "="))
-    elif remainder == 2:
-        n = (data[data_len] << 16) | (data[data_len + 1] << 8)
-        result.append(chr(table[(n >> 18) & 0x3F]))
-        result.append(chr(table[(n >> 12) & 0x3F]))
-        result.append(chr(table[(n >> 6) & 0x3F]))
-        if pad:
-            result.append("=")
-
-    return "".join(result)
+    encoded = base64.b64encode(data)
+    padding = -len(data) % 3
+    if padding:
+        # 先去掉标准填充再换表，避免自定义表里的 "=" 与填充混淆
+        encoded = encoded[:-padding]
+    result = encoded.translate(_b64_translation(table)).decode("ascii")
+    if pad and padding:
+        result += "=" * padding
+    return result
 
 
 def _mix_random_byte(value: int, value_mask: int, salt: int, salt_mask: int) -> int:
@@ -207,87 +287,151 @@ def _generate_spider_random_bytes() -> bytes:
     return bytes(result)
 
 
+_CHECKSUM_INDEXES = (
+    18,
+    20,
+    26,
+    30,
+    38,
+    40,
+    42,
+    21,
+    27,
+    31,
+    35,
+    39,
+    41,
+    43,
+    22,
+    28,
+    32,
+    36,
+    23,
+    29,
+    33,
+    37,
+    44,
+    45,
+    46,
+    47,
+    48,
+    49,
+    50,
+    24,
+    25,
+    52,
+    53,
+    54,
+    55,
+    57,
+    58,
+    59,
+    60,
+    65,
+    66,
+    70,
+    71,
+)
+
+
+def _checksum(b: bytearray) -> int:
+    checksum = 0
+    for index in _CHECKSUM_INDEXES:
+        checksum ^= b[index]
+    return checksum
+
+
+class SignerContext:
+    """Signing state that depends only on the user agent and sign args.
+
+    ``template`` is the 73-byte layout with every UA-derived and constant slot
+    filled in, so a signature only has to hash its query string and stamp the
+    timestamps.
+    """
+
+    __slots__ = ("user_agent", "args", "template", "window_env_bytes")
+
+    def __init__(self, user_agent: str, args: tuple[int, int, int], template: bytearray, window_env: str):
+        self.user_agent = user_agent
+        self.args = args
+        self.template = bytes(template)
+        self.window_env_bytes = window_env.encode()
+
+    @classmethod
+    def for_detail(cls, user_agent: str, args: tuple[int, int, int]) -> "SignerContext":
+        cus_hash2 = sm3_hash(sm3_hash(b"cus"))
+        ua_key = bytes([0, 1, args[2] & 0xFF])
+        ua_encrypted = rc4_encrypt(user_agent.encode(), ua_key)
+        ua_encoded = _custom_base64_encode(ua_encrypted, _S3, pad=False)
+        ua_hash = sm3_hash(ua_encoded.encode())
+
+        b = bytearray(73)
+        b[8] = 3
+        b[26:30] = (args[0] & _U32_MASK).to_bytes(4, "big")
+        b[34:38] = (args[2] & _U32_MASK).to_bytes(4, "big")
+        b[40] = cus_hash2[21]
+        b[41] = cus_hash2[22]
+        b[42] = ua_hash[23]
+        b[43] = ua_hash[24]
+        b[18] = 44
+        b[51] = 6241 >> 8
+        b[56] = 6383 & 0xFF
+        b[57] = 6383 & 0xFF
+        b[58] = (6383 >> 8) & 0xFF
+        window_env_len = len(_WINDOW_ENV_STR.encode())
+        b[64] = window_env_len
+        b[65] = window_env_len & 0xFF
+        return cls(user_agent, args, b, _WINDOW_ENV_STR)
+
+    @classmethod
+    def for_spider(cls, user_agent: str, args: tuple[int, int, int]) -> "SignerContext":
+        b = bytearray(73)
+        b[18] = 44
+        b[26:30] = (args[0] & _U32_MASK).to_bytes(4, "big")
+        b[30] = (args[1] >> 8) & 0xFF
+        b[31] = args[1] & 0xFF
+        b[32] = (args[1] >> 24) & 0xFF
+        b[33] = (args[1] >> 16) & 0xFF
+        b[34:38] = (args[2] & _U32_MASK).to_bytes(4, "big")
+        # The current Spider VM receives a hard-coded Firefox UA, but its compiled
+        # path emits these two UA hash bytes rather than the legacy douyin.js slots,
+        # so the UA never has to be hashed here.
+        b[42] = 145
+        b[43] = 238
+        b[48] = 12
+        b[51] = 6241 & 0xFF
+        window_env_len = len(_SPIDER_WINDOW_ENV_STR.encode())
+        b[64] = window_env_len
+        b[65] = window_env_len & 0xFF
+        b[66] = (window_env_len >> 8) & 0xFF
+        return cls(user_agent, args, b, _SPIDER_WINDOW_ENV_STR)
+
+
+@functools.lru_cache(maxsize=16)
+def get_signer_context(user_agent: str, args: tuple[int, int, int]) -> SignerContext:
+    return SignerContext.for_detail(user_agent, tuple(args))
+
+
+@functools.lru_cache(maxsize=4)
+def get_spider_signer_context(user_agent: str, args: tuple[int, int, int]) -> SignerContext:
+    return SignerContext.for_spider(user_agent, tuple(args))
+
+
 def _generate_rc4_bb(params: str, user_agent: str, args: tuple[int, int, int]) -> bytes:
+    context = get_signer_context(user_agent, args)
     start_time = int(time.time() * 1000)
     params_hash2 = sm3_hash(sm3_hash(params.encode()))
-    cus_hash2 = sm3_hash(sm3_hash(b"cus"))
-
-    ua_key = bytes([0, 1, args[2] & 0xFF])
-    ua_encrypted = rc4_encrypt(user_agent.encode(), ua_key)
-    ua_encoded = _custom_base64_encode(ua_encrypted, _S3, pad=False)
-    ua_hash = sm3_hash(ua_encoded.encode())
     end_time = int(time.time() * 1000)
+    return _build_rc4_bb(context, params_hash2, start_time, end_time)
+
 
-    b = bytearray(73)
-    b[8] = 3
+def _build_rc4_bb(context: SignerContext, params_hash2: bytes, start_time: int, end_time: int) -> bytes:
+    b = bytearray(context.template)
     b[44:48] = (end_time & _U32_MASK).to_bytes(4, "big")
     b[20:24] = (start_time & _U32_MASK).to_bytes(4, "big")
-    b[26:30] = (args[0] & _U32_MASK).to_bytes(4, "big")
-    b[34:38] = (args[2] & _U32_MASK).to_bytes(4, "big")
     b[38] = params_hash2[21]
     b[39] = params_hash2[22]
-    b[40] = cus_hash2[21]
-    b[41] = cus_hash2[22]
-    b[42] = ua_hash[23]
-    b[43] = ua_hash[24]
-    b[18] = 44
-    b[51] = 6241 >> 8
-    b[56] = 6383 & 0xFF
-    b[57] = 6383 & 0xFF
-    b[58] = (6383 >> 8) & 0xFF
-
-    window_env_bytes = _WINDOW_ENV_STR.encode()
-    b[64] = len(window_env_bytes)
-    b[65] = len(window_env_bytes) & 0xFF
-    checksum_indexes = (
-        18,
-        20,
-        26,
-        30,
-        38,
-        40,
-        42,
-        21,
-        27,
-        31,
-        35,
-        39,
-        41,
-        43,
-        22,
-        28,
-        32,
-        36,
-        23,
-        29,
-        33,
-        37,
-        44,
-        45,
-        46,
-        47,
-        48,
-        49,
-        50,
-        24,
-        25,
-        52,
-        53,
-        54,
-        55,
-        57,
-        58,
-        59,
-        60,
-        65,
-        66,
-        70,
-        71,
-    )
-    checksum = 0
-    for index in checksum_indexes:
-        checksum ^= b[index]
-    b[72] = checksum
+    b[72] = _checksum(b)
 
     bb = bytearray()
     bb.extend(b[18:19])
@@ -301,9 +445,9 @@ def _generate_rc4_bb(params: str, user_agent: str, args: tuple[int, int, int]) -
     bb.extend(b[24:26])
     bb.extend(b[65:67])
     bb.extend(b[70:72])
-    bb.extend(window_env_bytes)
+    bb.extend(context.window_env_bytes)
     bb.append(b[72])
-    return rc4_encrypt(bytes(bb), b"y")
+    return _rc4_encrypt_y(bytes(bb))
 
 
 def _double_sm3(data: str) -> bytes:
@@ -316,97 +460,26 @@ def _generate_spider_rc4_bb(
     user_agent: str = _SPIDER_USER_AGENT,
     args: tuple[int, int, int] = (0, 1, 8),
 ) -> bytes:
+    context = get_spider_signer_context(user_agent, args)
     start_time = int(time.time() * 1000)
     params_hash = _double_sm3(f"{params}cus")
     data_hash = _double_sm3(f"{data}cus")
-
-    ua_key = bytes([0, 1, args[2] & 0xFF])
-    ua_encrypted = rc4_encrypt(user_agent.encode(), ua_key)
-    ua_encoded = _custom_base64_encode(ua_encrypted, _S3, pad=False)
-    ua_hash = sm3_hash(ua_encoded.encode())
     end_time = int(time.time() * 1000)
 
     start_high = start_time >> 32
     end_high = end_time >> 32
-    b = bytearray(73)
-    b[18] = 44
+    b = bytearray(context.template)
     b[20:24] = (start_time & _U32_MASK).to_bytes(4, "big")
     b[24] = start_high & 0xFF
     b[25] = (start_high >> 8) & 0xFF
-    b[26:30] = (args[0] & _U32_MASK).to_bytes(4, "big")
-    b[30] = (args[1] >> 8) & 0xFF
-    b[31] = args[1] & 0xFF
-    b[32] = (args[1] >> 24) & 0xFF
-    b[33] = (args[1] >> 16) & 0xFF
-    b[34:38] = (args[2] & _U32_MASK).to_bytes(4, "big")
     b[38] = params_hash[21]
     b[39] = params_hash[22]
     b[40] = data_hash[21]
     b[41] = data_hash[22]
-    # The current Spider VM receives a hard-coded Firefox UA, but its compiled
-    # path emits these two UA hash bytes rather than the legacy douyin.js slots.
-    b[42] = 145
-    b[43] = 238
     b[44:48] = (end_time & _U32_MASK).to_bytes(4, "big")
-    b[48] = 12
     b[49] = end_high & 0xFF
     b[50] = (end_high >> 8) & 0xFF
-    b[51] = 6241 & 0xFF
-
-    window_env_bytes = _SPIDER_WINDOW_ENV_STR.encode()
-    b[64] = len(window_env_bytes)
-    b[65] = len(window_env_bytes) & 0xFF
-    b[66] = (len(window_env_bytes) >> 8) & 0xFF
-
-    checksum_indexes = (
-        18,
-        20,
-        26,
-        30,
-        38,
-        40,
-        42,
-        21,
-        27,
-        31,
-        35,
-        39,
-        41,
-        43,
-        22,
-        28,
-        32,
-        36,
-        23,
-        29,
-        33,
-        37,
-        44,
-        45,
-        46,
-        47,
-        48,
-        49,
-        50,
-        24,
-        25,
-        52,
-        53,
-        54,
-        55,
-        57,
-        58,
-        59,
-        60,
-        65,
-        66,
-        70,
-        71,
-    )
-    checksum = 0
-    for index in checksum_indexes:
-        checksum ^= b[index]
-    b[72] = checksum
+    b[72] = _checksum(b)
 
     bb = bytearray(
         (
@@ -456,9 +529,9 @@ def _generate_spider_rc4_bb(
             b[71],
         )
     )
-    bb.extend(window_env_bytes)
+    bb.extend(context.window_env_bytes)
     bb.append(b[72])
-    return rc4_encrypt(bytes(bb), b"y")
+    return _rc4_encrypt_y(bytes(bb))
 
 
 def sign(params: str, user_agent: str, args: tuple[int, int, int]) -> str:
@@ -466,6 +539,43 @@ def sign(params: str, user_agent: str, args: tuple[int, int, int]) -> str:
     return _custom_base64_encode(combined) + "="
 
 
+def _sm3_hash_many(messages: list[bytes]) -> list[bytes]:
+    # Vectorizing only pays off for the pure Python backend; OpenSSL is fast enough per message
+    if len(messages) > 1 and _sm3_backend == "python":
+        from src.api import sm3_batch
+
+        if sm3_batch.AVAILABLE:
+            return sm3_batch.sm3_hash_many(messages)
+    return [sm3_hash(message) for message in messages]
+
+
+def sign_many(
+    queries: list[str],
+    user_agent: str,
+    args: tuple[int, int, int] = (0, 1, 14),
+) -> list[str]:
+    """Sign many query strings at once; results line up with ``queries``.
+
+    With the pure Python SM3 backend and NumPy installed the query hashes are
+    computed lane-parallel, otherwise this is the scalar ``sign`` per query.
+    """
+    queries = list(queries)
+    if len(queries) <= 1:
+        return [sign(query, user_agent, args) for query in queries]
+
+    context = get_signer_context(user_agent, tuple(args))
+    start_time = int(time.time() * 1000)
+    params_hashes = _sm3_hash_many(_sm3_hash_many([query.encode() for query in queries]))
+    end_time = int(time.time() * 1000)
+    return [
+        _custom_base64_encode(
+            _generate_random_bytes() + _build_rc4_bb(context, params_hash2, start_time, end_time)
+        )
+        + "="
+        for params_hash2 in params_hashes
+    ]
+
+
 def sign_detail(params: str, user_agent: str) -> str:
     return sign(params, user_agent, (0, 1, 14))
 
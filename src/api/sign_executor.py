@@ -0,0 +1,245 @@
+"""a_bogus 签名执行器。
+
+纯 Python 的 SM3/RC4 签名是 CPU 密集计算，直接在协程里调用会卡住全局 asyncio 循环。
+这里把签名统一提交到进程池（默认）或线程池，并记录排队深度与耗时，方便观察签名争用。
+
+同一轮事件循环里到达的同类签名（评论回复预取、详情对冲等并发请求）合并成一次
+``sign.sign_many`` 提交，只有一条时仍走单条签名。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+
+from src.api import sign as douyin_sign
+from src.config.config import Config
+from src.utils import metrics
+
+logger = logging.getLogger('api')
+
+SIGN_TIMEOUT_SECONDS = 30
+
+SIGN_SECONDS = metrics.histogram('douyin_sign_seconds', '签名总耗时（含排队）', ('function',))
+SIGN_COMPUTE_SECONDS = metrics.histogram('douyin_sign_compute_seconds', '签名纯计算耗时', ('function',))
+SIGN_FAILURES = metrics.counter('douyin_sign_failures_total', '签名失败次数', ('function',))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 单条签名函数 -> sign_many 使用的参数
+_BATCH_ARGS = {
+    douyin_sign.sign_detail: (0, 1, 14),
+    douyin_sign.sign_reply: (0, 1, 8),
+}
+# (事件循环, 单条签名函数, User-Agent) -> 等待合并的 [(query, future)]
+_pending_batches: dict[tuple, list] = {}
+_pending_lock = threading.Lock()
+
+
+def _timed_call(func, *args):
+    """在工作进程/线程内执行签名，并返回纯计算耗时，用于区分排队时间。"""
+    started_at = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started_at
+
+
+class SignExecutor:
+    """签名工作池，附带排队深度与耗时计数。"""
+
+    def __init__(self, mode: str = 'process', max_workers: int = 2):
+        self.mode = Config.normalize_sign_executor(mode)
+        self.requested_mode = self.mode
+        self.max_workers = max(1, int(max_workers or 1))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._fallbacks = 0
+        self._total_latency = 0.0
+        self._total_queue_wait = 0.0
+        self._max_latency = 0.0
+
+    def _create_pool(self):
+        if self.mode == 'process':
+            # 统一使用 spawn，避免 fork 继承 gevent/asyncio 状态；PyInstaller 已在 main.py 调用 freeze_support。
+            return concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='douyin-sign',
+        )
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+
+    def _fallback_to_thread(self, error: Exception) -> None:
+        with self._pool_lock:
+            if self.mode != 'process':
+                return
+            logger.warning('签名进程池不可用，降级为线程池: %s', error)
+            old_pool = self._pool
+            self.mode = 'thread'
+            self._pool = None
+        with self._stats_lock:
+            self._fallbacks += 1
+        if old_pool is not None:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, func, *args):
+        if self.mode == 'inline':
+            return _timed_call(func, *args)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), _timed_call, func, *args)
+        return await asyncio.wait_for(future, timeout=SIGN_TIMEOUT_SECONDS)
+
+    async def run(self, func, *args) -> str:
+        """在工作池中执行 ``func(*args)``，返回签名结果。"""
+        with self._stats_lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started_at = time.perf_counter()
+        success = False
+        try:
+            attempt_mode = self.mode
+            try:
+                result, compute_seconds = await self._submit(func, *args)
+            except (
+                RuntimeError,  # 包含 BrokenProcessPool
+                asyncio.TimeoutError,
+                pickle.PicklingError,
+                NotImplementedError,
+                OSError,
+            ) as error:
+                # 并发请求可能已由其他调用完成降级，这里按本次提交时的模式判断。
+                if attempt_mode != 'process':
+                    raise
+                self._fallback_to_thread(error)
+                result, compute_seconds = await self._submit(func, *args)
+            success = True
+            return result
+        finally:
+            latency = time.perf_counter() - started_at
+            function = getattr(func, '__name__', 'sign')
+            if success:
+                SIGN_SECONDS.observe(latency, function=function)
+                SIGN_COMPUTE_SECONDS.observe(compute_seconds, function=function)
+            else:
+                SIGN_FAILURES.inc(function=function)
+            with self._stats_lock:
+                self._in_flight -= 1
+                if success:
+                    self._completed += 1
+                    self._total_latency += latency
+                    self._total_queue_wait += max(0.0, latency - compute_seconds)
+                    self._max_latency = max(self._max_latency, latency)
+                else:
+                    self._failed += 1
+
+    def stats(self) -> dict:
+        """返回签名池的排队与耗时统计。"""
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                'mode': self.mode,
+                'workers': self.max_workers,
+                'in_flight': self._in_flight,
+                'queue_depth': max(0, self._in_flight - self.max_workers),
+                'peak_in_flight': self._peak_in_flight,
+                'completed': completed,
+                'failed': self._failed,
+                'fallbacks': self._fallbacks,
+                'avg_latency_ms': round(self._total_latency / completed * 1000, 3) if completed else 0.0,
+                'avg_queue_wait_ms': round(self._total_queue_wait / completed * 1000, 3) if completed else 0.0,
+                'max_latency_ms': round(self._max_latency * 1000, 3),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._pool_lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def get_sign_executor() -> SignExecutor:
+    """返回与当前配置匹配的全局签名执行器，配置变化时重建。"""
+    global _executor
+    mode = Config.normalize_sign_executor(getattr(Config, 'SIGN_EXECUTOR', 'process'))
+    workers = Config.bounded_int(getattr(Config, 'SIGN_WORKERS', 2), 2, 1, 16)
+    with _executor_lock:
+        current = _executor
+        # 按请求的模式比较：进程池降级为线程池后保持降级状态，不因配置仍为 process 而反复重建。
+        if current is None or current.max_workers != workers or current.requested_mode != mode:
+            _executor = SignExecutor(mode, workers)
+            if current is not None:
+                current.shutdown(wait=False)
+        return _executor
+
+
+def get_sign_stats() -> dict:
+    return get_sign_executor().stats()
+
+
+async def _flush_batch(key: tuple) -> None:
+    with _pending_lock:
+        batch = _pending_batches.pop(key, [])
+    _, func, user_agent = key
+    queries = [query for query, _ in batch]
+    try:
+        if len(batch) == 1:
+            signatures = [await get_sign_executor().run(func, queries[0], user_agent)]
+        else:
+            signatures = await get_sign_executor().run(douyin_sign.sign_many, queries, user_agent, _BATCH_ARGS[func])
+    except asyncio.CancelledError:
+        for _, future in batch:
+            future.cancel()
+        raise
+    except Exception as error:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        return
+    for (_, future), signature in zip(batch, signatures):
+        if not future.done():
+            future.set_result(signature)
+
+
+async def _sign_batched(func, params: str, user_agent: str) -> str:
+    """登记一条签名，本轮循环结束后与同类请求一起提交。"""
+    loop = asyncio.get_running_loop()
+    key = (loop, func, user_agent)
+    future = loop.create_future()
+    with _pending_lock:
+        batch = _pending_batches.get(key)
+        if batch is None:
+            batch = _pending_batches[key] = []
+            # call_soon 排在本轮已就绪的协程之后，同一轮到达的请求都能赶上
+            loop.call_soon(lambda: loop.create_task(_flush_batch(key)))
+        batch.append((params, future))
+    return await future
+
+
+async def sign_detail(params: str, user_agent: str) -> str:
+    return await _sign_batched(douyin_sign.sign_detail, params, user_agent)
+
+
+async def sign_reply(params: str, user_agent: str) -> str:
+    return await _sign_batched(douyin_sign.sign_reply, params, user_agent)
+
+
+async def sign_spider_publish(params: str, data: str) -> str:
+    return await get_sign_executor().run(douyin_sign.sign_spider_publish, params, data)
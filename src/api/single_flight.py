@@ -0,0 +1,95 @@
+"""相同请求的并发合并（single-flight）。
+
+同一事件循环上，键相同的并发调用只执行一次，其余调用等待同一个结果。
+上游完成时（任何调用方被唤醒之前）按等待者数量准备结果：一个调用方拿原对象，
+其余各拿一份深拷贝，互相修改返回值不会串数据；没有合并时不做拷贝。
+等待者按引用计数，全部被取消时上游调用随之取消。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    __slots__ = ('task', 'waiters', 'results')
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        # 上游完成时为每个等待者准备好的结果
+        self.results: list = []
+
+
+class SingleFlight:
+    """按键合并进行中的协程调用，并统计合并次数。"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._calls: dict[tuple, _Call] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+        self._cancelled = 0
+
+    async def do(self, key, factory):
+        """执行 ``factory()``；已有相同 ``key`` 的调用在途时直接共享其结果。
+
+        某个等待者被取消只影响它自己；最后一个等待者被取消时取消上游调用。
+        """
+        call_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            call = self._calls.get(call_key)
+            if call is None:
+                self._leaders += 1
+                call = _Call(asyncio.ensure_future(factory()))
+                self._calls[call_key] = call
+                # 先于所有等待者的 shield 注册，回调里准备结果时还没有调用方被唤醒
+                call.task.add_done_callback(lambda done: self._complete(call_key, call))
+            else:
+                self._coalesced += 1
+            call.waiters += 1
+        try:
+            # shield：等待者被取消时由引用计数决定是否取消共享的上游调用
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+                if abandoned:
+                    # 之后的调用重新发起，不去等一个正在取消的任务
+                    self._forget_locked(call_key, call)
+                    self._cancelled += 1
+            if abandoned:
+                call.task.cancel()
+            raise
+        with self._lock:
+            call.waiters -= 1
+            if call.results:
+                return call.results.pop()
+        return copy.deepcopy(result)
+
+    def _complete(self, call_key: tuple, call: _Call) -> None:
+        with self._lock:
+            self._forget_locked(call_key, call)
+            if call.task.cancelled() or call.task.exception() is not None:
+                return
+            result = call.task.result()
+            call.results = [result, *(copy.deepcopy(result) for _ in range(call.waiters - 1))]
+
+    def _forget_locked(self, call_key: tuple, call: _Call) -> None:
+        if self._calls.get(call_key) is call:
+            del self._calls[call_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._leaders + self._coalesced
+            return {
+                'in_flight': len(self._calls),
+                'upstream_calls': self._leaders,
+                'coalesced': self._coalesced,
+                'cancelled': self._cancelled,
+                'coalesced_ratio': round(self._coalesced / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,86 @@
+"""Lane-parallel SM3 over NumPy uint32 arrays.
+
+Every message is one lane; messages are padded to a common block count and
+lanes that run out of blocks keep their state through a mask. NumPy is an
+optional dependency: ``AVAILABLE`` is False when it cannot be imported.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from src.api.sign import _IV, _TJ_ROTATED, _sm3_pad
+
+AVAILABLE = np is not None
+
+
+def _rotl(x, bits: int):
+    return (x << bits) | (x >> (32 - bits))
+
+
+def _compress(state, words):
+    """Compress one block per lane; ``state`` is 8 arrays, ``words`` is (16, n)."""
+    w = list(words)
+    for j in range(16, 68):
+        x = w[j - 16] ^ w[j - 9] ^ _rotl(w[j - 3], 15)
+        w.append(x ^ _rotl(x, 15) ^ _rotl(x, 23) ^ _rotl(w[j - 13], 7) ^ w[j - 6])
+
+    a, b, c, d, e, f, g, h = state
+    for j in range(64):
+        a12 = _rotl(a, 12)
+        ss1 = _rotl(a12 + e + np.uint32(_TJ_ROTATED[j]), 7)
+        wj = w[j]
+        if j < 16:
+            ff = a ^ b ^ c
+            gg = e ^ f ^ g
+        else:
+            ff = (a & b) | (a & c) | (b & c)
+            gg = (e & f) | (~e & g)
+        tt1 = ff + d + (ss1 ^ a12) + (wj ^ w[j + 4])
+        tt2 = gg + h + ss1 + wj
+        d = c
+        c = _rotl(b, 9)
+        b = a
+        a = tt1
+        h = g
+        g = _rotl(f, 19)
+        f = e
+        e = tt2 ^ _rotl(tt2, 9) ^ _rotl(tt2, 17)
+
+    return [v ^ x for v, x in zip(state, (a, b, c, d, e, f, g, h))]
+
+
+def sm3_hash_many(messages: Sequence[bytes]) -> list[bytes]:
+    """Hash every message in one vectorized pass and return the digests in order."""
+    if np is None:
+        raise RuntimeError("NumPy is not installed")
+    if not messages:
+        return []
+
+    padded = [_sm3_pad(bytes(message)) for message in messages]
+    lanes = len(padded)
+    block_counts = np.array([len(message) // 64 for message in padded])
+    max_blocks = int(block_counts.max())
+    buffer = np.zeros((lanes, max_blocks * 64), dtype=np.uint8)
+    for lane, message in enumerate(padded):
+        buffer[lane, : len(message)] = np.frombuffer(message, dtype=np.uint8)
+    # (lanes, blocks, 16) big-endian words -> (blocks, 16, lanes) so each word is a lane vector
+    words = buffer.view(">u4").astype(np.uint32).reshape(lanes, max_blocks, 16).transpose(1, 2, 0)
+
+    state = [np.full(lanes, value, dtype=np.uint32) for value in _IV]
+    with np.errstate(over="ignore"):
+        for block in range(max_blocks):
+            compressed = _compress(state, words[block])
+            active = block_counts > block
+            if active.all():
+                state = compressed
+            else:
+                state = [np.where(active, new, old) for new, old in zip(compressed, state)]
+
+    digests = np.stack(state, axis=1).astype(">u4")
+    return [digests[lane].tobytes() for lane in range(lanes)]
@@ -0,0 +1,145 @@
+"""webid / csrf token 的持久化缓存。
+
+令牌按 Cookie 指纹分组保存在 ``Config.CONFIG_FILE`` 同目录的 ``token_cache.json``，
+重启后仍可复用；临近过期时在后台提前刷新，缓存未命中时相同令牌只请求一次，
+获取失败会短暂记住，避免每个请求都重新下载页面。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from src.api.single_flight import SingleFlight
+from src.config.config import Config
+
+logger = logging.getLogger('api')
+
+TOKEN_CACHE_FILENAME = 'token_cache.json'
+# 令牌名 -> 有效期秒数
+TOKEN_TTLS = {
+    'webid': 600,
+    'csrf_token': 600,
+}
+REFRESH_AHEAD_SECONDS = 120
+FAILURE_BACKOFF_SECONDS = 60
+MAX_SCOPES = 8
+
+
+def token_cache_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(Config.CONFIG_FILE)), TOKEN_CACHE_FILENAME)
+
+
+def cookie_scope(cookie: str) -> str:
+    """Cookie 的短指纹，只保存哈希，不落盘 Cookie 本身。"""
+    if not cookie:
+        return 'anonymous'
+    return hashlib.sha256(cookie.encode('utf-8')).hexdigest()[:16]
+
+
+class TokenManager:
+    """带持久化、提前刷新与并发合并的令牌缓存。"""
+
+    def __init__(self, path: str, scope: str, ttls: dict | None = None):
+        self.path = path
+        self.scope = scope
+        self.ttls = dict(TOKEN_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self._flights = SingleFlight('tokens')
+        self._failures: dict[str, float] = {}
+        self._refreshing: set[str] = set()
+        self._all_scopes = self._load()
+        self._tokens = self._all_scopes.setdefault(scope, {})
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning('读取令牌缓存失败: %s', e)
+            return {}
+
+    def _save(self) -> None:
+        with self._lock:
+            scopes = sorted(
+                self._all_scopes.items(),
+                key=lambda item: max((token.get('fetched_at', 0) for token in item[1].values()), default=0),
+                reverse=True,
+            )
+            self._all_scopes = dict(scopes[:MAX_SCOPES])
+            self._all_scopes[self.scope] = self._tokens
+            payload = json.dumps(self._all_scopes, ensure_ascii=False, indent=2)
+        temp_file = f'{self.path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                f.write('\n')
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            logger.warning('保存令牌缓存失败: %s', e)
+            try:
+                os.remove(temp_file)
+            except Exception:
+                pass
+
+    def peek(self, name: str) -> str | None:
+        """返回未过期的缓存值，不触发刷新。"""
+        entry = self._tokens.get(name)
+        if entry and time.time() - entry.get('fetched_at', 0) < self.ttls.get(name, 600):
+            return entry.get('value')
+        return None
+
+    async def get(self, name: str, fetcher, force_refresh: bool = False):
+        """返回令牌；``fetcher`` 是获取新值的协程函数，失败时返回空值。"""
+        ttl = self.ttls.get(name, 600)
+        entry = self._tokens.get(name)
+        if not force_refresh and entry and entry.get('value'):
+            age = time.time() - entry.get('fetched_at', 0)
+            if 0 <= age < ttl:
+                if age >= ttl - REFRESH_AHEAD_SECONDS:
+                    self._refresh_in_background(name, fetcher)
+                return entry['value']
+        if not force_refresh and self._failures.get(name, 0) > time.monotonic():
+            return None
+        return await self._flights.do(name, lambda: self._refresh(name, fetcher))
+
+    async def _refresh(self, name: str, fetcher):
+        value = await fetcher()
+        if value:
+            self._tokens[name] = {'value': value, 'fetched_at': time.time()}
+            self._failures.pop(name, None)
+            self._save()
+        else:
+            self._failures[name] = time.monotonic() + FAILURE_BACKOFF_SECONDS
+        return value
+
+    def _refresh_in_background(self, name: str, fetcher) -> None:
+        if name in self._refreshing:
+            return
+        self._refreshing.add(name)
+
+        async def refresh():
+            try:
+                await self._flights.do(name, lambda: self._refresh(name, fetcher))
+            except Exception as e:
+                logger.warning('后台刷新令牌 %s 失败: %s', name, e)
+            finally:
+                self._refreshing.discard(name)
+
+        asyncio.get_running_loop().create_task(refresh())
+
+    def invalidate(self, name: str | None = None) -> None:
+        if name is None:
+            self._tokens.clear()
+        else:
+            self._tokens.pop(name, None)
+        self._save()
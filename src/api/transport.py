@@ -0,0 +1,263 @@
+"""DouyinAPI 的 HTTP 传输层。
+
+``Config.API_TRANSPORT`` 选择实现：
+- requests：在线程池里调用线程本地的 ``requests.Session``（原有行为）
+- aiohttp：每个事件循环共享一个 keep-alive ``ClientSession``，按 host 限制连接数
+
+两种实现返回相同形状的响应对象（status_code/headers/content/text/url/json()），
+失败时都抛出 ``requests.RequestException`` 子类，调用方无需区分。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import urllib.parse
+import weakref
+
+import requests
+import requests.adapters
+import urllib3.util.retry
+
+from src.config.config import Config
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:  # pragma: no cover - aiohttp 在 requirements.txt 中，缺失时只能用 requests
+    aiohttp = None
+    yarl = None
+
+# 与 aiohttp 实现共用同一套重试语义
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_FORCELIST = frozenset({502, 503, 504})
+# urllib3 Retry 默认只对幂等方法做读错误/状态码重试，连接失败则所有方法都会重试
+RETRY_ALLOWED_METHODS = urllib3.util.retry.Retry.DEFAULT_ALLOWED_METHODS
+RETRY_AFTER_STATUS_CODES = urllib3.util.retry.Retry.RETRY_AFTER_STATUS_CODES
+MAX_RETRY_AFTER_SECONDS = 120
+
+_CONNECT_ERRORS = tuple(
+    error_type
+    for error_type in (
+        getattr(aiohttp, 'ClientConnectorError', None),
+        getattr(aiohttp, 'ConnectionTimeoutError', None),
+    )
+    if error_type is not None
+)
+_retry = urllib3.util.retry.Retry(
+    total=RETRY_TOTAL,
+    backoff_factor=RETRY_BACKOFF_FACTOR,
+    status_forcelist=sorted(RETRY_STATUS_FORCELIST),
+)
+_thread_local = threading.local()
+_sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_sessions_lock = threading.Lock()
+
+
+class TransportError(requests.RequestException):
+    """aiohttp 传输层的网络错误，继承 RequestException 以兼容现有的异常处理。"""
+
+
+def _create_api_session():
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(max_retries=_retry))
+    return session
+
+
+def get_requests_session():
+    session = getattr(_thread_local, 'api_session', None)
+    if session is None:
+        session = _create_api_session()
+        _thread_local.api_session = session
+    return session
+
+
+def get_transport_name() -> str:
+    transport = Config.normalize_api_transport(getattr(Config, 'API_TRANSPORT', 'requests'))
+    if transport == 'aiohttp' and aiohttp is None:
+        return 'requests'
+    return transport
+
+
+class TransportResponse:
+    """aiohttp 响应的只读快照，接口与 requests.Response 常用部分一致。"""
+
+    __slots__ = ('status_code', 'headers', 'content', 'url', 'encoding')
+
+    def __init__(self, status_code: int, headers, content: bytes, url: str, encoding: str | None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _encode_pairs(values) -> str:
+    """按 requests 的规则编码查询串/表单：跳过 None，值用 urlencode 转义。"""
+    if isinstance(values, (str, bytes)):
+        return values.decode() if isinstance(values, bytes) else values
+    pairs = []
+    for key, value in (values.items() if isinstance(values, dict) else values):
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            pairs.extend((key, item) for item in value if item is not None)
+        else:
+            pairs.append((key, value))
+    return urllib.parse.urlencode(pairs, doseq=False)
+
+
+def _build_url(url: str, params) -> str:
+    if not params:
+        return url
+    query = _encode_pairs(params)
+    if not query:
+        return url
+    return f'{url}{"&" if "?" in url else "?"}{query}'
+
+
+def _client_timeout(timeout):
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+def _merge_cookies(headers: dict, cookies: dict | None) -> dict:
+    if not cookies:
+        return headers
+    merged = dict(headers)
+    cookie_key = next((key for key in merged if key.lower() == 'cookie'), None)
+    if cookie_key is None:
+        merged['Cookie'] = '; '.join(f'{key}={value}' for key, value in cookies.items())
+    return merged
+
+
+async def _get_aiohttp_session():
+    loop = asyncio.get_running_loop()
+    with _sessions_lock:
+        session = _sessions.get(loop)
+        if session is not None and not session.closed:
+            return session
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=Config.bounded_int(getattr(Config, 'API_CONNECTIONS_PER_HOST', 8), 8, 1, 64),
+            ttl_dns_cache=300,
+        )
+        # Cookie 始终由调用方通过请求头显式传入，不在会话间自动保存
+        session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        _sessions[loop] = session
+        return session
+
+
+def _backoff_seconds(consecutive_errors: int) -> float:
+    # 与 urllib3 1.26 一致：第一次重试不等待，之后 backoff_factor * 2^(n-1)
+    if consecutive_errors <= 1:
+        return 0.0
+    return RETRY_BACKOFF_FACTOR * (2 ** (consecutive_errors - 1))
+
+
+def _retry_after_seconds(response) -> float | None:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return min(MAX_RETRY_AFTER_SECONDS, max(0.0, float(value)))
+    except ValueError:
+        return None
+
+
+async def _aiohttp_request(method: str, url: str, *, params=None, data=None, headers=None,
+                           cookies=None, timeout=(10, 30), verify=True) -> TransportResponse:
+    method = method.upper()
+    session = await _get_aiohttp_session()
+    headers = _merge_cookies(dict(headers or {}), cookies)
+    body = data
+    if isinstance(data, (dict, list, tuple)):
+        body = _encode_pairs(data)
+        if not any(key.lower() == 'content-type' for key in headers):
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+
+    # 查询串已按 requests 规则编码，encoded=True 避免 yarl 二次转义改变签名内容
+    request_url = yarl.URL(_build_url(url, params), encoded=True)
+    idempotent = method in RETRY_ALLOWED_METHODS
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            async with session.request(
+                method,
+                request_url,
+                data=body,
+                headers=headers,
+                timeout=_client_timeout(timeout),
+                ssl=None if verify else False,
+                allow_redirects=method != 'HEAD',
+            ) as response:
+                content = await response.read()
+                if (
+                    idempotent
+                    and response.status in RETRY_STATUS_FORCELIST
+                    and attempts <= RETRY_TOTAL
+                ):
+                    retry_after = _retry_after_seconds(response) if response.status in RETRY_AFTER_STATUS_CODES else None
+                    await asyncio.sleep(retry_after if retry_after is not None else _backoff_seconds(attempts))
+                    continue
+                if response.status in RETRY_STATUS_FORCELIST and idempotent:
+                    raise TransportError(f'Max retries exceeded with url: {url} (too many {response.status} error responses)')
+                return TransportResponse(
+                    response.status,
+                    response.headers,
+                    content,
+                    str(response.url),
+                    response.get_encoding() if content else None,
+                )
+        except TransportError:
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError, aiohttp.ClientPayloadError) as error:
+            connect_failed = isinstance(error, _CONNECT_ERRORS)
+            if attempts > RETRY_TOTAL or not (connect_failed or idempotent):
+                raise TransportError(f'{type(error).__name__}: {error}') from error
+            await asyncio.sleep(_backoff_seconds(attempts))
+        except aiohttp.ClientError as error:
+            raise TransportError(f'{type(error).__name__}: {error}') from error
+
+
+async def request(method: str, url: str, *, params=None, data=None, headers=None,
+                  cookies=None, timeout=(10, 30), verify=True):
+    """发送一次 HTTP 请求，按配置选择 requests 或 aiohttp 传输层。"""
+    if get_transport_name() == 'aiohttp':
+        return await _aiohttp_request(
+            method, url, params=params, data=data, headers=headers,
+            cookies=cookies, timeout=timeout, verify=verify,
+        )
+    kwargs = {'headers': headers, 'timeout': timeout, 'verify': verify}
+    if params is not None:
+        kwargs['params'] = params
+    if data is not None:
+        kwargs['data'] = data
+    if cookies is not None:
+        kwargs['cookies'] = cookies
+    if method.upper() == 'HEAD':
+        kwargs['allow_redirects'] = False
+    return await asyncio.to_thread(lambda: get_requests_session().request(method, url, **kwargs))
+
+
+async def close_current_loop_session() -> None:
+    """关闭当前事件循环上的 aiohttp 会话（如存在）。"""
+    with _sessions_lock:
+        session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
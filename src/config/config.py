@@ -4,6 +4,9 @@ import getpass
 
 import sys
 
+from src.utils import json_codec
+from src.utils.warmup import normalize_host
+
 # 判断是否被 PyInstaller 打包
 IS_FROZEN = getattr(sys, 'frozen', False)
 if IS_FROZEN:
@@ -98,6 +101,50 @@ class Config:
     IM_FRIEND_SEC_USER_IDS = []
     IM_FRIEND_INCLUDE_ALL_USERS = False
     IM_FRIEND_REFRESH_INTERVAL_SECONDS = 5
+
+    # a_bogus 签名执行器：process（默认，多进程）/ thread / inline
+    SIGN_EXECUTOR = "process"
+    SIGN_WORKERS = 2
+
+    # API 传输层：requests（线程池 + requests.Session）/ aiohttp（每个事件循环共享一个 ClientSession）
+    API_TRANSPORT = "requests"
+    API_CONNECTIONS_PER_HOST = 8
+    # 幂等 GET 接口响应缓存上限（MB），0 表示关闭
+    RESPONSE_CACHE_MAX_MB = 32
+    # 按接口族自适应限速，批量任务遇到验证时自动降速
+    RATE_GOVERNOR = True
+    # 作品详情对冲请求：首选方式超过该毫秒数未返回时并发发出另一种请求，0 表示同时发出
+    DETAIL_HEDGE_DELAY_MS = 300
+    # 离线压测：本地假服务器地址（如 http://127.0.0.1:8765），接口与媒体下载都指向它
+    # 只从环境变量 DOUYIN_OFFLINE_HOST 读取，不读写 config.json，避免压测设置残留到正常使用
+    OFFLINE_HOST = ""
+    # 推荐流预取：当前页被取走该百分比后后台拉取下一页；去重集合最多记住的作品数
+    FEED_PREFETCH_PERCENT = 50
+    FEED_SEEN_MAX = 2000
+    # 打开评论时并发预取前 N 条热门评论的首页回复，0 表示关闭
+    COMMENT_REPLY_PREFETCH = 10
+    COMMENT_PREFETCH_CONCURRENCY = 4
+    # 启动时后台预解析并预连接 API / CDN 主机；DNS 缓存有效期（秒，0 表示不缓存）；额外预热的主机
+    # API 主机只有 aiohttp 传输层会预连接；requests 传输层每个工作线程各有会话，只预解析 DNS
+    WARMUP_ON_START = True
+    DNS_CACHE_TTL_SECONDS = 300
+    WARMUP_HOSTS = []
+    # 分段下载：视频不小于该大小（MB）且服务器支持 Range 时分成 N 段并发下载，1 表示关闭
+    SEGMENTED_DOWNLOAD_PARTS = 4
+    SEGMENTED_DOWNLOAD_MIN_MB = 16
+    # 启动时删除超过该天数没有更新的续传文件（.part / .part.json），0 表示不清理
+    RESUME_PART_MAX_AGE_DAYS = 7
+    # 批量下载引擎：thread（线程池 + requests）/ async（aiohttp，跑在全局事件循环上）；async 引擎每个任务的并发传输数
+    DOWNLOAD_ENGINE = "thread"
+    ASYNC_DOWNLOAD_CONCURRENCY = 32
+    # 全局下载调度：所有任务合计的并发下载数、单个 CDN 主机的并发下载数
+    DOWNLOAD_MAX_ACTIVE = 8
+    DOWNLOAD_PER_HOST_LIMIT = 16
+    # 下载限速（KB/s，0 表示不限）：全局总带宽、每个任务的默认上限；有 media_proxy 播放时给它预留的全局带宽比例（%）
+    # 全局不限速时预留比例按测得的下载链路容量计算，还没有下载过（没测到容量）时预留不生效
+    BANDWIDTH_LIMIT_KB = 0
+    BANDWIDTH_TASK_LIMIT_KB = 0
+    BANDWIDTH_PROXY_RESERVE_PERCENT = 20
     
     @classmethod
     def load_config(cls):
@@ -109,8 +156,8 @@ class Config:
         # 先读取配置文件，再用环境变量覆盖，方便无界面部署和临时调试。
         if os.path.exists(cls.CONFIG_FILE):
             try:
-                with open(cls.CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+                with open(cls.CONFIG_FILE, 'rb') as f:
+                    config_data = json_codec.loads(f.read())
                     cls.COOKIE = config_data.get("cookie", cls.COOKIE).replace('\n', '').replace('\r', '').strip()
                     relation_signer = config_data.get("relation_signer")
                     cls.RELATION_SIGNER = relation_signer if isinstance(relation_signer, dict) else None
@@ -155,6 +202,62 @@ class Config:
                         cls.MAX_CONCURRENT = max(1, min(10, int(config_data.get("max_concurrent", cls.MAX_CONCURRENT) or 3)))
                     except Exception:
                         cls.MAX_CONCURRENT = 3
+                    cls.SIGN_EXECUTOR = cls.normalize_sign_executor(config_data.get("sign_executor", cls.SIGN_EXECUTOR))
+                    cls.SIGN_WORKERS = cls.bounded_int(config_data.get("sign_workers"), cls.SIGN_WORKERS, 1, 16)
+                    cls.API_TRANSPORT = cls.normalize_api_transport(config_data.get("api_transport", cls.API_TRANSPORT))
+                    cls.API_CONNECTIONS_PER_HOST = cls.bounded_int(
+                        config_data.get("api_connections_per_host"), cls.API_CONNECTIONS_PER_HOST, 1, 64
+                    )
+                    cls.RESPONSE_CACHE_MAX_MB = cls.bounded_int(
+                        config_data.get("response_cache_max_mb"), cls.RESPONSE_CACHE_MAX_MB, 0, 1024
+                    )
+                    cls.RATE_GOVERNOR = bool(config_data.get("rate_governor", cls.RATE_GOVERNOR))
+                    cls.DETAIL_HEDGE_DELAY_MS = cls.bounded_int(
+                        config_data.get("detail_hedge_delay_ms"), cls.DETAIL_HEDGE_DELAY_MS, 0, 10000
+                    )
+                    cls.FEED_PREFETCH_PERCENT = cls.bounded_int(
+                        config_data.get("feed_prefetch_percent"), cls.FEED_PREFETCH_PERCENT, 0, 100
+                    )
+                    cls.FEED_SEEN_MAX = cls.bounded_int(config_data.get("feed_seen_max"), cls.FEED_SEEN_MAX, 100, 100000)
+                    cls.COMMENT_REPLY_PREFETCH = cls.bounded_int(
+                        config_data.get("comment_reply_prefetch"), cls.COMMENT_REPLY_PREFETCH, 0, 50
+                    )
+                    cls.COMMENT_PREFETCH_CONCURRENCY = cls.bounded_int(
+                        config_data.get("comment_prefetch_concurrency"), cls.COMMENT_PREFETCH_CONCURRENCY, 1, 16
+                    )
+                    cls.WARMUP_ON_START = bool(config_data.get("warmup_on_start", cls.WARMUP_ON_START))
+                    cls.DNS_CACHE_TTL_SECONDS = cls.bounded_int(
+                        config_data.get("dns_cache_ttl_seconds"), cls.DNS_CACHE_TTL_SECONDS, 0, 3600
+                    )
+                    cls.WARMUP_HOSTS = cls.normalize_warmup_hosts(config_data.get("warmup_hosts", cls.WARMUP_HOSTS))
+                    cls.SEGMENTED_DOWNLOAD_PARTS = cls.bounded_int(
+                        config_data.get("segmented_download_parts"), cls.SEGMENTED_DOWNLOAD_PARTS, 1, 16
+                    )
+                    cls.SEGMENTED_DOWNLOAD_MIN_MB = cls.bounded_int(
+                        config_data.get("segmented_download_min_mb"), cls.SEGMENTED_DOWNLOAD_MIN_MB, 1, 4096
+                    )
+                    cls.RESUME_PART_MAX_AGE_DAYS = cls.bounded_int(
+                        config_data.get("resume_part_max_age_days"), cls.RESUME_PART_MAX_AGE_DAYS, 0, 3650
+                    )
+                    cls.DOWNLOAD_ENGINE = cls.normalize_download_engine(config_data.get("download_engine", cls.DOWNLOAD_ENGINE))
+                    cls.ASYNC_DOWNLOAD_CONCURRENCY = cls.bounded_int(
+                        config_data.get("async_download_concurrency"), cls.ASYNC_DOWNLOAD_CONCURRENCY, 1, 512
+                    )
+                    cls.DOWNLOAD_MAX_ACTIVE = cls.bounded_int(
+                        config_data.get("download_max_active"), cls.DOWNLOAD_MAX_ACTIVE, 1, 512
+                    )
+                    cls.DOWNLOAD_PER_HOST_LIMIT = cls.bounded_int(
+                        config_data.get("download_per_host_limit"), cls.DOWNLOAD_PER_HOST_LIMIT, 1, 512
+                    )
+                    cls.BANDWIDTH_LIMIT_KB = cls.bounded_int(
+                        config_data.get("bandwidth_limit_kb"), cls.BANDWIDTH_LIMIT_KB, 0, 10_000_000
+                    )
+                    cls.BANDWIDTH_TASK_LIMIT_KB = cls.bounded_int(
+                        config_data.get("bandwidth_task_limit_kb"), cls.BANDWIDTH_TASK_LIMIT_KB, 0, 10_000_000
+                    )
+                    cls.BANDWIDTH_PROXY_RESERVE_PERCENT = cls.bounded_int(
+                        config_data.get("bandwidth_proxy_reserve_percent"), cls.BANDWIDTH_PROXY_RESERVE_PERCENT, 0, 90
+                    )
                     legacy_dir = os.path.join(cls.BASE_DIR, "douyin_download")
                     if os.path.isdir(legacy_dir) and os.path.abspath(legacy_dir).lower() != os.path.abspath(cls.DOWNLOAD_DIR).lower():
                         cls.HISTORY_DIRS = cls.normalize_history_dirs([*cls.HISTORY_DIRS, legacy_dir])
@@ -174,6 +277,11 @@ class Config:
         env_quality = os.environ.get("DOUYIN_DOWNLOAD_QUALITY")
         env_max_concurrent = os.environ.get("DOUYIN_MAX_CONCURRENT")
         env_relation_signer = os.environ.get("DOUYIN_RELATION_SIGNER")
+        env_sign_executor = os.environ.get("DOUYIN_SIGN_EXECUTOR")
+        env_sign_workers = os.environ.get("DOUYIN_SIGN_WORKERS")
+        env_api_transport = os.environ.get("DOUYIN_API_TRANSPORT")
+        env_offline_host = os.environ.get("DOUYIN_OFFLINE_HOST")
+        env_download_engine = os.environ.get("DOUYIN_DOWNLOAD_ENGINE")
 
         if env_cookie is not None:
             cls.COOKIE = env_cookie.replace('\n', '').replace('\r', '').strip()
@@ -194,7 +302,57 @@ class Config:
                     cls.RELATION_SIGNER = signer
             except Exception:
                 pass
+        if env_sign_executor:
+            cls.SIGN_EXECUTOR = cls.normalize_sign_executor(env_sign_executor)
+        if env_sign_workers:
+            cls.SIGN_WORKERS = cls.bounded_int(env_sign_workers, cls.SIGN_WORKERS, 1, 16)
+        if env_api_transport:
+            cls.API_TRANSPORT = cls.normalize_api_transport(env_api_transport)
+        if env_offline_host is not None:
+            cls.OFFLINE_HOST = cls.normalize_offline_host(env_offline_host)
+        if env_download_engine:
+            cls.DOWNLOAD_ENGINE = cls.normalize_download_engine(env_download_engine)
     
+    @classmethod
+    def bounded_int(cls, value, default, min_value, max_value):
+        """把配置值转换为限定范围内的整数，非法值回退到默认值。"""
+        try:
+            return max(min_value, min(max_value, int(value)))
+        except (TypeError, ValueError):
+            return default
+
+    @classmethod
+    def normalize_sign_executor(cls, value):
+        """归一化签名执行器类型。"""
+        mode = str(value or '').strip().lower()
+        return mode if mode in ('process', 'thread', 'inline') else 'process'
+
+    @classmethod
+    def normalize_api_transport(cls, value):
+        """归一化 API 传输层类型。"""
+        transport = str(value or '').strip().lower()
+        return transport if transport in ('requests', 'aiohttp') else 'requests'
+
+    @classmethod
+    def normalize_download_engine(cls, value):
+        """归一化批量下载引擎类型。"""
+        engine = str(value or '').strip().lower()
+        return engine if engine in ('thread', 'async') else 'thread'
+
+    @classmethod
+    def normalize_offline_host(cls, value):
+        """归一化离线假服务器地址，只接受 http(s):// 开头的地址。"""
+        host = str(value or '').strip().rstrip('/')
+        return host if host.startswith(('http://', 'https://')) else ''
+    
+    @classmethod
+    def normalize_warmup_hosts(cls, hosts):
+        """归一化额外预热主机列表，接受主机名或 URL。"""
+        if not isinstance(hosts, list):
+            return []
+        normalized = list(dict.fromkeys(host for host in (normalize_host(item) for item in hosts) if host))
+        return normalized[:32]
+
     @classmethod
     def normalize_history_dirs(cls, history_dirs):
         """归一化历史下载目录列表。"""
@@ -314,13 +472,37 @@ class Config:
             "im_friend_sec_user_ids": resolved_im_friend_sec_user_ids,
             "im_friend_include_all_users": resolved_im_friend_include_all_users,
             "im_friend_refresh_interval_seconds": resolved_im_friend_refresh_interval_seconds,
+            "sign_executor": cls.SIGN_EXECUTOR,
+            "sign_workers": cls.SIGN_WORKERS,
+            "api_transport": cls.API_TRANSPORT,
+            "api_connections_per_host": cls.API_CONNECTIONS_PER_HOST,
+            "response_cache_max_mb": cls.RESPONSE_CACHE_MAX_MB,
+            "rate_governor": cls.RATE_GOVERNOR,
+            "detail_hedge_delay_ms": cls.DETAIL_HEDGE_DELAY_MS,
+            "feed_prefetch_percent": cls.FEED_PREFETCH_PERCENT,
+            "feed_seen_max": cls.FEED_SEEN_MAX,
+            "comment_reply_prefetch": cls.COMMENT_REPLY_PREFETCH,
+            "comment_prefetch_concurrency": cls.COMMENT_PREFETCH_CONCURRENCY,
+            "warmup_on_start": cls.WARMUP_ON_START,
+            "dns_cache_ttl_seconds": cls.DNS_CACHE_TTL_SECONDS,
+            "warmup_hosts": cls.WARMUP_HOSTS,
+            "segmented_download_parts": cls.SEGMENTED_DOWNLOAD_PARTS,
+            "segmented_download_min_mb": cls.SEGMENTED_DOWNLOAD_MIN_MB,
+            "resume_part_max_age_days": cls.RESUME_PART_MAX_AGE_DAYS,
+            "download_engine": cls.DOWNLOAD_ENGINE,
+            "async_download_concurrency": cls.ASYNC_DOWNLOAD_CONCURRENCY,
+            "download_max_active": cls.DOWNLOAD_MAX_ACTIVE,
+            "download_per_host_limit": cls.DOWNLOAD_PER_HOST_LIMIT,
+            "bandwidth_limit_kb": cls.BANDWIDTH_LIMIT_KB,
+            "bandwidth_task_limit_kb": cls.BANDWIDTH_TASK_LIMIT_KB,
+            "bandwidth_proxy_reserve_percent": cls.BANDWIDTH_PROXY_RESERVE_PERCENT,
         }
         try:
             config_dir = os.path.dirname(cls.CONFIG_FILE)
             os.makedirs(config_dir, exist_ok=True)
             temp_file = f"{cls.CONFIG_FILE}.tmp"
             with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+                f.write(json_codec.dumps(config_data, indent=True))
                 f.write('\n')
             os.replace(temp_file, cls.CONFIG_FILE)
             print("\033[92m配置已保存到配置文件\033[0m")
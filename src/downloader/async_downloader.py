@@ -0,0 +1,643 @@
+"""基于 aiohttp 的异步下载引擎。
+
+``AsyncDouyinDownloader`` 提供与 ``DouyinDownloader`` 相同的 ``download_video`` /
+``download_media_group``（协程版），直接跑在全局事件循环上：每个传输不再占用一个线程，
+暂停与取消用 ``LoopEvent`` 直接 await，不再轮询；磁盘写入与下载记录等账目操作交给共用的 I/O 线程。
+下载记录、文件命名、.part 续传日志与线程版共用，切换引擎不会重复下载。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from types import SimpleNamespace
+from typing import List, Optional
+
+from src.config.config import Config
+from src.downloader import bandwidth, resume, segmented
+from src.downloader.downloader import DouyinDownloader, _route_media_url
+from src.utils.download_history_index import remove_download_history_entries, upsert_download_history_entries
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp 在 requirements.txt 中，缺失时只能用线程引擎
+    aiohttp = None
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+_FILE_TYPE_DISPLAY = {
+    'video': '视频',
+    'image': '图片',
+    'live_photo': 'Live Photo',
+}
+
+
+def get_download_engine() -> str:
+    """当前生效的批量下载引擎；未安装 aiohttp 时退回线程引擎。"""
+    engine = Config.normalize_download_engine(getattr(Config, 'DOWNLOAD_ENGINE', 'thread'))
+    if engine == 'async' and aiohttp is None:
+        return 'thread'
+    return engine
+
+
+class LoopEvent:
+    """任意线程都能 set/clear、协程里可以 await 的事件。
+
+    与 threading.Event / asyncio.Event 一样提供 ``is_set``/``set``/``clear``，线程版下载器
+    和调度器的 ``PauseGate`` 照常轮询；协程用 ``wait()`` / ``wait_clear()`` 等待状态变化。
+    """
+
+    def __init__(self):
+        self._flag = False
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[asyncio.Future, bool]] = []
+
+    def is_set(self) -> bool:
+        return self._flag
+
+    def set(self) -> None:
+        self._update(True)
+
+    def clear(self) -> None:
+        self._update(False)
+
+    def _update(self, value: bool) -> None:
+        with self._lock:
+            if self._flag == value:
+                return
+            self._flag = value
+            woken = [future for future, target in self._waiters if target == value]
+            self._waiters = [(future, target) for future, target in self._waiters if target != value]
+        for future in woken:
+            loop = future.get_loop()
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                _resolve(future)
+            else:
+                try:
+                    loop.call_soon_threadsafe(_resolve, future)
+                except RuntimeError:
+                    # 事件循环已关闭，等待方也不存在了
+                    pass
+
+    async def _wait_for(self, value: bool) -> None:
+        with self._lock:
+            if self._flag == value:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((future, value))
+        try:
+            await future
+        finally:
+            with self._lock:
+                self._waiters = [item for item in self._waiters if item[0] is not future]
+
+    async def wait(self) -> bool:
+        await self._wait_for(True)
+        return True
+
+    async def wait_clear(self) -> None:
+        await self._wait_for(False)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+async def wait_while_paused(pause_event=None, cancel_event=None, interval: float = 0.2) -> None:
+    """暂停期间挂起，恢复或取消后返回。
+
+    ``LoopEvent`` 与调度器的 ``PauseGate`` 提供可 await 的 ``wait_clear()``（闸门还会等到拿回名额），
+    其余事件退化为轮询。
+    """
+    while pause_event is not None and pause_event.is_set() and not (cancel_event is not None and cancel_event.is_set()):
+        wait_clear = getattr(pause_event, 'wait_clear', None)
+        if wait_clear is None:
+            await asyncio.sleep(interval)
+            continue
+        waiters = [asyncio.ensure_future(wait_clear())]
+        if isinstance(cancel_event, LoopEvent):
+            waiters.append(asyncio.ensure_future(cancel_event.wait()))
+        timeout = interval if cancel_event is not None and not isinstance(cancel_event, LoopEvent) else None
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+
+# 所有异步传输共用的磁盘 I/O 线程，线程数不随并发传输数增长
+FILE_IO_WORKERS = 4
+_file_io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=FILE_IO_WORKERS, thread_name_prefix='download-io')
+
+
+async def run_file_io(func, *args):
+    """在共用的磁盘 I/O 线程里执行 ``func``：下载记录、历史索引、改名等账目操作不占用事件循环。
+
+    与 ``asyncio.to_thread`` 一样带上当前上下文（限速与续传登记用到的任务名）。
+    """
+    context = contextvars.copy_context()
+    return await asyncio.wrap_future(_file_io_executor.submit(context.run, func, *args))
+
+
+class FileWorker:
+    """把单个文件的写入、预分配与续传日志保存交给共用写线程，不占用事件循环。
+
+    ``close`` 等该文件已提交的操作全部结束后再执行，传输被取消时也不会在写入途中关闭文件。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: set[concurrent.futures.Future] = set()
+
+    def _done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    async def run(self, func, *args):
+        future = _file_io_executor.submit(func, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    async def close(self, *funcs) -> None:
+        """已提交的操作结束后依次执行 ``funcs``（关闭文件等）；调用方被取消时仍会执行完。"""
+        with self._lock:
+            pending = list(self._pending)
+
+        def finish():
+            concurrent.futures.wait(pending)
+            for func in funcs:
+                func()
+
+        await asyncio.wrap_future(_file_io_executor.submit(finish))
+
+
+def _commit_file(base: DouyinDownloader, part_path: str, user_path: str, filename: str, extension: str) -> tuple[str, int]:
+    """把完成的 part 文件改名为正式文件并写入下载历史索引，返回 ``(路径, 文件大小)``。"""
+    filepath = base._commit_part(part_path, user_path, filename, extension)
+    upsert_download_history_entries([filepath])
+    return filepath, os.path.getsize(filepath)
+
+
+def _response_info(response) -> SimpleNamespace:
+    """把 aiohttp 响应转成线程版工具函数使用的 status_code/headers/url 形式。"""
+    return SimpleNamespace(status_code=response.status, headers=response.headers, url=str(response.url))
+
+
+class AsyncDouyinDownloader:
+    """aiohttp 下载引擎，包装一个 ``DouyinDownloader`` 并共用它的下载记录与命名规则。"""
+
+    def __init__(self, downloader: DouyinDownloader):
+        if aiohttp is None:
+            raise RuntimeError('异步下载引擎需要 aiohttp')
+        self.downloader = downloader
+        self.debug_mode = downloader.debug_mode
+        self._session = None
+        self._session_loop = None
+
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # 并发数由调用方控制，连接池本身不设上限；Cookie 通过请求头显式传入
+            connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _open_first(self, session, candidate_urls: List[str], headers: dict):
+        """依次尝试候选地址，返回第一个可用的响应和对应地址。"""
+        last_error = None
+        for candidate_url in candidate_urls:
+            response = None
+            try:
+                response = await session.get(_route_media_url(candidate_url), headers=headers)
+                response.raise_for_status()
+                return response, candidate_url
+            except (aiohttp.ClientError, asyncio.TimeoutError) as request_error:
+                last_error = request_error
+                if response is not None:
+                    response.close()
+                if self.debug_mode:
+                    print(f"\033[91m[AsyncDownloader] 地址不可用，尝试下一个: {request_error}\033[0m")
+        raise last_error or RuntimeError("没有可用的下载地址")
+
+    async def _download_file(self, session, response, url: str, headers: dict, part_path: str,
+                             cancel_event, pause_event, on_progress) -> Optional[int]:
+        """把已打开的响应下载到 part 文件，返回文件字节数；被取消时返回 None。
+
+        支持 Range 时与线程版一样续传、分段；否则单连接写完整个文件。
+        ``on_progress(downloaded_size, total, speed_bps)`` 最多每 ``PROGRESS_INTERVAL`` 秒调用一次。
+        """
+        info = _response_info(response)
+        total = segmented.ranged_total_size(info)
+        if not total:
+            return await self._download_stream(response, part_path, cancel_event, pause_event, on_progress)
+
+        base = self.downloader
+        parts = base._segment_parts(total)
+        validators = resume.response_validators(info)
+        journal = await run_file_io(base._open_journal, part_path, url, total, validators, parts)
+        range_url = info.url or url
+        range_headers = {**headers, **resume.if_range_headers(validators)}
+        try:
+            return await self._download_ranges(
+                session, response, range_url, range_headers, part_path, total, parts, journal,
+                cancel_event, pause_event, on_progress,
+            )
+        except segmented.SegmentedDownloadCancelled:
+            if journal is None:
+                print(f"\033[93m下载被取消，删除部分文件：{part_path}\033[0m")
+                await run_file_io(resume.remove_part, part_path)
+            else:
+                print(f"\033[93m下载被取消，已保留进度以便续传：{part_path}\033[0m")
+            return None
+        except BaseException:
+            # 没有日志的小文件留着也无法续传
+            if journal is None:
+                await run_file_io(resume.remove_part, part_path)
+            raise
+
+    async def _download_ranges(self, session, response, range_url: str, range_headers: dict, part_path: str,
+                               total: int, parts: int, journal, cancel_event, pause_event, on_progress) -> int:
+        if journal is not None:
+            segments = segmented.plan_ranges(journal.missing_ranges(), parts)
+            resumed = journal.completed_bytes()
+        else:
+            segments = segmented.plan_segments(total, parts)
+            resumed = 0
+        first_response = response if resumed == 0 and segments and segments[0][0] == 0 else None
+        if first_response is None:
+            response.close()
+        downloaded = [resumed]
+        started_at = time.monotonic()
+        last_report = [0.0]
+        limiter = bandwidth.get_limiter()
+
+        def cancelled() -> bool:
+            return bool(cancel_event is not None and cancel_event.is_set())
+
+        def paused() -> bool:
+            return bool(pause_event is not None and pause_event.is_set())
+
+        def write(offset: int, chunk: bytes) -> None:
+            writer.write_at(offset, chunk)
+            if journal is not None:
+                journal.mark(offset, len(chunk))
+
+        async def report(force: bool = False) -> None:
+            now = time.monotonic()
+            if not force and now - last_report[0] < segmented.PROGRESS_INTERVAL:
+                return
+            last_report[0] = now
+            if journal is not None:
+                await worker.run(journal.save)
+            speed_bps = (downloaded[0] - resumed) / max(now - started_at, 0.001)
+            on_progress(downloaded[0], total, speed_bps)
+
+        async def fetch(index: int, start: int, end: int) -> None:
+            offset = start
+            attempts = 0
+            current = first_response if index == 0 else None
+            while offset <= end:
+                if cancelled():
+                    raise segmented.SegmentedDownloadCancelled()
+                if paused():
+                    # 暂停期间不占用连接，恢复后按当前偏移重新请求
+                    if current is not None:
+                        current.close()
+                        current = None
+                    await wait_while_paused(pause_event, cancel_event)
+                    continue
+                try:
+                    if current is None:
+                        current = await session.get(range_url, headers={**range_headers, 'Range': f'bytes={offset}-{end}'})
+                        current.raise_for_status()
+                        if current.status != 206:
+                            raise aiohttp.ClientPayloadError(f'分段请求未返回 206: status={current.status}')
+                    async for chunk in current.content.iter_chunked(segmented.SEGMENT_CHUNK_SIZE):
+                        if cancelled():
+                            raise segmented.SegmentedDownloadCancelled()
+                        if paused():
+                            break
+                        chunk = chunk[:end - offset + 1]
+                        await worker.run(write, offset, chunk)
+                        offset += len(chunk)
+                        downloaded[0] += len(chunk)
+                        await report()
+                        await limiter.athrottle(len(chunk), should_stop=lambda: cancelled() or paused())
+                        if offset > end:
+                            break
+                    if offset <= end and not paused():
+                        raise aiohttp.ClientPayloadError(f'分段连接提前结束: {offset}/{end}')
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                    attempts += 1
+                    if attempts > segmented.SEGMENT_RETRIES:
+                        raise
+                finally:
+                    if current is not None:
+                        # 读完的连接放回连接池，读到一半的直接断开
+                        if offset > end:
+                            current.release()
+                        else:
+                            current.close()
+                        current = None
+
+        worker = FileWorker()
+        try:
+            writer = await worker.run(segmented.PositionalFile, part_path, total, resumed == 0)
+        except BaseException:
+            await worker.close()
+            raise
+        tasks = [asyncio.ensure_future(fetch(index, start, end)) for index, (start, end) in enumerate(segments)]
+        try:
+            await asyncio.gather(*tasks)
+            await report(force=True)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            closers = [writer.close]
+            if journal is not None:
+                closers.append(lambda: journal.save(force=True))
+            await worker.close(*closers)
+        return downloaded[0]
+
+    async def _download_stream(self, response, part_path: str, cancel_event, pause_event, on_progress) -> Optional[int]:
+        """服务器不支持 Range 时单连接下载，暂停期间只能保持连接。"""
+        total = self.downloader._get_response_size(_response_info(response))
+        started_at = time.monotonic()
+        last_report = 0.0
+        downloaded_size = 0
+        limiter = bandwidth.get_limiter()
+        interrupted = DouyinDownloader._interrupt_check(pause_event, cancel_event)
+        worker = FileWorker()
+        # 小块先攒起来，凑够一个分段块再交给写线程，减少线程切换
+        buffer = bytearray()
+        f = None
+        try:
+            f = await worker.run(open, part_path, 'wb')
+            async for chunk in response.content.iter_chunked(Config.CHUNK_SIZE):
+                await wait_while_paused(pause_event, cancel_event)
+                if cancel_event is not None and cancel_event.is_set():
+                    print(f"\033[93m下载被取消，删除部分文件：{part_path}\033[0m")
+                    await worker.close(f.close, lambda: resume.remove_part(part_path))
+                    f = None
+                    return None
+                buffer += chunk
+                if len(buffer) >= segmented.SEGMENT_CHUNK_SIZE:
+                    await worker.run(f.write, bytes(buffer))
+                    buffer.clear()
+                downloaded_size += len(chunk)
+                await limiter.athrottle(len(chunk), should_stop=interrupted)
+                now = time.monotonic()
+                if now - last_report >= segmented.PROGRESS_INTERVAL:
+                    last_report = now
+                    on_progress(downloaded_size, total, downloaded_size / max(now - started_at, 0.001))
+            if buffer:
+                await worker.run(f.write, bytes(buffer))
+        except BaseException:
+            closers = [f.close] if f is not None else []
+            f = None
+            await worker.close(*closers, lambda: resume.remove_part(part_path))
+            raise
+        finally:
+            response.close()
+            if f is not None:
+                await worker.close(f.close)
+        return downloaded_size
+
+    async def download_video(self, url: str, name: str, aweme_id: str, cancel_event=None, socketio=None, task_id=None,
+                             progress_callback=None, pause_event=None, check_existing: bool = True,
+                             fallback_urls: Optional[List[str]] = None) -> bool:
+        """下载视频，参数与 ``DouyinDownloader.download_video`` 相同。"""
+        base = self.downloader
+        response = None
+        part_path = None
+        try:
+            user_dir, filename = base._split_download_name(name)
+
+            if check_existing and await run_file_io(base._is_aweme_downloaded, aweme_id, user_dir):
+                print(f"\033[93m作品已下载，跳过：{user_dir}/{filename}\033[0m")
+                return True
+
+            if cancel_event and cancel_event.is_set():
+                print(f"\033[93m下载被取消（开始下载前）：{user_dir}/{filename}\033[0m")
+                return False
+
+            headers = base._get_download_headers()
+            candidate_urls = list(dict.fromkeys(
+                candidate for candidate in (str(item or '').strip() for item in [url, *(fallback_urls or [])]) if candidate
+            ))
+            session = await self._get_session()
+            response, selected_url = await self._open_first(session, candidate_urls, headers)
+            info = _response_info(response)
+            response_size = base._get_response_size(info)
+            file_started_at = time.monotonic()
+
+            user_path = os.path.join(base.download_dir, user_dir)
+            await run_file_io(partial(os.makedirs, user_path, exist_ok=True))
+            extension = base._extension_for_media('video', selected_url, info)
+            part_path = base._part_path(user_path, filename, extension)
+
+            def emit(progress, status, downloaded_size, total, speed_bps, eta_seconds, completed=0):
+                base._emit_download_progress(
+                    socketio, task_id, progress_callback,
+                    progress=progress,
+                    completed=completed,
+                    total=1,
+                    status=status,
+                    file_index=1,
+                    file_total=1,
+                    file_progress=progress,
+                    bytes_downloaded=downloaded_size,
+                    bytes_total=total,
+                    speed_bps=speed_bps,
+                    eta_seconds=eta_seconds,
+                    file_type='video',
+                    file_type_display='视频'
+                )
+
+            def on_progress(downloaded_size: int, total: int, speed_bps: float):
+                progress = min(100, max(0, downloaded_size / total * 100)) if total > 0 else 0
+                eta_seconds = (total - downloaded_size) / speed_bps if total > 0 and speed_bps > 0 else None
+                base._observe_task_speed(task_id or aweme_id, speed_bps)
+                emit(progress, 'downloading', downloaded_size, total, speed_bps, eta_seconds)
+
+            emit(0, 'downloading', 0, response_size, 0, None)
+            downloaded_size = await self._download_file(
+                session, response, _route_media_url(selected_url), headers, part_path,
+                cancel_event, pause_event, on_progress,
+            )
+            if downloaded_size is None:
+                return False
+
+            filepath, final_size = await run_file_io(_commit_file, base, part_path, user_path, filename, extension)
+            elapsed = max(time.monotonic() - file_started_at, 0.001)
+            base._record_file_downloaded('video', downloaded_size, elapsed)
+            print(f"\033[93m下载视频成功：{user_dir}/{os.path.basename(filepath)}\033[0m")
+            emit(100, 'completed', final_size, response_size or final_size, final_size / elapsed, 0, completed=1)
+            await run_file_io(base._save_download_record, user_dir, aweme_id)
+            return True
+        except Exception as e:
+            print(f"\033[91m下载视频失败：{str(e)}\033[0m")
+            return False
+        finally:
+            base._clear_task_speed(task_id or aweme_id)
+            base._release_part(part_path)
+            if response is not None:
+                response.close()
+
+    async def download_media_group(self, urls: List[dict], name: str, aweme_id: str = None, socketio=None, task_id=None,
+                                   cancel_event=None, progress_callback=None, pause_event=None,
+                                   check_existing: bool = True) -> bool:
+        """依次下载一组媒体文件，参数与 ``DouyinDownloader.download_media_group`` 相同。"""
+        base = self.downloader
+        socketio = socketio or base.socketio
+        try:
+            if cancel_event and cancel_event.is_set():
+                print(f"\033[93m媒体组下载被取消（开始前）：{name}\033[0m")
+                return False
+
+            user_dir, filename = base._split_download_name(name)
+            if check_existing and aweme_id and await run_file_io(base._is_aweme_downloaded, aweme_id, user_dir):
+                print(f"\033[93m作品已下载，跳过：{user_dir}/{filename}\033[0m")
+                return True
+
+            session = await self._get_session()
+            success = True
+            downloaded_files = []
+            file_total = len(urls)
+
+            def discard_group():
+                for filepath in downloaded_files:
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+                remove_download_history_entries(downloaded_files)
+
+            def emit_log(message: str):
+                if socketio and task_id:
+                    socketio.emit('download_log', {
+                        'task_id': task_id,
+                        'message': message,
+                        'timestamp': datetime.now().strftime('%H:%M:%S')
+                    })
+
+            for i, url_info in enumerate(urls):
+                if cancel_event and cancel_event.is_set():
+                    print(f"\033[93m媒体组下载被取消（下载中），清理已下载文件：{name}\033[0m")
+                    await run_file_io(discard_group)
+                    return False
+
+                response = None
+                part_path = None
+                file_type = url_info.get('type', 'image')
+                file_type_display = _FILE_TYPE_DISPLAY.get(file_type, '文件')
+                file_started_at = time.monotonic()
+
+                def emit(file_progress, completed, downloaded_size, total, speed_bps, eta_seconds):
+                    base._emit_download_progress(
+                        socketio, task_id, progress_callback,
+                        progress=((i + file_progress / 100) / file_total) * 100,
+                        completed=completed,
+                        total=file_total,
+                        status='downloading',
+                        file_index=i + 1,
+                        file_total=file_total,
+                        file_progress=file_progress,
+                        bytes_downloaded=downloaded_size,
+                        bytes_total=total,
+                        speed_bps=speed_bps,
+                        eta_seconds=eta_seconds,
+                        file_type=file_type,
+                        file_type_display=file_type_display
+                    )
+
+                def on_progress(downloaded_size: int, total: int, speed_bps: float):
+                    file_progress = min(100, max(0, downloaded_size / total * 100)) if total > 0 else 0
+                    eta_seconds = (total - downloaded_size) / speed_bps if total > 0 and speed_bps > 0 else None
+                    base._observe_task_speed(task_id or aweme_id, speed_bps)
+                    emit(file_progress, i, downloaded_size, total, speed_bps, eta_seconds)
+
+                try:
+                    url = url_info['url']
+                    emit(0, i, 0, 0, 0, None)
+                    emit_log(f'正在下载第 {i+1}/{file_total} 个文件 ({file_type_display})')
+
+                    headers = base._get_download_headers()
+                    response, _ = await self._open_first(session, [url], headers)
+                    info = _response_info(response)
+
+                    if file_total == 1:
+                        filename_with_index = base._sanitize_filename(filename)
+                    else:
+                        index_suffix = f"_{i+1:02d}"
+                        protected_suffix = index_suffix
+                        if aweme_id and filename.endswith(f"_{aweme_id}"):
+                            protected_suffix = f"_{aweme_id}{index_suffix}"
+                        filename_with_index = base._sanitize_filename(f"{filename}{index_suffix}", protected_suffix=protected_suffix)
+
+                    user_path = os.path.join(base.download_dir, user_dir)
+                    await run_file_io(partial(os.makedirs, user_path, exist_ok=True))
+                    extension = base._extension_for_media(file_type, url, info)
+                    part_path = base._part_path(user_path, filename_with_index, extension)
+
+                    downloaded_size = await self._download_file(
+                        session, response, _route_media_url(url), headers, part_path,
+                        cancel_event, pause_event, on_progress,
+                    )
+                    if downloaded_size is None:
+                        # 清理本组此前已完成的文件，当前文件保留续传进度
+                        await run_file_io(discard_group)
+                        return False
+
+                    filepath, final_size = await run_file_io(
+                        _commit_file, base, part_path, user_path, filename_with_index, extension,
+                    )
+                    downloaded_files.append(filepath)
+                    elapsed = max(time.monotonic() - file_started_at, 0.001)
+                    base._record_file_downloaded(file_type, downloaded_size, elapsed)
+                    print(f"\033[93m下载{file_type_display} ({i+1}/{file_total}) 成功：{user_dir}/{os.path.basename(filepath)}\033[0m")
+                    emit(100, i + 1, final_size, final_size, final_size / elapsed, 0)
+                    emit_log(f'✅ 第 {i+1}/{file_total} 个文件下载成功 ({os.path.basename(filepath)})')
+                except Exception as e:
+                    print(f"\033[91m下载第 {i+1}/{file_total} 个文件失败：{str(e)}\033[0m")
+                    success = False
+                    emit_log(f'❌ 第 {i+1}/{file_total} 个文件下载失败: {str(e)}')
+                finally:
+                    base._release_part(part_path)
+                    if response is not None:
+                        response.close()
+
+            if success and aweme_id:
+                await run_file_io(base._save_download_record, user_dir, aweme_id)
+            return success
+        except Exception as e:
+            print(f"\033[91m下载失败：{str(e)}\033[0m")
+            return False
+        finally:
+            base._clear_task_speed(task_id or aweme_id)
@@ -0,0 +1,311 @@
+"""下载带宽限速。
+
+所有下载循环每写入一块数据就向 ``BandwidthLimiter`` 报告字节数，按令牌桶计算需要等待的时间：
+- 全局桶限制所有下载的总速度（``Config.BANDWIDTH_LIMIT_KB``）
+- 每个任务一个桶（``Config.BANDWIDTH_TASK_LIMIT_KB``，或 ``set_task_limit`` 单独指定）
+- 有 media_proxy 播放流时，下载只能用全局带宽的 ``100 - BANDWIDTH_PROXY_RESERVE_PERCENT``%，
+  剩下的留给前端播放，代理流本身不限速。没有设置全局限速时按测得的链路容量（下载不限速期间
+  每秒合计流量的峰值，逐窗口衰减）计算；还没测到时不预留
+
+限速值每次计算时从 Config 读取，修改配置后正在进行的下载立即按新速度执行。
+当前任务由调度器名额通过 contextvar 传下来，``asyncio.to_thread`` 会带上它。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config.config import Config
+from src.utils import metrics
+
+# 令牌桶最多积攒多少秒的流量
+BURST_SECONDS = 0.5
+# 任务超过该时间没有下载数据，丢弃它的桶和单独设置的上限
+TASK_IDLE_SECONDS = 300.0
+# 等待期间每隔多久重新计算一次，调整限速后正在等待的下载也按新速度放行
+WAIT_SLICE = 0.2
+# 链路容量按这么长的窗口统计下载合计流量；两次下载间隔超过 CAPACITY_IDLE_GAP 时重新开窗
+CAPACITY_WINDOW = 1.0
+CAPACITY_IDLE_GAP = 2.0
+# 每个窗口旧的峰值按该系数衰减，链路变慢后估计值随之下降
+CAPACITY_DECAY = 0.8
+
+THROTTLE_SECONDS = metrics.counter('douyin_download_throttle_seconds_total', '下载限速累计等待时间', ('scope',))
+
+_current_task: contextvars.ContextVar[str] = contextvars.ContextVar('download_bandwidth_task', default='')
+
+
+def current_task() -> str:
+    return _current_task.get()
+
+
+def bind_task(task: str) -> contextvars.Token:
+    """把之后的下载字节记到 ``task`` 的桶里，返回值交给 ``reset_task`` 还原。"""
+    return _current_task.set(str(task or ''))
+
+
+def reset_task(token: contextvars.Token) -> None:
+    _current_task.reset(token)
+
+
+def config_limits() -> tuple[int, int, float]:
+    """全局下载速度、单任务默认速度（字节/秒，0 不限）与给 media_proxy 预留的比例。"""
+    global_kb = Config.bounded_int(getattr(Config, 'BANDWIDTH_LIMIT_KB', 0), 0, 0, 10_000_000)
+    task_kb = Config.bounded_int(getattr(Config, 'BANDWIDTH_TASK_LIMIT_KB', 0), 0, 0, 10_000_000)
+    reserve = Config.bounded_int(getattr(Config, 'BANDWIDTH_PROXY_RESERVE_PERCENT', 20), 20, 0, 90)
+    return global_kb * 1024, task_kb * 1024, reserve / 100
+
+
+class TokenBucket:
+    """令牌桶，``rate`` 为字节/秒，0 表示不限速。
+
+    令牌可以透支：``acquire`` 返回一个凭据（累计补充到多少令牌时这笔透支才还清），
+    ``remaining`` 按当前速度换算成还要等待的秒数，中途改速度立即生效。
+    """
+
+    def __init__(self, rate: float = 0, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.rate = 0.0
+        self.burst = 0.0
+        self._tokens = 0.0
+        self._refilled = 0.0
+        self._updated = clock()
+        self.set_rate(rate)
+        self._tokens = self.burst
+
+    def _refill_locked(self) -> None:
+        now = self._clock()
+        if self.rate > 0:
+            gained = (now - self._updated) * self.rate
+            self._refilled += gained
+            self._tokens = min(self.burst, self._tokens + gained)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill_locked()
+            self.rate = max(0.0, float(rate))
+            self.burst = self.rate * BURST_SECONDS
+            # 从不限速切回限速时不继承之前的透支
+            self._tokens = min(self._tokens, self.burst) if self.rate > 0 else 0.0
+
+    def acquire(self, nbytes: int) -> float:
+        """取走 ``nbytes`` 个令牌，返回等待凭据；0 表示不用等。"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            self._refill_locked()
+            self._tokens -= nbytes
+            return self._refilled - self._tokens if self._tokens < 0 else 0.0
+
+    def remaining(self, ticket: float) -> float:
+        """凭据还要等待的秒数；期间切换为不限速时立即返回 0。"""
+        with self._lock:
+            if not ticket or self.rate <= 0:
+                return 0.0
+            self._refill_locked()
+            return max(0.0, (ticket - self._refilled) / self.rate)
+
+    def reserve(self, nbytes: int) -> float:
+        """取走 ``nbytes`` 个令牌，返回按当前速度需要等待的秒数。"""
+        return self.remaining(self.acquire(nbytes))
+
+
+class BandwidthLimiter:
+    """全局 + 按任务的下载限速，并在 media_proxy 播放时让出预留带宽。"""
+
+    def __init__(self, limits=config_limits, clock=time.monotonic):
+        self._limits = limits
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._global = TokenBucket(clock=clock)
+        self._tasks: dict[str, TokenBucket] = {}
+        # 单独设置的任务上限（字节/秒）与任务最近一次使用时间
+        self._task_limits: dict[str, int] = {}
+        self._task_used: dict[str, float] = {}
+        self._proxy_streams = 0
+        self._applied = None
+        # 测得的链路容量（字节/秒）与当前统计窗口
+        self._capacity = 0.0
+        self._window_started: float | None = None
+        self._window_seen = 0.0
+        self._window_bytes = 0
+
+    def _sync(self) -> None:
+        """配置或代理流状态变化时更新各个桶的速度。"""
+        global_rate, task_rate, reserve = self._limits()
+        with self._lock:
+            proxied = self._proxy_streams > 0
+            state = (global_rate, task_rate, reserve, proxied, self._capacity if proxied and not global_rate else 0)
+            if state == self._applied:
+                return
+            self._applied = state
+            if proxied:
+                global_rate = (global_rate or self._capacity) * (1 - reserve)
+            self._global.set_rate(global_rate)
+            for task, bucket in self._tasks.items():
+                bucket.set_rate(self._task_limits.get(task, task_rate))
+
+    def _observe(self, nbytes: int) -> None:
+        """统计不限速期间的下载合计流量，更新链路容量估计。"""
+        now = self._clock()
+        with self._lock:
+            if self._global.rate > 0:
+                # 自己在限速，测到的不是链路速度
+                self._window_started = None
+                return
+            if self._window_started is None or now - self._window_seen > CAPACITY_IDLE_GAP:
+                self._window_started = now
+                self._window_bytes = 0
+            self._window_bytes += nbytes
+            self._window_seen = now
+            elapsed = now - self._window_started
+            if elapsed >= CAPACITY_WINDOW:
+                self._capacity = max(self._window_bytes / elapsed, self._capacity * CAPACITY_DECAY)
+                self._window_started = now
+                self._window_bytes = 0
+
+    def _task_bucket(self, task: str) -> TokenBucket | None:
+        now = self._clock()
+        with self._lock:
+            self._task_used[task] = now
+            bucket = self._tasks.get(task)
+            if bucket is not None:
+                return bucket
+            rate = self._task_limits.get(task, self._applied[1] if self._applied else 0)
+            if not rate:
+                return None
+            self._prune_locked(now)
+            bucket = self._tasks[task] = TokenBucket(rate, clock=self._clock)
+            return bucket
+
+    def _prune_locked(self, now: float) -> None:
+        for task, used in list(self._task_used.items()):
+            if now - used > TASK_IDLE_SECONDS:
+                self._task_used.pop(task, None)
+                self._tasks.pop(task, None)
+                self._task_limits.pop(task, None)
+
+    def set_task_limit(self, task: str, rate: int | None) -> None:
+        """单独设置某个任务的速度（字节/秒，0 不限）；``None`` 恢复为默认的单任务上限。"""
+        task = str(task or '')
+        if not task:
+            return
+        with self._lock:
+            self._prune_locked(self._clock())
+            if rate is None:
+                self._task_limits.pop(task, None)
+            else:
+                self._task_limits[task] = max(0, int(rate))
+            self._task_used[task] = self._clock()
+            # 已有的桶由下一次 _sync 原地改速度，正在等待的下载随之生效
+            self._applied = None
+
+    def _acquire(self, nbytes: int, task: str) -> list[tuple[TokenBucket, float]]:
+        self._observe(nbytes)
+        self._sync()
+        tickets = [(self._global, self._global.acquire(nbytes))]
+        if task:
+            bucket = self._task_bucket(task)
+            if bucket is not None:
+                tickets.append((bucket, bucket.acquire(nbytes)))
+        return tickets
+
+    def _remaining(self, tickets) -> float:
+        self._sync()
+        return max(bucket.remaining(ticket) for bucket, ticket in tickets)
+
+    def delay(self, nbytes: int, task: str = '') -> float:
+        """登记 ``nbytes`` 字节的下载流量，返回按当前速度需要等待的秒数。"""
+        return self._remaining(self._acquire(nbytes, task))
+
+    def throttle(self, nbytes: int, task: str | None = None, should_stop=None) -> None:
+        """线程里调用：超出限速时阻塞等待。``task`` 默认取当前上下文的任务。
+
+        ``should_stop()`` 为真（取消或暂停）时立即返回，由下载循环自己处理后续。
+        """
+        tickets = self._acquire(nbytes, current_task() if task is None else task)
+        started_at = time.monotonic()
+        wait = self._remaining(tickets)
+        while wait > 0 and not (should_stop is not None and should_stop()):
+            time.sleep(min(wait, WAIT_SLICE))
+            wait = self._remaining(tickets)
+        waited = time.monotonic() - started_at
+        if waited > 0.001:
+            THROTTLE_SECONDS.inc(waited, scope='thread')
+
+    async def athrottle(self, nbytes: int, task: str | None = None, should_stop=None) -> None:
+        """协程版 ``throttle``，等待时不阻塞事件循环。"""
+        tickets = self._acquire(nbytes, current_task() if task is None else task)
+        started_at = time.monotonic()
+        wait = self._remaining(tickets)
+        while wait > 0 and not (should_stop is not None and should_stop()):
+            await asyncio.sleep(min(wait, WAIT_SLICE))
+            wait = self._remaining(tickets)
+        waited = time.monotonic() - started_at
+        if waited > 0.001:
+            THROTTLE_SECONDS.inc(waited, scope='async')
+
+    def throttler(self, should_stop=None):
+        """绑定当前任务的 ``throttle``，交给不继承上下文的分段线程使用。
+
+        返回的函数接受 ``(nbytes, should_stop=None)``，调用时传入的 ``should_stop`` 优先。
+        """
+        task = current_task()
+
+        def throttle(nbytes: int, stop=None) -> None:
+            self.throttle(nbytes, task, stop or should_stop)
+
+        return throttle
+
+    @contextmanager
+    def proxy_stream(self):
+        """media_proxy 转发期间持有，下载让出预留带宽。"""
+        with self._lock:
+            self._proxy_streams += 1
+        self._sync()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._proxy_streams -= 1
+            self._sync()
+
+    def stats(self) -> dict:
+        self._sync()
+        global_rate, task_rate, reserve = self._limits()
+        with self._lock:
+            if global_rate:
+                reserve_base = 'limit'
+            else:
+                # 没有全局限速时预留只能基于测得的容量，还没测到就不生效
+                reserve_base = 'measured' if self._capacity else 'none'
+            return {
+                'global_bps': global_rate,
+                'download_bps': self._global.rate,
+                'task_bps': task_rate,
+                'proxy_reserve_percent': int(round(reserve * 100)),
+                'proxy_reserve_base': reserve_base,
+                'link_capacity_bps': int(self._capacity),
+                'proxy_streams': self._proxy_streams,
+                'task_limits': dict(self._task_limits),
+                'task_buckets': {task: bucket.rate for task, bucket in self._tasks.items()},
+            }
+
+
+_limiter: BandwidthLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> BandwidthLimiter:
+    """进程内共享的限速器。"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = BandwidthLimiter()
+        return _limiter
@@ -11,6 +11,8 @@ from typing import List, Optional
 
 from src.config.config import Config
 from src.api.api import DouyinAPI
+from src.downloader import bandwidth, resume, segmented
+from src.utils import metrics
 from src.utils.download_history_index import (
     remove_download_history_entries,
     upsert_download_history_entries,
@@ -20,6 +22,13 @@ from src.utils.download_history_index import (
 _retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
 _thread_local = threading.local()
 
+DOWNLOAD_BYTES = metrics.counter('douyin_download_bytes_total', '已下载完成的文件字节数', ('media_type',))
+DOWNLOAD_FILES = metrics.counter('douyin_download_files_total', '已下载完成的文件数', ('media_type',))
+DOWNLOAD_SPEED = metrics.histogram(
+    'douyin_download_speed_bytes_per_second', '单个文件的平均下载速度', ('media_type',), buckets=metrics.SPEED_BUCKETS
+)
+DOWNLOAD_TASK_SPEED = metrics.gauge('douyin_download_task_speed_bytes_per_second', '进行中下载任务的当前速度', ('task',))
+
 
 def _create_session():
     session = requests.Session()
@@ -36,6 +45,15 @@ def _get_session():
     return session
 
 
+def _route_media_url(url: str) -> str:
+    """离线压测模式下把媒体地址改写到假服务器，保留路径与查询串。"""
+    offline_host = Config.OFFLINE_HOST
+    if not offline_host or not url:
+        return url
+    parsed = urlparse(url)
+    return f"{offline_host}{parsed.path or '/'}{'?' + parsed.query if parsed.query else ''}"
+
+
 def _redact_headers(headers: dict) -> dict:
     redacted = dict(headers)
     for key in list(redacted.keys()):
@@ -190,6 +208,8 @@ class DouyinDownloader:
         self._downloaded_file_ids_cache = set()
         self._all_download_records_loaded = False
         self._all_download_records_roots = ()
+        self._active_part_paths = set()
+        self._part_lock = threading.Lock()
         
         # 检查是否启用调试模式
         self.debug_mode = os.environ.get('DEBUG_MODE', '').lower() in ('true', '1', 'yes')
@@ -224,7 +244,7 @@ class DouyinDownloader:
         if not filename or filename.startswith('.'):
             return False
         lower_name = filename.lower()
-        if lower_name.endswith(('.tmp', '.part', '.download', '.crdownload')):
+        if lower_name.endswith(('.tmp', '.part', '.part.json', '.download', '.crdownload')):
             return False
         if filename == "download_record.json":
             return False
@@ -533,12 +553,30 @@ class DouyinDownloader:
                 if self.debug_mode:
                     print(f"\033[91m[Downloader] 进度回调失败: {str(e)}\033[0m")
 
+    def _observe_task_speed(self, task_key, speed_bps: float) -> None:
+        if task_key:
+            DOWNLOAD_TASK_SPEED.set(speed_bps, task=task_key)
+
+    def _clear_task_speed(self, task_key) -> None:
+        if task_key:
+            DOWNLOAD_TASK_SPEED.remove(task=task_key)
+
+    def _record_file_downloaded(self, media_type: str, size: int, elapsed: float) -> None:
+        DOWNLOAD_FILES.inc(media_type=media_type)
+        DOWNLOAD_BYTES.inc(size, media_type=media_type)
+        DOWNLOAD_SPEED.observe(size / max(elapsed, 0.001), media_type=media_type)
+
     def _wait_if_paused(self, pause_event=None, cancel_event=None):
         if not pause_event:
             return
         while pause_event.is_set() and not (cancel_event and cancel_event.is_set()):
             time.sleep(0.2)
 
+    @staticmethod
+    def _interrupt_check(pause_event=None, cancel_event=None):
+        """取消或暂停时返回真，让限速等待提前结束。"""
+        return lambda: bool((cancel_event and cancel_event.is_set()) or (pause_event and pause_event.is_set()))
+
     def _split_download_name(self, name: str) -> tuple[str, str]:
         raw_user_dir, separator, raw_filename = str(name or '').partition('/')
         if not separator:
@@ -595,6 +633,7 @@ class DouyinDownloader:
 
             for i, url_info in enumerate(urls):
                 response = None
+                part_path = None
                 # 检查取消信号
                 if cancel_event and cancel_event.is_set():
                     print(f"\033[93m媒体组下载被取消（下载中），清理已下载文件：{name}\033[0m")
@@ -665,7 +704,7 @@ class DouyinDownloader:
                         )
                         
                     headers = self._get_download_headers()
-                    response = _get_session().get(url, headers=headers, stream=True, timeout=(10, 120))
+                    response = _get_session().get(_route_media_url(url), headers=headers, stream=True, timeout=(10, 120))
                     response.raise_for_status()
                     response_size = self._get_response_size(response)
                     
@@ -691,74 +730,116 @@ class DouyinDownloader:
                     os.makedirs(user_path, exist_ok=True)
                     
                     extension = self._extension_for_media(file_type, url, response)
-                    filepath = self._unique_filepath(user_path, filename_with_index, extension)
-                    filename_with_index = os.path.splitext(os.path.basename(filepath))[0]
+                    part_path = self._part_path(user_path, filename_with_index, extension)
 
                     if self.debug_mode:
-                        print(f"\033[93m[Downloader] 保存文件路径: {filepath}\033[0m")
+                        print(f"\033[93m[Downloader] 保存文件路径: {part_path}\033[0m")
+
+                    resumable_total = segmented.ranged_total_size(response)
+                    if resumable_total:
+                        def on_progress(downloaded_size: int, speed_bps: float):
+                            file_progress = min(100, max(0, downloaded_size / resumable_total * 100))
+                            self._observe_task_speed(task_id or aweme_id, speed_bps)
+                            self._emit_download_progress(
+                                socketio, task_id, progress_callback,
+                                progress=((i + file_progress / 100) / len(urls)) * 100,
+                                completed=i,
+                                total=len(urls),
+                                status='downloading',
+                                file_index=i + 1,
+                                file_total=len(urls),
+                                file_progress=file_progress,
+                                bytes_downloaded=downloaded_size,
+                                bytes_total=resumable_total,
+                                speed_bps=speed_bps,
+                                eta_seconds=(resumable_total - downloaded_size) / speed_bps if speed_bps > 0 else None,
+                                file_type=file_type,
+                                file_type_display=file_type_display
+                            )
 
+                        downloaded_size = self._download_resumable(
+                            response, _route_media_url(url), headers, part_path, resumable_total,
+                            cancel_event, pause_event, on_progress,
+                        )
+                        if downloaded_size is None:
+                            # 清理本组此前已完成的文件，当前文件保留续传进度
+                            for fp in downloaded_files:
+                                if os.path.exists(fp):
+                                    os.remove(fp)
+                            remove_download_history_entries(downloaded_files)
+                            return False
+                    else:
+                        try:
+                            with open(part_path, "wb") as f:
+                                downloaded_size = 0
+                                last_emit_time = time.monotonic()
+                                last_emit_progress = (i / len(urls)) * 100
+                                throttle = bandwidth.get_limiter().throttler(self._interrupt_check(pause_event, cancel_event))
+                                for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
+                                    self._wait_if_paused(pause_event, cancel_event)
+                                    # 检查取消信号
+                                    if cancel_event and cancel_event.is_set():
+                                        print(f"\033[93m下载被取消，删除部分文件：{part_path}\033[0m")
+                                        f.close()
+                                        # 删除未完成的文件
+                                        resume.remove_part(part_path)
+                                        # 清理之前下载的文件
+                                        for fp in downloaded_files:
+                                            if os.path.exists(fp):
+                                                os.remove(fp)
+                                        remove_download_history_entries(downloaded_files)
+                                        return False
+                                    if chunk:
+                                        f.write(chunk)
+                                        downloaded_size += len(chunk)
+                                        throttle(len(chunk))
+                                        now = time.monotonic()
+                                        elapsed = max(now - file_started_at, 0.001)
+                                        file_progress = (downloaded_size / response_size * 100) if response_size > 0 else 0
+                                        file_progress = min(100, max(0, file_progress))
+                                        progress = ((i + file_progress / 100) / len(urls)) * 100
+                                        speed_bps = downloaded_size / elapsed
+                                        eta_seconds = ((response_size - downloaded_size) / speed_bps) if response_size > 0 and speed_bps > 0 else None
+                                        should_emit = (
+                                            now - last_emit_time >= 0.5 or
+                                            abs(progress - last_emit_progress) >= 1 or
+                                            (response_size > 0 and downloaded_size >= response_size)
+                                        )
+                                        if should_emit:
+                                            self._observe_task_speed(task_id or aweme_id, speed_bps)
+                                            self._emit_download_progress(
+                                                socketio, task_id, progress_callback,
+                                                progress=progress,
+                                                completed=i,
+                                                total=len(urls),
+                                                status='downloading',
+                                                file_index=i + 1,
+                                                file_total=len(urls),
+                                                file_progress=file_progress,
+                                                bytes_downloaded=downloaded_size,
+                                                bytes_total=response_size,
+                                                speed_bps=speed_bps,
+                                                eta_seconds=eta_seconds,
+                                                file_type=file_type,
+                                                file_type_display=file_type_display
+                                            )
+                                            last_emit_time = now
+                                            last_emit_progress = progress
+                                        if self.debug_mode and downloaded_size % (Config.CHUNK_SIZE * 10) == 0:
+                                            print(f"\033[93m[Downloader] 已下载: {downloaded_size/1024:.2f} KB\033[0m")
+                        except Exception:
+                            resume.remove_part(part_path)
+                            raise
+
+                    filepath = self._commit_part(part_path, user_path, filename_with_index, extension)
+                    filename_with_index = os.path.splitext(os.path.basename(filepath))[0]
                     # 记录已下载的文件路径，用于取消时清理
                     downloaded_files.append(filepath)
 
-                    with open(filepath, "wb") as f:
-                        downloaded_size = 0
-                        last_emit_time = time.monotonic()
-                        last_emit_progress = (i / len(urls)) * 100
-                        for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
-                            self._wait_if_paused(pause_event, cancel_event)
-                            # 检查取消信号
-                            if cancel_event and cancel_event.is_set():
-                                print(f"\033[93m下载被取消，删除部分文件：{filepath}\033[0m")
-                                f.close()
-                                # 删除未完成的文件
-                                if os.path.exists(filepath):
-                                    os.remove(filepath)
-                                # 清理之前下载的文件
-                                for fp in downloaded_files:
-                                    if os.path.exists(fp):
-                                        os.remove(fp)
-                                remove_download_history_entries(downloaded_files)
-                                return False
-                            if chunk:
-                                f.write(chunk)
-                                downloaded_size += len(chunk)
-                                now = time.monotonic()
-                                elapsed = max(now - file_started_at, 0.001)
-                                file_progress = (downloaded_size / response_size * 100) if response_size > 0 else 0
-                                file_progress = min(100, max(0, file_progress))
-                                progress = ((i + file_progress / 100) / len(urls)) * 100
-                                speed_bps = downloaded_size / elapsed
-                                eta_seconds = ((response_size - downloaded_size) / speed_bps) if response_size > 0 and speed_bps > 0 else None
-                                should_emit = (
-                                    now - last_emit_time >= 0.5 or
-                                    abs(progress - last_emit_progress) >= 1 or
-                                    (response_size > 0 and downloaded_size >= response_size)
-                                )
-                                if should_emit:
-                                    self._emit_download_progress(
-                                        socketio, task_id, progress_callback,
-                                        progress=progress,
-                                        completed=i,
-                                        total=len(urls),
-                                        status='downloading',
-                                        file_index=i + 1,
-                                        file_total=len(urls),
-                                        file_progress=file_progress,
-                                        bytes_downloaded=downloaded_size,
-                                        bytes_total=response_size,
-                                        speed_bps=speed_bps,
-                                        eta_seconds=eta_seconds,
-                                        file_type=file_type,
-                                        file_type_display=file_type_display
-                                    )
-                                    last_emit_time = now
-                                    last_emit_progress = progress
-                                if self.debug_mode and downloaded_size % (Config.CHUNK_SIZE * 10) == 0:
-                                    print(f"\033[93m[Downloader] 已下载: {downloaded_size/1024:.2f} KB\033[0m")
-
                     if self.debug_mode:
                         print(f"\033[92m[Downloader] 文件下载完成: {filepath}, 大小: {os.path.getsize(filepath)/1024:.2f} KB\033[0m")
                     
+                    self._record_file_downloaded(file_type, downloaded_size, time.monotonic() - file_started_at)
                     upsert_download_history_entries([filepath])
                     print(f"\033[93m下载{file_type_display} ({i+1}/{len(urls)}) 成功：{user_dir}/{filename_with_index}.{extension}\033[0m")
                     
@@ -825,6 +906,7 @@ class DouyinDownloader:
                             'timestamp': datetime.now().strftime('%H:%M:%S')
                         })
                 finally:
+                    self._release_part(part_path)
                     if response is not None:
                         response.close()
 
@@ -846,6 +928,8 @@ class DouyinDownloader:
                     print(f"\033[91m[Downloader] 作品ID: {aweme_id}\033[0m")
             print(f"\033[91m下载失败：{str(e)}\033[0m")
             return False
+        finally:
+            self._clear_task_speed(task_id or aweme_id)
 
 
 
@@ -860,6 +944,7 @@ class DouyinDownloader:
             bool: 下载是否成功
         """
         response = None
+        part_path = None
         try:
             user_dir, filename = self._split_download_name(name)
 
@@ -889,7 +974,7 @@ class DouyinDownloader:
                     response.close()
                     response = None
                 try:
-                    response = _get_session().get(candidate_url, headers=headers, stream=True, timeout=(10, 120))
+                    response = _get_session().get(_route_media_url(candidate_url), headers=headers, stream=True, timeout=(10, 120))
                     response.raise_for_status()
                     selected_url = candidate_url
                     break
@@ -907,10 +992,11 @@ class DouyinDownloader:
 
             user_path = os.path.join(self.download_dir, user_dir)
             os.makedirs(user_path, exist_ok=True)
-            filepath = self._unique_filepath(user_path, filename, self._extension_for_media('video', selected_url, response))
+            extension = self._extension_for_media('video', selected_url, response)
+            part_path = self._part_path(user_path, filename, extension)
 
             if self.debug_mode:
-                print(f"\033[93m[Downloader] 开始下载视频: {filepath}\033[0m")
+                print(f"\033[93m[Downloader] 开始下载视频: {part_path}\033[0m")
 
             self._emit_download_progress(
                 socketio, task_id, progress_callback,
@@ -929,61 +1015,97 @@ class DouyinDownloader:
                 file_type_display='视频'
             )
 
-            with open(filepath, "wb") as f:
-                downloaded_size = 0
-                last_emit_time = time.monotonic()
-                last_emit_progress = 0
-                for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
-                    self._wait_if_paused(pause_event, cancel_event)
-                    # 检查取消信号
-                    if cancel_event and cancel_event.is_set():
-                        print(f"\033[93m下载被取消，删除部分文件：{filepath}\033[0m")
-                        f.close()
-                        # 删除未完成的文件
-                        if os.path.exists(filepath):
-                            os.remove(filepath)
-                            remove_download_history_entries([filepath])
-                        return False
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        now = time.monotonic()
-                        elapsed = max(now - file_started_at, 0.001)
-                        progress = (downloaded_size / response_size * 100) if response_size > 0 else 0
-                        progress = min(100, max(0, progress))
-                        speed_bps = downloaded_size / elapsed
-                        eta_seconds = ((response_size - downloaded_size) / speed_bps) if response_size > 0 and speed_bps > 0 else None
-                        should_emit = (
-                            now - last_emit_time >= 0.5 or
-                            abs(progress - last_emit_progress) >= 1 or
-                            (response_size > 0 and downloaded_size >= response_size)
-                        )
-                        if should_emit:
-                            self._emit_download_progress(
-                                socketio, task_id, progress_callback,
-                                progress=progress,
-                                completed=0,
-                                total=1,
-                                status='downloading',
-                                file_index=1,
-                                file_total=1,
-                                file_progress=progress,
-                                bytes_downloaded=downloaded_size,
-                                bytes_total=response_size,
-                                speed_bps=speed_bps,
-                                eta_seconds=eta_seconds,
-                                file_type='video',
-                                file_type_display='视频'
-                            )
-                            last_emit_time = now
-                            last_emit_progress = progress
-                        if self.debug_mode and downloaded_size % (Config.CHUNK_SIZE * 10) == 0:
-                            print(f"\033[93m[Downloader] 已下载: {downloaded_size/1024:.2f} KB\033[0m")
-            
+            resumable_total = segmented.ranged_total_size(response)
+            if resumable_total:
+                def on_progress(downloaded_size: int, speed_bps: float):
+                    progress = min(100, max(0, downloaded_size / resumable_total * 100))
+                    self._observe_task_speed(task_id or aweme_id, speed_bps)
+                    self._emit_download_progress(
+                        socketio, task_id, progress_callback,
+                        progress=progress,
+                        completed=0,
+                        total=1,
+                        status='downloading',
+                        file_index=1,
+                        file_total=1,
+                        file_progress=progress,
+                        bytes_downloaded=downloaded_size,
+                        bytes_total=resumable_total,
+                        speed_bps=speed_bps,
+                        eta_seconds=(resumable_total - downloaded_size) / speed_bps if speed_bps > 0 else None,
+                        file_type='video',
+                        file_type_display='视频'
+                    )
+
+                downloaded_size = self._download_resumable(
+                    response, _route_media_url(selected_url), headers, part_path, resumable_total,
+                    cancel_event, pause_event, on_progress,
+                )
+                if downloaded_size is None:
+                    return False
+            else:
+                try:
+                    with open(part_path, "wb") as f:
+                        downloaded_size = 0
+                        last_emit_time = time.monotonic()
+                        last_emit_progress = 0
+                        throttle = bandwidth.get_limiter().throttler(self._interrupt_check(pause_event, cancel_event))
+                        for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
+                            self._wait_if_paused(pause_event, cancel_event)
+                            # 检查取消信号
+                            if cancel_event and cancel_event.is_set():
+                                print(f"\033[93m下载被取消，删除部分文件：{part_path}\033[0m")
+                                f.close()
+                                # 服务器不支持续传，未完成的文件没有保留价值
+                                resume.remove_part(part_path)
+                                return False
+                            if chunk:
+                                f.write(chunk)
+                                downloaded_size += len(chunk)
+                                throttle(len(chunk))
+                                now = time.monotonic()
+                                elapsed = max(now - file_started_at, 0.001)
+                                progress = (downloaded_size / response_size * 100) if response_size > 0 else 0
+                                progress = min(100, max(0, progress))
+                                speed_bps = downloaded_size / elapsed
+                                eta_seconds = ((response_size - downloaded_size) / speed_bps) if response_size > 0 and speed_bps > 0 else None
+                                should_emit = (
+                                    now - last_emit_time >= 0.5 or
+                                    abs(progress - last_emit_progress) >= 1 or
+                                    (response_size > 0 and downloaded_size >= response_size)
+                                )
+                                if should_emit:
+                                    self._observe_task_speed(task_id or aweme_id, speed_bps)
+                                    self._emit_download_progress(
+                                        socketio, task_id, progress_callback,
+                                        progress=progress,
+                                        completed=0,
+                                        total=1,
+                                        status='downloading',
+                                        file_index=1,
+                                        file_total=1,
+                                        file_progress=progress,
+                                        bytes_downloaded=downloaded_size,
+                                        bytes_total=response_size,
+                                        speed_bps=speed_bps,
+                                        eta_seconds=eta_seconds,
+                                        file_type='video',
+                                        file_type_display='视频'
+                                    )
+                                    last_emit_time = now
+                                    last_emit_progress = progress
+                                if self.debug_mode and downloaded_size % (Config.CHUNK_SIZE * 10) == 0:
+                                    print(f"\033[93m[Downloader] 已下载: {downloaded_size/1024:.2f} KB\033[0m")
+                except Exception:
+                    resume.remove_part(part_path)
+                    raise
+
+            filepath = self._commit_part(part_path, user_path, filename, extension)
             if self.debug_mode:
                 file_size = os.path.getsize(filepath)
                 print(f"\033[92m[Downloader] 视频下载完成: {filepath}, 大小: {file_size/1024:.2f} KB\033[0m")
                 
+            self._record_file_downloaded('video', downloaded_size, time.monotonic() - file_started_at)
             upsert_download_history_entries([filepath])
             print(f"\033[93m下载视频成功：{user_dir}/{os.path.basename(filepath)}\033[0m")
             elapsed = max(time.monotonic() - file_started_at, 0.001)
@@ -1015,9 +1137,115 @@ class DouyinDownloader:
             print(f"\033[91m下载视频失败：{str(e)}\033[0m")
             return False
         finally:
+            self._clear_task_speed(task_id or aweme_id)
+            self._release_part(part_path)
             if response is not None:
                 response.close()
 
+    def _part_path(self, directory: str, filename: str, extension: str) -> str:
+        """占用未完成文件的固定路径，重试和重启后据此找回续传进度；用完需 ``_release_part``。"""
+        safe_extension = extension.lower().lstrip('.') or 'bin'
+        base = os.path.join(directory, self._sanitize_filename(filename))
+        with self._part_lock:
+            part_path = resume.part_path_for(f"{base}.{safe_extension}")
+            counter = 2
+            # 同一作品被并发下载时各用各的 part 文件，避免互相覆盖
+            while part_path in self._active_part_paths:
+                part_path = resume.part_path_for(f"{base}_{counter}.{safe_extension}")
+                counter += 1
+            self._active_part_paths.add(part_path)
+            return part_path
+
+    def _release_part(self, part_path: Optional[str]) -> None:
+        if part_path:
+            with self._part_lock:
+                self._active_part_paths.discard(part_path)
+
+    def _commit_part(self, part_path: str, directory: str, filename: str, extension: str) -> str:
+        """把下载完成的 part 文件改名为不覆盖已有文件的正式路径。"""
+        filepath = self._unique_filepath(directory, filename, extension)
+        resume.commit_part(part_path, filepath)
+        return filepath
+
+    def _segment_parts(self, total: int) -> int:
+        """大小达到阈值时返回分段数，否则返回 1 走单连接。"""
+        parts = Config.bounded_int(Config.SEGMENTED_DOWNLOAD_PARTS, 4, 1, 16)
+        min_size = Config.bounded_int(Config.SEGMENTED_DOWNLOAD_MIN_MB, 16, 1, 4096) * 1024 * 1024
+        return parts if total >= min_size else 1
+
+    def _open_journal(self, part_path: str, url: str, total: int, validators: dict, parts: int = 1):
+        """取回与远端文件一致的续传日志，否则新建；小文件不写日志，返回 None。"""
+        if total < resume.MIN_RESUMABLE_BYTES:
+            return None
+        journal = resume.ResumeJournal.load(part_path)
+        if journal is not None and not journal.matches(total, **validators):
+            if self.debug_mode:
+                print(f"\033[93m[Downloader] 远端文件已变化，放弃旧的续传进度: {part_path}\033[0m")
+            journal = None
+        if journal is None:
+            journal = resume.ResumeJournal(part_path, url, total, **validators)
+        resume.track_part(part_path, bandwidth.current_task())
+        resumed = journal.completed_bytes()
+        if resumed:
+            print(f"\033[93m继续未完成的下载：{os.path.basename(part_path)} ({resumed / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB)\033[0m")
+        elif self.debug_mode and parts > 1:
+            print(f"\033[93m[Downloader] 分段下载: {total / 1024 / 1024:.1f} MB, {parts} 段\033[0m")
+        return journal
+
+    def _download_resumable(self, response, url: str, headers: dict, part_path: str, total: int,
+                            cancel_event, pause_event, on_progress) -> Optional[int]:
+        """按 Range 下载到 part 文件并记录续传日志，返回已完成字节数；被取消时保留进度并返回 None。
+
+        ``response`` 是 ``bytes=0-`` 的响应；日志与远端文件一致时只请求缺失区间。
+        ``on_progress(downloaded_size, speed_bps)`` 的速度只统计本次下载的字节。
+        """
+        parts = self._segment_parts(total)
+        validators = resume.response_validators(response)
+        journal = self._open_journal(part_path, url, total, validators, parts)
+        resumed = journal.completed_bytes() if journal is not None else 0
+
+        # 重定向后的 CDN 地址，其余分段直接请求，省掉一次跳转
+        range_url = getattr(response, 'url', '') or url
+        range_headers = {**headers, **resume.if_range_headers(validators)}
+
+        def open_range(start: int, end: int):
+            request_headers = dict(range_headers)
+            request_headers['Range'] = f'bytes={start}-{end}'
+            return _get_session().get(range_url, headers=request_headers, stream=True, timeout=(10, 120))
+
+        started_at = time.monotonic()
+
+        def report(downloaded_size: int):
+            elapsed = max(time.monotonic() - started_at, 0.001)
+            on_progress(downloaded_size, (downloaded_size - resumed) / elapsed)
+
+        try:
+            return segmented.download_segments(
+                None if resumed else response,
+                open_range,
+                part_path,
+                total,
+                parts,
+                journal=journal,
+                should_stop=lambda: bool(cancel_event and cancel_event.is_set()),
+                wait_if_paused=lambda: self._wait_if_paused(pause_event, cancel_event),
+                paused=lambda: bool(pause_event and pause_event.is_set()),
+                on_progress=report,
+                throttle=bandwidth.get_limiter().throttler(),
+            )
+        except segmented.SegmentedDownloadCancelled:
+            if journal is None:
+                print(f"\033[93m下载被取消，删除部分文件：{part_path}\033[0m")
+                resume.remove_part(part_path)
+            else:
+                print(f"\033[93m下载被取消，已保留进度以便续传：{part_path}\033[0m")
+            return None
+        except Exception:
+            # 没有日志的小文件留着也无法续传
+            if journal is None:
+                resume.remove_part(part_path)
+            raise
+
     def download_image(self, url: str, name: str, aweme_id: str, is_live: bool = False, check_existing: bool = True) -> bool:
         """下载图片或Live Photo
         Returns:
@@ -1036,7 +1264,7 @@ class DouyinDownloader:
                 return True  # 已下载视为成功
                 
             headers = self._get_download_headers()
-            response = _get_session().get(url, headers=headers, stream=True, timeout=(10, 120))
+            response = _get_session().get(_route_media_url(url), headers=headers, stream=True, timeout=(10, 120))
             response.raise_for_status()
             
             user_path = os.path.join(self.download_dir, user_dir)
@@ -1052,10 +1280,12 @@ class DouyinDownloader:
             
             with open(filepath, "wb") as f:
                 total_size = 0
+                throttle = bandwidth.get_limiter().throttler()
                 for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
                     if chunk:
                         f.write(chunk)
                         total_size += len(chunk)
+                        throttle(len(chunk))
                         if self.debug_mode and total_size % (Config.CHUNK_SIZE * 10) == 0:
                             print(f"\033[93m[Downloader] 已下载: {total_size/1024:.2f} KB\033[0m")
             
@@ -1095,7 +1325,7 @@ class DouyinDownloader:
             if self.debug_mode:
                 print(f"\033[93m[Downloader] 开始发送视频下载请求\033[0m")
                 
-            response = _get_session().get(url, headers=headers, stream=True, timeout=(10, 120))
+            response = _get_session().get(_route_media_url(url), headers=headers, stream=True, timeout=(10, 120))
             response.raise_for_status()
             
             if self.debug_mode:
@@ -1119,10 +1349,12 @@ class DouyinDownloader:
             
             with open(filepath, "wb") as f:
                 total_size = 0
+                throttle = bandwidth.get_limiter().throttler()
                 for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
                     if chunk:
                         f.write(chunk)
                         total_size += len(chunk)
+                        throttle(len(chunk))
                         if self.debug_mode and total_size % (Config.CHUNK_SIZE * 10) == 0:
                             print(f"\033[93m[Downloader] 已下载: {total_size/1024/1024:.2f} MB\033[0m")
             
@@ -1157,7 +1389,7 @@ class DouyinDownloader:
             if self.debug_mode:
                 print(f"\033[93m[Downloader] 开始发送图片下载请求\033[0m")
                 
-            response = _get_session().get(url, headers=headers, stream=True, timeout=(10, 120))
+            response = _get_session().get(_route_media_url(url), headers=headers, stream=True, timeout=(10, 120))
             response.raise_for_status()
             
             if self.debug_mode:
@@ -1181,10 +1413,12 @@ class DouyinDownloader:
             
             with open(filepath, "wb") as f:
                 total_size = 0
+                throttle = bandwidth.get_limiter().throttler()
                 for chunk in response.iter_content(chunk_size=Config.CHUNK_SIZE):
                     if chunk:
                         f.write(chunk)
                         total_size += len(chunk)
+                        throttle(len(chunk))
                         if self.debug_mode and total_size % (Config.CHUNK_SIZE * 10) == 0:
                             print(f"\033[93m[Downloader] 已下载: {total_size/1024:.2f} KB\033[0m")
             
@@ -0,0 +1,260 @@
+"""断点续传日志。
+
+下载先写入 ``<文件>.part``，旁边的 ``<文件>.part.json`` 记录地址、ETag/Last-Modified、
+总大小和已完成的字节区间。重试或重启后校验一致就只请求缺失的区间，完成后原子改名。
+
+用户取消（移除）任务时按任务登记删除它留下的 part；启动时清理长期没有更新的 part。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from src.utils import json_codec
+
+PART_SUFFIX = '.part'
+JOURNAL_SUFFIX = '.json'
+JOURNAL_VERSION = 1
+# 小于该大小的文件重下代价很低，不写日志
+MIN_RESUMABLE_BYTES = 1024 * 1024
+SAVE_INTERVAL = 1.0
+
+# part 文件 -> 使用它的下载任务
+_part_tasks: dict[str, str] = {}
+_part_tasks_lock = threading.Lock()
+
+
+def part_path_for(filepath: str) -> str:
+    return f'{filepath}{PART_SUFFIX}'
+
+
+def journal_path_for(part_path: str) -> str:
+    return f'{part_path}{JOURNAL_SUFFIX}'
+
+
+def response_validators(response) -> dict:
+    """取出用来判断远端文件是否变化的 ETag / Last-Modified。"""
+    headers = getattr(response, 'headers', None) or {}
+    return {
+        'etag': str(headers.get('ETag') or '').strip(),
+        'last_modified': str(headers.get('Last-Modified') or '').strip(),
+    }
+
+
+def if_range_headers(validators: dict) -> dict:
+    """续传期间文件若被替换，带 If-Range 的请求会拿到 200 整个文件，分段校验失败而不会拼出坏文件。"""
+    etag = validators.get('etag', '')
+    if etag and not etag.startswith('W/'):
+        return {'If-Range': etag}
+    return {}
+
+
+def merge_ranges(ranges) -> list[list[int]]:
+    """合并重叠或相邻的闭区间。"""
+    merged: list[list[int]] = []
+    for start, end in sorted((int(start), int(end)) for start, end in ranges if int(end) >= int(start)):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def track_part(part_path: str, task: str) -> None:
+    """登记 ``task`` 正在使用该 part 文件，任务被移除时由 ``discard_task_parts`` 删除。"""
+    if not task:
+        return
+    with _part_tasks_lock:
+        _part_tasks[part_path] = task
+
+
+def _untrack_part(part_path: str) -> None:
+    with _part_tasks_lock:
+        _part_tasks.pop(part_path, None)
+
+
+def discard_task_parts(task: str) -> int:
+    """删除任务留下的全部 part 文件及日志，返回删除的个数。"""
+    if not task:
+        return 0
+    with _part_tasks_lock:
+        parts = [part_path for part_path, owner in _part_tasks.items() if owner == task]
+    for part_path in parts:
+        remove_part(part_path)
+    return len(parts)
+
+
+def release_task_parts(task: str) -> None:
+    """任务正常结束：保留失败留下的 part 以便下次续传，只取消登记。"""
+    with _part_tasks_lock:
+        for part_path in [part_path for part_path, owner in _part_tasks.items() if owner == task]:
+            del _part_tasks[part_path]
+
+
+def _part_updated_at(part_path: str) -> float:
+    """日志里记录的最后更新时间；日志缺失或损坏时取文件修改时间。"""
+    try:
+        with open(journal_path_for(part_path), 'rb') as f:
+            updated_at = json_codec.loads(f.read()).get('updated_at')
+        if isinstance(updated_at, (int, float)) and updated_at > 0:
+            return float(updated_at)
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+    try:
+        return os.path.getmtime(part_path)
+    except OSError:
+        return os.path.getmtime(journal_path_for(part_path))
+
+
+def sweep_stale_parts(root: str, max_age_days: float, now: float | None = None) -> int:
+    """删除 ``root`` 下超过 ``max_age_days`` 天没有更新、也没有任务在用的 part 文件，返回删除的个数。"""
+    if max_age_days <= 0 or not os.path.isdir(root):
+        return 0
+    cutoff = (time.time() if now is None else now) - max_age_days * 86400
+    with _part_tasks_lock:
+        active = set(_part_tasks)
+    removed = 0
+    for directory, _, files in os.walk(root):
+        names = set(files)
+        for name in files:
+            if name.endswith(PART_SUFFIX):
+                part_path = os.path.join(directory, name)
+            elif name.endswith(PART_SUFFIX + JOURNAL_SUFFIX) and name[:-len(JOURNAL_SUFFIX)] not in names:
+                # 只剩日志的孤儿
+                part_path = os.path.join(directory, name[:-len(JOURNAL_SUFFIX)])
+            else:
+                continue
+            if part_path in active:
+                continue
+            try:
+                stale = _part_updated_at(part_path) < cutoff
+            except OSError:
+                continue
+            if stale:
+                remove_part(part_path)
+                removed += 1
+    return removed
+
+
+def remove_part(part_path: str) -> None:
+    """删除 part 文件及其日志。"""
+    _untrack_part(part_path)
+    for path in (part_path, journal_path_for(part_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def commit_part(part_path: str, filepath: str) -> None:
+    """下载完成后把 part 文件原子改名为正式文件，并删除日志。"""
+    os.replace(part_path, filepath)
+    _untrack_part(part_path)
+    try:
+        os.remove(journal_path_for(part_path))
+    except FileNotFoundError:
+        pass
+
+
+class ResumeJournal:
+    """一个 part 文件的续传状态，``mark`` 可在多个分段线程里并发调用。"""
+
+    def __init__(self, part_path: str, url: str, total: int, etag: str = '', last_modified: str = '', ranges=None):
+        self.part_path = part_path
+        self.url = url
+        self.total = int(total)
+        self.etag = etag
+        self.last_modified = last_modified
+        self._ranges = merge_ranges(ranges or [])
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        self._dirty = False
+
+    @classmethod
+    def load(cls, part_path: str) -> ResumeJournal | None:
+        """读取日志；不存在、损坏或 part 文件大小不符时返回 None。"""
+        try:
+            with open(journal_path_for(part_path), 'rb') as f:
+                data = json_codec.loads(f.read())
+            if data.get('version') != JOURNAL_VERSION:
+                return None
+            journal = cls(
+                part_path,
+                data.get('url', ''),
+                int(data['total']),
+                data.get('etag', ''),
+                data.get('last_modified', ''),
+                data.get('ranges', []),
+            )
+            if journal.total <= 0 or os.path.getsize(part_path) != journal.total:
+                return None
+            return journal
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+
+    def matches(self, total: int, etag: str = '', last_modified: str = '') -> bool:
+        """远端文件与日志记录的是同一个版本时返回 True；签名地址会变，不比较 URL。"""
+        if int(total) != self.total:
+            return False
+        if self.etag and etag and self.etag != etag:
+            return False
+        if self.last_modified and last_modified and self.last_modified != last_modified:
+            return False
+        return True
+
+    def mark(self, start: int, length: int) -> None:
+        """记录 ``[start, start + length)`` 已写入 part 文件。"""
+        if length <= 0:
+            return
+        end = start + length - 1
+        with self._lock:
+            last = self._ranges[-1] if self._ranges else None
+            if last is not None and last[0] <= start <= last[1] + 1:
+                last[1] = max(last[1], end)
+            else:
+                self._ranges = merge_ranges([*self._ranges, (start, end)])
+            self._dirty = True
+
+    def completed_bytes(self) -> int:
+        with self._lock:
+            return sum(end - start + 1 for start, end in self._ranges)
+
+    def missing_ranges(self) -> list[tuple[int, int]]:
+        """尚未下载的闭区间。"""
+        missing = []
+        cursor = 0
+        with self._lock:
+            for start, end in self._ranges:
+                if start > cursor:
+                    missing.append((cursor, start - 1))
+                cursor = max(cursor, end + 1)
+        if cursor < self.total:
+            missing.append((cursor, self.total - 1))
+        return missing
+
+    def save(self, force: bool = False) -> None:
+        """写入日志；非强制时距上次保存不足 ``SAVE_INTERVAL`` 秒则跳过。"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty and not force:
+                return
+            if not force and now - self._saved_at < SAVE_INTERVAL:
+                return
+            payload = {
+                'version': JOURNAL_VERSION,
+                'url': self.url,
+                'total': self.total,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'ranges': [list(item) for item in self._ranges],
+                'updated_at': int(time.time()),
+            }
+            self._saved_at = now
+            self._dirty = False
+        journal_path = journal_path_for(self.part_path)
+        temp_path = f'{journal_path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(json_codec.dumps_bytes(payload))
+        os.replace(temp_path, journal_path)
@@ -0,0 +1,375 @@
+"""进程级下载调度器。
+
+所有下载入口（单个作品、批量、点赞、作者同步）都先向调度器申请名额再开始传输：
+- 全局并发上限与按 CDN 主机的并发上限
+- 优先级：interactive（用户单击下载）> batch（批量任务）> background（后台同步）
+- 同一优先级内按任务公平分配：优先给当前占用名额最少的任务，同样少时先到先得
+- interactive 可额外占用 ``INTERACTIVE_RESERVE`` 个名额，单击下载不必等批量任务让出位置
+
+名额通过 ``async with scheduler.slot(...)`` 持有；等待方可以在任意事件循环里。
+暂停的任务通过 ``pause_gate`` 让出名额，恢复后重新排队，拿回名额才继续传输。
+持有名额期间的下载流量记到同名任务的限速桶里（见 ``bandwidth``）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from src.config.config import Config
+from src.downloader import bandwidth
+from src.utils import metrics
+
+PRIORITIES = ('interactive', 'batch', 'background')
+INTERACTIVE_RESERVE = 2
+
+SCHEDULER_JOBS = metrics.gauge('douyin_download_scheduler_jobs', '下载调度器中的作业数', ('priority', 'state'))
+SCHEDULER_WAIT = metrics.histogram('douyin_download_scheduler_wait_seconds', '下载作业排队等待时间', ('priority',))
+
+
+def media_host(url: str) -> str:
+    try:
+        return (urlparse(str(url or '')).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+def config_limits() -> tuple[int, int]:
+    """全局并发上限与单主机上限；async 引擎取 ``ASYNC_DOWNLOAD_CONCURRENCY`` 与全局上限的较大值。"""
+    max_active = Config.bounded_int(getattr(Config, 'DOWNLOAD_MAX_ACTIVE', 8), 8, 1, 512)
+    if Config.normalize_download_engine(getattr(Config, 'DOWNLOAD_ENGINE', 'thread')) == 'async':
+        max_active = max(max_active, Config.bounded_int(getattr(Config, 'ASYNC_DOWNLOAD_CONCURRENCY', 32), 32, 1, 512))
+    per_host = Config.bounded_int(getattr(Config, 'DOWNLOAD_PER_HOST_LIMIT', 16), 16, 1, 512)
+    return max_active, per_host
+
+
+class _Job:
+    __slots__ = ('seq', 'priority', 'task', 'host', 'future', 'queued_at', 'state')
+
+    def __init__(self, seq: int, priority: str, task: str, host: str, future: asyncio.Future | None):
+        self.seq = seq
+        self.priority = priority
+        self.task = task
+        self.host = host
+        # 暂停后重新排队的作业没有 future，由暂停闸门轮询 state
+        self.future = future
+        self.queued_at = time.monotonic()
+        # waiting / running / parked（暂停中，不占名额）
+        self.state = 'waiting'
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class DownloadScheduler:
+    """按优先级、主机上限和任务公平性分配下载名额。"""
+
+    def __init__(self, limits=config_limits):
+        self._limits = limits
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # priority -> task -> 等待中的作业
+        self._waiting: dict[str, dict[str, deque]] = {priority: {} for priority in PRIORITIES}
+        self._running_total = 0
+        self._running_by_host: dict[str, int] = {}
+        self._running_by_task: dict[str, int] = {}
+        self._running_by_priority: dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._granted = 0
+        self._parked = 0
+
+    def slot(self, priority: str = 'batch', task: str = '', url: str = '', host: str = '', pause_gate=None):
+        """``async with`` 持有一个下载名额；``url`` 用来推断 CDN 主机。
+
+        传入 ``pause_gate`` 时把名额绑定到闸门上，暂停期间自动让出。
+        """
+        return _Slot(self, priority, task, host or media_host(url), pause_gate)
+
+    def pause_gate(self, pause_event) -> PauseGate:
+        """包装任务的暂停事件，交给下载器代替原事件使用。"""
+        return PauseGate(self, pause_event)
+
+    async def acquire(self, priority: str = 'batch', task: str = '', host: str = '') -> _Job:
+        priority = priority if priority in PRIORITIES else 'batch'
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            job = _Job(next(self._seq), priority, str(task or ''), host, future)
+            self._waiting[priority].setdefault(job.task, deque()).append(job)
+            granted = self._dispatch_locked()
+        self._wake(granted)
+        try:
+            await future
+        except BaseException:
+            # 排队时被取消：还没拿到名额就出队，已经拿到就归还
+            self.finish(job)
+            raise
+        SCHEDULER_WAIT.observe(time.monotonic() - job.queued_at, priority=priority)
+        return job
+
+    def finish(self, job: _Job) -> None:
+        """作业结束：占着名额就归还，还在排队就出队。"""
+        with self._lock:
+            if job.state == 'running':
+                self._uncount_locked(job)
+            elif job.state == 'waiting':
+                self._remove_waiting_locked(job)
+            elif job.state == 'parked':
+                self._parked -= 1
+            job.state = 'done'
+            granted = self._dispatch_locked()
+        self._wake(granted)
+
+    def park(self, job: _Job) -> None:
+        """暂停：归还名额（或退出队列），其他作业可以立即使用。"""
+        with self._lock:
+            if job.state == 'running':
+                self._uncount_locked(job)
+            elif job.state == 'waiting':
+                self._remove_waiting_locked(job)
+            else:
+                return
+            job.state = 'parked'
+            self._parked += 1
+            granted = self._dispatch_locked()
+        self._wake(granted)
+
+    def unpark(self, job: _Job, future: asyncio.Future | None = None) -> bool:
+        """恢复：暂停中的作业重新排到队尾；返回是否已经拿回名额。
+
+        传入 ``future`` 时，作业在队列里拿到名额后会 resolve 它，协程可以直接 await。
+        """
+        with self._lock:
+            if job.state == 'parked':
+                self._parked -= 1
+                job.state = 'waiting'
+                job.future = future
+                job.seq = next(self._seq)
+                job.queued_at = time.monotonic()
+                self._waiting[job.priority].setdefault(job.task, deque()).append(job)
+                granted = self._dispatch_locked()
+            else:
+                if job.state == 'waiting':
+                    job.future = future
+                granted = []
+            running = job.state == 'running'
+        self._wake(granted)
+        return running
+
+    def detach(self, job: _Job, future: asyncio.Future) -> None:
+        """等待方不再等 ``future``（被取消或又暂停了），作业照常排队。"""
+        with self._lock:
+            if job.future is future:
+                job.future = None
+
+    def _uncount_locked(self, job: _Job) -> None:
+        self._running_total -= 1
+        self._decrement(self._running_by_host, job.host)
+        self._decrement(self._running_by_task, job.task)
+        self._running_by_priority[job.priority] -= 1
+
+    def _remove_waiting_locked(self, job: _Job) -> None:
+        queue = self._waiting[job.priority].get(job.task)
+        if queue is not None and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self._waiting[job.priority][job.task]
+
+    @staticmethod
+    def _decrement(counts: dict, key: str) -> None:
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+
+    def _dispatch_locked(self) -> list[_Job]:
+        max_active, per_host = self._limits()
+        granted = []
+        while True:
+            job = self._next_job_locked(max_active, per_host)
+            if job is None:
+                break
+            queue = self._waiting[job.priority][job.task]
+            queue.popleft()
+            if not queue:
+                del self._waiting[job.priority][job.task]
+            self._running_total += 1
+            self._running_by_host[job.host] = self._running_by_host.get(job.host, 0) + 1
+            self._running_by_task[job.task] = self._running_by_task.get(job.task, 0) + 1
+            self._running_by_priority[job.priority] += 1
+            self._granted += 1
+            job.state = 'running'
+            granted.append(job)
+        for priority in PRIORITIES:
+            SCHEDULER_JOBS.set(sum(len(queue) for queue in self._waiting[priority].values()), priority=priority, state='waiting')
+            SCHEDULER_JOBS.set(self._running_by_priority[priority], priority=priority, state='running')
+        return granted
+
+    def _next_job_locked(self, max_active: int, per_host: int) -> _Job | None:
+        for priority in PRIORITIES:
+            capacity = max_active + (INTERACTIVE_RESERVE if priority == 'interactive' else 0)
+            if self._running_total >= capacity:
+                continue
+            best = None
+            best_key = None
+            for task, queue in self._waiting[priority].items():
+                # 队首作业的主机满了就整个任务本轮让位，保持任务内先到先得
+                head = queue[0]
+                if head.future is not None and head.future.cancelled():
+                    continue
+                if head.host and self._running_by_host.get(head.host, 0) >= per_host:
+                    continue
+                key = (self._running_by_task.get(task, 0), head.seq)
+                if best_key is None or key < best_key:
+                    best, best_key = head, key
+            if best is not None:
+                return best
+            # 这一级只剩被主机上限挡住的作业时，低一级里其他主机的作业可以先用空闲名额
+        return None
+
+    @staticmethod
+    def _wake(jobs: list[_Job]) -> None:
+        for job in jobs:
+            if job.future is None:
+                continue
+            loop = job.future.get_loop()
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                _resolve(job.future)
+            else:
+                try:
+                    loop.call_soon_threadsafe(_resolve, job.future)
+                except RuntimeError:
+                    pass
+
+    def stats(self) -> dict:
+        max_active, per_host = self._limits()
+        with self._lock:
+            return {
+                'max_active': max_active,
+                'per_host': per_host,
+                'interactive_reserve': INTERACTIVE_RESERVE,
+                'running': self._running_total,
+                'parked': self._parked,
+                'granted': self._granted,
+                'running_by_priority': dict(self._running_by_priority),
+                'running_by_host': dict(self._running_by_host),
+                'running_by_task': dict(self._running_by_task),
+                'waiting': {
+                    priority: {task: len(queue) for task, queue in tasks.items()}
+                    for priority, tasks in self._waiting.items()
+                },
+            }
+
+
+class PauseGate:
+    """代替任务暂停事件传给下载器的 ``is_set``：暂停时让出名额，恢复后拿回名额前仍视为暂停。
+
+    线程版下载器在暂停期间轮询 ``is_set``，让出与重新申请名额都在轮询里完成；
+    异步引擎改用 ``wait_clear()``，挂在暂停事件和名额分配上，不轮询。
+    """
+
+    def __init__(self, scheduler: DownloadScheduler, pause_event):
+        self._scheduler = scheduler
+        self._pause_event = pause_event
+        self._job: _Job | None = None
+
+    def bind(self, job: _Job | None) -> None:
+        self._job = job
+
+    def is_set(self) -> bool:
+        paused = self._pause_event is not None and self._pause_event.is_set()
+        job = self._job
+        if job is None:
+            return paused
+        if paused:
+            self._scheduler.park(job)
+            return True
+        if job.state == 'running':
+            return False
+        return not self._scheduler.unpark(job)
+
+    def wait_while_set(self, cancel_event=None, interval: float = 0.2) -> None:
+        while self.is_set() and not (cancel_event and cancel_event.is_set()):
+            time.sleep(interval)
+
+    async def wait_clear(self, interval: float = 0.2) -> None:
+        """等到恢复且拿回名额。
+
+        暂停事件能 await（``LoopEvent``）时挂在它的 ``wait_clear`` 上，否则按 ``interval`` 轮询；
+        恢复后 await 调度器重新分配名额，排队期间再次暂停会重新让出。
+        """
+        # threading.Event 也有 wait()，只有带 wait_clear() 的 LoopEvent 才能 await
+        pause_event = self._pause_event
+        awaitable = pause_event is not None and hasattr(pause_event, 'wait_clear')
+        while True:
+            job = self._job
+            if pause_event is not None and pause_event.is_set():
+                if job is not None:
+                    self._scheduler.park(job)
+                if awaitable:
+                    await pause_event.wait_clear()
+                else:
+                    await asyncio.sleep(interval)
+                continue
+            if job is None or job.state == 'running':
+                return
+            granted = asyncio.get_running_loop().create_future()
+            if self._scheduler.unpark(job, granted):
+                return
+            waiters = [granted]
+            if awaitable:
+                waiters.append(asyncio.ensure_future(pause_event.wait()))
+            timeout = interval if pause_event is not None and not awaitable else None
+            try:
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self._scheduler.detach(job, granted)
+                for waiter in waiters[1:]:
+                    waiter.cancel()
+
+
+class _Slot:
+    def __init__(self, scheduler: DownloadScheduler, priority: str, task: str, host: str, pause_gate=None):
+        self._scheduler = scheduler
+        self._args = (priority, task, host)
+        self._pause_gate = pause_gate
+        self._job = None
+        self._token = None
+
+    async def __aenter__(self):
+        self._job = await self._scheduler.acquire(*self._args)
+        self._token = bandwidth.bind_task(self._job.task)
+        if self._pause_gate is not None:
+            self._pause_gate.bind(self._job)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        job, self._job = self._job, None
+        if self._pause_gate is not None:
+            self._pause_gate.bind(None)
+        if self._token is not None:
+            bandwidth.reset_task(self._token)
+            self._token = None
+        if job is not None:
+            self._scheduler.finish(job)
+        return False
+
+
+_scheduler: DownloadScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> DownloadScheduler:
+    """进程内共享的调度器，上限每次分配时从 Config 读取，修改配置立即生效。"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DownloadScheduler()
+        return _scheduler
@@ -0,0 +1,231 @@
+"""多连接分段下载。
+
+服务器对 ``Range`` 请求返回 206（或声明 ``Accept-Ranges: bytes``）且文件足够大时，
+把文件切成 N 段，各段用独立连接并发拉取，按偏移直接写入预分配好的文件。
+第一段复用探测时已经发出的 ``Range: bytes=0-`` 响应，不额外多发请求。
+传入续传日志时只下载缺失的区间，并把写入进度记到日志里。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import requests
+
+SEGMENT_CHUNK_SIZE = 256 * 1024
+SEGMENT_RETRIES = 2
+PROGRESS_INTERVAL = 0.5
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes\s+(\d+)-(\d+)/(\d+)$')
+
+
+class SegmentedDownloadCancelled(Exception):
+    """下载被取消。"""
+
+
+def ranged_total_size(response) -> int:
+    """从 ``Range: bytes=0-`` 的响应判断是否支持分段，支持时返回文件总大小，否则返回 0。"""
+    if response.status_code == 206:
+        match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', '').strip())
+        if match and int(match.group(1)) == 0:
+            return int(match.group(3))
+        return 0
+    if response.status_code == 200 and response.headers.get('Accept-Ranges', '').lower() == 'bytes':
+        content_length = response.headers.get('Content-Length', '')
+        return int(content_length) if content_length.isdigit() else 0
+    return 0
+
+
+def plan_segments(total: int, parts: int) -> list[tuple[int, int]]:
+    """把 ``[0, total)`` 切成至多 ``parts`` 段闭区间，前几段多分摊余数。"""
+    parts = max(1, min(parts, total))
+    base, remainder = divmod(total, parts)
+    segments = []
+    start = 0
+    for index in range(parts):
+        length = base + (1 if index < remainder else 0)
+        segments.append((start, start + length - 1))
+        start += length
+    return segments
+
+
+def plan_ranges(ranges, parts: int) -> list[tuple[int, int]]:
+    """把若干缺失区间按长度比例切成约 ``parts`` 段，每个区间至少一段。"""
+    ranges = [(start, end) for start, end in ranges if end >= start]
+    total = sum(end - start + 1 for start, end in ranges)
+    segments = []
+    for start, end in ranges:
+        share = max(1, parts * (end - start + 1) // total)
+        segments.extend((start + first, start + last) for first, last in plan_segments(end - start + 1, share))
+    return segments
+
+
+class PositionalFile:
+    """预分配大小的文件，多个线程按偏移写入互不干扰。"""
+
+    def __init__(self, path: str, size: int, truncate: bool = True):
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o644)
+        self._lock = threading.Lock()
+        try:
+            os.ftruncate(self._fd, size)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def write_at(self, offset: int, data: bytes) -> None:
+        view = memoryview(data)
+        if hasattr(os, 'pwrite'):
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+            return
+        # Windows 没有 pwrite，退化为加锁的 seek + write
+        with self._lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def download_segments(
+    first_response,
+    open_range,
+    filepath: str,
+    total: int,
+    parts: int,
+    *,
+    journal=None,
+    should_stop=None,
+    wait_if_paused=None,
+    paused=None,
+    on_progress=None,
+    throttle=None,
+) -> int:
+    """并发下载各段并写入 ``filepath``，返回文件已完成的字节数。
+
+    ``open_range(start, end)`` 发出带 Range 的请求并返回流式响应；``first_response`` 为
+    ``bytes=0-`` 的响应，可为 None。``journal`` 为 ``ResumeJournal`` 时只下载缺失区间。
+    ``paused()`` 为真时各段先关闭连接再等待 ``wait_if_paused()`` 返回，恢复后从断点重新请求。
+    ``on_progress(downloaded)`` 在调用线程里每隔 ``PROGRESS_INTERVAL`` 秒调用一次；
+    ``should_stop()`` 为真时抛出 ``SegmentedDownloadCancelled``。任一段重试后仍失败时抛出其异常。
+    ``throttle(nbytes, should_stop)`` 在各段写入后调用，用于限速；取消或暂停时应尽快返回。
+    """
+    if journal is not None:
+        segments = plan_ranges(journal.missing_ranges(), parts)
+        resumed = journal.completed_bytes()
+    else:
+        segments = plan_segments(total, parts)
+        resumed = 0
+    if first_response is not None and not (segments and segments[0][0] == 0):
+        first_response.close()
+        first_response = None
+    stop = threading.Event()
+    lock = threading.Lock()
+    downloaded = [resumed]
+
+    def stopped() -> bool:
+        if stop.is_set():
+            return True
+        if should_stop is not None and should_stop():
+            stop.set()
+            return True
+        return False
+
+    def is_paused() -> bool:
+        return paused is not None and bool(paused())
+
+    def fetch(index: int, start: int, end: int) -> None:
+        offset = start
+        attempts = 0
+        response = first_response if index == 0 else None
+        while offset <= end:
+            if is_paused():
+                # 暂停期间不占用连接，恢复后按当前偏移重新请求
+                if response is not None:
+                    response.close()
+                    response = None
+                if wait_if_paused is not None:
+                    wait_if_paused()
+                else:
+                    time.sleep(0.2)
+                if stopped():
+                    return
+                continue
+            try:
+                if response is None:
+                    response = open_range(offset, end)
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise requests.HTTPError(f'分段请求未返回 206: status={response.status_code}')
+                for chunk in response.iter_content(chunk_size=SEGMENT_CHUNK_SIZE):
+                    if stopped():
+                        return
+                    if is_paused():
+                        break
+                    if paused is None and wait_if_paused is not None:
+                        wait_if_paused()
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end - offset + 1]
+                    writer.write_at(offset, chunk)
+                    if journal is not None:
+                        journal.mark(offset, len(chunk))
+                    offset += len(chunk)
+                    with lock:
+                        downloaded[0] += len(chunk)
+                    if throttle is not None:
+                        throttle(len(chunk), lambda: stopped() or is_paused())
+                    if offset > end:
+                        break
+                if offset <= end and not is_paused():
+                    raise requests.ConnectionError(f'分段连接提前结束: {offset}/{end}')
+            except (requests.RequestException, OSError):
+                attempts += 1
+                if attempts > SEGMENT_RETRIES or stopped():
+                    raise
+            finally:
+                if response is not None:
+                    response.close()
+                    response = None
+
+    writer = PositionalFile(filepath, total, truncate=resumed == 0)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(segments)), thread_name_prefix='segment') as pool:
+            futures = [pool.submit(fetch, index, start, end) for index, (start, end) in enumerate(segments)]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception() is not None:
+                        stop.set()
+                        raise future.exception()
+                if stopped():
+                    raise SegmentedDownloadCancelled()
+                if journal is not None:
+                    journal.save()
+                if on_progress is not None:
+                    with lock:
+                        current = downloaded[0]
+                    on_progress(current)
+    finally:
+        stop.set()
+        writer.close()
+        if journal is not None:
+            journal.save(force=True)
+
+    if stopped() and downloaded[0] < total:
+        raise SegmentedDownloadCancelled()
+    return downloaded[0]
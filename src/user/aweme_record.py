@@ -0,0 +1,62 @@
+"""批量下载使用的精简作品记录。
+
+接口返回的 ``aweme_list`` 每条带完整的作者、音乐、bit_rate 等字段，动辄几十 KB；
+批量下载只需要其中少数字段。每页数据到达时投影一次为 ``AwemeRecord``，
+原始字典随即可以释放，下载时也不必再重复收集候选地址。
+"""
+
+from __future__ import annotations
+
+
+class AwemeRecord:
+    """批量下载需要的作品字段。"""
+
+    __slots__ = (
+        'aweme_id',
+        'desc',
+        'create_time',
+        'author_nickname',
+        'author_sec_uid',
+        'author_avatar',
+        'media_type',
+        'media_urls',
+        'candidate_urls',
+        'cover_url',
+    )
+
+    def __init__(
+        self,
+        aweme_id: str,
+        desc: str = '',
+        create_time: int = 0,
+        author_nickname: str = '',
+        author_sec_uid: str = '',
+        author_avatar: str = '',
+        media_type: str = 'unknown',
+        media_urls: tuple = (),
+        candidate_urls: tuple = (),
+        cover_url: str = '',
+    ):
+        self.aweme_id = aweme_id
+        self.desc = desc
+        self.create_time = create_time
+        self.author_nickname = author_nickname
+        self.author_sec_uid = author_sec_uid
+        self.author_avatar = author_avatar
+        self.media_type = media_type
+        # [{'type': ..., 'url': ...}]，与 get_media_info 返回结构一致
+        self.media_urls = media_urls
+        # 视频的无水印候选地址，按下载画质偏好排序，供失败时回退
+        self.candidate_urls = candidate_urls
+        self.cover_url = cover_url
+
+    @property
+    def primary_url(self) -> str:
+        return self.media_urls[0]['url'] if self.media_urls else ''
+
+    def media_info(self) -> tuple[str, list[dict]]:
+        """返回与 ``get_media_info`` 相同的 ``(media_type, urls)``。"""
+        return self.media_type, [dict(item) for item in self.media_urls]
+
+    def __repr__(self) -> str:
+        return f'AwemeRecord(aweme_id={self.aweme_id!r}, media_type={self.media_type!r})'
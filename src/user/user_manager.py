@@ -8,8 +8,12 @@ import urllib.parse
 from typing import List, Dict, Optional, Tuple, Union
 
 from src.api.api import DouyinAPI
+from src.api.hedged_request import HedgedRequest
+from src.api.single_flight import SingleFlight
+from src.user.aweme_record import AwemeRecord
 from src.config.config import Config
 from src.downloader.downloader import DouyinDownloader, build_download_name
+from src.downloader.scheduler import get_scheduler
 
 # 移除增强下载器支持
 ENHANCED_DOWNLOADER_AVAILABLE = False
@@ -24,6 +28,9 @@ class DouyinUserManager:
         self.socketio = socketio  # 添加WebSocket支持
         self.cookie = cookie
         self._user_detail_cache = {}
+        self.user_detail_flights = SingleFlight('user_detail')
+        # 作品详情：免签名与签名两种取法对冲
+        self.detail_hedge = HedgedRequest('aweme_detail', ('unsigned', 'signed'))
         # 检查是否启用调试模式
         self.debug_mode = os.environ.get('DEBUG_MODE', '').lower() in ('true', '1', 'yes')
         if self.debug_mode:
@@ -400,13 +407,13 @@ class DouyinUserManager:
             'is_prohibited': bool(status.get('is_prohibited', False)),
         }
         
-    async def get_user_videos(self, user_id: str, offset: int = 0, limit: int = 1000, on_batch=None) -> Union[List[dict], Dict]:
+    async def get_user_videos(self, user_id: str, offset: int = 0, limit: int = 1000, on_batch=None) -> Union[List[AwemeRecord], Dict]:
         """获取用户视频列表
         Args:
             user_id: 用户的sec_uid
             offset: 偏移量 (内部通过max_cursor控制，offset用于控制返回数量)
             limit: 最大获取数量
-            on_batch: 每获取一页数据时的回调函数，接收当前页的视频列表
+            on_batch: 每获取一页数据时的回调函数，接收当前页的 AwemeRecord 列表
         """
         videos = []
         max_cursor = 0
@@ -437,7 +444,8 @@ class DouyinUserManager:
                     'message': (resp or {}).get('message') or (resp or {}).get('status_msg') or '获取用户作品失败，请检查 Cookie 或稍后重试',
                 }
             
-            batch = resp.get('aweme_list', [])
+            # 每页只投影一次，不保留原始作品字典
+            batch = self.project_awemes(resp.get('aweme_list', []))
             if on_batch and batch:
                 on_batch(batch)
                 # 让下载消费者有机会在下一页抓取前先处理已入队作品
@@ -453,7 +461,10 @@ class DouyinUserManager:
         """获取用户详情"""
         if not force_refresh and user_id in self._user_detail_cache:
             return dict(self._user_detail_cache[user_id])
+        # 并发查询同一用户时只请求一次
+        return await self.user_detail_flights.do(user_id, lambda: self._fetch_user_detail(user_id))
 
+    async def _fetch_user_detail(self, user_id: str) -> dict:
         params = {
             "sec_user_id": user_id,
             "personal_center_strategy": 1,
@@ -682,6 +693,42 @@ class DouyinUserManager:
 
         return media_type, urls
 
+    def project_aweme(self, post: dict) -> Optional[AwemeRecord]:
+        """把接口返回的作品字典投影为 AwemeRecord，缺少 aweme_id 时返回 None。"""
+        aweme_id = str(post.get('aweme_id') or '').strip()
+        if not aweme_id:
+            return None
+        media_type, media_urls = self.get_media_info(post)
+        video_data = post.get('video') or {}
+        candidate_urls = self.get_video_download_urls(video_data) if media_type == 'video' else []
+        cover_url = ''
+        if video_data.get('cover'):
+            cover_url = self._first_url(video_data['cover'])
+        elif post.get('images'):
+            cover_url = self._first_url(post['images'][0])
+        author = post.get('author') or {}
+        return AwemeRecord(
+            aweme_id=aweme_id,
+            desc=post.get('desc') or '',
+            create_time=post.get('create_time') or 0,
+            author_nickname=author.get('nickname') or '',
+            author_sec_uid=author.get('sec_uid') or '',
+            author_avatar=self._first_url(author.get('avatar_thumb') or {}),
+            media_type=media_type,
+            media_urls=tuple(media_urls),
+            candidate_urls=tuple(candidate_urls),
+            cover_url=cover_url,
+        )
+
+    def project_awemes(self, posts: list) -> List[AwemeRecord]:
+        records = []
+        for post in posts or []:
+            if isinstance(post, dict):
+                record = self.project_aweme(post)
+                if record is not None:
+                    records.append(record)
+        return records
+
     def _extract_bgm_url(self, post: dict) -> Optional[str]:
         """提取作品背景音乐地址。"""
         bgm_url = None
@@ -725,13 +772,18 @@ class DouyinUserManager:
                 "os": "windows"
             }
 
-            resp, succ = await self.api.common_request('/aweme/v1/web/aweme/detail/',
-                                                     params,
-                                                     {}, skip_sign=True)
-            if not succ or not (isinstance(resp, dict) and resp.get('aweme_detail')):
-                resp, succ = await self.api.common_request('/aweme/v1/web/aweme/detail/',
-                                                         params,
-                                                         {}, skip_sign=False)
+            def fetch(skip_sign: bool):
+                return lambda: self.api.common_request('/aweme/v1/web/aweme/detail/',
+                                                       dict(params),
+                                                       {}, skip_sign=skip_sign)
+
+            # 首选取法发往上游后超过对冲延迟未返回或返回无效时发出另一种，先拿到有效详情的胜出
+            _, (resp, succ) = await self.detail_hedge.run(
+                {'unsigned': fetch(True), 'signed': fetch(False)},
+                Config.DETAIL_HEDGE_DELAY_MS / 1000,
+                lambda result: bool(result[1] and isinstance(result[0], dict) and result[0].get('aweme_detail')),
+                wait_dispatch=True,
+            )
 
             if isinstance(resp, dict) and (resp.get('_need_verify') or resp.get('_need_login')):
                 return resp
@@ -913,12 +965,14 @@ class DouyinUserManager:
             'unknown': '未知'
         }.get(media_type, '未知')
 
-    async def download_user_videos(self, user_info: dict, auto_confirm: bool = False,web_socket: bool = False):
+    async def download_user_videos(self, user_info: dict, auto_confirm: bool = False,web_socket: bool = False,
+                                   priority: str = 'batch'):
         """下载用户视频
         Args:
             user_info: 用户信息
             auto_confirm: 是否自动确认下载（不需要用户输入）
             web_socket: 是否使用WebSocket返回下载进度
+            priority: 全局下载调度器中的优先级
         """
         user_id = user_info['sec_uid']
         nickname = user_info.get('nickname', 'unknown')
@@ -943,7 +997,7 @@ class DouyinUserManager:
         # 过滤出磁盘上仍然存在的已下载作品；如果用户删除了文件，允许重新下载。
         new_posts = [
             post for post in posts
-            if not self.downloader._is_aweme_downloaded(post['aweme_id'], nickname)
+            if not self.downloader._is_aweme_downloaded(post.aweme_id, nickname)
         ]
         
         if not new_posts:
@@ -966,10 +1020,10 @@ class DouyinUserManager:
         else:
             # 显示作品列表
             for i, post in enumerate(new_posts):
-                media_type, urls = self._get_media_info(post)
+                media_type, urls = post.media_info()
                 type_str = self._media_type_label(media_type, urls)
                 
-                print(f"\033[36m{i}. [{type_str}] {post['desc']}\033[0m")
+                print(f"\033[36m{i}. [{type_str}] {post.desc}\033[0m")
 
             # 处理用户输入
             str_sub = input("\033[31m请输入要下载的序号\n1. 单个数字下载单个作品，多个数字用空格隔开下载多个作品\n2. 片段用-隔开\n3. 直接回车下载全部\033[0m\n")
@@ -987,7 +1041,7 @@ class DouyinUserManager:
 
         # 下载选中的作品
         for i, post in enumerate(selected_posts, 1):
-            media_type, urls = self._get_media_info(post)
+            media_type, urls = post.media_info()
             type_str = self._media_type_label(media_type, urls)
             
             progress_msg = f"正在下载第 {i}/{len(selected_posts)} 个 [{type_str}]"
@@ -1001,11 +1055,11 @@ class DouyinUserManager:
             else:
                 print(f"\033[36m{progress_msg}\033[0m")
             
-            aweme_id = post['aweme_id']
-            name = build_download_name(nickname, post.get('desc', ''), aweme_id, media_type=media_type)
+            aweme_id = post.aweme_id
+            name = build_download_name(nickname, post.desc, aweme_id, media_type=media_type)
             
             if not urls:
-                error_msg = f"无法获取媒体URL: {post['desc']}"
+                error_msg = f"无法获取媒体URL: {post.desc}"
                 if web_socket and self.socketio:
                     self.socketio.emit('download_error', {'message': error_msg})
                 else:
@@ -1013,12 +1067,13 @@ class DouyinUserManager:
                 continue
             
             if media_type in ['mixed', 'live_photo', 'image']:
-                success = await asyncio.to_thread(
-                    self.downloader.download_media_group,
-                    urls,
-                    name,
-                    aweme_id,
-                )
+                async with get_scheduler().slot(priority=priority, task=f'user:{user_id}', url=urls[0]['url']):
+                    success = await asyncio.to_thread(
+                        self.downloader.download_media_group,
+                        urls,
+                        name,
+                        aweme_id,
+                    )
                 if success:
                     success_msg = f"作品 {name} 下载完成"
                     if web_socket and self.socketio:
@@ -1033,14 +1088,15 @@ class DouyinUserManager:
                         print(f"\033[91m{error_msg}\033[0m")
                 
             elif media_type == 'video':
-                fallback_urls = self.get_video_download_urls(post.get('video') or {})
-                success = await asyncio.to_thread(
-                    self.downloader.download_video,
-                    urls[0]['url'],
-                    name,
-                    aweme_id,
-                    fallback_urls=fallback_urls,
-                )
+                fallback_urls = list(post.candidate_urls)
+                async with get_scheduler().slot(priority=priority, task=f'user:{user_id}', url=urls[0]['url']):
+                    success = await asyncio.to_thread(
+                        self.downloader.download_video,
+                        urls[0]['url'],
+                        name,
+                        aweme_id,
+                        fallback_urls=fallback_urls,
+                    )
                 if success:
                     success_msg = f"作品 {name} 下载完成"
                     if web_socket and self.socketio:
@@ -1054,7 +1110,7 @@ class DouyinUserManager:
                     else:
                         print(f"\033[91m{error_msg}\033[0m")
             else:
-                error_msg = f"未知的媒体类型: {post['desc']}"
+                error_msg = f"未知的媒体类型: {post.desc}"
                 if web_socket and self.socketio:
                     self.socketio.emit('download_error', {'message': error_msg})
                 else:
@@ -1288,6 +1344,7 @@ class DouyinUserManager:
 
         if not success:
             return resp if isinstance(resp, dict) else {'_error': True, 'message': '点赞失败'}
+        self.api.invalidate_aweme_detail(aweme_id)
 
         return {
             'success': True,
@@ -1320,6 +1377,7 @@ class DouyinUserManager:
 
         if not success:
             return resp if isinstance(resp, dict) else {'_error': True, 'message': '收藏失败'}
+        self.api.invalidate_aweme_detail(aweme_id)
 
         return {
             'success': True,
@@ -1487,8 +1545,7 @@ class DouyinUserManager:
             if not videos:
                 return 0
 
-            max_workers = max(1, int(getattr(Config, 'MAX_CONCURRENT', 3) or 1))
-            semaphore = asyncio.Semaphore(max_workers)
+            scheduler = get_scheduler()
 
             async def download_one(video: dict) -> int:
                 aweme_id = video.get('aweme_id')
@@ -1500,7 +1557,8 @@ class DouyinUserManager:
                 author_name = (video.get('author') or {}).get('nickname') or 'liked'
                 name = build_download_name(author_name, video.get('desc', ''), aweme_id, media_type=media_type)
 
-                async with semaphore:
+                # 并发由全局下载调度器控制，与其他下载任务公平分配名额
+                async with scheduler.slot(priority='batch', task='liked', url=media_urls[0].get('url', '')):
                     if media_type == 'video' and len(media_urls) == 1:
                         fallback_urls = self.get_video_download_urls((video.get('video') or {}))
                         success = await asyncio.to_thread(
@@ -1624,13 +1682,14 @@ class DouyinUserManager:
                 if not selected or author.get('sec_uid') in selected
             ]
 
+            # 只限制同时拉取作品列表的作者数，文件下载由全局调度器按 background 优先级排队
             max_workers = max(1, int(getattr(Config, 'MAX_CONCURRENT', 3) or 1))
             semaphore = asyncio.Semaphore(max_workers)
 
             async def download_one_author(author: dict) -> int:
                 async with semaphore:
                     print(f"\n\033[36m正在处理作者: {author['nickname']}\033[0m")
-                    await self.download_user_videos(author, auto_confirm=True)
+                    await self.download_user_videos(author, auto_confirm=True, priority='background')
                 return 1
 
             results = await asyncio.gather(
@@ -0,0 +1,114 @@
+"""进程内 DNS 缓存。
+
+替换 ``socket.getaddrinfo``，按 TTL 缓存解析结果。requests/urllib3、aiohttp 的线程
+解析器都在调用时查找 ``socket.getaddrinfo``，因此 API、下载器与媒体代理共用同一份
+缓存。IP 字面量不缓存；解析失败不做负缓存，下次照常重试。
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = 300
+MAX_ENTRIES = 512
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.split('%', 1)[0])
+        return True
+    except ValueError:
+        return False
+
+
+class DnsCache:
+    """包装一个 getaddrinfo 实现，命中 TTL 内的结果直接返回。"""
+
+    def __init__(self, resolver=None, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.resolver = resolver or socket.getaddrinfo
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if isinstance(host, bytes):
+            host_key = host.decode('idna', errors='ignore')
+        else:
+            host_key = str(host or '')
+        if self.ttl <= 0 or not host_key or _is_ip_literal(host_key):
+            return self.resolver(host, port, family, type, proto, flags)
+
+        key = (host_key.lower().rstrip('.'), str(port), family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return list(entry[1])
+            self._misses += 1
+
+        result = self.resolver(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            hosts = sorted({key[0] for key, (expires_at, _) in self._entries.items() if expires_at > now})
+            return {
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hosts': hosts,
+            }
+
+
+_installed: DnsCache | None = None
+_original_getaddrinfo = None
+_install_lock = threading.Lock()
+
+
+def install(ttl: float = DEFAULT_TTL_SECONDS) -> DnsCache:
+    """安装全局 DNS 缓存；重复调用只更新 TTL。
+
+    应在 gevent monkey patch 之后调用，这样包装的是协作式解析器。
+    """
+    global _installed, _original_getaddrinfo
+    with _install_lock:
+        if _installed is not None and socket.getaddrinfo == _installed.getaddrinfo:
+            _installed.ttl = ttl
+            return _installed
+        _original_getaddrinfo = socket.getaddrinfo
+        _installed = DnsCache(_original_getaddrinfo, ttl=ttl)
+        socket.getaddrinfo = _installed.getaddrinfo
+        return _installed
+
+
+def uninstall() -> None:
+    global _installed, _original_getaddrinfo
+    with _install_lock:
+        if _installed is not None and socket.getaddrinfo == _installed.getaddrinfo:
+            socket.getaddrinfo = _original_getaddrinfo
+        _installed = None
+        _original_getaddrinfo = None
+
+
+def get_dns_cache() -> DnsCache | None:
+    return _installed
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
 import os
 import threading
 import time
 from pathlib import Path
 
 from src.config.config import Config
+from src.utils import json_codec
+from src.utils import metrics
 
 _INDEX_VERSION = 2
 _CACHE_LOCK = threading.Lock()
@@ -19,6 +20,9 @@ LOCAL_MEDIA_EXTENSIONS = {
     '.mp3', '.m4a', '.aac', '.wav', '.flac', '.ogg',
 }
 
+REBUILD_SECONDS = metrics.histogram('douyin_history_index_rebuild_seconds', '下载历史索引全量重建耗时')
+INDEX_ITEMS = metrics.gauge('douyin_history_index_items', '下载历史索引条目数')
+
 
 def _index_file_path() -> Path:
     return Path(os.path.dirname(Config.CONFIG_FILE)) / 'download_history_index.json'
@@ -97,7 +101,7 @@ def _read_disk_index(expected_roots: tuple[str, ...]) -> list[dict] | None:
         return None
 
     try:
-        payload = json.loads(index_file.read_text(encoding='utf-8'))
+        payload = json_codec.loads(index_file.read_bytes())
     except Exception:
         return None
 
@@ -128,7 +132,8 @@ def _write_disk_index(roots_signature: tuple[str, ...], items: list[dict]) -> No
 
     index_file.parent.mkdir(parents=True, exist_ok=True)
     temp_file = index_file.with_suffix('.tmp')
-    temp_file.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+    # 索引可能有十万条记录，紧凑格式写入，不做缩进
+    temp_file.write_bytes(json_codec.dumps_bytes(payload))
     os.replace(temp_file, index_file)
 
 
@@ -149,6 +154,7 @@ def invalidate_download_history_cache(drop_disk: bool = False) -> None:
 def rebuild_download_history_index() -> list[dict]:
     global _CACHE_ROOTS, _CACHE_ITEMS
 
+    started_at = time.perf_counter()
     roots = get_download_history_roots()
     roots_signature = _roots_signature(roots)
     items = []
@@ -168,6 +174,8 @@ def rebuild_download_history_index() -> list[dict]:
         _CACHE_ROOTS = roots_signature
         _CACHE_ITEMS = _clone_items(items)
 
+    REBUILD_SECONDS.observe(time.perf_counter() - started_at)
+    INDEX_ITEMS.set(len(items))
     return _clone_items(items)
 
 
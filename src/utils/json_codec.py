@@ -0,0 +1,83 @@
+"""JSON 编解码入口。
+
+安装了 ``orjson`` 时使用 orjson，否则回退到标准库 ``json``。两种实现的输出语义一致：
+中文等非 ASCII 字符原样输出（等价于 ``ensure_ascii=False``），缩进固定为 2 个空格。
+orjson 不支持的输入（非字符串键、超过 64 位的整数、NaN 等）自动改走标准库。
+"""
+
+from __future__ import annotations
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def _orjson_option(indent: bool, sort_keys: bool, passthrough_datetime: bool) -> int:
+    option = 0
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if passthrough_datetime:
+        option |= orjson.OPT_PASSTHROUGH_DATETIME
+    return option
+
+
+def loads(data: bytes | bytearray | memoryview | str):
+    """解析 JSON 文本或 UTF-8 字节串。"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # 标准库额外接受 NaN/Infinity 等非严格 JSON，失败时仍抛 json.JSONDecodeError
+            pass
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def dumps_bytes(
+    obj,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default=None,
+    passthrough_datetime: bool = False,
+) -> bytes:
+    """序列化为 UTF-8 字节串；``passthrough_datetime`` 让日期类型交给 ``default`` 处理。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=_orjson_option(indent, sort_keys, passthrough_datetime))
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj, indent, sort_keys, default).encode('utf-8')
+
+
+def dumps(
+    obj,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default=None,
+    passthrough_datetime: bool = False,
+) -> str:
+    """序列化为字符串。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, default=default, option=_orjson_option(indent, sort_keys, passthrough_datetime)
+            ).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj, indent, sort_keys, default)
+
+
+def _stdlib_dumps(obj, indent: bool, sort_keys: bool, default) -> str:
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys, default=default)
@@ -0,0 +1,118 @@
+"""启动预热：预解析并预连接抖音 API 与 CDN 主机。
+
+每个主机依次做 DNS 解析（写入全局 DNS 缓存）和一次预连接（由调用方提供，通常是
+用真实客户端发一个 HEAD，让连接留在它的连接池里），分别记录耗时。主机之间并发。
+"""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# API 主机
+API_HOSTS = ('www.douyin.com', 'www-hj.douyin.com', 'imapi.douyin.com')
+# 常见的视频 / 图片 CDN 主机，对应 ALLOWED_MEDIA_HOST_SUFFIXES 里的 douyinvod / douyinpic
+CDN_HOSTS = (
+    'v3-web.douyinvod.com',
+    'v26-web.douyinvod.com',
+    'p3-pc.douyinpic.com',
+    'p3-pc-sign.douyinpic.com',
+    'p26-pc-sign.douyinpic.com',
+)
+WARMUP_TIMEOUT = 5
+
+
+def normalize_host(value) -> str:
+    """接受主机名或 URL，返回小写主机名；无效时返回空字符串。"""
+    text = str(value or '').strip()
+    if not text:
+        return ''
+    parsed = urlparse(text if '://' in text else f'//{text}')
+    return (parsed.hostname or '').lower().rstrip('.')
+
+
+def _elapsed_ms(started_at: float) -> float:
+    return round((time.perf_counter() - started_at) * 1000, 1)
+
+
+def warm_host(host: str, connect=None, port: int = 443) -> dict:
+    """解析并预连接单个主机，返回耗时与结果。"""
+    result = {'host': host}
+    started_at = time.perf_counter()
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        result['dns_ms'] = _elapsed_ms(started_at)
+        result['addresses'] = len(addresses)
+    except OSError as error:
+        result['dns_ms'] = _elapsed_ms(started_at)
+        result['error'] = f'DNS: {error}'
+        return result
+
+    if connect is not None:
+        connect_started_at = time.perf_counter()
+        try:
+            result['status'] = connect(host)
+        except Exception as error:
+            result['error'] = f'{type(error).__name__}: {error}'
+        result['connect_ms'] = _elapsed_ms(connect_started_at)
+    result['total_ms'] = _elapsed_ms(started_at)
+    return result
+
+
+def warm_hosts(hosts, connect=None, max_workers: int = 8) -> dict:
+    """并发预热多个主机。
+
+    ``connect(host)`` 负责预连接并返回状态码之类的简短结果，为 None 时只做 DNS 解析。
+    """
+    unique_hosts = list(dict.fromkeys(host for host in (normalize_host(item) for item in hosts) if host))
+    started_at = time.perf_counter()
+    report = {'started_at': time.time(), 'hosts': {}}
+    if unique_hosts:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_hosts)))) as pool:
+            for result in pool.map(lambda host: warm_host(host, connect), unique_hosts):
+                report['hosts'][result.pop('host')] = result
+    report['total_ms'] = _elapsed_ms(started_at)
+    report['failed'] = sorted(host for host, result in report['hosts'].items() if 'error' in result)
+    return report
+
+
+class Warmup:
+    """在后台线程里执行一次预热，保存最近一次的报告。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._report = {'state': 'idle'}
+
+    def start(self, hosts, connect=None, on_done=None) -> bool:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._report = {'state': 'running', 'started_at': time.time()}
+
+            def run():
+                try:
+                    report = warm_hosts(hosts, connect)
+                    report['state'] = 'done'
+                except Exception as error:
+                    report = {'state': 'failed', 'error': str(error)}
+                with self._lock:
+                    self._report = report
+                if on_done is not None:
+                    on_done(report)
+
+            self._thread = threading.Thread(target=run, name='startup-warmup', daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout: float | None = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def report(self) -> dict:
+        with self._lock:
+            return dict(self._report)
@@ -0,0 +1,224 @@
+"""推荐流预取缓冲。
+
+每个会话一个 ``FeedBuffer``：当前页被取走一定比例后在后台拉取下一页，格式化好的作品
+先放进缓冲区，前端翻到页尾时直接取走，不用再等一次签名请求。跨页的 aweme_id 用有界
+的已见集合去重。所有方法都在全局事件循环里调用，不需要额外加锁。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from src.utils.metrics import counter
+
+# 推荐地址带签名，放久了会过期
+ITEM_TTL_SECONDS = 600
+# 连续多少页没有新作品时停止补货，避免接口一直返回重复内容时死循环
+MAX_EMPTY_PAGES = 3
+
+FEED_TAKES = counter('douyin_feed_takes_total', '推荐流取数次数', ('result',))
+
+
+class FeedBuffer:
+    """单个会话的推荐流缓冲区。
+
+    ``fetch_page(count, cursor)`` 是返回 ``(resp, success)`` 的协程函数，游标由缓冲区按上游响应推进；
+    ``format_aweme(aweme)`` 返回格式化后的作品，无效作品返回 None。
+    """
+
+    def __init__(
+        self,
+        fetch_page,
+        format_aweme,
+        *,
+        prefetch_ratio: float = 0.5,
+        seen_max: int = 2000,
+        max_buffered: int = 200,
+    ):
+        self.fetch_page = fetch_page
+        self.format_aweme = format_aweme
+        self.prefetch_ratio = min(1.0, max(0.0, prefetch_ratio))
+        self.seen_max = max(1, seen_max)
+        self.max_buffered = max(1, max_buffered)
+        self._items: deque = deque()
+        self._seen: OrderedDict = OrderedDict()
+        self._inflight: asyncio.Task | None = None
+        self._page_size = 0
+        self._has_more = True
+        # 下一次向上游请求使用的游标
+        self._cursor = 0
+        self.last_used = time.monotonic()
+        self.stats = {'pages': 0, 'prefetches': 0, 'duplicates': 0, 'skipped': 0, 'expired': 0, 'served': 0}
+
+    def _remember(self, aweme_id: str) -> bool:
+        """记录 aweme_id，已见过返回 False。"""
+        if aweme_id in self._seen:
+            self._seen.move_to_end(aweme_id)
+            return False
+        self._seen[aweme_id] = None
+        while len(self._seen) > self.seen_max:
+            self._seen.popitem(last=False)
+        return True
+
+    def _drop_expired(self) -> None:
+        deadline = time.monotonic() - ITEM_TTL_SECONDS
+        while self._items and self._items[0][0] < deadline:
+            self._items.popleft()
+            self.stats['expired'] += 1
+
+    async def _fetch(self, count: int) -> tuple[dict, bool, int]:
+        """拉取一页并放进缓冲区，返回 ``(resp, success, 新增数量)``。"""
+        try:
+            resp, success = await self.fetch_page(count, self._cursor)
+        except Exception as error:
+            return {'message': str(error)}, False, 0
+        if not success or not isinstance(resp, dict):
+            return resp, False, 0
+
+        self.stats['pages'] += 1
+        fetched_at = time.monotonic()
+        added = 0
+        has_more = resp.get('has_more', False)
+        self._has_more = has_more == 1 or has_more is True
+        # 与不经缓冲时返回给前端的游标算法一致
+        self._cursor = (
+            resp.get('cursor')
+            or resp.get('max_cursor')
+            or resp.get('min_cursor')
+            or (self._cursor + 1 if self._has_more else self._cursor)
+        )
+        aweme_list = resp.get('aweme_list') or []
+        for aweme in aweme_list:
+            aweme_id = str((aweme or {}).get('aweme_id') or '')
+            if aweme_id and not self._remember(aweme_id):
+                self.stats['duplicates'] += 1
+                continue
+            item = self.format_aweme(aweme)
+            if item is None:
+                self.stats['skipped'] += 1
+                continue
+            self._items.append((fetched_at, item, self._cursor))
+            added += 1
+
+        self._page_size = max(len(aweme_list), 1)
+        return resp, True, added
+
+    async def _fill(self, count: int) -> tuple[dict, bool, int]:
+        """等待进行中的预取，没有则同步拉取一页。"""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch(count))
+        task = self._inflight
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done() and self._inflight is task:
+                self._inflight = None
+
+    def _maybe_prefetch(self, count: int) -> None:
+        if self._inflight is not None or not self._has_more or len(self._items) >= self.max_buffered:
+            return
+        # 当前页剩余不超过 (1 - ratio) 时预取下一页
+        if len(self._items) > self._page_size * (1 - self.prefetch_ratio):
+            return
+        self.stats['prefetches'] += 1
+        task = asyncio.ensure_future(self._fetch(count))
+        task.add_done_callback(self._prefetch_done)
+        self._inflight = task
+
+    def _prefetch_done(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+
+    async def take(self, count: int) -> dict:
+        """取出最多 ``count`` 个作品。
+
+        缓冲区不足时等待补货；完全取不到作品时返回 ``error``（上游原始响应），
+        由调用方决定提示验证还是登录。``cursor`` 是最后一个作品所在页的上游游标。
+        """
+        self.last_used = time.monotonic()
+        self._drop_expired()
+        waited = False
+        error = None
+        empty_pages = 0
+        while len(self._items) < count and (self._has_more or self._inflight is not None):
+            waited = True
+            resp, success, added = await self._fill(count)
+            if not success:
+                error = resp
+                break
+            empty_pages = 0 if added else empty_pages + 1
+            if empty_pages >= MAX_EMPTY_PAGES:
+                break
+
+        videos = []
+        cursor = self._cursor
+        while self._items and len(videos) < count:
+            _, item, cursor = self._items.popleft()
+            videos.append(item)
+        self.stats['served'] += len(videos)
+        FEED_TAKES.inc(result='waited' if waited else 'buffered')
+        self._maybe_prefetch(count)
+        return {
+            'videos': videos,
+            'has_more': bool(self._items) or self._has_more,
+            'cursor': cursor,
+            'buffered': len(self._items),
+            'error': error if not videos else None,
+        }
+
+    def close(self) -> None:
+        if self._inflight is not None:
+            self._inflight.cancel()
+            self._inflight = None
+        self._items.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            'buffered': len(self._items),
+            'seen': len(self._seen),
+            'prefetching': self._inflight is not None,
+            'has_more': self._has_more,
+            'idle_seconds': round(time.monotonic() - self.last_used, 1),
+        }
+
+
+class FeedBufferPool:
+    """按会话保存 ``FeedBuffer``，超出上限或闲置过久的会话被回收。"""
+
+    def __init__(self, factory, max_sessions: int = 32, idle_ttl: float = 1800):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self._buffers: OrderedDict[str, FeedBuffer] = OrderedDict()
+
+    def _evict(self) -> None:
+        deadline = time.monotonic() - self.idle_ttl
+        for key in [key for key, buffer in self._buffers.items() if buffer.last_used < deadline]:
+            self._buffers.pop(key).close()
+        while len(self._buffers) > self.max_sessions:
+            _, buffer = self._buffers.popitem(last=False)
+            buffer.close()
+
+    def get(self, key: str) -> FeedBuffer:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = self.factory()
+        self._buffers.move_to_end(key)
+        self._evict()
+        return buffer
+
+    def reset(self, key: str) -> None:
+        buffer = self._buffers.pop(key, None)
+        if buffer is not None:
+            buffer.close()
+
+    def clear(self) -> None:
+        for buffer in self._buffers.values():
+            buffer.close()
+        self._buffers.clear()
+
+    def stats(self) -> dict:
+        return {key: buffer.snapshot() for key, buffer in self._buffers.items()}
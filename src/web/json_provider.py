@@ -0,0 +1,36 @@
+"""Flask JSON provider：jsonify / request.get_json 使用 json_codec。"""
+
+from __future__ import annotations
+
+from src.utils import json_codec
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:  # Flask < 2.2 没有可替换的 JSON provider
+    DefaultJSONProvider = None
+
+
+if DefaultJSONProvider is not None:
+    class CodecJSONProvider(DefaultJSONProvider):
+        """日期、Decimal 等类型仍交给 Flask 默认的 ``default`` 处理，输出格式不变。"""
+
+        def dumps(self, obj, **kwargs):
+            if 'cls' in kwargs:
+                return super().dumps(obj, **kwargs)
+            return json_codec.dumps(
+                obj,
+                indent=bool(kwargs.get('indent')),
+                sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                default=kwargs.get('default', self.default),
+                passthrough_datetime=True,
+            )
+
+        def loads(self, s, **kwargs):
+            return json_codec.loads(s)
+else:
+    CodecJSONProvider = None
+
+
+def install_json_provider(app) -> None:
+    if CodecJSONProvider is not None:
+        app.json = CodecJSONProvider(app)
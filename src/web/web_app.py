@@ -29,6 +29,7 @@ import concurrent.futures
 import tempfile
 import mimetypes
 import hashlib
+import http.cookiejar
 import shlex
 import requests as http_requests
 from datetime import datetime
@@ -70,6 +71,23 @@ UPDATER_PUBLIC_KEY = (
     'V1QvYVhHMFRmS0hEZmpYNEdhWEFnUExoU1dqUHFiYXhnU2UzWm1Rblo5UUc4MnM0cE13RXFiNAo='
 )
 MEDIA_PROXY_REDIRECT_CACHE = {}
+_media_proxy_session = None
+_media_proxy_session_lock = threading.Lock()
+
+
+def _get_media_proxy_session():
+    """media_proxy 共用的连接池，启动预热建立的连接可被后续代理请求复用。"""
+    global _media_proxy_session
+    with _media_proxy_session_lock:
+        if _media_proxy_session is None:
+            session = http_requests.Session()
+            # 共享会话不保存 CDN 返回的 Set-Cookie，避免一个播放请求的 cookie 被带到其他请求
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = http_requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _media_proxy_session = session
+        return _media_proxy_session
 
 
 def _cap_media_range_header(range_header: str, requested_media_type: str) -> str:
@@ -123,7 +141,18 @@ from src.api.native_cookie_login import (
     serialize_cookie_entries,
 )
 from src.api import douyin_im_proto
+from src.api import sign_executor
+from src.api import transport
+from src.api.comment_tree import comment_block, comment_items
+from src.api.rate_governor import get_rate_governor
+from src.api.token_manager import cookie_scope
+from src.downloader.async_downloader import AsyncDouyinDownloader, LoopEvent, get_download_engine, run_file_io, wait_while_paused
+from src.downloader import bandwidth, resume
+from src.downloader.scheduler import get_scheduler
 from src.downloader.downloader import DouyinDownloader, build_download_name, build_download_title
+from src.utils import dns_cache, metrics, warmup
+from src.web.json_provider import install_json_provider
+from src.web.feed_buffer import FeedBuffer, FeedBufferPool
 from src.utils.download_history_index import (
     get_download_history_items,
     invalidate_download_history_cache,
@@ -141,9 +170,19 @@ _native_verify_window = None
 _native_verify_window_session = None
 VERIFY_COOKIE_SYNC_TIMEOUT = 10 * 60
 
+MEDIA_PROXY_TTFB = metrics.histogram('douyin_media_proxy_upstream_ttfb_seconds', 'media_proxy 上游首字节耗时（含重试与重定向）', ('media_type',))
+MEDIA_PROXY_BYTES = metrics.counter('douyin_media_proxy_bytes_total', 'media_proxy 转发给前端的字节数', ('media_type',))
+MEDIA_PROXY_RESPONSES = metrics.counter('douyin_media_proxy_upstream_responses_total', 'media_proxy 上游响应状态', ('media_type', 'status'))
+SIGN_IN_FLIGHT = metrics.gauge('douyin_sign_in_flight', '进行中的签名任务数')
+SIGN_QUEUE_DEPTH = metrics.gauge('douyin_sign_queue_depth', '等待签名工作池的任务数')
+RATE_GOVERNOR_RATE = metrics.gauge('douyin_rate_governor_rate_per_second', '各接口族当前限速', ('family',))
+RESPONSE_CACHE_BYTES = metrics.gauge('douyin_response_cache_bytes', '响应缓存占用字节数')
+RESPONSE_CACHE_ENTRIES = metrics.gauge('douyin_response_cache_entries', '响应缓存条目数')
+
 app = Flask(__name__, static_folder=None)
 app.config['SECRET_KEY'] = 'better_douyin_secret_key'
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # 禁用静态文件缓存
+install_json_provider(app)
 # macOS + pywebview 时 gevent 未 patch，必须用 threading 模式
 if IS_WINDOWS or (IS_MACOS and os.environ.get('USE_PYWEBVIEW') == '1'):
     socketio_async_mode = 'threading'
@@ -163,6 +202,7 @@ socketio = SocketIO(
 # 全局变量
 api = None
 downloader = None
+async_downloader = None
 user_manager = None
 download_tasks = {} # 用于存储任务状态和元数据（同步Dict）
 active_tasks = {} # 用于存储活跃的 asyncio.Future 和 asyncio.Event
@@ -174,20 +214,6 @@ _im_message_lock = threading.Lock()
 TERMINAL_TASK_STATUSES = {'completed', 'failed', 'error', 'cancelled', 'canceled'}
 
 
-class ThreadPauseEvent:
-    """Thread-compatible pause guard backed by an asyncio.Event."""
-
-    def __init__(self, event):
-        self.event = event
-
-    def is_set(self):
-        return self.event.is_set()
-
-    def wait_while_set(self, cancel_event=None, interval=0.2):
-        while self.event.is_set() and not (cancel_event and cancel_event.is_set()):
-            time.sleep(interval)
-
-
 @app.route('/favicon.ico')
 def favicon():
     """Serve favicon to avoid noisy 404s in browsers."""
@@ -1010,6 +1036,9 @@ def is_allowed_media_url(url: str) -> bool:
         return False
 
     hostname = parsed.hostname.lower().rstrip('.')
+    if Config.OFFLINE_HOST and urlparse(Config.OFFLINE_HOST).netloc == parsed.netloc:
+        # 离线压测时放行假服务器的媒体地址
+        return True
     return any(hostname == suffix or hostname.endswith(f'.{suffix}') for suffix in ALLOWED_MEDIA_HOST_SUFFIXES)
 
 
@@ -1890,6 +1919,7 @@ def get_or_create_loop():
         _global_loop = asyncio.new_event_loop()
         _loop_thread = threading.Thread(target=_global_loop.run_forever, daemon=True)
         _loop_thread.start()
+        asyncio.run_coroutine_threadsafe(metrics.monitor_event_loop_lag(), _global_loop)
         logger.info("Global asyncio loop started in background thread")
     return _global_loop
 
@@ -1903,6 +1933,39 @@ def run_async(coro, timeout: float | None = 120):
         future.cancel()
         raise TimeoutError(f'异步任务执行超时（{timeout}s）') from exc
 
+def _get_async_downloader() -> AsyncDouyinDownloader:
+    """按需创建包装当前下载器的 aiohttp 下载引擎，共用下载记录。"""
+    global async_downloader
+    base = user_manager.downloader
+    if async_downloader is None or async_downloader.downloader is not base:
+        async_downloader = AsyncDouyinDownloader(base)
+    return async_downloader
+
+
+def _first_media_url(target) -> str:
+    """download_video 传入单个地址，download_media_group 传入媒体列表，取第一个地址判断 CDN 主机。"""
+    if isinstance(target, str):
+        return target
+    for item in target or []:
+        url = item.get('url') if isinstance(item, dict) else item
+        if url:
+            return str(url)
+    return ''
+
+
+async def _run_download(method: str, *args, engine: str | None = None, priority: str = 'batch', task: str = '',
+                        pause_gate=None, **kwargs):
+    """向全局调度器申请名额后，按 DOWNLOAD_ENGINE 调用线程版（to_thread）或 aiohttp 版下载器的同名方法。
+
+    ``pause_gate`` 是传给下载器的暂停事件（``get_scheduler().pause_gate``），暂停期间名额让给其他任务。
+    """
+    url = _first_media_url(args[0] if args else '')
+    async with get_scheduler().slot(priority=priority, task=task, url=url, pause_gate=pause_gate):
+        if (engine or get_download_engine()) == 'async':
+            return await getattr(_get_async_downloader(), method)(*args, **kwargs)
+        return await asyncio.to_thread(getattr(user_manager.downloader, method), *args, **kwargs)
+
+
 class WebDownloadProgress:
     """Web下载进度回调"""
     def __init__(self, task_id, socketio, desc=None):
@@ -1974,6 +2037,74 @@ def _store_download_task(task_id: str, task: dict) -> None:
     _prune_download_tasks()
 
 
+startup_warmup = warmup.Warmup()
+
+
+def _warmup_hosts() -> list[str]:
+    if Config.OFFLINE_HOST:
+        return [warmup.normalize_host(Config.OFFLINE_HOST)]
+    return [*warmup.API_HOSTS, *warmup.CDN_HOSTS, *Config.WARMUP_HOSTS]
+
+
+def _api_pool_warmup() -> str:
+    """API 主机的预连接能否留在 API 实际使用的连接池里。"""
+    # requests 传输层的会话是线程本地的，HEAD 只会落到 to_thread 随机一个工作线程的连接池
+    return 'shared_session' if transport.get_transport_name() == 'aiohttp' else 'dns_only'
+
+
+def _warmup_connect(host: str):
+    """用真实客户端发一个 HEAD，让连接留在对应的连接池里；requests 传输层的 API 主机只预解析 DNS。"""
+    if Config.OFFLINE_HOST:
+        url = f'{Config.OFFLINE_HOST}/'
+    else:
+        url = f'https://{host}/'
+    if Config.OFFLINE_HOST or host in warmup.API_HOSTS:
+        if _api_pool_warmup() == 'dns_only':
+            return 'dns_only'
+        response = run_async(
+            transport.request('HEAD', url, headers={'User-Agent': Config.COMMON_HEADERS['User-Agent']}, timeout=(warmup.WARMUP_TIMEOUT, warmup.WARMUP_TIMEOUT)),
+            timeout=warmup.WARMUP_TIMEOUT * 3,
+        )
+        return response.status_code
+    response = _get_media_proxy_session().head(
+        url,
+        headers={'User-Agent': Config.COMMON_HEADERS['User-Agent']},
+        timeout=(warmup.WARMUP_TIMEOUT, warmup.WARMUP_TIMEOUT),
+        allow_redirects=False,
+    )
+    response.close()
+    return response.status_code
+
+
+def _log_warmup_report(report: dict) -> None:
+    hosts = report.get('hosts') or {}
+    logger.info(
+        "[预热] %s 个主机完成，耗时 %.0fms，失败: %s",
+        len(hosts),
+        report.get('total_ms', 0),
+        ', '.join(report.get('failed') or []) or '无',
+    )
+    for host, result in hosts.items():
+        logger.debug(
+            "[预热] %s dns=%sms connect=%sms status=%s error=%s",
+            host, result.get('dns_ms'), result.get('connect_ms'), result.get('status'), result.get('error', ''),
+        )
+
+
+def _start_startup_warmup() -> bool:
+    return startup_warmup.start(_warmup_hosts(), _warmup_connect, on_done=_log_warmup_report)
+
+
+def _sweep_stale_parts() -> None:
+    try:
+        removed = resume.sweep_stale_parts(Config.DOWNLOAD_DIR, Config.RESUME_PART_MAX_AGE_DAYS)
+    except Exception as e:
+        logger.warning(f"清理过期续传文件失败: {e}")
+        return
+    if removed:
+        logger.info(f"已清理 {removed} 个超过 {Config.RESUME_PART_MAX_AGE_DAYS} 天未更新的续传文件")
+
+
 def init_app():
     """初始化应用"""
     global api, downloader, user_manager
@@ -1991,6 +2122,12 @@ def init_app():
         
         # 启动全局 Loop
         get_or_create_loop()
+
+        # DNS 缓存在 gevent monkey patch 之后安装，包装的是协作式解析器
+        dns_cache.install(Config.DNS_CACHE_TTL_SECONDS)
+        if Config.WARMUP_ON_START:
+            _start_startup_warmup()
+        threading.Thread(target=_sweep_stale_parts, daemon=True).start()
         
         logger.info("Web应用初始化完成")
     except Exception as e:
@@ -2067,6 +2204,9 @@ def get_config():
         'im_friend_sec_user_ids': getattr(Config, 'IM_FRIEND_SEC_USER_IDS', []),
         'im_friend_include_all_users': getattr(Config, 'IM_FRIEND_INCLUDE_ALL_USERS', False),
         'im_friend_refresh_interval_seconds': getattr(Config, 'IM_FRIEND_REFRESH_INTERVAL_SECONDS', 5),
+        'bandwidth_limit_kb': Config.BANDWIDTH_LIMIT_KB,
+        'bandwidth_task_limit_kb': Config.BANDWIDTH_TASK_LIMIT_KB,
+        'bandwidth_proxy_reserve_percent': Config.BANDWIDTH_PROXY_RESERVE_PERCENT,
         'app_version': _get_current_app_version(),
     })
 
@@ -2181,6 +2321,15 @@ def save_friend_chat_state():
         logger.warning('保存好友聊天状态失败: %s', error)
         return jsonify({'success': False, 'message': f'保存好友聊天状态失败: {str(error)}'}), 500
 
+# 运行时直接生效、不需要重建下载器的配置项
+_RUNTIME_CONFIG_KEYS = frozenset({
+    'bandwidth_limit_kb',
+    'bandwidth_task_limit_kb',
+    'bandwidth_proxy_reserve_percent',
+    'task_bandwidth_limits',
+})
+
+
 @app.route('/api/config', methods=['POST'])
 def set_config():
     """设置配置"""
@@ -2222,6 +2371,22 @@ def set_config():
                 1,
                 3600,
             )
+        # 限速每次计算时从 Config 读取，正在进行的下载不用重启即按新值执行
+        if 'bandwidth_limit_kb' in data:
+            Config.BANDWIDTH_LIMIT_KB = _coerce_int(data.get('bandwidth_limit_kb'), 0, 0, 10_000_000)
+        if 'bandwidth_task_limit_kb' in data:
+            Config.BANDWIDTH_TASK_LIMIT_KB = _coerce_int(data.get('bandwidth_task_limit_kb'), 0, 0, 10_000_000)
+        if 'bandwidth_proxy_reserve_percent' in data:
+            Config.BANDWIDTH_PROXY_RESERVE_PERCENT = _coerce_int(data.get('bandwidth_proxy_reserve_percent'), 20, 0, 90)
+        # 单个任务的临时限速 {task_id: KB/s}，null 恢复默认；只在本次运行有效
+        task_bandwidth_limits = data.get('task_bandwidth_limits')
+        if isinstance(task_bandwidth_limits, dict):
+            limiter = bandwidth.get_limiter()
+            for task_key, limit_kb in task_bandwidth_limits.items():
+                limiter.set_task_limit(
+                    task_key,
+                    None if limit_kb is None else _coerce_int(limit_kb, 0, 0, 10_000_000) * 1024,
+                )
 
         move_existing_files = bool(data.get('move_existing_files'))
         history_dirs = list(getattr(Config, 'HISTORY_DIRS', []))
@@ -2267,8 +2432,9 @@ def set_config():
         else:
             invalidate_download_history_cache(drop_disk=False)
         
-        # 重新初始化API和下载器
-        init_app()
+        # 重新初始化API和下载器；只调整限速时不需要
+        if not (data and set(data) <= _RUNTIME_CONFIG_KEYS):
+            init_app()
         
         return jsonify({
             'success': True,
@@ -2284,6 +2450,9 @@ def set_config():
             'im_friend_sec_user_ids': Config.IM_FRIEND_SEC_USER_IDS,
             'im_friend_include_all_users': Config.IM_FRIEND_INCLUDE_ALL_USERS,
             'im_friend_refresh_interval_seconds': Config.IM_FRIEND_REFRESH_INTERVAL_SECONDS,
+            'bandwidth_limit_kb': Config.BANDWIDTH_LIMIT_KB,
+            'bandwidth_task_limit_kb': Config.BANDWIDTH_TASK_LIMIT_KB,
+            'bandwidth_proxy_reserve_percent': Config.BANDWIDTH_PROXY_RESERVE_PERCENT,
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'配置保存失败: {str(e)}'}), 500
@@ -2875,7 +3044,7 @@ def media_proxy():
                 headers['Range'] = upstream_range_value
 
             try:
-                resp = http_requests.get(
+                resp = _get_media_proxy_session().get(
                     upstream_url,
                     headers=headers,
                     stream=True,
@@ -2896,6 +3065,7 @@ def media_proxy():
 
                 if cache_key:
                     MEDIA_PROXY_REDIRECT_CACHE.pop(cache_key, None)
+                MEDIA_PROXY_RESPONSES.inc(media_type=requested_media_type or 'other', status='error')
                 logger.error(
                     '[media_proxy] 请求失败, elapsed=%sms seeded_range=%s range="%s" url=%s error=%s',
                     int((time.time() - start_time) * 1000),
@@ -2935,6 +3105,10 @@ def media_proxy():
 
             break
 
+        proxy_media_type = requested_media_type or 'other'
+        MEDIA_PROXY_TTFB.observe(time.time() - start_time, media_type=proxy_media_type)
+        MEDIA_PROXY_RESPONSES.inc(media_type=proxy_media_type, status=resp.status_code)
+
         if cache_key and upstream_url != url:
             _remember_media_redirect(cache_key, upstream_url)
 
@@ -2986,6 +3160,7 @@ def media_proxy():
                 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
                 encrypted = resp.content
                 resp.close()
+                MEDIA_PROXY_BYTES.inc(len(encrypted), media_type=proxy_media_type)
                 key = bytes.fromhex(image_skey)
                 if len(key) != 32 or len(encrypted) <= 28:
                     raise ValueError('invalid encrypted image payload')
@@ -3010,15 +3185,18 @@ def media_proxy():
             total = 0
             stream_start = time.time()
             try:
-                for chunk in resp.iter_content(chunk_size=65536):
-                    if chunk:
-                        total += len(chunk)
-                        yield chunk
+                # 播放期间批量下载让出预留带宽
+                with bandwidth.get_limiter().proxy_stream():
+                    for chunk in resp.iter_content(chunk_size=65536):
+                        if chunk:
+                            total += len(chunk)
+                            yield chunk
             finally:
                 try:
                     resp.close()
                 except Exception:
                     pass
+                MEDIA_PROXY_BYTES.inc(total, media_type=proxy_media_type)
                 logger.info(
                     '[media_proxy] 传输完成, 共 %.2fMB, 耗时 %.2fs, url=%s',
                     total / 1048576,
@@ -3055,6 +3233,122 @@ def debug_seek():
     return 'ok'
 
 
+@app.route('/api/debug/sign_stats')
+def debug_sign_stats():
+    """返回 a_bogus 签名池的排队深度与耗时统计。"""
+    return jsonify({'success': True, 'stats': sign_executor.get_sign_stats()})
+
+
+@app.route('/api/debug/response_cache')
+def debug_response_cache():
+    """返回 API 响应缓存的命中统计。"""
+    if api is None:
+        return jsonify({'success': False, 'message': 'API 未初始化'})
+    return jsonify({'success': True, 'stats': api.response_cache.stats()})
+
+
+@app.route('/api/debug/rate_governor')
+def debug_rate_governor():
+    """返回各接口族当前学到的请求速率。"""
+    return jsonify({'success': True, 'stats': get_rate_governor().stats()})
+
+
+@app.route('/api/debug/single_flight')
+def debug_single_flight():
+    """返回相同请求并发合并的统计。"""
+    if api is None or user_manager is None:
+        return jsonify({'success': False, 'message': 'API 未初始化'})
+    return jsonify({
+        'success': True,
+        'stats': {
+            'common_request': api.request_flights.stats(),
+            'user_detail': user_manager.user_detail_flights.stats(),
+        },
+    })
+
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Prometheus 文本格式的进程内指标。"""
+    _refresh_scrape_gauges()
+    return Response(metrics.render_prometheus(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+def _refresh_scrape_gauges():
+    """把已有的统计快照同步到仪表指标，只在抓取时计算。"""
+    sign_stats = sign_executor.get_sign_stats()
+    SIGN_IN_FLIGHT.set(sign_stats['in_flight'])
+    SIGN_QUEUE_DEPTH.set(sign_stats['queue_depth'])
+    for family, item in get_rate_governor().stats()['families'].items():
+        RATE_GOVERNOR_RATE.set(item['rate_per_second'], family=family)
+    if api is not None:
+        cache_stats = api.response_cache.stats()
+        RESPONSE_CACHE_BYTES.set(cache_stats.get('bytes', 0))
+        RESPONSE_CACHE_ENTRIES.set(cache_stats.get('entries', 0))
+
+
+@app.route('/api/debug/hedged_detail')
+def debug_hedged_detail():
+    """返回作品详情对冲请求各取法的成功率。"""
+    if user_manager is None:
+        return jsonify({'success': False, 'message': 'API 未初始化'})
+    return jsonify({
+        'success': True,
+        'delay_ms': Config.DETAIL_HEDGE_DELAY_MS,
+        'stats': user_manager.detail_hedge.stats(),
+    })
+
+
+@app.route('/api/debug/comment_tree')
+def debug_comment_tree():
+    """返回评论树缓存与回复预取统计。"""
+    if api is None:
+        return jsonify({'success': False, 'message': 'API 未初始化'})
+    return jsonify({'success': True, 'stats': api.comment_tree.stats()})
+
+
+@app.route('/api/debug/warmup', methods=['GET', 'POST'])
+def debug_warmup():
+    """返回启动预热各主机的 DNS / 连接耗时；POST 重新预热一次。"""
+    restarted = _start_startup_warmup() if request.method == 'POST' else False
+    cache = dns_cache.get_dns_cache()
+    return jsonify({
+        'success': True,
+        'restarted': restarted,
+        'report': startup_warmup.report(),
+        'api_transport': transport.get_transport_name(),
+        # dns_only：requests 传输层下 API 主机只预解析 DNS，连接池不预热
+        'api_pool_warmup': _api_pool_warmup(),
+        'dns_cache': cache.stats() if cache is not None else None,
+    })
+
+
+@app.route('/api/debug/feed_buffer')
+def debug_feed_buffer():
+    """返回各会话推荐流缓冲区的预取与去重统计。"""
+    return jsonify({
+        'success': True,
+        'prefetch_percent': Config.FEED_PREFETCH_PERCENT,
+        'stats': run_async(_feed_buffer_stats()),
+    })
+
+
+async def _feed_buffer_stats() -> dict:
+    return feed_buffers.stats()
+
+
+@app.route('/api/debug/download_scheduler')
+def debug_download_scheduler():
+    """返回全局下载调度器的名额占用与排队情况。"""
+    return jsonify({'success': True, 'stats': get_scheduler().stats()})
+
+
+@app.route('/api/debug/bandwidth')
+def debug_bandwidth():
+    """返回下载限速器当前生效的速度与代理预留状态。"""
+    return jsonify({'success': True, 'stats': bandwidth.get_limiter().stats()})
+
+
 @app.route('/api/download_music')
 def download_music():
     """代理下载音乐，并显式设置文件名。"""
@@ -4355,33 +4649,37 @@ def download_single_video():
                 try:
                     # 统一下载处理，直接传入urls参数
                     logger.debug(f" 开始下载: {len(urls)} 个文件")
+                    # 单击下载走 interactive 优先级，可以使用预留名额，不必排在批量任务后面
+                    scheduler_slot = get_scheduler().slot(priority='interactive', task=task_id, url=_first_media_url(urls))
                     if len(urls) == 1 and urls[0].get('type') == 'video':
-                        success = await asyncio.to_thread(
-                            downloader.download_video,
-                            urls[0]['url'],
-                            file_path,
-                            aweme_id,
-                            None,
-                            socketio,
-                            task_id,
-                            None,
-                            None,
-                            False,
-                            fallback_urls=video_fallback_urls,
-                        )
+                        async with scheduler_slot:
+                            success = await asyncio.to_thread(
+                                downloader.download_video,
+                                urls[0]['url'],
+                                file_path,
+                                aweme_id,
+                                None,
+                                socketio,
+                                task_id,
+                                None,
+                                None,
+                                False,
+                                fallback_urls=video_fallback_urls,
+                            )
                     else:
-                        success = await asyncio.to_thread(
-                            downloader.download_media_group,
-                            urls,
-                            file_path,
-                            aweme_id,
-                            socketio,
-                            task_id,
-                            None,
-                            None,
-                            None,
-                            False,
-                        )
+                        async with scheduler_slot:
+                            success = await asyncio.to_thread(
+                                downloader.download_media_group,
+                                urls,
+                                file_path,
+                                aweme_id,
+                                socketio,
+                                task_id,
+                                None,
+                                None,
+                                None,
+                                False,
+                            )
                     
                     if success:
                         socketio.emit('download_progress', {
@@ -4471,8 +4769,9 @@ def download_user_video():
         
         # 生成任务ID
         task_id = str(uuid.uuid4())
-        cancel_event = asyncio.Event()
-        pause_event = asyncio.Event()  # 暂停事件，默认不暂停
+        # 路由线程里 set/clear，异步下载引擎可直接 await
+        cancel_event = LoopEvent()
+        pause_event = LoopEvent()  # 暂停事件，默认不暂停
 
         display_name = f'{nickname or "用户"} 全部作品'
         _store_download_task(task_id, {
@@ -4517,8 +4816,12 @@ def download_user_video():
                 total_skipped = [0]
                 total_failed = [0]
                 total_videos = aweme_count # 初始总量
-                consumer_count = max(1, int(getattr(Config, 'MAX_CONCURRENT', 3) or 1))
-                pause_control = ThreadPauseEvent(pause_event)
+                download_engine = get_download_engine()
+                if download_engine == 'async':
+                    # 异步引擎的传输不占线程，可以开到数十上百个并发
+                    consumer_count = Config.bounded_int(Config.ASYNC_DOWNLOAD_CONCURRENCY, 32, 1, 512)
+                else:
+                    consumer_count = max(1, int(getattr(Config, 'MAX_CONCURRENT', 3) or 1))
                 batch_started_at = time.monotonic()
 
                 def update_task_snapshot(**fields):
@@ -4564,7 +4867,7 @@ def download_user_video():
                     if cancel_event.is_set():
                         return
                     for post in batch:
-                        if user_manager.downloader._is_aweme_downloaded(post['aweme_id']):
+                        if user_manager.downloader._is_aweme_downloaded(post.aweme_id):
                             total_processed[0] += 1
                             total_skipped[0] += 1
                             # 发送跳过进度更新
@@ -4578,7 +4881,7 @@ def download_user_video():
                                 'failed': total_failed[0],
                                 'remaining': max(total_videos - total_processed[0], 0),
                                 'overall_progress': overall_progress,
-                                'message': f'跳过已下载: {post.get("desc", post["aweme_id"])[:10]}...',
+                                'message': f'跳过已下载: {(post.desc or post.aweme_id)[:10]}...',
                                 'type': 'progress'
                             })
                         else:
@@ -4621,8 +4924,7 @@ def download_user_video():
                                 'type': 'info'
                             })
                             # 等待 pause_event 被清除（恢复）
-                            while pause_event.is_set() and not cancel_event.is_set():
-                                await asyncio.sleep(0.5)
+                            await wait_while_paused(pause_event, cancel_event)
 
                         try:
                             # 等待队列中的新作品
@@ -4635,9 +4937,10 @@ def download_user_video():
                             logger.info(f"Task {task_id} cancelled before download")
                             break
 
-                        aweme_id = post['aweme_id']
-                        media_type, urls = user_manager.get_media_info(post)
-                        name = build_download_name(_nickname, post.get('desc', ''), aweme_id, media_type=media_type)
+                        aweme_id = post.aweme_id
+                        desc = post.desc or aweme_id
+                        media_type, urls = post.media_info()
+                        name = build_download_name(_nickname, post.desc, aweme_id, media_type=media_type)
 
                         def current_total_count():
                             return max(total_videos, total_discovered[0] + total_skipped[0], total_processed[0] + download_queue.qsize())
@@ -4716,10 +5019,7 @@ def download_user_video():
                                 continue
 
                             success = False
-                            def progress_callback(progress_data):
-                                pause_control.wait_while_set(cancel_event)
-                                if cancel_event.is_set():
-                                    raise RuntimeError('下载已取消')
+                            def report_progress(progress_data):
                                 emit_current_video_progress(
                                     current_progress=progress_data.get('progress', 0),
                                     status=progress_data.get('status', 'downloading'),
@@ -4735,31 +5035,48 @@ def download_user_video():
                                     bytes_total=progress_data.get('bytes_total', 0)
                                 )
 
+                            # 暂停期间让出调度名额，恢复后重新排队
+                            pause_gate = get_scheduler().pause_gate(pause_event)
+
+                            def progress_callback(progress_data):
+                                # 线程引擎在回调里阻塞等待恢复；异步引擎自己处理暂停，回调不能阻塞事件循环
+                                pause_gate.wait_while_set(cancel_event)
+                                if cancel_event.is_set():
+                                    raise RuntimeError('下载已取消')
+                                report_progress(progress_data)
+
+                            engine_callback = report_progress if download_engine == 'async' else progress_callback
                             if media_type == 'video' and len(urls) == 1:
-                                fallback_urls = user_manager.get_video_download_urls((post.get('video') or {}))
-                                success = await asyncio.to_thread(
-                                    user_manager.downloader.download_video,
+                                fallback_urls = list(post.candidate_urls)
+                                success = await _run_download(
+                                    'download_video',
                                     urls[0]['url'],
                                     name,
                                     aweme_id,
                                     cancel_event,
                                     None,
                                     None,
-                                    progress_callback,
-                                    pause_control,
+                                    engine_callback,
+                                    pause_gate,
                                     fallback_urls=fallback_urls,
+                                    engine=download_engine,
+                                    task=task_id,
+                                    pause_gate=pause_gate,
                                 )
                             else:
-                                success = await asyncio.to_thread(
-                                    user_manager.downloader.download_media_group,
+                                success = await _run_download(
+                                    'download_media_group',
                                     urls,
                                     name,
                                     aweme_id,
                                     None,
                                     None,
                                     cancel_event,
-                                    progress_callback,
-                                    pause_control,
+                                    engine_callback,
+                                    pause_gate,
+                                    engine=download_engine,
+                                    task=task_id,
+                                    pause_gate=pause_gate,
                                 )
 
                             if success:
@@ -4833,6 +5150,7 @@ def download_user_video():
                 
                 if cancel_event.is_set():
                     download_tasks[task_id]['status'] = 'cancelled'
+                    await run_file_io(resume.discard_task_parts, task_id)
                     socketio.emit('download_cancelled', {'task_id': task_id, 'message': '下载任务已取消'})
                 else:
                     download_tasks[task_id]['status'] = 'completed'
@@ -4851,12 +5169,14 @@ def download_user_video():
                     })
             except asyncio.CancelledError:
                 download_tasks[task_id]['status'] = 'cancelled'
+                resume.discard_task_parts(task_id)
                 socketio.emit('download_cancelled', {'task_id': task_id, 'message': '下载任务已取消'})
             except Exception as e:
                 logger.error(f"Task {task_id} error: {e}")
                 download_tasks[task_id]['status'] = 'failed'
                 socketio.emit('download_failed', {'task_id': task_id, 'message': f'任务出错: {str(e)}'})
             finally:
+                resume.release_task_parts(task_id)
                 if task_id in active_tasks:
                     del active_tasks[task_id]
 
@@ -5268,6 +5588,25 @@ def download_liked_authors():
         return jsonify({'success': False, 'message': f'下载失败: {str(e)}'}), 500
 
 
+def _comment_page_payload(resp: dict) -> dict:
+    """评论 / 回复页的公共返回结构。"""
+    data_block = comment_block(resp)
+    has_more = data_block.get('has_more', False)
+    return {
+        'comments': [_format_comment_item(item) for item in comment_items(resp)],
+        'cursor': data_block.get('cursor', 0),
+        'has_more': has_more == 1 or has_more is True,
+        'total': data_block.get('total', 0),
+    }
+
+
+def _schedule_reply_prefetch(aweme_id: str, comments: list[dict]) -> None:
+    """不等待结果地在全局循环里预取回复。"""
+    if api is None or not comments or api.comment_tree.reply_prefetch <= 0:
+        return
+    asyncio.run_coroutine_threadsafe(api.comment_tree.prefetch_replies(aweme_id, comments), get_or_create_loop())
+
+
 @app.route('/api/get_comments', methods=['POST'])
 def get_comments():
     """获取视频评论列表。"""
@@ -5283,7 +5622,7 @@ def get_comments():
         if not api:
             return jsonify({'success': False, 'message': '服务未初始化'}), 400
 
-        resp, success = run_async(api.get_comments(aweme_id, count, cursor))
+        resp, success = run_async(api.comment_tree.get_comments(aweme_id, count, cursor))
 
         if isinstance(resp, dict) and resp.get('_need_verify'):
             return jsonify(_verify_error_response(
@@ -5300,18 +5639,9 @@ def get_comments():
                 'message': _api_message(resp, '获取评论失败，请稍后重试'),
             })
 
-        data_block = resp.get('data') if isinstance(resp.get('data'), dict) else resp
-        raw_comments = data_block.get('comments') or []
-        comments = [_format_comment_item(item) for item in raw_comments if isinstance(item, dict)]
-
-        has_more = data_block.get('has_more', False)
-        return jsonify({
-            'success': True,
-            'comments': comments,
-            'cursor': data_block.get('cursor', 0),
-            'has_more': has_more == 1 or has_more is True,
-            'total': data_block.get('total', 0),
-        })
+        # 后台预取热门评论的首页回复，用户展开时直接命中缓存
+        _schedule_reply_prefetch(aweme_id, comment_items(resp))
+        return jsonify({'success': True, **_comment_page_payload(resp)})
 
     except Exception as e:
         logger.exception(f"获取评论失败: {e}")
@@ -5335,7 +5665,7 @@ def get_comment_replies():
         if not api:
             return jsonify({'success': False, 'message': '服务未初始化'}), 400
 
-        resp, success = run_async(api.get_comment_replies(aweme_id, comment_id, count, cursor))
+        resp, success = run_async(api.comment_tree.get_replies(aweme_id, comment_id, count, cursor))
 
         if isinstance(resp, dict) and resp.get('_need_verify'):
             return jsonify(_verify_error_response(
@@ -5352,16 +5682,7 @@ def get_comment_replies():
                 'message': _api_message(resp, '获取评论回复失败，请稍后重试'),
             })
 
-        data_block = resp.get('data') if isinstance(resp.get('data'), dict) else resp
-        raw_comments = data_block.get('comments') or data_block.get('reply_comments') or []
-        has_more = data_block.get('has_more', False)
-        return jsonify({
-            'success': True,
-            'comments': [_format_comment_item(item) for item in raw_comments if isinstance(item, dict)],
-            'cursor': data_block.get('cursor', 0),
-            'has_more': has_more == 1 or has_more is True,
-            'total': data_block.get('total', 0),
-        })
+        return jsonify({'success': True, **_comment_page_payload(resp)})
 
     except Exception as e:
         logger.exception(f"获取评论回复失败: {e}")
@@ -5543,6 +5864,44 @@ def handle_disconnect():
     """客户端断开连接"""
     logger.debug("客户端已断开连接")
 
+@socketio.on('load_comment_tree')
+def handle_load_comment_tree(data):
+    """加载一级评论并并发预取热门评论的回复，每拿到一页就推送给请求方。"""
+    data = data if isinstance(data, dict) else {}
+    aweme_id = str(data.get('aweme_id') or '').strip()
+    request_id = str(data.get('request_id') or '')
+    count = _coerce_int(data.get('count'), 20, 1, 100)
+    cursor = _coerce_int(data.get('cursor'), 0, 0)
+    sid = request.sid
+    if not aweme_id or api is None:
+        emit('comment_tree_done', {
+            'request_id': request_id,
+            'aweme_id': aweme_id,
+            'success': False,
+            'message': '视频ID不能为空' if not aweme_id else '服务未初始化',
+        })
+        return
+
+    def page_payload(resp, success, fallback):
+        if success:
+            return {'success': True, **_comment_page_payload(resp)}
+        if isinstance(resp, dict) and resp.get('_need_login'):
+            return _login_error_response(resp)
+        if isinstance(resp, dict) and resp.get('_need_verify'):
+            # 回调在事件循环里执行，不做会阻塞的登录态复查
+            return _verify_error_response_without_login_check(
+                resp, fallback, verify_url=f'https://www.douyin.com/video/{aweme_id}'
+            )
+        return {'success': False, 'message': _api_message(resp, fallback)}
+
+    def emit_to_client(event, payload):
+        socketio.emit(event, payload, to=sid)
+
+    asyncio.run_coroutine_threadsafe(
+        api.comment_tree.stream_tree(aweme_id, emit_to_client, page_payload, request_id=request_id, count=count, cursor=cursor),
+        get_or_create_loop(),
+    )
+
 @socketio.on('test_connection')
 def handle_test_connection(data):
     """测试WebSocket连接"""
@@ -6059,9 +6418,157 @@ def _build_content_disposition(filename: str, disposition_type: str = 'attachmen
     return f"{disposition_type}; filename=\"{ascii_filename}\"; filename*=UTF-8''{quote(filename)}"
 
 
+def _format_recommended_aweme(aweme: dict) -> dict | None:
+    """把推荐流原始作品格式化为前端结构，缺少播放地址、封面或作者时返回 None。"""
+    try:
+        # 提取视频播放地址
+        video_data = aweme.get('video', {})
+        play_addr = _media_first_url(video_data.get('play_addr'))
+        selected_video_url = _select_recommended_video_url(video_data, play_addr)
+        dash_video_url = _select_dash_video_url(video_data)
+        dash_audio_url = _select_dash_audio_url(video_data)
+
+        # 跳过没有播放地址的视频
+        if not selected_video_url:
+            logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 无播放地址")
+            return None
+
+        # 提取封面
+        cover_data = video_data.get('cover', {})
+        if isinstance(cover_data, dict):
+            cover = cover_data.get('url_list', [''])[0]
+        else:
+            cover = cover_data if cover_data else ''
+
+        if not cover:
+            logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 无封面")
+            return None
+
+        # 提取动态封面
+        dynamic_cover_data = video_data.get('dynamic_cover', {})
+        if isinstance(dynamic_cover_data, dict):
+            dynamic_cover = dynamic_cover_data.get('url_list', [''])[0]
+        else:
+            dynamic_cover = dynamic_cover_data if dynamic_cover_data else ''
+
+        origin_cover_data = video_data.get('origin_cover', {})
+        if isinstance(origin_cover_data, dict):
+            origin_cover = origin_cover_data.get('url_list', [''])[0]
+        else:
+            origin_cover = origin_cover_data if origin_cover_data else cover
+
+        play_addr_h264_data = video_data.get('play_addr_h264', {})
+        if isinstance(play_addr_h264_data, dict):
+            play_addr_h264 = play_addr_h264_data.get('url_list', [''])[0]
+        else:
+            play_addr_h264 = play_addr_h264_data if play_addr_h264_data else ''
+
+        play_addr_lowbr_data = video_data.get('play_addr_lowbr', {})
+        if isinstance(play_addr_lowbr_data, dict):
+            play_addr_lowbr = play_addr_lowbr_data.get('url_list', [''])[0]
+        else:
+            play_addr_lowbr = play_addr_lowbr_data if play_addr_lowbr_data else ''
+
+        download_addr_data = video_data.get('download_addr', {})
+        if isinstance(download_addr_data, dict):
+            download_addr = download_addr_data.get('url_list', [''])[0]
+        else:
+            download_addr = download_addr_data if download_addr_data else ''
+
+        # 提取作者头像
+        author_data = aweme.get('author', {})
+        avatar_data = author_data.get('avatar_thumb', {})
+        if isinstance(avatar_data, dict):
+            avatar_thumb = avatar_data.get('url_list', [''])[0]
+        else:
+            avatar_thumb = avatar_data if avatar_data else ''
+
+        author_key = (
+            author_data.get('sec_uid')
+            or author_data.get('uid')
+            or author_data.get('unique_id')
+            or author_data.get('nickname')
+            or ''
+        )
+        if not aweme.get('aweme_id') or not author_key:
+            logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 缺少作品或作者信息")
+            return None
+
+        video_info = {
+            'aweme_id': aweme.get('aweme_id', ''),
+            'desc': aweme.get('desc', ''),
+            'create_time': aweme.get('create_time', 0),
+            'media_type': 'video',
+            'raw_media_type': 'video',
+            'media_urls': [{'type': 'video', 'url': selected_video_url}],
+            'bgm_url': dash_audio_url or _extract_music_info(aweme.get('music') or {}).get('play_url', ''),
+            'cover_url': cover,
+            'author': {
+                'uid': author_data.get('uid', ''),
+                'nickname': author_data.get('nickname', ''),
+                'avatar_thumb': avatar_thumb,
+                'sec_uid': author_data.get('sec_uid', ''),
+            },
+            'statistics': {
+                'digg_count': (aweme.get('statistics') or {}).get('digg_count', 0),
+                'comment_count': (aweme.get('statistics') or {}).get('comment_count', 0),
+                'share_count': (aweme.get('statistics') or {}).get('share_count', 0),
+                'play_count': (aweme.get('statistics') or {}).get('play_count', 0),
+                'collect_count': (aweme.get('statistics') or {}).get('collect_count', 0),
+            },
+            'status': _extract_post_status(aweme),
+            'video': {
+                'cover': cover,
+                'dynamic_cover': dynamic_cover,
+                'origin_cover': origin_cover or cover,
+                'play_addr': selected_video_url,
+                'dash_addr': dash_video_url,
+                'audio_addr': dash_audio_url,
+                'preview_addr': _media_first_url(video_data.get('preview_addr')) or selected_video_url,
+                'play_addr_h264': _media_first_url(video_data.get('play_addr_h264')),
+                'play_addr_lowbr': _media_first_url(video_data.get('play_addr_lowbr')),
+                'download_addr': _media_first_url(video_data.get('download_addr')),
+                'width': video_data.get('width', 0),
+                'height': video_data.get('height', 0),
+                'duration': _raw_duration_value(video_data.get('duration', 0)),
+                'duration_unit': 'milliseconds',
+                'ratio': video_data.get('ratio', ''),
+                'bit_rate': video_data.get('bit_rate') or [],
+            },
+            'music': {
+                **_extract_music_info(aweme.get('music') or {}),
+                'cover': (aweme.get('music') or {}).get('cover_large', {}).get('url_list', [''])[0] if isinstance((aweme.get('music') or {}).get('cover_large'), dict) else '',
+            }
+        }
+
+        return video_info
+    except Exception as e:
+        import traceback
+        logger.error(f"解析视频信息失败: {e}")
+        logger.error(traceback.format_exc())
+        return None
+
+
+def _create_feed_buffer() -> FeedBuffer:
+    async def fetch_page(count: int, cursor: int):
+        if not api:
+            return {'message': '服务未初始化'}, False
+        return await api.get_recommended_feed(count, cursor)
+
+    return FeedBuffer(
+        fetch_page,
+        _format_recommended_aweme,
+        prefetch_ratio=Config.FEED_PREFETCH_PERCENT / 100,
+        seen_max=Config.FEED_SEEN_MAX,
+    )
+
+
+feed_buffers = FeedBufferPool(_create_feed_buffer)
+
+
 @app.route('/api/recommended_feed', methods=['POST'])
 def get_recommended_feed():
-    """获取推荐视频流 - 直接调用 DouyinAPI，不使用子进程"""
+    """获取推荐视频流：优先从会话缓冲区取已格式化的作品，后台预取下一页"""
     try:
         data = _request_json()
         count = _coerce_int(data.get('count'), 20, 1, 100)
@@ -6082,181 +6589,38 @@ def get_recommended_feed():
                 'message': '服务未初始化'
             })
 
-        # 直接调用 DouyinAPI，与其他接口保持一致
+        # 缓冲区按 Cookie 区分；前端首次加载和刷新都从 cursor=0 开始，此时丢弃旧缓冲
+        buffer_key = cookie_scope(cookie)
         logger.info(f"[推荐视频] 请求 {count} 个视频")
 
-        async def fetch_recommended():
-            resp, success = await api.get_recommended_feed(count, cursor)
-            return resp, success
+        async def take_recommended():
+            if cursor == 0:
+                feed_buffers.reset(buffer_key)
+            return await feed_buffers.get(buffer_key).take(count)
 
-        resp, success = run_async(fetch_recommended())
+        result = run_async(take_recommended())
+        videos = result['videos']
+        resp = result['error']
 
         if isinstance(resp, dict) and resp.get('_need_verify'):
             return jsonify(_verify_error_response(resp, '获取推荐视频失败，请完成验证后重试'))
         if isinstance(resp, dict) and resp.get('_need_login'):
             return jsonify(_login_error_response(resp))
 
-        if not success or not resp.get('aweme_list'):
+        if not videos:
             logger.error(f"获取推荐视频失败: {resp}")
             return jsonify({
                 'success': False,
                 'message': _api_message(resp, '获取推荐视频失败，请稍后重试')
             })
 
-        aweme_list = resp.get('aweme_list', [])
-        logger.info(f"[推荐视频] API 返回 {len(aweme_list)} 个视频")
-
-        # 格式化视频信息
-        videos = []
-        skipped_count = 0
-        for aweme in aweme_list:
-            try:
-                # 提取视频播放地址
-                video_data = aweme.get('video', {})
-                play_addr = _media_first_url(video_data.get('play_addr'))
-                selected_video_url = _select_recommended_video_url(video_data, play_addr)
-                dash_video_url = _select_dash_video_url(video_data)
-                dash_audio_url = _select_dash_audio_url(video_data)
-
-                # 跳过没有播放地址的视频
-                if not selected_video_url:
-                    skipped_count += 1
-                    logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 无播放地址")
-                    continue
-
-                # 提取封面
-                cover_data = video_data.get('cover', {})
-                if isinstance(cover_data, dict):
-                    cover = cover_data.get('url_list', [''])[0]
-                else:
-                    cover = cover_data if cover_data else ''
-
-                if not cover:
-                    skipped_count += 1
-                    logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 无封面")
-                    continue
-
-                # 提取动态封面
-                dynamic_cover_data = video_data.get('dynamic_cover', {})
-                if isinstance(dynamic_cover_data, dict):
-                    dynamic_cover = dynamic_cover_data.get('url_list', [''])[0]
-                else:
-                    dynamic_cover = dynamic_cover_data if dynamic_cover_data else ''
-
-                origin_cover_data = video_data.get('origin_cover', {})
-                if isinstance(origin_cover_data, dict):
-                    origin_cover = origin_cover_data.get('url_list', [''])[0]
-                else:
-                    origin_cover = origin_cover_data if origin_cover_data else cover
-
-                play_addr_h264_data = video_data.get('play_addr_h264', {})
-                if isinstance(play_addr_h264_data, dict):
-                    play_addr_h264 = play_addr_h264_data.get('url_list', [''])[0]
-                else:
-                    play_addr_h264 = play_addr_h264_data if play_addr_h264_data else ''
-
-                play_addr_lowbr_data = video_data.get('play_addr_lowbr', {})
-                if isinstance(play_addr_lowbr_data, dict):
-                    play_addr_lowbr = play_addr_lowbr_data.get('url_list', [''])[0]
-                else:
-                    play_addr_lowbr = play_addr_lowbr_data if play_addr_lowbr_data else ''
-
-                download_addr_data = video_data.get('download_addr', {})
-                if isinstance(download_addr_data, dict):
-                    download_addr = download_addr_data.get('url_list', [''])[0]
-                else:
-                    download_addr = download_addr_data if download_addr_data else ''
-
-                # 提取作者头像
-                author_data = aweme.get('author', {})
-                avatar_data = author_data.get('avatar_thumb', {})
-                if isinstance(avatar_data, dict):
-                    avatar_thumb = avatar_data.get('url_list', [''])[0]
-                else:
-                    avatar_thumb = avatar_data if avatar_data else ''
-
-                author_key = (
-                    author_data.get('sec_uid')
-                    or author_data.get('uid')
-                    or author_data.get('unique_id')
-                    or author_data.get('nickname')
-                    or ''
-                )
-                if not aweme.get('aweme_id') or not author_key:
-                    skipped_count += 1
-                    logger.debug(f"跳过视频 {aweme.get('aweme_id')}: 缺少作品或作者信息")
-                    continue
-
-                video_info = {
-                    'aweme_id': aweme.get('aweme_id', ''),
-                    'desc': aweme.get('desc', ''),
-                    'create_time': aweme.get('create_time', 0),
-                    'media_type': 'video',
-                    'raw_media_type': 'video',
-                    'media_urls': [{'type': 'video', 'url': selected_video_url}],
-                    'bgm_url': dash_audio_url or _extract_music_info(aweme.get('music') or {}).get('play_url', ''),
-                    'cover_url': cover,
-                    'author': {
-                        'uid': author_data.get('uid', ''),
-                        'nickname': author_data.get('nickname', ''),
-                        'avatar_thumb': avatar_thumb,
-                        'sec_uid': author_data.get('sec_uid', ''),
-                    },
-                    'statistics': {
-                        'digg_count': (aweme.get('statistics') or {}).get('digg_count', 0),
-                        'comment_count': (aweme.get('statistics') or {}).get('comment_count', 0),
-                        'share_count': (aweme.get('statistics') or {}).get('share_count', 0),
-                        'play_count': (aweme.get('statistics') or {}).get('play_count', 0),
-                        'collect_count': (aweme.get('statistics') or {}).get('collect_count', 0),
-                    },
-                    'status': _extract_post_status(aweme),
-                    'video': {
-                        'cover': cover,
-                        'dynamic_cover': dynamic_cover,
-                        'origin_cover': origin_cover or cover,
-                        'play_addr': selected_video_url,
-                        'dash_addr': dash_video_url,
-                        'audio_addr': dash_audio_url,
-                        'preview_addr': _media_first_url(video_data.get('preview_addr')) or selected_video_url,
-                        'play_addr_h264': _media_first_url(video_data.get('play_addr_h264')),
-                        'play_addr_lowbr': _media_first_url(video_data.get('play_addr_lowbr')),
-                        'download_addr': _media_first_url(video_data.get('download_addr')),
-                        'width': video_data.get('width', 0),
-                        'height': video_data.get('height', 0),
-                        'duration': _raw_duration_value(video_data.get('duration', 0)),
-                        'duration_unit': 'milliseconds',
-                        'ratio': video_data.get('ratio', ''),
-                        'bit_rate': video_data.get('bit_rate') or [],
-                    },
-                    'music': {
-                        **_extract_music_info(aweme.get('music') or {}),
-                        'cover': (aweme.get('music') or {}).get('cover_large', {}).get('url_list', [''])[0] if isinstance((aweme.get('music') or {}).get('cover_large'), dict) else '',
-                    }
-                }
-
-                videos.append(video_info)
-            except Exception as e:
-                import traceback
-                logger.error(f"解析视频信息失败: {e}")
-                logger.error(traceback.format_exc())
-                continue
-
-        logger.info(f"[推荐视频] 返回 {len(videos)} 个有效视频, 跳过 {skipped_count} 个无效视频")
-
-        has_more = resp.get('has_more', False)
-        has_more_bool = has_more == 1 or has_more is True
-        next_cursor = (
-            resp.get('cursor')
-            or resp.get('max_cursor')
-            or resp.get('min_cursor')
-            or (cursor + 1 if has_more_bool else cursor)
-        )
+        logger.info(f"[推荐视频] 返回 {len(videos)} 个有效视频, 缓冲区剩余 {result['buffered']} 个")
 
         return jsonify({
             'success': True,
             'videos': videos,
-            'cursor': next_cursor,
-            'has_more': has_more_bool,
+            'cursor': result['cursor'],
+            'has_more': result['has_more'],
             'count': len(videos)
         })
 
@@ -6305,8 +6669,8 @@ def download_video_by_aweme_id():
         async def do_download():
             try:
                 if len(media_urls) == 1 and media_urls[0].get('type') == 'video':
-                    success = await asyncio.to_thread(
-                        user_manager.downloader.download_video,
+                    success = await _run_download(
+                        'download_video',
                         media_urls[0]['url'],
                         name,
                         aweme_id,
@@ -6317,10 +6681,12 @@ def download_video_by_aweme_id():
                         None,
                         False,
                         fallback_urls=video_fallback_urls,
+                        priority='interactive',
+                        task=task_id,
                     )
                 else:
-                    success = await asyncio.to_thread(
-                        user_manager.downloader.download_media_group,
+                    success = await _run_download(
+                        'download_media_group',
                         media_urls,
                         name,
                         aweme_id,
@@ -6330,6 +6696,8 @@ def download_video_by_aweme_id():
                         None,
                         None,
                         False,
+                        priority='interactive',
+                        task=task_id,
                     )
 
                 if success:
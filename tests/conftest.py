@@ -0,0 +1,50 @@
+import timeit
+
+import pytest
+
+from src.api import sign as douyin_sign
+
+
+class _FrozenTime:
+    @staticmethod
+    def time():
+        return 1700000000.123
+
+    @staticmethod
+    def time_ns():
+        return 1700000000123456789
+
+
+class _FrozenRandom:
+    @staticmethod
+    def random():
+        return 0.4242
+
+
+@pytest.fixture
+def frozen_sign(monkeypatch):
+    """固定 sign.py 的时间与随机数，使 a_bogus 输出可复现。"""
+    monkeypatch.setattr(douyin_sign, "time", _FrozenTime)
+    monkeypatch.setattr(douyin_sign, "random", _FrozenRandom)
+    return douyin_sign
+
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+
+    class _SimpleBenchmark:
+        """pytest-benchmark 未安装时的最小替身，只计时不做统计报告。"""
+
+        def __init__(self, number=20):
+            self.number = number
+            self.seconds_per_call = None
+
+        def __call__(self, func, *args, **kwargs):
+            result = func(*args, **kwargs)
+            self.seconds_per_call = timeit.timeit(lambda: func(*args, **kwargs), number=self.number) / self.number
+            return result
+
+    @pytest.fixture
+    def benchmark():
+        return _SimpleBenchmark()
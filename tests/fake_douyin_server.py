@@ -0,0 +1,440 @@
+"""离线压测用的抖音假服务器。
+
+实现 ``DouyinAPI`` 与下载器实际用到的接口形状：作品列表分页、作品详情、用户资料、
+评论与回复、推荐流，以及支持 Range 的媒体地址。所有数据由 ID 确定性生成，可注入
+固定延迟与带宽上限，用来在本机可复现地测量端到端批量下载吞吐。
+
+测试中作为上下文管理器使用::
+
+    with FakeDouyinServer(posts_per_user=40) as server:
+        Config.OFFLINE_HOST = server.base_url
+
+也可以单独运行，再把环境变量 ``DOUYIN_OFFLINE_HOST`` 指向它::
+
+    python tests/fake_douyin_server.py --port 8765 --latency-ms 50 --bandwidth-kbps 4096
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+
+from aiohttp import web
+
+BASE_CREATE_TIME = 1_700_000_000
+DEFAULT_SEC_UID = 'MS4wLjABAAAA_fake_user'
+MEDIA_CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FakeDouyinServer:
+    """在后台线程里运行的 aiohttp 假服务器。"""
+
+    def __init__(
+        self,
+        *,
+        posts_per_user: int = 60,
+        comments_per_aweme: int = 30,
+        replies_per_comment: int = 3,
+        media_size: int = 256 * 1024,
+        image_every: int = 5,
+        max_page_size: int = 20,
+        latency: float = 0.0,
+        bandwidth: int = 0,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        self.posts_per_user = posts_per_user
+        self.comments_per_aweme = comments_per_aweme
+        self.replies_per_comment = replies_per_comment
+        self.media_size = media_size
+        self.image_every = image_every
+        # 真实接口单页最多返回约 20 条，count 更大也会被截断
+        self.max_page_size = max_page_size
+        # 每个请求的固定延迟（秒）与每个连接的带宽上限（字节/秒，0 不限）
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.host = host
+        self.port = port
+        self.stats: dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._media_cache: dict[str, bytes] = {}
+        self._authors: dict[str, str] = {}
+        self._feed_offset = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    # ---------- 生命周期 ----------
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> str:
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                loop.run_until_complete(self._start_site())
+            except Exception as error:
+                errors.append(error)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self._runner.cleanup())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name='fake-douyin-server', daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        if errors:
+            raise errors[0]
+        return self.base_url
+
+    async def _start_site(self) -> None:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', self.handle_home)
+        app.router.add_route('HEAD', '/service/2/abtest_config/', self.handle_csrf)
+        app.router.add_get('/aweme/v1/web/aweme/post/', self.handle_post_list)
+        app.router.add_get('/aweme/v1/web/aweme/detail/', self.handle_detail)
+        app.router.add_get('/aweme/v1/web/user/profile/other/', self.handle_profile)
+        app.router.add_get('/aweme/v1/web/comment/list/', self.handle_comments)
+        app.router.add_get('/aweme/v1/web/comment/list/reply/', self.handle_replies)
+        app.router.add_post('/aweme/v2/web/module/feed/', self.handle_feed)
+        app.router.add_get('/media/{name}', self.handle_media)
+        return app
+
+    # ---------- 统计 ----------
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    # ---------- 数据生成 ----------
+
+    @staticmethod
+    def _user_seed(sec_uid: str) -> int:
+        return zlib.crc32(sec_uid.encode('utf-8')) % 90_000 + 10_000
+
+    def aweme_ids(self, sec_uid: str) -> list[str]:
+        seed = self._user_seed(sec_uid)
+        return [f'73{seed:05d}{index:012d}' for index in range(self.posts_per_user)]
+
+    def _index_of(self, aweme_id: str) -> int:
+        return int(aweme_id[-12:]) if aweme_id[-12:].isdigit() else 0
+
+    def _create_time(self, aweme_id: str) -> int:
+        # 越靠前的作品越新，与真实接口按时间倒序一致
+        return BASE_CREATE_TIME + (self.posts_per_user - self._index_of(aweme_id)) * 3600
+
+    def _user(self, base: str, sec_uid: str) -> dict:
+        return {
+            'uid': str(self._user_seed(sec_uid)),
+            'sec_uid': sec_uid,
+            'nickname': f'离线用户{self._user_seed(sec_uid)}',
+            'signature': '离线压测账号',
+            'aweme_count': self.posts_per_user,
+            'follower_count': 1000,
+            'following_count': 10,
+            'total_favorited': 5000,
+            'avatar_thumb': {'url_list': [f'{base}/media/avatar_{self._user_seed(sec_uid)}.jpeg']},
+            'avatar_larger': {'url_list': [f'{base}/media/avatar_{self._user_seed(sec_uid)}.jpeg']},
+        }
+
+    def make_aweme(self, base: str, aweme_id: str, sec_uid: str | None = None) -> dict:
+        sec_uid = sec_uid or self._authors.get(aweme_id, DEFAULT_SEC_UID)
+        index = self._index_of(aweme_id)
+        author = self._user(base, sec_uid)
+        cover = {'url_list': [f'{base}/media/{aweme_id}_cover.jpeg']}
+        aweme = {
+            'aweme_id': aweme_id,
+            'desc': f'离线作品 {index}',
+            'create_time': self._create_time(aweme_id),
+            'author': author,
+            'statistics': {'digg_count': index * 7, 'comment_count': self.comments_per_aweme, 'share_count': index},
+            'music': {'title': '原声', 'play_url': {'url_list': [f'{base}/media/{aweme_id}_music.mp3']}},
+        }
+        if self.image_every and index % self.image_every == self.image_every - 1:
+            aweme['aweme_type'] = 68
+            aweme['images'] = [
+                {'url_list': [f'{base}/media/{aweme_id}_{number}.jpeg'], 'width': 1080, 'height': 1440}
+                for number in range(2)
+            ]
+            aweme['video'] = {'cover': cover}
+        else:
+            play_addr = {'url_list': [f'{base}/media/{aweme_id}.mp4'], 'data_size': self.media_size}
+            aweme['aweme_type'] = 0
+            aweme['video'] = {
+                'cover': cover,
+                'play_addr': play_addr,
+                'bit_rate': [{'bit_rate': 2_000_000, 'gear_name': 'normal_1080_0', 'play_addr': play_addr}],
+                'duration': 15000,
+            }
+        return aweme
+
+    def media_bytes(self, name: str) -> bytes:
+        """按文件名确定性生成媒体内容，测试可据此校验下载结果。"""
+        data = self._media_cache.get(name)
+        if data is None:
+            block = hashlib.sha256(name.encode('utf-8')).digest() * 128
+            repeat = self.media_size // len(block) + 1
+            data = self._media_cache[name] = (block * repeat)[:self.media_size]
+        return data
+
+    # ---------- 处理函数 ----------
+
+    async def _delay(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def _json(self, payload: dict) -> web.Response:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self._count('bytes_sent', len(body))
+        return web.Response(body=body, content_type='application/json')
+
+    @staticmethod
+    def _base(request: web.Request) -> str:
+        return f'{request.scheme}://{request.host}'
+
+    @staticmethod
+    def _int_param(request: web.Request, name: str, default: int = 0) -> int:
+        try:
+            return int(request.query.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    async def handle_home(self, request: web.Request) -> web.Response:
+        self._count('home')
+        html = '<html><script>window._ssr = {"user_unique_id":"7300000000000000001"}</script></html>'
+        return web.Response(text=html, content_type='text/html')
+
+    async def handle_csrf(self, request: web.Request) -> web.Response:
+        self._count('csrf')
+        return web.Response(headers={'x-ware-csrf-token': '0001000000017f0fake,csrf'})
+
+    async def handle_post_list(self, request: web.Request) -> web.Response:
+        self._count('aweme_post')
+        await self._delay()
+        sec_uid = request.query.get('sec_user_id') or DEFAULT_SEC_UID
+        count = min(self.max_page_size, max(1, self._int_param(request, 'count', 18)))
+        max_cursor = self._int_param(request, 'max_cursor', 0)
+        ids = self.aweme_ids(sec_uid)
+        # max_cursor 为上一页最后一条作品的发布时间（毫秒），返回比它更早的作品
+        remaining = [aweme_id for aweme_id in ids if not max_cursor or self._create_time(aweme_id) * 1000 < max_cursor]
+        page = remaining[:count]
+        for aweme_id in page:
+            self._authors[aweme_id] = sec_uid
+        base = self._base(request)
+        return self._json({
+            'status_code': 0,
+            'aweme_list': [self.make_aweme(base, aweme_id, sec_uid) for aweme_id in page],
+            'has_more': 1 if len(remaining) > len(page) else 0,
+            'max_cursor': self._create_time(page[-1]) * 1000 if page else max_cursor,
+            'min_cursor': self._create_time(page[0]) * 1000 if page else 0,
+        })
+
+    async def handle_detail(self, request: web.Request) -> web.Response:
+        self._count('aweme_detail')
+        await self._delay()
+        aweme_id = request.query.get('aweme_id', '')
+        if not aweme_id.isdigit():
+            return self._json({'status_code': 0, 'aweme_detail': None, 'filter_detail': {'filter_reason': 'not_found'}})
+        return self._json({'status_code': 0, 'aweme_detail': self.make_aweme(self._base(request), aweme_id)})
+
+    async def handle_profile(self, request: web.Request) -> web.Response:
+        self._count('user_profile')
+        await self._delay()
+        sec_uid = request.query.get('sec_user_id') or DEFAULT_SEC_UID
+        return self._json({'status_code': 0, 'user': self._user(self._base(request), sec_uid)})
+
+    def _comment(self, base: str, aweme_id: str, cid: str, index: int, reply_total: int) -> dict:
+        return {
+            'cid': cid,
+            'aweme_id': aweme_id,
+            'text': f'离线评论 {index}',
+            'create_time': BASE_CREATE_TIME + index,
+            'digg_count': index,
+            'reply_comment_total': reply_total,
+            'user': self._user(base, DEFAULT_SEC_UID),
+        }
+
+    async def handle_comments(self, request: web.Request) -> web.Response:
+        self._count('comment_list')
+        await self._delay()
+        aweme_id = request.query.get('aweme_id', '')
+        cursor = max(0, self._int_param(request, 'cursor', 0))
+        count = max(1, self._int_param(request, 'count', 20))
+        end = min(self.comments_per_aweme, cursor + count)
+        base = self._base(request)
+        comments = [
+            self._comment(base, aweme_id, f'{aweme_id[-8:]}{index:06d}', index, self.replies_per_comment)
+            for index in range(cursor, end)
+        ]
+        return self._json({
+            'status_code': 0,
+            'comments': comments,
+            'cursor': end,
+            'has_more': 1 if end < self.comments_per_aweme else 0,
+            'total': self.comments_per_aweme,
+        })
+
+    async def handle_replies(self, request: web.Request) -> web.Response:
+        self._count('comment_reply')
+        await self._delay()
+        aweme_id = request.query.get('item_id') or request.query.get('aweme_id', '')
+        comment_id = request.query.get('comment_id', '')
+        cursor = max(0, self._int_param(request, 'cursor', 0))
+        count = max(1, self._int_param(request, 'count', 6))
+        end = min(self.replies_per_comment, cursor + count)
+        base = self._base(request)
+        replies = [
+            dict(self._comment(base, aweme_id, f'{comment_id}{index:02d}', index, 0), reply_id=comment_id)
+            for index in range(cursor, end)
+        ]
+        return self._json({
+            'status_code': 0,
+            'comments': replies,
+            'cursor': end,
+            'has_more': 1 if end < self.replies_per_comment else 0,
+            'total': self.replies_per_comment,
+        })
+
+    async def handle_feed(self, request: web.Request) -> web.Response:
+        self._count('feed')
+        await self._delay()
+        form = await request.post()
+        try:
+            count = max(1, int(form.get('count') or request.query.get('count') or 10))
+        except ValueError:
+            count = 10
+        ids = self.aweme_ids(DEFAULT_SEC_UID)
+        page = [ids[(self._feed_offset + offset) % len(ids)] for offset in range(count)] if ids else []
+        self._feed_offset += count
+        base = self._base(request)
+        return self._json({'status_code': 0, 'aweme_list': [self.make_aweme(base, aweme_id) for aweme_id in page], 'has_more': 1})
+
+    async def handle_media(self, request: web.Request) -> web.StreamResponse:
+        name = request.match_info['name']
+        self._count('media')
+        await self._delay()
+        data = self.media_bytes(name)
+        total = len(data)
+        start, end = 0, total - 1
+        status = 200
+        etag = f'"{zlib.crc32(name.encode("utf-8")):08x}-{total:x}"'
+        range_header = request.headers.get('Range', '')
+        if_range = request.headers.get('If-Range', '')
+        if if_range and if_range != etag:
+            # 文件已变化，按 RFC 9110 返回完整内容
+            range_header = ''
+        if range_header:
+            match = _RANGE_RE.match(range_header.strip())
+            if not match or (not match.group(1) and not match.group(2)):
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{total}'})
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), total - 1) if match.group(2) else total - 1
+            else:
+                start = max(0, total - int(match.group(2)))
+            if start >= total or start > end:
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{total}'})
+            status = 206
+
+        content_type = 'video/mp4' if name.endswith('.mp4') else 'audio/mpeg' if name.endswith('.mp3') else 'image/jpeg'
+        response = web.StreamResponse(status=status)
+        response.content_type = content_type
+        response.content_length = end - start + 1
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['ETag'] = etag
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{total}'
+        await response.prepare(request)
+        self._count('media_requested_bytes', end - start + 1)
+
+        offset = start
+        try:
+            while offset <= end:
+                chunk = data[offset:min(end + 1, offset + MEDIA_CHUNK_SIZE)]
+                sent_at = time.monotonic()
+                await response.write(chunk)
+                offset += len(chunk)
+                self._count('media_bytes', len(chunk))
+                if self.bandwidth > 0:
+                    # 按带宽上限补足每块应耗的时间
+                    await asyncio.sleep(max(0.0, len(chunk) / self.bandwidth - (time.monotonic() - sent_at)))
+            await response.write_eof()
+        except ConnectionError:
+            # 客户端只读所需范围后主动断开（如分段下载的第一段），属正常情况
+            self._count('media_aborted')
+        return response
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='离线抖音假服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--posts', type=int, default=60, help='每个用户的作品数')
+    parser.add_argument('--media-kb', type=int, default=1024, help='每个媒体文件大小（KB）')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='每个请求的固定延迟')
+    parser.add_argument('--bandwidth-kbps', type=int, default=0, help='每个连接的带宽上限（KB/s），0 不限')
+    args = parser.parse_args()
+
+    server = FakeDouyinServer(
+        posts_per_user=args.posts,
+        media_size=args.media_kb * 1024,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1024,
+        host=args.host,
+        port=args.port,
+    )
+    server.start()
+    print(f'假服务器已启动: {server.base_url}（把 DOUYIN_OFFLINE_HOST 指向它）')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
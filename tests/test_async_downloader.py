@@ -0,0 +1,208 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_douyin_server import FakeDouyinServer
+from src.config.config import Config
+from src.downloader import resume, segmented
+from src.downloader.async_downloader import AsyncDouyinDownloader, LoopEvent, get_download_engine, wait_while_paused
+from src.downloader.downloader import DouyinDownloader
+
+MEDIA_SIZE = 2 * 1024 * 1024 + 321
+_CONFIG_FIELDS = ('CONFIG_FILE', 'DOWNLOAD_DIR', 'SEGMENTED_DOWNLOAD_PARTS', 'SEGMENTED_DOWNLOAD_MIN_MB', 'DOWNLOAD_ENGINE')
+
+
+class _Api:
+    cookie = ''
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeDouyinServer(media_size=MEDIA_SIZE) as fake:
+        yield fake
+
+
+@pytest.fixture
+def engines(tmp_path):
+    saved = {field: getattr(Config, field) for field in _CONFIG_FIELDS}
+    Config.CONFIG_FILE = str(tmp_path / 'config.json')
+    Config.DOWNLOAD_DIR = str(tmp_path / 'downloads')
+    Config.SEGMENTED_DOWNLOAD_PARTS = 4
+    Config.SEGMENTED_DOWNLOAD_MIN_MB = 1
+    try:
+        downloader = DouyinDownloader(_Api())
+        yield downloader, AsyncDouyinDownloader(downloader)
+    finally:
+        for field, value in saved.items():
+            setattr(Config, field, value)
+
+
+def _run(engine, coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await engine.close()
+
+    return asyncio.run(runner())
+
+
+def _files(pattern='*.mp4'):
+    return sorted(Path(Config.DOWNLOAD_DIR).rglob(pattern))
+
+
+def test_engine_selection_falls_back_to_thread():
+    saved = Config.DOWNLOAD_ENGINE
+    try:
+        Config.DOWNLOAD_ENGINE = 'async'
+        assert get_download_engine() == 'async'
+        Config.DOWNLOAD_ENGINE = 'bogus'
+        assert get_download_engine() == 'thread'
+    finally:
+        Config.DOWNLOAD_ENGINE = saved
+    assert Config.normalize_download_engine(' ASYNC ') == 'async'
+
+
+def test_loop_event_wakes_waiters_from_other_threads():
+    async def run():
+        pause_event = LoopEvent()
+        cancel_event = LoopEvent()
+        pause_event.set()
+        threading.Timer(0.05, pause_event.clear).start()
+        started_at = time.monotonic()
+        await wait_while_paused(pause_event, cancel_event)
+        resumed_after = time.monotonic() - started_at
+
+        pause_event.set()
+        threading.Timer(0.05, cancel_event.set).start()
+        await asyncio.wait_for(wait_while_paused(pause_event, cancel_event), 2)
+        await asyncio.wait_for(cancel_event.wait(), 1)
+        return resumed_after
+
+    assert 0.04 <= asyncio.run(run()) < 1
+
+
+def test_async_video_download_matches_source(server, engines):
+    _, engine = engines
+    name = '7300000000000000201.mp4'
+    before = server.snapshot().get('media', 0)
+    progress = []
+
+    ok = _run(engine, engine.download_video(f'{server.base_url}/media/{name}', '作者/异步', '7300000000000000201',
+                                            progress_callback=progress.append))
+
+    assert ok
+    files = _files()
+    assert [path.name for path in files] == ['异步.mp4']
+    assert files[0].read_bytes() == server.media_bytes(name)
+    assert server.snapshot()['media'] - before == 4
+    assert progress[-1]['status'] == 'completed'
+    assert progress[-1]['bytes_downloaded'] == MEDIA_SIZE
+
+
+
+def test_async_file_writes_run_off_the_event_loop(server, engines, monkeypatch):
+    downloader, engine = engines
+    write_threads = set()
+    original_write_at = segmented.PositionalFile.write_at
+
+    def write_at(self, offset, data):
+        write_threads.add(threading.get_ident())
+        original_write_at(self, offset, data)
+
+    def on_io_thread(method):
+        def wrapper(*args, **kwargs):
+            write_threads.add(threading.get_ident())
+            return method(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(segmented.PositionalFile, 'write_at', write_at)
+    # 已下载检查、下载记录与改名等账目操作同样不在事件循环线程执行
+    for method in ('_is_aweme_downloaded', '_save_download_record', '_commit_part'):
+        monkeypatch.setattr(downloader, method, on_io_thread(getattr(downloader, method)))
+
+    async def run():
+        loop_thread = threading.get_ident()
+        ok = await engine.download_video(f'{server.base_url}/media/7300000000000000204.mp4', '作者/写线程',
+                                         '7300000000000000204')
+        return ok, loop_thread
+
+    ok, loop_thread = _run(engine, run())
+    assert ok
+    assert write_threads and loop_thread not in write_threads
+    assert _files()[0].read_bytes() == server.media_bytes('7300000000000000204.mp4')
+
+def test_async_media_group_and_shared_download_record(server, engines):
+    downloader, engine = engines
+    urls = [
+        {'url': f'{server.base_url}/media/7300000000000000202_1.jpeg', 'type': 'image'},
+        {'url': f'{server.base_url}/media/7300000000000000202_2.jpeg', 'type': 'image'},
+    ]
+
+    assert _run(engine, engine.download_media_group(urls, '作者/图集_7300000000000000202', '7300000000000000202'))
+
+    assert [path.name for path in _files('*.jpg')] == ['图集_7300000000000000202_01.jpg', '图集_7300000000000000202_02.jpg']
+    assert _files('*.jpg')[1].read_bytes() == server.media_bytes('7300000000000000202_2.jpeg')
+    # 线程版引擎看到同一份下载记录，不会重复下载
+    assert downloader._is_aweme_downloaded('7300000000000000202', '作者')
+
+
+def test_many_concurrent_transfers_do_not_use_threads(server, engines):
+    _, engine = engines
+    Config.SEGMENTED_DOWNLOAD_PARTS = 1
+    threads_before = threading.active_count()
+    peak_threads = [threads_before]
+
+    async def watch(stop):
+        while not stop.is_set():
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        stop = asyncio.Event()
+        watcher = asyncio.ensure_future(watch(stop))
+        results = await asyncio.gather(*(
+            engine.download_video(f'{server.base_url}/media/{7300000000000001000 + index}.mp4', f'作者/并发{index}',
+                                  str(7300000000000001000 + index))
+            for index in range(48)
+        ))
+        stop.set()
+        await watcher
+        return results
+
+    assert all(_run(engine, run()))
+    assert len(_files()) == 48
+    # aiohttp 默认解析器可能用到少量线程，但不会随并发传输数增长
+    assert peak_threads[0] - threads_before < 8
+
+
+def test_async_cancel_keeps_part_and_thread_engine_resumes(server, engines):
+    downloader, engine = engines
+    name = '7300000000000000203.mp4'
+    url = f'{server.base_url}/media/{name}'
+    # 每个分段约 1 秒，确保下载中途至少报告一次进度
+    server.bandwidth = 512 * 1024
+    cancel_event = LoopEvent()
+
+    def on_progress(payload):
+        if payload.get('bytes_downloaded', 0) > MEDIA_SIZE // 4:
+            cancel_event.set()
+
+    try:
+        ok = _run(engine, engine.download_video(url, '作者/切换引擎', '7300000000000000203',
+                                                cancel_event=cancel_event, progress_callback=on_progress))
+    finally:
+        server.bandwidth = 0
+    assert ok is False
+    part = _files('*.part')[0]
+    assert 0 < resume.ResumeJournal.load(str(part)).completed_bytes() < MEDIA_SIZE
+
+    assert downloader.download_video(url, '作者/切换引擎', '7300000000000000203')
+    assert _files()[0].read_bytes() == server.media_bytes(name)
+    assert _files('*.part*') == []
@@ -0,0 +1,125 @@
+import asyncio
+import sys
+import tracemalloc
+
+from src.user.aweme_record import AwemeRecord
+from src.user.user_manager import DouyinUserManager
+
+
+def _user_manager(api=None):
+    manager = DouyinUserManager.__new__(DouyinUserManager)
+    manager.debug_mode = False
+    manager.api = api
+    return manager
+
+
+def _video_post(index=0):
+    return {
+        'aweme_id': f'73800112233445566{index:02d}',
+        'desc': f'测试作品 {index}',
+        'create_time': 1718000000 + index,
+        'author': {
+            'nickname': '作者',
+            'sec_uid': 'MS4wLjABAAAA',
+            'avatar_thumb': {'url_list': ['https://p3.douyinpic.com/avatar.jpeg']},
+            'signature': '签名' * 200,
+        },
+        'music': {'title': '原声', 'play_url': {'url_list': ['https://sf3.douyinvod.com/music.mp3']}},
+        'video': {
+            'cover': {'url_list': [f'https://p3.douyinpic.com/cover_{index}.jpeg']},
+            'play_addr': {'url_list': [f'https://v3.douyinvod.com/play_{index}.mp4']},
+            'download_addr': {'url_list': [f'https://v3.douyinvod.com/playwm_{index}.mp4?watermark=1']},
+            'bit_rate': [
+                {'bit_rate': 2_000_000 + level, 'play_addr': {'url_list': [f'https://v3.douyinvod.com/{index}_{level}.mp4']}}
+                for level in range(6)
+            ],
+        },
+    }
+
+
+def test_project_video_post_keeps_download_fields():
+    manager = _user_manager()
+    post = _video_post()
+    record = manager.project_aweme(post)
+
+    assert isinstance(record, AwemeRecord)
+    assert not hasattr(record, '__dict__')
+    assert record.aweme_id == post['aweme_id']
+    assert record.desc == '测试作品 0'
+    assert record.author_nickname == '作者'
+    assert record.author_avatar == 'https://p3.douyinpic.com/avatar.jpeg'
+    assert record.cover_url == 'https://p3.douyinpic.com/cover_0.jpeg'
+    assert record.media_info() == manager.get_media_info(post)
+    assert list(record.candidate_urls) == manager.get_video_download_urls(post['video'])
+    assert record.primary_url == record.candidate_urls[0]
+
+
+def test_project_image_post_has_no_video_candidates():
+    manager = _user_manager()
+    post = {
+        'aweme_id': '7380011223344556699',
+        'desc': '图文',
+        'images': [
+            {'url_list': ['https://p3.douyinpic.com/img_small.webp', 'https://p3.douyinpic.com/img_1.jpeg']},
+            {'url_list': ['https://p3.douyinpic.com/img_2.jpeg']},
+        ],
+    }
+    record = manager.project_aweme(post)
+
+    assert record.media_type == 'image'
+    assert [item['url'] for item in record.media_urls] == [
+        'https://p3.douyinpic.com/img_1.jpeg',
+        'https://p3.douyinpic.com/img_2.jpeg',
+    ]
+    assert record.candidate_urls == ()
+    assert record.cover_url == 'https://p3.douyinpic.com/img_small.webp'
+    assert manager.project_aweme({'desc': '缺少 ID'}) is None
+
+
+def test_media_info_returns_independent_copies():
+    record = _user_manager().project_aweme(_video_post())
+    _, urls = record.media_info()
+    urls[0]['url'] = 'changed'
+    assert record.media_urls[0]['url'] != 'changed'
+
+
+class _PagedApi:
+    def __init__(self, pages):
+        self.pages = list(pages)
+
+    async def common_request(self, uri, params, headers, skip_sign=False):
+        return self.pages.pop(0), True
+
+
+def test_get_user_videos_projects_each_page_once():
+    pages = [
+        {'aweme_list': [_video_post(i) for i in range(3)], 'has_more': 1, 'max_cursor': 10},
+        {'aweme_list': [_video_post(i) for i in range(3, 5)] + [{'desc': 'bad'}], 'has_more': 0, 'max_cursor': 0},
+    ]
+    manager = _user_manager(_PagedApi(pages))
+    batches = []
+
+    records = asyncio.run(manager.get_user_videos('sec', on_batch=batches.append))
+
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert all(isinstance(record, AwemeRecord) for record in records)
+    assert [record.aweme_id for record in records] == [_video_post(i)['aweme_id'] for i in range(5)]
+
+
+def test_records_retain_less_memory_than_raw_posts():
+    manager = _user_manager()
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        raw_posts = [_video_post(i) for i in range(200)]
+        raw_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        records = manager.project_awemes(raw_posts)
+        del raw_posts
+        record_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    assert len(records) == 200
+    assert record_bytes < raw_bytes / 3
+    assert sys.getsizeof(records[0]) < sys.getsizeof(_video_post())
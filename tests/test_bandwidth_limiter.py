@@ -0,0 +1,206 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_douyin_server import FakeDouyinServer
+from src.config.config import Config
+from src.downloader import bandwidth
+from src.downloader.downloader import DouyinDownloader
+from src.downloader.scheduler import DownloadScheduler
+
+MEDIA_SIZE = 1536 * 1024
+_CONFIG_FIELDS = (
+    'CONFIG_FILE', 'DOWNLOAD_DIR', 'SEGMENTED_DOWNLOAD_PARTS', 'SEGMENTED_DOWNLOAD_MIN_MB',
+    'BANDWIDTH_LIMIT_KB', 'BANDWIDTH_TASK_LIMIT_KB', 'BANDWIDTH_PROXY_RESERVE_PERCENT',
+)
+
+
+class _Api:
+    cookie = ''
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeDouyinServer(media_size=MEDIA_SIZE) as fake:
+        yield fake
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    saved = {field: getattr(Config, field) for field in _CONFIG_FIELDS}
+    Config.CONFIG_FILE = str(tmp_path / 'config.json')
+    Config.DOWNLOAD_DIR = str(tmp_path / 'downloads')
+    Config.SEGMENTED_DOWNLOAD_PARTS = 2
+    Config.SEGMENTED_DOWNLOAD_MIN_MB = 1
+    try:
+        yield DouyinDownloader(_Api())
+    finally:
+        for field, value in saved.items():
+            setattr(Config, field, value)
+
+
+def test_token_bucket_allows_burst_then_converts_debt_to_wait():
+    clock = _Clock()
+    bucket = bandwidth.TokenBucket(1000, clock=clock)
+    assert bucket.reserve(500) == 0
+    assert bucket.reserve(1000) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.reserve(100) == pytest.approx(0.1)
+
+    bucket.set_rate(0)
+    assert bucket.reserve(10 ** 9) == 0
+    # 重新限速时不继承不限速期间的流量
+    bucket.set_rate(1000)
+    assert bucket.reserve(100) == pytest.approx(0.1)
+
+
+def test_proxy_stream_reserves_share_of_global_limit():
+    limiter = bandwidth.BandwidthLimiter(limits=lambda: (1000, 0, 0.25))
+    assert limiter.stats()['download_bps'] == 1000
+    with limiter.proxy_stream():
+        with limiter.proxy_stream():
+            assert limiter.stats()['download_bps'] == 750
+        assert limiter.stats()['proxy_streams'] == 1
+    assert limiter.stats()['download_bps'] == 1000
+
+    unlimited = bandwidth.BandwidthLimiter(limits=lambda: (0, 0, 0.25))
+    with unlimited.proxy_stream():
+        assert unlimited.delay(10 ** 9) == 0
+
+
+def test_proxy_reserve_without_global_limit_uses_measured_capacity():
+    clock = _Clock()
+    limiter = bandwidth.BandwidthLimiter(limits=lambda: (0, 0, 0.25), clock=clock)
+    with limiter.proxy_stream():
+        # 还没测到容量：不预留，调试接口说明原因
+        assert limiter.delay(10 ** 6) == 0
+        assert limiter.stats()['proxy_reserve_base'] == 'none'
+
+    # 空闲一段时间后重新开窗：不限速下载 1 秒内合计 4000 字节
+    clock.now += bandwidth.CAPACITY_IDLE_GAP + 1
+    for _ in range(4):
+        limiter.delay(1000)
+        clock.now += 0.25
+    limiter.delay(0)
+    stats = limiter.stats()
+    assert stats['link_capacity_bps'] == 4000
+    assert stats['download_bps'] == 0
+    assert stats['proxy_reserve_base'] == 'measured'
+
+    with limiter.proxy_stream():
+        assert limiter.stats()['download_bps'] == 3000
+        # 限速期间不更新容量，不会越限越低
+        for _ in range(8):
+            limiter.delay(100)
+            clock.now += 0.25
+        assert limiter.stats()['link_capacity_bps'] == 4000
+        assert limiter.delay(3000) > 0
+    assert limiter.stats()['download_bps'] == 0
+
+    configured = bandwidth.BandwidthLimiter(limits=lambda: (1000, 0, 0.25), clock=clock)
+    assert configured.stats()['proxy_reserve_base'] == 'limit'
+
+def test_task_limits_apply_per_task_and_can_be_overridden():
+    limiter = bandwidth.BandwidthLimiter(limits=lambda: (0, 1000, 0.2))
+    limiter.delay(500, 'a')
+    limiter.delay(500, 'b')
+    # 每个任务有自己的桶，互不影响；不属于任何任务的流量只受全局限制
+    assert limiter.delay(1000, 'a') == pytest.approx(1.0, abs=0.05)
+    assert limiter.delay(1000, 'b') == pytest.approx(1.0, abs=0.05)
+    assert limiter.delay(10 ** 6) == 0
+
+    # 正在等待的凭据按新的单任务上限重新计算
+    ticket = limiter._acquire(1000, 'b')
+    limiter.set_task_limit('b', 0)
+    assert limiter._remaining(ticket) == 0
+    assert limiter.delay(10 ** 6, 'b') == 0
+    limiter.set_task_limit('b', None)
+    assert limiter.stats()['task_limits'] == {}
+    assert limiter.delay(10 ** 6, 'b') > 100
+
+
+def test_scheduler_slot_binds_task_for_worker_threads():
+    scheduler = DownloadScheduler(limits=lambda: (2, 2))
+
+    async def run():
+        async with scheduler.slot(task='batch-1'):
+            inside = await asyncio.to_thread(bandwidth.current_task)
+        return inside, bandwidth.current_task()
+
+    assert asyncio.run(run()) == ('batch-1', '')
+
+
+def test_global_limit_throttles_segmented_download(server, downloader):
+    Config.BANDWIDTH_LIMIT_KB = 1024
+    started_at = time.monotonic()
+    assert downloader.download_video(f'{server.base_url}/media/7300000000000000301.mp4', '作者/限速', '7300000000000000301')
+    elapsed = time.monotonic() - started_at
+
+    # 1.5MB 按 1MB/s 下载，扣掉 0.5 秒的突发额度至少要 1 秒
+    assert elapsed >= 0.9
+    files = list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4'))
+    assert files[0].read_bytes() == server.media_bytes('7300000000000000301.mp4')
+
+
+def test_raising_limit_at_runtime_speeds_up_running_download(server, downloader):
+    Config.BANDWIDTH_LIMIT_KB = 128
+    result = []
+    worker = threading.Thread(target=lambda: result.append(downloader.download_video(
+        f'{server.base_url}/media/7300000000000000302.mp4', '作者/调速', '7300000000000000302')))
+    started_at = time.monotonic()
+    worker.start()
+    time.sleep(0.3)
+    # 按 128KB/s 需要 10 秒以上；解除限速后正在进行的下载马上提速
+    Config.BANDWIDTH_LIMIT_KB = 0
+    worker.join(10)
+    assert result == [True]
+    assert time.monotonic() - started_at < 2.5
+
+
+def test_throttle_wait_returns_when_stopped():
+    limiter = bandwidth.BandwidthLimiter(limits=lambda: (1000, 0, 0.2))
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    started_at = time.monotonic()
+    limiter.throttle(100_000, '', stop.is_set)
+    assert time.monotonic() - started_at < 1
+
+    async def run():
+        async_stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, async_stop.set)
+        await limiter.athrottle(100_000, should_stop=async_stop.is_set)
+
+    started_at = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started_at < 1
+
+
+def test_cancel_is_not_blocked_by_throttled_segments(server, downloader):
+    Config.BANDWIDTH_LIMIT_KB = 1
+    cancel_event = threading.Event()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(downloader.download_video(
+        f'{server.base_url}/media/7300000000000000303.mp4', '作者/限速取消', '7300000000000000303',
+        cancel_event=cancel_event)))
+    worker.start()
+    time.sleep(0.3)
+    started_at = time.monotonic()
+    # 每个 256KB 分段块按 1KB/s 要等几分钟，取消后应在一个等待周期内返回
+    cancel_event.set()
+    worker.join(10)
+    assert result == [False]
+    assert time.monotonic() - started_at < 2
@@ -0,0 +1,198 @@
+import asyncio
+import time
+
+from src.api.api import DouyinAPI
+from src.api.comment_tree import CommentTreeLoader, comment_items
+
+
+class _CommentApi:
+    """按 cid 生成评论与回复，记录每次上游请求并统计最大并发。"""
+
+    def __init__(self, comments=12, reply_delay=0.05, verify_on=None):
+        self.comments = comments
+        self.reply_delay = reply_delay
+        self.verify_on = verify_on
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def get_comments(self, aweme_id, count=20, cursor=0):
+        self.calls.append(('comments', aweme_id, cursor, count))
+        end = min(self.comments, cursor + count)
+        return {
+            'status_code': 0,
+            'comments': [
+                {'cid': f'c{index}', 'text': f'评论{index}', 'reply_comment_total': 0 if index % 3 == 2 else 2}
+                for index in range(cursor, end)
+            ],
+            'cursor': end,
+            'has_more': 1 if end < self.comments else 0,
+            'total': self.comments,
+        }, True
+
+    async def get_comment_replies(self, aweme_id, comment_id, count=6, cursor=0):
+        self.calls.append(('replies', comment_id, cursor, count))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.reply_delay)
+        finally:
+            self.active -= 1
+        if comment_id == self.verify_on:
+            return {'_need_verify': True, 'message': '需要验证'}, False
+        return {'status_code': 0, 'comments': [{'cid': f'{comment_id}-r{cursor}'}], 'cursor': cursor + 1, 'has_more': 0}, True
+
+
+def _reply_calls(api):
+    return [call for call in api.calls if call[0] == 'replies']
+
+
+def test_load_tree_prefetches_top_replies_concurrently():
+    api = _CommentApi(comments=12, reply_delay=0.05)
+    loader = CommentTreeLoader(api, reply_prefetch=4, concurrency=2)
+    events = []
+
+    started = time.monotonic()
+    resp, success = asyncio.run(loader.load_tree(
+        'a1',
+        count=10,
+        on_comments=lambda resp, ok: events.append(('comments', len(comment_items(resp)))),
+        on_replies=lambda comment_id, resp, ok: events.append(('replies', comment_id)),
+    ))
+    elapsed = time.monotonic() - started
+
+    assert success
+    assert events[0] == ('comments', 10)
+    # 跳过没有回复的 c2，取前 4 条有回复的评论
+    assert sorted(event[1] for event in events[1:]) == ['c0', 'c1', 'c3', 'c4']
+    assert api.max_active == 2
+    assert elapsed < 0.05 * 4
+    assert loader.stats()['prefetched_reply_pages'] == 4
+
+
+def test_prefetched_replies_are_served_from_cache_regardless_of_count():
+    api = _CommentApi()
+    loader = CommentTreeLoader(api, reply_prefetch=2)
+
+    async def run():
+        await loader.load_tree('a1')
+        first = await loader.get_replies('a1', 'c0', count=10)
+        again = await loader.get_comments('a1', count=5)
+        return first, again
+
+    (replies, ok), (comments, comments_ok) = asyncio.run(run())
+    assert ok and comments_ok
+    assert comment_items(replies)[0]['cid'] == 'c0-r0'
+    assert len(comment_items(comments)) == 12
+    assert len(_reply_calls(api)) == 2
+    assert len([call for call in api.calls if call[0] == 'comments']) == 1
+
+
+def test_concurrent_requests_for_same_page_share_one_upstream_call():
+    api = _CommentApi()
+    loader = CommentTreeLoader(api, reply_prefetch=0)
+
+    async def run():
+        return await asyncio.gather(*(loader.get_replies('a1', 'c1') for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert all(ok for _, ok in results)
+    assert len(_reply_calls(api)) == 1
+
+
+def test_cache_expires_and_invalidates():
+    api = _CommentApi()
+    loader = CommentTreeLoader(api, reply_prefetch=0, ttl=0.01)
+
+    async def run():
+        await loader.get_comments('a1')
+        await asyncio.sleep(0.02)
+        await loader.get_comments('a1')
+        loader.ttl = 60
+        await loader.get_comments('a2')
+        loader.invalidate('a2')
+        await loader.get_comments('a2')
+
+    asyncio.run(run())
+    assert [call[1] for call in api.calls] == ['a1', 'a1', 'a2', 'a2']
+
+
+def test_failed_pages_are_not_cached_and_verify_stops_streaming():
+    api = _CommentApi(reply_delay=0.0, verify_on='c0')
+    loader = CommentTreeLoader(api, reply_prefetch=5, concurrency=1)
+    seen = []
+
+    asyncio.run(loader.load_tree('a1', on_replies=lambda comment_id, resp, ok: seen.append((comment_id, ok))))
+    assert seen == [('c0', False)]
+
+    asyncio.run(loader.get_replies('a1', 'c0'))
+    assert [call[1] for call in _reply_calls(api)].count('c0') == 2
+
+
+def test_comment_page_loaded_during_write_is_dropped_after_write():
+    api = DouyinAPI('')
+    upstream = _CommentApi(comments=1)
+    api.get_comments = upstream.get_comments
+
+    async def fake_digg(aweme_id, comment_id, liked, level):
+        # 点赞请求还没返回时，别的请求把旧评论页写进了缓存
+        await api.comment_tree.get_comments(aweme_id)
+        return {'status_code': 0}, True
+
+    api._send_comment_digg = fake_digg
+
+    async def run():
+        await api.set_comment_liked('a1', 'c0', True)
+        return await api.comment_tree.get_comments('a1')
+
+    _, success = asyncio.run(run())
+    assert success
+    assert [call[0] for call in upstream.calls] == ['comments', 'comments']
+
+
+def _page_payload(resp, success, fallback):
+    if success:
+        return {'success': True, 'comments': [item['cid'] for item in comment_items(resp)]}
+    return {'success': False, 'message': fallback}
+
+
+def test_stream_tree_emits_comments_then_replies_then_done():
+    api = _CommentApi(comments=4, reply_delay=0.01)
+    loader = CommentTreeLoader(api, reply_prefetch=2)
+    emitted = []
+
+    success = asyncio.run(loader.stream_tree(
+        'a1', lambda event, data: emitted.append((event, data)), _page_payload, request_id='r1', count=4,
+    ))
+
+    assert success
+    assert [event for event, _ in emitted] == [
+        'comment_tree_comments', 'comment_tree_replies', 'comment_tree_replies', 'comment_tree_done',
+    ]
+    assert emitted[0][1] == {'request_id': 'r1', 'aweme_id': 'a1', 'success': True, 'comments': ['c0', 'c1', 'c2', 'c3']}
+    replies = sorted((data['comment_id'], tuple(data['comments'])) for _, data in emitted[1:3])
+    assert replies == [('c0', ('c0-r0',)), ('c1', ('c1-r0',))]
+    assert all(data['request_id'] == 'r1' and data['aweme_id'] == 'a1' for _, data in emitted)
+    assert emitted[-1][1] == {'request_id': 'r1', 'aweme_id': 'a1', 'success': True}
+
+
+def test_stream_tree_reports_failures_and_still_finishes():
+    api = _CommentApi(comments=3, verify_on='c0')
+    loader = CommentTreeLoader(api, reply_prefetch=2, concurrency=1)
+    emitted = []
+
+    asyncio.run(loader.stream_tree('a1', lambda event, data: emitted.append((event, data)), _page_payload, request_id='r2'))
+
+    # 验证失败后不再推送剩余回复，但仍以 done 收尾
+    assert [event for event, _ in emitted] == ['comment_tree_comments', 'comment_tree_replies', 'comment_tree_done']
+    assert emitted[1][1]['success'] is False
+    assert emitted[1][1]['message'] == '获取评论回复失败，请稍后重试'
+
+    async def broken(aweme_id, count=20, cursor=0):
+        raise RuntimeError('boom')
+
+    api.get_comments = broken
+    emitted.clear()
+    success = asyncio.run(loader.stream_tree('a2', lambda event, data: emitted.append((event, data)), _page_payload))
+    assert success is False
+    assert emitted == [('comment_tree_done', {'request_id': '', 'aweme_id': 'a2', 'success': False})]
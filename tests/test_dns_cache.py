@@ -0,0 +1,90 @@
+import socket
+import time
+
+import pytest
+import requests
+
+from src.utils import dns_cache, warmup
+from src.utils.dns_cache import DnsCache
+
+
+class _Resolver:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.calls.append(host)
+        if host == 'missing.invalid':
+            raise socket.gaierror('not found')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', port))]
+
+
+def test_cache_hits_within_ttl_and_expires():
+    resolver = _Resolver()
+    cache = DnsCache(resolver, ttl=0.05)
+
+    first = cache.getaddrinfo('www.douyin.com', 443)
+    first.clear()  # 调用方修改返回值不影响缓存
+    assert cache.getaddrinfo('WWW.douyin.com.', 443)[0][4] == ('10.0.0.1', 443)
+    assert resolver.calls == ['www.douyin.com']
+    time.sleep(0.06)
+    cache.getaddrinfo('www.douyin.com', 443)
+    assert len(resolver.calls) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_ip_literals_and_failures_are_not_cached():
+    resolver = _Resolver()
+    cache = DnsCache(resolver)
+    cache.getaddrinfo('127.0.0.1', 80)
+    cache.getaddrinfo('127.0.0.1', 80)
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.getaddrinfo('missing.invalid', 443)
+    assert resolver.calls == ['127.0.0.1', '127.0.0.1', 'missing.invalid', 'missing.invalid']
+    assert cache.stats()['entries'] == 0
+
+
+def test_install_wraps_socket_getaddrinfo_once():
+    original = socket.getaddrinfo
+    try:
+        cache = dns_cache.install(ttl=60)
+        assert socket.getaddrinfo == cache.getaddrinfo
+        assert dns_cache.install(ttl=30) is cache
+        assert cache.ttl == 30
+        socket.getaddrinfo('localhost', 80)
+        socket.getaddrinfo('localhost', 80)
+        assert cache.stats()['hits'] >= 1
+    finally:
+        dns_cache.uninstall()
+    assert socket.getaddrinfo is original
+    assert dns_cache.get_dns_cache() is None
+
+
+def test_warm_hosts_reports_dns_and_connect_timings():
+    connected = []
+
+    def connect(host):
+        connected.append(host)
+        if host == 'localhost':
+            return 200
+        raise requests.ConnectionError('refused')
+
+    report = warmup.warm_hosts(['https://localhost/path', 'localhost', 'missing.invalid', ''], connect)
+
+    assert list(report['hosts']) == ['localhost', 'missing.invalid']
+    assert connected == ['localhost']
+    localhost = report['hosts']['localhost']
+    assert localhost['status'] == 200 and 'dns_ms' in localhost and 'connect_ms' in localhost
+    assert report['failed'] == ['missing.invalid']
+    assert report['hosts']['missing.invalid']['error'].startswith('DNS')
+
+
+def test_background_warmup_keeps_last_report():
+    runner = warmup.Warmup()
+    done = []
+    assert runner.start(['localhost'], on_done=done.append)
+    runner.join(5)
+    report = runner.report()
+    assert report['state'] == 'done'
+    assert done and 'localhost' in report['hosts']
@@ -0,0 +1,301 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.downloader.scheduler import INTERACTIVE_RESERVE, DownloadScheduler, media_host
+
+
+def _limits(max_active, per_host=16):
+    return lambda: (max_active, per_host)
+
+
+async def _hold(scheduler, order, name, release, **kwargs):
+    async with scheduler.slot(**kwargs):
+        order.append(name)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_media_host_normalizes_urls():
+    assert media_host('https://V3-Web.douyinvod.com/a/b.mp4?x=1') == 'v3-web.douyinvod.com'
+    assert media_host('') == ''
+    assert media_host('not a url') == ''
+
+
+def test_global_cap_and_priority_order():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(2))
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.ensure_future(_hold(scheduler, order, f'bg{i}', release, priority='background', task='sync'))
+                 for i in range(3)]
+        await _settle()
+        tasks += [asyncio.ensure_future(_hold(scheduler, order, f'batch{i}', release, priority='batch', task='t'))
+                  for i in range(2)]
+        await _settle()
+        assert order == ['bg0', 'bg1']
+        assert scheduler.stats()['running'] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    # 名额释放后先发给 batch，再轮到剩下的 background
+    assert asyncio.run(run()) == ['bg0', 'bg1', 'batch0', 'batch1', 'bg2']
+
+
+def test_interactive_uses_reserve_when_batch_is_saturated():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(2))
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.ensure_future(_hold(scheduler, order, f'batch{i}', release, priority='batch', task='t'))
+                 for i in range(4)]
+        await _settle()
+        tasks += [asyncio.ensure_future(_hold(scheduler, order, f'click{i}', release, priority='interactive', task=f'c{i}'))
+                  for i in range(INTERACTIVE_RESERVE + 1)]
+        await _settle()
+        snapshot = list(order)
+        release.set()
+        await asyncio.gather(*tasks)
+        return snapshot, order
+
+    snapshot, order = asyncio.run(run())
+    assert snapshot == ['batch0', 'batch1', *[f'click{i}' for i in range(INTERACTIVE_RESERVE)]]
+    assert order.index(f'click{INTERACTIVE_RESERVE}') < order.index('batch2')
+
+
+def test_per_host_limit_lets_other_hosts_through():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(4, per_host=1))
+        release = asyncio.Event()
+        order = []
+        tasks = [
+            asyncio.ensure_future(_hold(scheduler, order, 'a1', release, task='x', url='https://a.example/1')),
+            asyncio.ensure_future(_hold(scheduler, order, 'a2', release, task='y', url='https://a.example/2')),
+            asyncio.ensure_future(_hold(scheduler, order, 'b1', release, task='z', url='https://b.example/1')),
+        ]
+        await _settle()
+        snapshot = list(order)
+        stats = scheduler.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return snapshot, stats, order
+
+    snapshot, stats, order = asyncio.run(run())
+    assert snapshot == ['a1', 'b1']
+    assert stats['running_by_host'] == {'a.example': 1, 'b.example': 1}
+    assert stats['waiting']['batch'] == {'y': 1}
+    assert order[-1] == 'a2'
+
+
+def test_tasks_share_capacity_fairly():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(2))
+        order = []
+        releases = {}
+
+        async def job(name, task):
+            releases[name] = asyncio.Event()
+            async with scheduler.slot(task=task):
+                order.append(name)
+                await releases[name].wait()
+
+        # 任务 A 先排了一大批，任务 B 后来
+        tasks = [asyncio.ensure_future(job(f'A{i}', 'A')) for i in range(4)]
+        await _settle()
+        tasks += [asyncio.ensure_future(job(f'B{i}', 'B')) for i in range(2)]
+        await _settle()
+        assert order == ['A0', 'A1']
+
+        releases['A0'].set()
+        await _settle()
+        releases['A1'].set()
+        await _settle()
+        snapshot = list(order)
+        for event in releases.values():
+            event.set()
+        await asyncio.gather(*tasks)
+        return snapshot
+
+    # A 释放的第一个名额给还没有名额的 B；之后 A、B 各占一个，按先来后到交替
+    assert asyncio.run(run()) == ['A0', 'A1', 'B0', 'A2']
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(1))
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(scheduler, order, 'first', release))
+        waiter = asyncio.ensure_future(_hold(scheduler, order, 'second', release))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.stats()['waiting']['batch'] == {}
+        release.set()
+        await holder
+        return scheduler.stats(), order
+
+    stats, order = asyncio.run(run())
+    assert order == ['first']
+    assert stats['running'] == 0
+    assert stats['running_by_task'] == {}
+
+
+def test_slots_are_shared_across_event_loops():
+    scheduler = DownloadScheduler(limits=_limits(1))
+    holding = threading.Event()
+    release = threading.Event()
+    acquired = []
+
+    async def hold():
+        async with scheduler.slot(task='loop-a'):
+            holding.set()
+            await asyncio.to_thread(release.wait)
+
+    async def wait_for_slot():
+        async with scheduler.slot(task='loop-b'):
+            acquired.append(True)
+
+    first = threading.Thread(target=asyncio.run, args=(hold(),))
+    first.start()
+    assert holding.wait(5)
+    second = threading.Thread(target=asyncio.run, args=(wait_for_slot(),))
+    second.start()
+    second.join(0.2)
+    assert acquired == []
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert acquired == [True]
+    assert scheduler.stats()['running'] == 0
+
+
+def test_paused_job_gives_its_slot_back_until_resumed():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(1))
+        pause_event = threading.Event()
+        gate = scheduler.pause_gate(pause_event)
+        steps = []
+
+        async def paused_job():
+            async with scheduler.slot(task='paused', pause_gate=gate):
+                pause_event.set()
+                assert gate.is_set()
+                steps.append(('parked', scheduler.stats()['running'], scheduler.stats()['parked']))
+                await other_started.wait()
+                pause_event.clear()
+                # 名额被别的任务占着，恢复后仍要排队
+                steps.append(('resuming', gate.is_set()))
+                while gate.is_set():
+                    await asyncio.sleep(0.01)
+                steps.append(('resumed', scheduler.stats()['running_by_task']))
+
+        async def other_job():
+            async with scheduler.slot(task='other'):
+                other_started.set()
+                await asyncio.sleep(0.05)
+                steps.append(('other done',))
+
+        other_started = asyncio.Event()
+        first = asyncio.ensure_future(paused_job())
+        await _settle()
+        await asyncio.gather(first, other_job())
+        return steps, scheduler.stats()
+
+    steps, stats = asyncio.run(run())
+    assert steps == [
+        ('parked', 0, 1),
+        ('resuming', True),
+        ('other done',),
+        ('resumed', {'paused': 1}),
+    ]
+    assert stats['running'] == 0
+    assert stats['parked'] == 0
+    assert stats['waiting']['batch'] == {}
+
+
+def test_slot_exit_while_requeued_after_pause_leaves_queue():
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(1))
+        pause_event = threading.Event()
+        gate = scheduler.pause_gate(pause_event)
+        release = asyncio.Event()
+        holder_ready = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(task='holder'):
+                holder_ready.set()
+                await release.wait()
+
+        async with scheduler.slot(task='paused', pause_gate=gate):
+            pause_event.set()
+            assert gate.is_set()
+            holding = asyncio.ensure_future(holder())
+            await holder_ready.wait()
+            pause_event.clear()
+            assert gate.is_set()
+            assert scheduler.stats()['waiting']['batch'] == {'paused': 1}
+        # 还在排队就被取消：出队，不影响占着名额的任务
+        stats = scheduler.stats()
+        release.set()
+        await holding
+        return stats, scheduler.stats()
+
+    during, after = asyncio.run(run())
+    assert during['waiting']['batch'] == {}
+    assert during['running_by_task'] == {'holder': 1}
+    assert after['running'] == 0
+
+
+def test_pause_gate_wait_clear_awaits_resume_and_regrant_without_polling():
+    from src.downloader.async_downloader import LoopEvent, wait_while_paused
+
+    async def run():
+        scheduler = DownloadScheduler(limits=_limits(1))
+        pause_event = LoopEvent()
+        gate = scheduler.pause_gate(pause_event)
+        release = asyncio.Event()
+        holder_ready = asyncio.Event()
+        steps = []
+
+        async def holder():
+            async with scheduler.slot(task='holder'):
+                holder_ready.set()
+                await release.wait()
+                steps.append('holder done')
+
+        async with scheduler.slot(task='paused', pause_gate=gate):
+            pause_event.set()
+            # 轮询间隔设得很长：只有靠事件唤醒才能按时返回
+            waiting = asyncio.ensure_future(wait_while_paused(gate, LoopEvent(), interval=30))
+            holding = asyncio.ensure_future(holder())
+            await holder_ready.wait()
+            assert scheduler.stats()['parked'] == 1
+
+            threading.Timer(0.02, pause_event.clear).start()
+            await asyncio.sleep(0.1)
+            # 已恢复但名额被占着，仍在排队
+            assert not waiting.done()
+            assert scheduler.stats()['waiting']['batch'] == {'paused': 1}
+
+            release.set()
+            await asyncio.wait_for(waiting, 1)
+            steps.append('resumed')
+            running = scheduler.stats()['running_by_task']
+        await holding
+        return steps, running, scheduler.stats()
+
+    steps, running, stats = asyncio.run(run())
+    assert steps == ['holder done', 'resumed']
+    assert running == {'paused': 1}
+    assert stats['running'] == 0
+    assert stats['parked'] == 0
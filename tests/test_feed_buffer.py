@@ -0,0 +1,151 @@
+import asyncio
+
+from src.web.feed_buffer import FeedBuffer, FeedBufferPool
+
+
+class _FeedApi:
+    """按页返回推荐流，可指定每页的作品 ID 与单页延迟。"""
+
+    def __init__(self, pages, delay=0.0):
+        self.pages = list(pages)
+        self.delay = delay
+        self.calls = 0
+        self.cursors = []
+
+    async def fetch(self, count, cursor):
+        self.calls += 1
+        self.cursors.append(cursor)
+        await asyncio.sleep(self.delay)
+        if not self.pages:
+            return {'status_code': 0, 'aweme_list': [], 'has_more': 0}, True
+        ids = self.pages.pop(0)
+        if isinstance(ids, dict):
+            return ids, False
+        return {
+            'status_code': 0,
+            'aweme_list': [{'aweme_id': aweme_id} for aweme_id in ids],
+            'has_more': 1 if self.pages else 0,
+        }, True
+
+
+def _format(aweme):
+    if aweme['aweme_id'].startswith('bad'):
+        return None
+    return {'aweme_id': aweme['aweme_id']}
+
+
+def _ids(result):
+    return [video['aweme_id'] for video in result['videos']]
+
+
+def test_take_prefetches_next_page_in_background():
+    feed = _FeedApi([[f'a{i}' for i in range(10)], [f'b{i}' for i in range(10)]], delay=0.05)
+    buffer = FeedBuffer(feed.fetch, _format, prefetch_ratio=0.5)
+
+    async def run():
+        first = await buffer.take(5)
+        assert buffer.snapshot()['prefetching']  # 取走一半后已在后台请求下一页
+        await asyncio.sleep(0.1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        second = await buffer.take(10)
+        return first, second, loop.time() - started
+
+    first, second, elapsed = asyncio.run(run())
+    assert _ids(first) == [f'a{i}' for i in range(5)]
+    assert _ids(second) == [f'a{i}' for i in range(5, 10)] + [f'b{i}' for i in range(5)]
+    assert elapsed < 0.04
+    assert buffer.snapshot()['prefetches'] == 1
+
+
+def test_no_prefetch_before_threshold():
+    feed = _FeedApi([[f'a{i}' for i in range(10)], [f'b{i}' for i in range(10)]])
+    buffer = FeedBuffer(feed.fetch, _format, prefetch_ratio=0.8)
+
+    async def run():
+        await buffer.take(5)
+        return feed.calls
+
+    assert asyncio.run(run()) == 1
+
+
+def test_duplicates_and_invalid_items_are_dropped():
+    feed = _FeedApi([['a1', 'a2', 'bad1'], ['a2', 'a3', 'a1'], ['a4']])
+    buffer = FeedBuffer(feed.fetch, _format, prefetch_ratio=0.0)
+
+    async def run():
+        results = []
+        for _ in range(3):
+            results.append(await buffer.take(2))
+        return results
+
+    results = asyncio.run(run())
+    served = [aweme_id for result in results for aweme_id in _ids(result)]
+    assert served == ['a1', 'a2', 'a3', 'a4']
+    stats = buffer.snapshot()
+    assert stats['duplicates'] == 2
+    assert stats['skipped'] == 1
+    assert results[-1]['has_more'] is False
+
+
+def test_seen_set_is_bounded():
+    feed = _FeedApi([['a1', 'a2', 'a3'], ['a1']])
+    buffer = FeedBuffer(feed.fetch, _format, prefetch_ratio=0.0, seen_max=2)
+
+    async def run():
+        first = await buffer.take(3)
+        second = await buffer.take(1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    # a1 已被挤出已见集合，再次出现时不会被当作重复
+    assert _ids(first) == ['a1', 'a2', 'a3']
+    assert _ids(second) == ['a1']
+    assert buffer.snapshot()['seen'] == 2
+
+
+def test_upstream_error_is_returned_when_nothing_buffered():
+    verify = {'_need_verify': True, 'message': '需要验证'}
+    buffer = FeedBuffer(_FeedApi([verify]).fetch, _format)
+
+    result = asyncio.run(buffer.take(5))
+    assert result['videos'] == []
+    assert result['error'] is verify
+
+
+def test_cursor_follows_upstream_pages():
+    feed = _FeedApi([[f'{page}{i}' for i in range(4)] for page in 'abc'])
+    buffer = FeedBuffer(feed.fetch, _format, prefetch_ratio=0.0)
+
+    async def run():
+        return [await buffer.take(3) for _ in range(3)]
+
+    results = asyncio.run(run())
+    # 上游没有返回游标时按页递增；返回给前端的是最后一个作品所在页之后的游标
+    assert feed.cursors == [0, 1, 2]
+    assert [result['cursor'] for result in results] == [1, 2, 2]
+
+    async def fetch_with_cursor(count, cursor):
+        return {'status_code': 0, 'aweme_list': [{'aweme_id': 'c1'}], 'has_more': 1, 'max_cursor': 1700000000}, True
+
+    buffer = FeedBuffer(fetch_with_cursor, _format)
+    assert asyncio.run(buffer.take(1))['cursor'] == 1700000000
+
+
+def test_pool_evicts_least_recently_used_sessions():
+    created = []
+
+    def factory():
+        buffer = FeedBuffer(_FeedApi([]).fetch, _format)
+        created.append(buffer)
+        return buffer
+
+    pool = FeedBufferPool(factory, max_sessions=2)
+    first = pool.get('a')
+    pool.get('b')
+    assert pool.get('a') is first
+    pool.get('c')
+    assert set(pool.stats()) == {'a', 'c'}
+    pool.reset('a')
+    assert pool.get('a') is not first
+    assert len(created) == 4
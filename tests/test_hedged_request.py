@@ -0,0 +1,193 @@
+import asyncio
+import time
+
+import pytest
+
+from src.api.hedged_request import HedgedRequest, mark_dispatched
+from src.api.single_flight import SingleFlight
+from src.config.config import Config
+from src.user.user_manager import DouyinUserManager
+
+
+def _is_good(result):
+    return result == 'ok'
+
+
+def _variant(calls, name, result, delay=0.0):
+    async def run():
+        calls.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append(f'{name}:cancelled')
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return run
+
+
+def test_fast_primary_does_not_launch_hedge():
+    calls = []
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+    result = asyncio.run(hedge.run(
+        {'unsigned': _variant(calls, 'unsigned', 'ok'), 'signed': _variant(calls, 'signed', 'ok')},
+        0.2,
+        _is_good,
+    ))
+    assert result == ('unsigned', 'ok')
+    assert calls == ['unsigned']
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    calls = []
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+    started = time.monotonic()
+    result = asyncio.run(hedge.run(
+        {'unsigned': _variant(calls, 'unsigned', 'ok', 5.0), 'signed': _variant(calls, 'signed', 'ok', 0.01)},
+        0.05,
+        _is_good,
+    ))
+    assert result == ('signed', 'ok')
+    assert time.monotonic() - started < 1.0
+    assert calls == ['unsigned', 'signed', 'unsigned:cancelled']
+    stats = hedge.stats()['variants']
+    assert stats['unsigned']['cancelled'] == 1
+    assert stats['signed']['wins'] == 1
+
+
+
+def test_hedge_delay_starts_after_dispatch():
+    calls = []
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+
+    async def queued_primary():
+        calls.append('unsigned')
+        # 在限速器里排队的时间远超对冲延迟，不应触发对冲
+        await asyncio.sleep(0.2)
+        mark_dispatched()
+        calls.append('unsigned:dispatched')
+        await asyncio.sleep(0.02)
+        return 'ok'
+
+    result = asyncio.run(hedge.run(
+        {'unsigned': queued_primary, 'signed': _variant(calls, 'signed', 'ok')},
+        0.05,
+        _is_good,
+        wait_dispatch=True,
+    ))
+    assert result == ('unsigned', 'ok')
+    assert calls == ['unsigned', 'unsigned:dispatched']
+
+    calls.clear()
+
+    async def slow_after_dispatch():
+        calls.append('unsigned')
+        mark_dispatched()
+        await asyncio.sleep(5.0)
+        return 'ok'
+
+    result = asyncio.run(hedge.run(
+        {'unsigned': slow_after_dispatch, 'signed': _variant(calls, 'signed', 'ok', 0.01)},
+        0.05,
+        _is_good,
+        wait_dispatch=True,
+    ))
+    assert result == ('signed', 'ok')
+    assert calls == ['unsigned', 'signed']
+
+
+def test_losing_variant_cancels_its_single_flight_upstream():
+    calls = []
+    flight = SingleFlight('detail')
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+
+    def through_flight(name, delay):
+        upstream = _variant(calls, name, 'ok', delay)
+        return lambda: flight.do(name, upstream)
+
+    result = asyncio.run(hedge.run(
+        {'unsigned': through_flight('unsigned', 5.0), 'signed': through_flight('signed', 0.01)},
+        0.05,
+        _is_good,
+    ))
+    assert result == ('signed', 'ok')
+    # 落败取法的上游协程真正收到 CancelledError，而不只是取消了等待者
+    assert calls == ['unsigned', 'signed', 'unsigned:cancelled']
+    assert flight.stats()['cancelled'] == 1
+    assert hedge.stats()['variants']['unsigned']['cancelled'] == 1
+
+def test_bad_primary_launches_next_without_waiting_for_delay():
+    calls = []
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+    started = time.monotonic()
+    result = asyncio.run(hedge.run(
+        {'unsigned': _variant(calls, 'unsigned', 'empty'), 'signed': _variant(calls, 'signed', 'ok')},
+        5.0,
+        _is_good,
+    ))
+    assert result == ('signed', 'ok')
+    assert time.monotonic() - started < 1.0
+
+
+def test_all_bad_returns_last_result_and_all_errors_raise():
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+    calls = []
+    result = asyncio.run(hedge.run(
+        {'unsigned': _variant(calls, 'unsigned', 'empty'), 'signed': _variant(calls, 'signed', 'verify')},
+        0.01,
+        _is_good,
+    ))
+    assert result == ('signed', 'verify')
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedge.run(
+            {'unsigned': _variant(calls, 'unsigned', RuntimeError('a')), 'signed': _variant(calls, 'signed', RuntimeError('b'))},
+            0.01,
+            _is_good,
+        ))
+
+
+def test_order_adapts_to_success_rate():
+    hedge = HedgedRequest('detail', ('unsigned', 'signed'))
+    assert hedge.order() == ['unsigned', 'signed']
+    for _ in range(3):
+        asyncio.run(hedge.run(
+            {'unsigned': _variant([], 'unsigned', 'empty'), 'signed': _variant([], 'signed', 'ok')},
+            0.01,
+            _is_good,
+        ))
+    assert hedge.order() == ['signed', 'unsigned']
+
+    calls = []
+    asyncio.run(hedge.run(
+        {'unsigned': _variant(calls, 'unsigned', 'ok'), 'signed': _variant(calls, 'signed', 'ok')},
+        0.2,
+        _is_good,
+    ))
+    assert calls == ['signed']
+
+
+class _DetailApi:
+    def __init__(self):
+        self.calls = []
+
+    async def common_request(self, uri, params, headers, skip_sign=False):
+        self.calls.append(skip_sign)
+        if skip_sign:
+            return {'status_code': 0, 'filter_detail': {}}, True
+        return {'status_code': 0, 'aweme_detail': {'aweme_id': params['aweme_id'], 'desc': '详情'}}, True
+
+
+def test_get_video_detail_uses_signed_variant_when_unsigned_is_empty():
+    previous = Config.DETAIL_HEDGE_DELAY_MS
+    Config.DETAIL_HEDGE_DELAY_MS = 2000
+    api = _DetailApi()
+    manager = DouyinUserManager(api, None)
+    try:
+        detail = asyncio.run(manager.get_video_detail('7380011223344556677'))
+    finally:
+        Config.DETAIL_HEDGE_DELAY_MS = previous
+    assert detail['aweme_id'] == '7380011223344556677'
+    assert detail['desc'] == '详情'
+    assert api.calls == [True, False]
+    assert manager.detail_hedge.stats()['variants']['unsigned']['failures'] == 1
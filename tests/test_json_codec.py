@@ -0,0 +1,170 @@
+"""json_codec 两种后端的等价性校验与编解码基准。
+
+``python tests/test_json_codec.py`` 输出 1000 条作品列表页与 10 万条下载历史索引
+在标准库 json 与当前后端下的编解码耗时。
+"""
+
+import datetime
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.utils import json_codec
+
+BACKENDS = ['json'] + (['orjson'] if json_codec.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def codec_backend(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(json_codec, 'orjson', None)
+    return request.param
+
+
+def aweme_page(count=1000):
+    """结构与 /aweme/v1/web/aweme/post/ 返回值相近的作品列表页。"""
+    return {
+        'status_code': 0,
+        'has_more': 1,
+        'max_cursor': 1718000000000,
+        'aweme_list': [
+            {
+                'aweme_id': str(7380000000000000000 + i),
+                'desc': f'第 {i} 条作品 #话题{i % 17} 🎵',
+                'create_time': 1718000000 + i,
+                'author': {'uid': str(100000 + i % 50), 'nickname': f'作者{i % 50}', 'sec_uid': 'MS4wLjABAAAA' + 'x' * 40},
+                'statistics': {'digg_count': i * 13, 'comment_count': i * 3, 'share_count': i, 'collect_count': i * 2},
+                'video': {
+                    'duration': 15000 + i,
+                    'ratio': '1080p',
+                    'play_addr': {'url_list': [f'https://v{j}.douyinvod.com/{i}/video.mp4?a=1128' for j in range(3)]},
+                    'cover': {'url_list': [f'https://p3.douyinpic.com/obj/{i}.jpeg']},
+                },
+                'images': None,
+                'is_top': i == 0,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def history_index(count=100_000):
+    """结构与 download_history_index 落盘格式一致的索引。"""
+    return {
+        'version': 2,
+        'roots': ['/data/downloads'],
+        'updated_at': 1718000000,
+        'items': [
+            {
+                'name': f'{i}_作品标题.mp4',
+                'path': f'/data/downloads/作者{i % 300}/{i}_作品标题.mp4',
+                'relative_path': f'作者{i % 300}/{i}_作品标题.mp4',
+                'root_path': '/data/downloads',
+                'author': f'作者{i % 300}',
+                'size': 1048576 + i,
+                'modified_at': 1718000000 - i,
+                'extension': '.mp4',
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def test_round_trip_matches_stdlib(codec_backend):
+    payload = aweme_page(50)
+    encoded = json_codec.dumps(payload)
+    assert json.loads(encoded) == payload
+    assert json_codec.loads(encoded) == payload
+    assert json_codec.loads(encoded.encode('utf-8')) == payload
+    assert json_codec.loads(json_codec.dumps_bytes(payload)) == payload
+    # 与 ensure_ascii=False 一致，中文原样输出
+    assert '作者' in encoded and '\\u' not in encoded
+
+
+def test_indent_and_sort_keys_match_stdlib(codec_backend):
+    payload = {'b': [1, {'中': '文'}], 'a': {'z': None, 'y': True}}
+    assert json_codec.dumps(payload, indent=True, sort_keys=True) == json.dumps(
+        payload, ensure_ascii=False, indent=2, sort_keys=True
+    )
+    assert json_codec.dumps(payload) == json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def test_inputs_outside_orjson_support_fall_back_to_stdlib(codec_backend):
+    assert json.loads(json_codec.dumps({1: 'a', 'b': 2 ** 70})) == {'1': 'a', 'b': 2 ** 70}
+    assert json_codec.loads('{"v": NaN}')['v'] != json_codec.loads('{"v": NaN}')['v']
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads(b'{"broken":')
+    with pytest.raises(TypeError):
+        json_codec.dumps({'value': object()})
+
+
+def test_flask_provider_keeps_flask_date_format():
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+
+    from src.web.json_provider import CodecJSONProvider
+
+    app = Flask(__name__)
+    payload = {'when': datetime.datetime(2024, 6, 13, 8, 30), 'name': '作品'}
+    assert json.loads(CodecJSONProvider(app).dumps(payload)) == json.loads(DefaultJSONProvider(app).dumps(payload))
+
+
+def test_history_index_round_trip(codec_backend):
+    payload = history_index(2000)
+    assert json_codec.loads(json_codec.dumps_bytes(payload)) == payload
+
+
+@pytest.mark.skipif(json_codec.orjson is None, reason='orjson 未安装')
+def test_orjson_decodes_aweme_page_faster_than_stdlib():
+    encoded = json.dumps(aweme_page(), ensure_ascii=False).encode('utf-8')
+    stdlib = min(timeit.repeat(lambda: json.loads(encoded), number=5, repeat=3))
+    current = min(timeit.repeat(lambda: json_codec.loads(encoded), number=5, repeat=3))
+    assert current < stdlib
+
+
+def test_bench_decode_aweme_page(benchmark, codec_backend):
+    encoded = json_codec.dumps_bytes(aweme_page())
+    assert len(benchmark(json_codec.loads, encoded)['aweme_list']) == 1000
+
+
+def test_bench_encode_aweme_page(benchmark, codec_backend):
+    payload = aweme_page()
+    assert benchmark(json_codec.dumps_bytes, payload).startswith(b'{"status_code":0')
+
+
+def _best_of(func, number, repeat=3):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def run_benchmarks():
+    cases = [
+        ('aweme_page_1000', aweme_page(), 50),
+        ('history_index_100k', history_index(), 2),
+    ]
+    print(f'backend: {json_codec.BACKEND}')
+    for name, payload, number in cases:
+        encoded = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        rows = [
+            ('decode', lambda: json.loads(encoded), lambda: json_codec.loads(encoded)),
+            (
+                'encode',
+                lambda: json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                lambda: json_codec.dumps_bytes(payload),
+            ),
+        ]
+        for op, stdlib, current in rows:
+            stdlib_ms = _best_of(stdlib, number) * 1e3
+            current_ms = _best_of(current, number) * 1e3
+            print(
+                f'{name:<20} {op}  stdlib {stdlib_ms:9.2f} ms  current {current_ms:9.2f} ms  '
+                f'x{stdlib_ms / current_ms:.1f}  ({len(encoded) / 1e6:.1f} MB)'
+            )
+
+
+if __name__ == '__main__':
+    run_benchmarks()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from src.api import api as api_module
+from src.api import rate_governor
+from src.api.api import DouyinAPI
+from src.api.rate_governor import RateGovernor
+from src.utils import metrics
+from src.utils.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests_total = registry.counter('demo_requests_total', '请求数', ('uri', 'outcome'))
+    requests_total.inc(uri='/a', outcome='success')
+    requests_total.inc(2, uri='/a', outcome='success')
+    requests_total.inc(uri='/b"x', outcome='error')
+    in_flight = registry.gauge('demo_in_flight', '进行中')
+    in_flight.set(3)
+    in_flight.dec()
+
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{uri="/a",outcome="success"} 3' in text
+    assert 'demo_requests_total{uri="/b\\"x",outcome="error"} 1' in text
+    assert '# TYPE demo_in_flight gauge\ndemo_in_flight 2\n' in text
+    with pytest.raises(ValueError):
+        requests_total.inc(-1, uri='/a', outcome='success')
+    with pytest.raises(ValueError):
+        requests_total.inc(uri='/a')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('demo_seconds', '耗时', ('uri',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, uri='/a')
+
+    lines = registry.render().splitlines()
+    assert 'demo_seconds_bucket{uri="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{uri="/a",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{uri="/a",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{uri="/a"} 4.05' in lines
+    assert 'demo_seconds_count{uri="/a"} 4' in lines
+
+
+def test_registry_returns_existing_metric_and_rejects_conflicts():
+    registry = MetricsRegistry()
+    first = registry.counter('demo_total', '计数', ('uri',))
+    assert registry.counter('demo_total', '计数', ('uri',)) is first
+    with pytest.raises(ValueError):
+        registry.gauge('demo_total', '计数', ('uri',))
+
+
+def test_event_loop_lag_monitor_reports_blocking():
+    async def run():
+        task = asyncio.ensure_future(metrics.monitor_event_loop_lag(interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # 故意阻塞事件循环
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    before = metrics.EVENT_LOOP_LAG_HISTOGRAM.snapshot()['count']
+    asyncio.run(run())
+    assert metrics.EVENT_LOOP_LAG_HISTOGRAM.snapshot()['count'] > before
+    assert metrics.EVENT_LOOP_LAG_HISTOGRAM.snapshot()['sum'] >= 0.05
+
+
+def test_common_request_records_latency_and_outcome(tmp_path, monkeypatch):
+    governor = RateGovernor(str(tmp_path / 'rate_governor.json'))
+    monkeypatch.setattr(rate_governor, 'get_rate_governor', lambda: governor)
+    monkeypatch.setattr('src.api.api.get_rate_governor', lambda: governor)
+    api = DouyinAPI('')
+    responses = iter([({'status_code': 0}, True), ({'_need_verify': True}, False)])
+
+    async def fake_perform(*args, **kwargs):
+        return next(responses)
+
+    api._perform_common_request = fake_perform
+    uri = '/aweme/v1/web/metrics-test/'
+
+    async def run():
+        await api._send_common_request(uri, {}, {})
+        await api._send_common_request(uri, {}, {})
+
+    asyncio.run(run())
+    assert api_module.API_REQUESTS.value(uri=uri, outcome='success') == 1
+    assert api_module.API_REQUESTS.value(uri=uri, outcome='throttled') == 1
+    assert api_module.API_REQUEST_SECONDS.snapshot(uri=uri)['count'] == 2
+    assert f'douyin_api_request_seconds_count{{uri="{uri}"}} 2' in metrics.render_prometheus()
@@ -0,0 +1,246 @@
+"""针对离线假服务器的端到端测试与批量下载吞吐测量。
+
+``python tests/test_offline_server.py [thread|async]`` 以默认参数（200 个作品、每个 1MB、
+20ms 延迟）用指定下载引擎跑一次批量下载并输出吞吐。
+"""
+
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_douyin_server import FakeDouyinServer
+from src.api.api import DouyinAPI
+from src.config.config import Config
+from src.downloader import downloader as downloader_module
+from src.downloader.async_downloader import AsyncDouyinDownloader
+from src.downloader.downloader import DouyinDownloader
+from src.user.user_manager import DouyinUserManager
+
+SEC_UID = 'MS4wLjABAAAA_offline'
+_CONFIG_FIELDS = ('OFFLINE_HOST', 'CONFIG_FILE', 'DOWNLOAD_DIR', 'RATE_GOVERNOR', 'RESPONSE_CACHE_MAX_MB')
+
+
+class _OfflineConfig:
+    """把 Config 指向假服务器与临时目录，退出时还原。"""
+
+    def __init__(self, base_url: str, root: Path):
+        self.base_url = base_url
+        self.root = root
+        self.saved = {}
+
+    def __enter__(self):
+        self.saved = {field: getattr(Config, field) for field in _CONFIG_FIELDS}
+        Config.OFFLINE_HOST = self.base_url
+        Config.CONFIG_FILE = str(self.root / 'config.json')
+        Config.DOWNLOAD_DIR = str(self.root / 'downloads')
+        Config.RATE_GOVERNOR = False
+        Config.RESPONSE_CACHE_MAX_MB = 0
+        return self
+
+    def __exit__(self, *exc_info):
+        for field, value in self.saved.items():
+            setattr(Config, field, value)
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeDouyinServer(posts_per_user=45, media_size=64 * 1024) as fake:
+        yield fake
+
+
+@pytest.fixture
+def offline(server, tmp_path):
+    with _OfflineConfig(server.base_url, tmp_path):
+        yield server
+
+
+def test_offline_host_is_normalized():
+    assert Config.normalize_offline_host(' http://127.0.0.1:8765/ ') == 'http://127.0.0.1:8765'
+    assert Config.normalize_offline_host('127.0.0.1:8765') == ''
+    assert Config.normalize_offline_host(None) == ''
+
+
+
+def test_offline_host_stays_out_of_config_file(tmp_path, monkeypatch):
+    saved = {name: value for name, value in vars(Config).items() if name.isupper()}
+    monkeypatch.delenv('DOUYIN_OFFLINE_HOST', raising=False)
+    try:
+        Config.CONFIG_FILE = str(tmp_path / 'config.json')
+        Config.OFFLINE_HOST = 'http://127.0.0.1:8765'
+        assert Config.save_config('', str(tmp_path))
+        data = json.loads((tmp_path / 'config.json').read_text(encoding='utf-8'))
+        assert 'offline_host' not in data
+
+        # 旧版本写进配置文件的值也不再生效
+        data['offline_host'] = 'http://127.0.0.1:9999'
+        (tmp_path / 'config.json').write_text(json.dumps(data), encoding='utf-8')
+        Config.OFFLINE_HOST = ''
+        Config.load_config()
+        assert Config.OFFLINE_HOST == ''
+
+        monkeypatch.setenv('DOUYIN_OFFLINE_HOST', 'http://127.0.0.1:8765/')
+        Config.apply_env_overrides()
+        assert Config.OFFLINE_HOST == 'http://127.0.0.1:8765'
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+def test_route_media_url_rewrites_only_in_offline_mode(offline):
+    url = 'https://v3-web.douyinvod.com/media/123.mp4?a=1&b=2'
+    assert downloader_module._route_media_url(url) == f'{offline.base_url}/media/123.mp4?a=1&b=2'
+    Config.OFFLINE_HOST = ''
+    assert downloader_module._route_media_url(url) == url
+
+
+def test_user_videos_paginate_through_fake_server(offline):
+    api = DouyinAPI('')
+    assert api.host == offline.base_url
+    manager = DouyinUserManager(api, None)
+    batches = []
+
+    records = asyncio.run(manager.get_user_videos(SEC_UID, on_batch=batches.append))
+
+    assert [record.aweme_id for record in records] == offline.aweme_ids(SEC_UID)
+    assert len(batches) > 1
+    assert sum(record.media_type == 'image' for record in records) == 9
+    assert all(record.primary_url.startswith(offline.base_url) for record in records if record.media_type == 'video')
+
+
+def test_detail_profile_and_comments(offline):
+    api = DouyinAPI('')
+    manager = DouyinUserManager(api, None)
+    aweme_id = offline.aweme_ids(SEC_UID)[0]
+
+    async def run():
+        detail = await manager.get_video_detail(aweme_id)
+        profile = await manager.get_user_detail(SEC_UID)
+        comments, ok = await api.get_comments(aweme_id, count=20, cursor=0)
+        replies, reply_ok = await api.get_comment_replies(aweme_id, comments['comments'][0]['cid'])
+        feed, feed_ok = await api.get_recommended_feed(count=5)
+        return detail, profile, (comments, ok), (replies, reply_ok), (feed, feed_ok)
+
+    detail, profile, (comments, ok), (replies, reply_ok), (feed, feed_ok) = asyncio.run(run())
+
+    assert detail['aweme_id'] == aweme_id
+    assert profile.get('sec_uid') == SEC_UID or profile.get('user', {}).get('sec_uid') == SEC_UID
+    assert ok and comments['has_more'] == 1 and comments['cursor'] == 20 and len(comments['comments']) == 20
+    assert reply_ok and len(replies['comments']) == offline.replies_per_comment
+    assert feed_ok and len(feed['aweme_list']) == 5
+
+
+def test_media_supports_range_requests(server):
+    url = f'{server.base_url}/media/7300000000001.mp4'
+    expected = server.media_bytes('7300000000001.mp4')
+
+    partial = requests.get(url, headers={'Range': 'bytes=100-199'}, timeout=10)
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f'bytes 100-199/{len(expected)}'
+    assert partial.content == expected[100:200]
+
+    suffix = requests.get(url, headers={'Range': 'bytes=-10'}, timeout=10)
+    assert suffix.content == expected[-10:]
+
+    invalid = requests.get(url, headers={'Range': f'bytes={len(expected)}-'}, timeout=10)
+    assert invalid.status_code == 416
+
+
+def _download_record(downloader, record) -> bool:
+    name = f'{record.author_nickname}/{record.desc}_{record.aweme_id}'
+    if record.media_type == 'video':
+        return downloader.download_video(record.primary_url, name, record.aweme_id)
+    _, urls = record.media_info()
+    return downloader.download_media_group(urls, name, record.aweme_id)
+
+
+async def _download_records_async(downloader, records, workers: int) -> list:
+    engine = AsyncDouyinDownloader(downloader)
+    semaphore = asyncio.Semaphore(workers)
+
+    async def download(record):
+        name = f'{record.author_nickname}/{record.desc}_{record.aweme_id}'
+        async with semaphore:
+            if record.media_type == 'video':
+                return await engine.download_video(record.primary_url, name, record.aweme_id)
+            _, urls = record.media_info()
+            return await engine.download_media_group(urls, name, record.aweme_id)
+
+    try:
+        return await asyncio.gather(*(download(record) for record in records))
+    finally:
+        await engine.close()
+
+
+def run_batch_download(server, root: Path, workers: int = 8, engine: str = 'thread') -> dict:
+    """拉取一个用户的全部作品并用指定引擎并发下载，返回耗时与吞吐。"""
+    with _OfflineConfig(server.base_url, root):
+        api = DouyinAPI('')
+        manager = DouyinUserManager(api, None)
+        downloader = DouyinDownloader(api)
+        started_at = time.perf_counter()
+        records = asyncio.run(manager.get_user_videos(SEC_UID))
+        listed_at = time.perf_counter()
+        if engine == 'async':
+            results = asyncio.run(_download_records_async(downloader, records, workers))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda record: _download_record(downloader, record), records))
+        finished_at = time.perf_counter()
+
+    files = [path for path in (root / 'downloads').rglob('*') if path.is_file() and path.name != 'download_record.json']
+    total_bytes = sum(path.stat().st_size for path in files)
+    download_seconds = max(finished_at - listed_at, 1e-9)
+    return {
+        'records': len(records),
+        'succeeded': sum(results),
+        'files': len(files),
+        'bytes': total_bytes,
+        'list_seconds': listed_at - started_at,
+        'download_seconds': download_seconds,
+        'mb_per_second': total_bytes / download_seconds / 1024 / 1024,
+        'files_per_second': len(files) / download_seconds,
+    }
+
+
+@pytest.mark.parametrize('engine', ['thread', 'async'])
+def test_batch_download_end_to_end(server, tmp_path, engine):
+    before = server.snapshot().get('media_bytes', 0)
+    report = run_batch_download(server, tmp_path, workers=4, engine=engine)
+
+    assert report['records'] == 45
+    assert report['succeeded'] == 45
+    # 36 个视频 + 9 个图文各 2 张
+    assert report['files'] == 36 + 9 * 2
+    assert report['bytes'] == report['files'] * server.media_size
+    assert server.snapshot()['media_bytes'] - before == report['bytes']
+    video = next((tmp_path / 'downloads').rglob('*.mp4'))
+    aweme_id = video.stem.rsplit('_', 1)[-1]
+    assert video.read_bytes() == server.media_bytes(f'{aweme_id}.mp4')
+
+
+def main() -> None:
+    import tempfile
+
+    engine = sys.argv[1] if len(sys.argv) > 1 else 'thread'
+    workers = 64 if engine == 'async' else 8
+    with tempfile.TemporaryDirectory() as root, FakeDouyinServer(
+        posts_per_user=200, media_size=1024 * 1024, latency=0.02
+    ) as fake:
+        report = run_batch_download(fake, Path(root), workers=workers, engine=engine)
+    print(
+        f"[{engine} x{workers}] {report['records']} 个作品 / {report['files']} 个文件 / {report['bytes'] / 1024 / 1024:.1f} MB："
+        f"列表 {report['list_seconds']:.2f}s，下载 {report['download_seconds']:.2f}s，"
+        f"{report['mb_per_second']:.1f} MB/s，{report['files_per_second']:.1f} 文件/s"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+from src.api import rate_governor
+from src.api.api import DouyinAPI
+from src.api.rate_governor import RateGovernor
+
+POSTS_URI = '/aweme/v1/web/aweme/post/'
+
+
+def test_families_start_unthrottled_until_verify(tmp_path):
+    governor = RateGovernor(str(tmp_path / 'rate_governor.json'))
+    assert [governor.reserve(POSTS_URI) for _ in range(5)] == [0.0] * 5
+    governor.record(POSTS_URI, 'success')
+    governor.record(POSTS_URI, 'error')
+    stats = governor.stats()['families']['user_posts']
+    assert stats['rate_per_second'] == 0
+    assert (stats['successes'], stats['errors']) == (1, 1)
+
+    # 第一次触发验证后从保守速率开始限速，其他接口族不受影响
+    governor.record(POSTS_URI, 'throttled')
+    assert governor.stats()['families']['user_posts']['rate_per_second'] == rate_governor.INITIAL_RATE
+    assert governor.reserve(POSTS_URI) > 0
+    assert governor.reserve('/aweme/v1/web/aweme/detail/') == 0
+
+
+def test_rate_increases_on_success_and_halves_on_verify(tmp_path):
+    governor = RateGovernor(str(tmp_path / 'rate_governor.json'))
+    governor.record(POSTS_URI, 'throttled')
+    governor._buckets['user_posts'].last_decrease = 0.0
+    for _ in range(10):
+        governor.record(POSTS_URI, 'success')
+    ramped = governor.stats()['families']['user_posts']['rate_per_second']
+    assert ramped == round(rate_governor.INITIAL_RATE + 10 * rate_governor.ADDITIVE_INCREASE, 3)
+
+    governor.record(POSTS_URI, 'throttled')
+    governor.record(POSTS_URI, 'throttled')  # 冷却期内不重复降速
+    stats = governor.stats()['families']['user_posts']
+    assert stats['rate_per_second'] == round(ramped * rate_governor.VERIFY_DECREASE, 3)
+    assert stats['throttled'] == 3
+    assert 'aweme_detail' not in governor.stats()['families']
+
+
+def test_learned_rates_persist_across_restarts(tmp_path):
+    path = tmp_path / 'rate_governor.json'
+    governor = RateGovernor(str(path))
+    governor.record('/aweme/v1/web/user/profile/other/', 'throttled')
+
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert saved['rates']['user_profile'] == rate_governor.INITIAL_RATE
+    restored = RateGovernor(str(path))
+    assert restored.stats()['families']['user_profile']['rate_per_second'] == saved['rates']['user_profile']
+
+
+def test_reserve_spaces_requests_by_rate(tmp_path):
+    path = tmp_path / 'rate_governor.json'
+    path.write_text(json.dumps({'rates': {'aweme_detail': 2.0}}), encoding='utf-8')
+    governor = RateGovernor(str(path))
+    waits = [governor.reserve('/aweme/v1/web/aweme/detail/') for _ in range(3)]
+    assert waits[0] == 0
+    assert 0.4 < waits[1] <= 0.5
+    assert 0.9 < waits[2] <= 1.0
+
+
+def test_common_request_outcomes_feed_the_governor(tmp_path, monkeypatch):
+    governor = RateGovernor(str(tmp_path / 'rate_governor.json'))
+    monkeypatch.setattr(rate_governor, 'get_rate_governor', lambda: governor)
+    monkeypatch.setattr('src.api.api.get_rate_governor', lambda: governor)
+    api = DouyinAPI('')
+    responses = iter([
+        ({'status_code': 0}, True),
+        ({'_need_verify': True}, False),
+        ({'status_code': -1, 'message': '网络请求失败'}, False),
+    ])
+
+    async def fake_perform(*args, **kwargs):
+        return next(responses)
+
+    api._perform_common_request = fake_perform
+
+    async def run():
+        for _ in range(3):
+            await api._send_common_request('/aweme/v1/web/comment/list/', {}, {})
+
+    asyncio.run(run())
+    stats = governor.stats()['families']['comments']
+    assert (stats['successes'], stats['throttled'], stats['errors']) == (1, 1, 0)
+
+
+def test_record_on_the_event_loop_saves_off_the_loop(tmp_path):
+    path = tmp_path / 'rate_governor.json'
+    governor = RateGovernor(str(path))
+    save_threads = []
+    real_save = governor.save
+
+    def recording_save():
+        save_threads.append(threading.current_thread())
+        real_save()
+
+    governor.save = recording_save
+
+    async def run():
+        governor.record(POSTS_URI, 'throttled')
+        loop_thread = threading.current_thread()
+        for _ in range(100):
+            if path.exists():
+                break
+            await asyncio.sleep(0.01)
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(save_threads) == 1 and save_threads[0] is not loop_thread
+    assert json.loads(path.read_text(encoding='utf-8'))['rates']['user_posts'] == rate_governor.INITIAL_RATE
@@ -0,0 +1,77 @@
+import asyncio
+import urllib.parse
+
+import pytest
+from aiohttp import web
+
+from src.api import sign_executor, transport
+from src.api.api import DouyinAPI
+from src.config.config import Config
+
+COOKIE = 'sessionid=abc; dy_swidth=1920; dy_sheight=1080; s_v_web_id=verify_fixed; UIFID=uifid123'
+
+
+def test_template_derives_device_params_once_per_cookie():
+    api = DouyinAPI(COOKIE)
+    template = api._request_template()
+    assert api._request_template() is template
+    assert template.static_params['screen_width'] == '1920'
+    assert template.verify_fp == 'verify_fixed'
+    assert template.forced_headers == {'Cookie': COOKIE, 'uifid': 'uifid123'}
+
+    api.cookie = 'sessionid=other'
+    assert api._request_template() is not template
+
+
+@pytest.mark.parametrize('transport_name', ['requests', 'aiohttp'])
+def test_common_request_sends_exactly_the_signed_query(monkeypatch, tmp_path, transport_name):
+    signed = []
+    seen = {}
+
+    async def fake_sign_detail(query, user_agent):
+        signed.append(query)
+        return 'Dfmh/QDg+Dk=='
+
+    async def fake_webid(headers, url=''):
+        return '7380011223344556677'
+
+    async def handler(request):
+        seen['query'] = request.rel_url.raw_query_string
+        seen['headers'] = dict(request.headers)
+        return web.json_response({'status_code': 0, 'aweme_detail': {'aweme_id': '1'}})
+
+    monkeypatch.setattr(sign_executor, 'sign_detail', fake_sign_detail)
+    monkeypatch.setattr(Config, 'API_TRANSPORT', transport_name)
+    monkeypatch.setattr(Config, 'CONFIG_FILE', str(tmp_path / 'config.json'))
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/aweme/v1/web/aweme/detail/', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        api = DouyinAPI(COOKIE)
+        api.host = f'http://127.0.0.1:{port}'
+        api._get_webid = fake_webid
+        try:
+            return await api.common_request(
+                '/aweme/v1/web/aweme/detail/',
+                {'aweme_id': '1', 'keyword': 'a b/c'},
+                {},
+                use_cache=False,
+            )
+        finally:
+            await transport.close_current_loop_session()
+            await runner.cleanup()
+
+    data, success = asyncio.run(run())
+    assert success
+    assert seen['query'] == f"{signed[0]}&a_bogus={urllib.parse.quote('Dfmh/QDg+Dk==', safe='')}"
+    assert seen['query'].startswith('aweme_id=1&keyword=a%20b/c&device_platform=webapp')
+    params = urllib.parse.parse_qs(seen['query'])
+    assert params['screen_width'] == ['1920']
+    assert params['verifyFp'] == params['fp'] == ['verify_fixed']
+    assert params['webid'] == ['7380011223344556677']
+    assert seen['headers']['uifid'] == 'uifid123'
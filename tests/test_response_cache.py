@@ -0,0 +1,160 @@
+import asyncio
+
+from src.api.api import DouyinAPI
+from src.api.response_cache import ResponseCache
+
+DETAIL_URI = '/aweme/v1/web/aweme/detail/'
+
+
+def test_cache_key_ignores_volatile_params():
+    first = ResponseCache.make_key('h', DETAIL_URI, {'aweme_id': '1', 'msToken': 'a', 'a_bogus': 'x', 'webid': '1'})
+    second = ResponseCache.make_key('h', DETAIL_URI, {'msToken': 'b', 'aweme_id': '1', 'verifyFp': 'v'})
+    assert first == second
+    assert first != ResponseCache.make_key('h', DETAIL_URI, {'aweme_id': '2'})
+
+
+def test_cache_evicts_least_recently_used_entries_by_bytes():
+    cache = ResponseCache(max_bytes=130, ttls={DETAIL_URI: (60, 60)})
+    policy = cache.policy_for(DETAIL_URI)
+    for index in range(3):
+        assert cache.set(('h', DETAIL_URI, index), {'value': 'x' * 30}, policy)
+    cache.get(('h', DETAIL_URI, 0))
+    cache.set(('h', DETAIL_URI, 3), {'value': 'x' * 30}, policy)
+
+    assert cache.get(('h', DETAIL_URI, 1)) == (None, False)
+    assert cache.get(('h', DETAIL_URI, 0))[0] == {'value': 'x' * 30}
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 130
+
+
+def _api_with_fake_upstream(responses):
+    api = DouyinAPI('')
+    calls = []
+
+    async def fake_send(uri, params, headers, host=None, skip_sign=False, method='GET'):
+        calls.append(dict(params))
+        return responses[min(len(calls), len(responses)) - 1]
+
+    api._send_common_request = fake_send
+    return api, calls
+
+
+def test_common_request_serves_repeated_detail_from_cache():
+    api, calls = _api_with_fake_upstream([({'status_code': 0, 'aweme_detail': {'aweme_id': '1'}}, True)])
+
+    async def run():
+        first = await api.common_request(DETAIL_URI, {'aweme_id': '1', 'msToken': 'a'}, {})
+        first[0]['aweme_detail']['desc'] = 'mutated by caller'
+        second = await api.common_request(DETAIL_URI, {'aweme_id': '1', 'msToken': 'b'}, {})
+        return second
+
+    data, success = asyncio.run(run())
+    assert success
+    assert data == {'status_code': 0, 'aweme_detail': {'aweme_id': '1'}}
+    assert len(calls) == 1
+    assert api.response_cache.stats()['hits'] == 1
+
+
+def test_common_request_does_not_cache_failures_or_verify_responses():
+    api, calls = _api_with_fake_upstream([
+        ({'_need_verify': True}, False),
+        ({'status_code': 8, 'status_msg': 'error'}, False),
+        ({'status_code': 0, 'aweme_detail': {}}, True),
+    ])
+
+    async def run():
+        for _ in range(4):
+            await api.common_request(DETAIL_URI, {'aweme_id': '1'}, {})
+
+    asyncio.run(run())
+    assert len(calls) == 3
+    assert api.response_cache.stats()['bypassed'] == 2
+
+
+def test_stale_entry_is_returned_and_refreshed_in_background():
+    api, calls = _api_with_fake_upstream([
+        ({'status_code': 0, 'version': 1}, True),
+        ({'status_code': 0, 'version': 2}, True),
+    ])
+    api.response_cache.ttls[DETAIL_URI] = (0, 60)
+
+    async def run():
+        await api.common_request(DETAIL_URI, {'aweme_id': '1'}, {})
+        stale, _ = await api.common_request(DETAIL_URI, {'aweme_id': '1'}, {})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        refreshed, _ = await api.common_request(DETAIL_URI, {'aweme_id': '1'}, {})
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(run())
+    assert stale['version'] == 1
+    assert refreshed['version'] == 2
+    assert api.response_cache.stats()['stale_hits'] == 2
+
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    api = DouyinAPI('')
+    calls = []
+
+    async def fake_send(uri, params, headers, host=None, skip_sign=False, method='GET'):
+        calls.append(uri)
+        await asyncio.sleep(0.01)
+        return {'status_code': 0, 'user': {'uid': '1'}}, True
+
+    api._send_common_request = fake_send
+
+    async def run():
+        return await asyncio.gather(*(
+            api.common_request('/aweme/v1/web/user/profile/other/', {'sec_user_id': 'u1'}, {}, use_cache=False)
+            for _ in range(5)
+        ))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == ({'status_code': 0, 'user': {'uid': '1'}}, True) for result in results)
+    assert results[0][0] is not results[1][0]
+    stats = api.request_flights.stats()
+    assert stats['upstream_calls'] == 1
+    assert stats['coalesced'] == 4
+    assert stats['in_flight'] == 0
+
+
+
+def test_liking_a_video_drops_its_cached_detail():
+    from src.user.user_manager import DouyinUserManager
+
+    api = DouyinAPI('')
+    state = {'liked': False}
+    calls = []
+
+    async def fake_send(uri, params, headers, host=None, skip_sign=False, method='GET'):
+        calls.append(params['aweme_id'])
+        return {'status_code': 0, 'aweme_detail': {
+            'aweme_id': params['aweme_id'],
+            'user_digged': 1 if state['liked'] else 0,
+            'statistics': {'digg_count': 1 if state['liked'] else 0},
+        }}, True
+
+    async def fake_digg(uri, params, headers, host=None, **kwargs):
+        state['liked'] = params['type'] == '1'
+        return {'status_code': 0}, True
+
+    api._send_common_request = fake_send
+    api.signed_form_action_request = fake_digg
+    manager = DouyinUserManager(api, None)
+
+    async def run():
+        before = await manager.get_video_detail('1')
+        await manager.get_video_detail('2')
+        await manager.get_video_detail('2')
+        assert (await manager.set_video_liked('1', True))['success']
+        after = await manager.get_video_detail('1')
+        await manager.get_video_detail('2')
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert (before['is_liked'], before['digg_count']) == (False, 0)
+    assert (after['is_liked'], after['digg_count']) == (True, 1)
+    # 其他作品的详情缓存不受影响
+    assert calls.count('2') == 1
@@ -0,0 +1,218 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_douyin_server import FakeDouyinServer
+from src.config.config import Config
+from src.downloader import bandwidth, resume, segmented
+from src.downloader.downloader import DouyinDownloader
+from src.utils import json_codec
+
+MEDIA_SIZE = 2 * 1024 * 1024 + 77
+_CONFIG_FIELDS = ('CONFIG_FILE', 'DOWNLOAD_DIR', 'SEGMENTED_DOWNLOAD_PARTS', 'SEGMENTED_DOWNLOAD_MIN_MB')
+
+
+class _Api:
+    cookie = ''
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeDouyinServer(media_size=MEDIA_SIZE) as fake:
+        yield fake
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    saved = {field: getattr(Config, field) for field in _CONFIG_FIELDS}
+    Config.CONFIG_FILE = str(tmp_path / 'config.json')
+    Config.DOWNLOAD_DIR = str(tmp_path / 'downloads')
+    Config.SEGMENTED_DOWNLOAD_PARTS = 2
+    Config.SEGMENTED_DOWNLOAD_MIN_MB = 1
+    try:
+        yield DouyinDownloader(_Api())
+    finally:
+        for field, value in saved.items():
+            setattr(Config, field, value)
+
+
+def _requested_bytes(server):
+    return server.snapshot().get('media_requested_bytes', 0)
+
+
+def _cancel_after(limit):
+    cancel_event = threading.Event()
+
+    def on_progress(payload):
+        if payload.get('bytes_downloaded', 0) >= limit:
+            cancel_event.set()
+
+    return cancel_event, on_progress
+
+
+def test_journal_tracks_ranges_and_round_trips(tmp_path):
+    part_path = str(tmp_path / 'video.mp4.part')
+    Path(part_path).write_bytes(b'\0' * 100)
+    journal = resume.ResumeJournal(part_path, 'https://example.com/v.mp4', 100, etag='"a"')
+    journal.mark(0, 10)
+    journal.mark(10, 10)
+    journal.mark(50, 25)
+    assert journal.completed_bytes() == 45
+    assert journal.missing_ranges() == [(20, 49), (75, 99)]
+    journal.save(force=True)
+
+    loaded = resume.ResumeJournal.load(part_path)
+    assert loaded.missing_ranges() == [(20, 49), (75, 99)]
+    assert loaded.matches(100, '"a"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    assert not loaded.matches(100, '"b"')
+    assert not loaded.matches(101, '"a"')
+
+    Path(part_path).write_bytes(b'\0' * 99)
+    assert resume.ResumeJournal.load(part_path) is None
+
+
+def test_cancelled_download_resumes_without_refetching(server, downloader):
+    name = '7300000000000000101.mp4'
+    url = f'{server.base_url}/media/{name}'
+    server.bandwidth = 1024 * 1024
+    cancel_event, on_progress = _cancel_after(MEDIA_SIZE // 3)
+    try:
+        assert not downloader.download_video(url, '作者/续传', '7300000000000000101', cancel_event=cancel_event, progress_callback=on_progress)
+    finally:
+        server.bandwidth = 0
+    part = next(Path(Config.DOWNLOAD_DIR).rglob('*.part'))
+    completed = resume.ResumeJournal.load(str(part)).completed_bytes()
+    assert 0 < completed < MEDIA_SIZE
+
+    before = _requested_bytes(server)
+    progress = []
+    assert downloader.download_video(url, '作者/续传', '7300000000000000101', progress_callback=progress.append)
+
+    # bytes=0- 的探测请求拿到校验信息后立即关闭，其余请求只覆盖缺失区间
+    assert _requested_bytes(server) - before == MEDIA_SIZE + (MEDIA_SIZE - completed)
+    files = list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4'))
+    assert len(files) == 1
+    assert files[0].read_bytes() == server.media_bytes(name)
+    assert list(Path(Config.DOWNLOAD_DIR).rglob('*.part*')) == []
+    assert progress[-1]['bytes_downloaded'] == MEDIA_SIZE
+
+
+def test_changed_remote_file_restarts_from_zero(server, downloader):
+    name = '7300000000000000102.mp4'
+    url = f'{server.base_url}/media/{name}'
+    user_dir = Path(Config.DOWNLOAD_DIR) / '作者'
+    user_dir.mkdir(parents=True)
+    part_path = str(user_dir / '旧版本.mp4.part')
+    Path(part_path).write_bytes(b'x' * MEDIA_SIZE)
+    journal = resume.ResumeJournal(part_path, url, MEDIA_SIZE, etag='"stale"')
+    journal.mark(0, MEDIA_SIZE // 2)
+    journal.save(force=True)
+
+    assert downloader.download_video(url, '作者/旧版本', '7300000000000000102')
+
+    assert (user_dir / '旧版本.mp4').read_bytes() == server.media_bytes(name)
+    assert not Path(part_path).exists()
+
+
+class _Response:
+    status_code = 206
+
+    def __init__(self, data: bytes, start: int, end: int, pause_event=None):
+        self.payload = data[start:end + 1]
+        self.pause_event = pause_event
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for index in range(0, len(self.payload), 16):
+            yield self.payload[index:index + 16]
+            if self.pause_event is not None:
+                # 写完第一块后暂停
+                self.pause_event.set()
+                self.pause_event = None
+
+    def close(self):
+        self.closed = True
+
+
+def test_pause_closes_connection_and_reopens_from_offset(tmp_path):
+    data = bytes(range(256))
+    pause_event = threading.Event()
+    opened = []
+
+    def open_range(start, end):
+        response = _Response(data, start, end, pause_event if not opened else None)
+        opened.append((start, response))
+        return response
+
+    def wait_if_paused():
+        assert all(response.closed for _, response in opened)
+        pause_event.clear()
+
+    target = tmp_path / 'out.bin'
+    written = segmented.download_segments(
+        None, open_range, str(target), len(data), 1,
+        paused=pause_event.is_set, wait_if_paused=wait_if_paused,
+    )
+
+    assert written == len(data)
+    assert target.read_bytes() == data
+    assert [start for start, _ in opened] == [0, 16]
+
+
+def test_removing_a_cancelled_task_deletes_its_parts(server, downloader):
+    name = '7300000000000000103.mp4'
+    url = f'{server.base_url}/media/{name}'
+    server.bandwidth = 1024 * 1024
+    cancel_event, on_progress = _cancel_after(MEDIA_SIZE // 3)
+    token = bandwidth.bind_task('task-1')
+    try:
+        assert not downloader.download_video(url, '作者/移除', '7300000000000000103', cancel_event=cancel_event, progress_callback=on_progress)
+    finally:
+        bandwidth.reset_task(token)
+        server.bandwidth = 0
+    assert list(Path(Config.DOWNLOAD_DIR).rglob('*.part*'))
+
+    assert resume.discard_task_parts('other-task') == 0
+    assert resume.discard_task_parts('task-1') == 1
+    assert list(Path(Config.DOWNLOAD_DIR).rglob('*.part*')) == []
+
+
+def test_sweep_removes_only_stale_idle_parts(tmp_path):
+    now = 1_700_000_000
+    day = 86400
+
+    def make_part(name, updated_at):
+        part_path = str(tmp_path / name)
+        Path(part_path).write_bytes(b'\0' * 10)
+        journal = resume.ResumeJournal(part_path, 'https://example.com/v.mp4', 10)
+        journal.save(force=True)
+        journal_path = resume.journal_path_for(part_path)
+        payload = json_codec.loads(Path(journal_path).read_bytes())
+        payload['updated_at'] = updated_at
+        Path(journal_path).write_bytes(json_codec.dumps_bytes(payload))
+        return part_path
+
+    stale = make_part('stale.mp4.part', now - 8 * day)
+    fresh = make_part('fresh.mp4.part', now - 1 * day)
+    in_use = make_part('in_use.mp4.part', now - 30 * day)
+    orphan = tmp_path / 'orphan.mp4.part.json'
+    orphan.write_bytes(b'{}')
+    os.utime(orphan, (now - 9 * day, now - 9 * day))
+    resume.track_part(in_use, 'running-task')
+    try:
+        assert resume.sweep_stale_parts(str(tmp_path), 0, now=now) == 0
+        assert resume.sweep_stale_parts(str(tmp_path), 7, now=now) == 2
+    finally:
+        resume.release_task_parts('running-task')
+
+    assert not Path(stale).exists() and not Path(resume.journal_path_for(stale)).exists()
+    assert not orphan.exists()
+    assert Path(fresh).exists() and Path(in_use).exists()
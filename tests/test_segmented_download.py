@@ -0,0 +1,151 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_douyin_server import FakeDouyinServer
+from src.config.config import Config
+from src.downloader import segmented
+from src.downloader.downloader import DouyinDownloader
+
+MEDIA_SIZE = 3 * 1024 * 1024 + 123
+_CONFIG_FIELDS = ('CONFIG_FILE', 'DOWNLOAD_DIR', 'SEGMENTED_DOWNLOAD_PARTS', 'SEGMENTED_DOWNLOAD_MIN_MB')
+
+
+class _Api:
+    cookie = ''
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeDouyinServer(media_size=MEDIA_SIZE) as fake:
+        yield fake
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    saved = {field: getattr(Config, field) for field in _CONFIG_FIELDS}
+    Config.CONFIG_FILE = str(tmp_path / 'config.json')
+    Config.DOWNLOAD_DIR = str(tmp_path / 'downloads')
+    Config.SEGMENTED_DOWNLOAD_PARTS = 4
+    Config.SEGMENTED_DOWNLOAD_MIN_MB = 1
+    try:
+        yield DouyinDownloader(_Api())
+    finally:
+        for field, value in saved.items():
+            setattr(Config, field, value)
+
+
+def _media_requests(server):
+    return server.snapshot().get('media', 0)
+
+
+def test_plan_segments_covers_file_without_gaps():
+    segments = segmented.plan_segments(10, 3)
+    assert segments == [(0, 3), (4, 6), (7, 9)]
+    assert segmented.plan_segments(2, 8) == [(0, 0), (1, 1)]
+
+
+def test_ranged_total_size_probe():
+    class _Response:
+        def __init__(self, status, headers):
+            self.status_code = status
+            self.headers = headers
+
+    assert segmented.ranged_total_size(_Response(206, {'Content-Range': 'bytes 0-99/100'})) == 100
+    assert segmented.ranged_total_size(_Response(206, {'Content-Range': 'bytes 10-99/100'})) == 0
+    assert segmented.ranged_total_size(_Response(200, {'Accept-Ranges': 'bytes', 'Content-Length': '50'})) == 50
+    assert segmented.ranged_total_size(_Response(200, {'Content-Length': '50'})) == 0
+
+
+def test_large_video_downloads_in_parallel_segments(server, downloader):
+    before = _media_requests(server)
+    progress = []
+    url = f'{server.base_url}/media/7300000000000000001.mp4'
+
+    assert downloader.download_video(url, '作者/分段', '7300000000000000001', progress_callback=progress.append)
+
+    files = list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4'))
+    assert len(files) == 1
+    assert files[0].read_bytes() == server.media_bytes('7300000000000000001.mp4')
+    assert _media_requests(server) - before == 4
+    assert progress[-1]['status'] == 'completed'
+    assert progress[-1]['bytes_downloaded'] == MEDIA_SIZE
+
+
+def test_small_video_uses_single_stream(server, downloader):
+    Config.SEGMENTED_DOWNLOAD_MIN_MB = 16
+    before = _media_requests(server)
+    url = f'{server.base_url}/media/7300000000000000002.mp4'
+
+    assert downloader.download_video(url, '作者/单连接', '7300000000000000002')
+
+    assert _media_requests(server) - before == 1
+    files = list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4'))
+    assert files[0].read_bytes() == server.media_bytes('7300000000000000002.mp4')
+
+
+def test_cancel_keeps_resumable_part_file(server, downloader):
+    server.bandwidth = 512 * 1024
+    cancel_event = threading.Event()
+    url = f'{server.base_url}/media/7300000000000000003.mp4'
+
+    def on_progress(payload):
+        if payload.get('status') == 'downloading' and payload.get('bytes_downloaded', 0) > 0:
+            cancel_event.set()
+
+    try:
+        ok = downloader.download_video(url, '作者/取消', '7300000000000000003', cancel_event=cancel_event, progress_callback=on_progress)
+    finally:
+        server.bandwidth = 0
+    assert ok is False
+    assert list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4')) == []
+    assert len(list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4.part'))) == 1
+    assert len(list(Path(Config.DOWNLOAD_DIR).rglob('*.mp4.part.json'))) == 1
+
+
+class _FlakyResponse:
+    """只返回前 ``limit`` 字节后断开的分段响应。"""
+
+    def __init__(self, data: bytes, start: int, limit: int | None = None):
+        self.status_code = 206
+        self.data = data
+        self.start = start
+        self.limit = limit
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        payload = self.data[self.start:]
+        if self.limit is not None:
+            yield payload[:self.limit]
+            raise requests.ConnectionError('reset')
+        for index in range(0, len(payload), chunk_size):
+            yield payload[index:index + chunk_size]
+
+    def close(self):
+        pass
+
+
+def test_segment_resumes_from_offset_after_connection_reset(tmp_path):
+    data = bytes(range(256)) * 64
+    calls = []
+
+    def open_range(start, end):
+        calls.append((start, end))
+        limit = 100 if len(calls) == 1 else None
+        response = _FlakyResponse(data[:end + 1], start, limit)
+        return response
+
+    target = tmp_path / 'out.bin'
+    written = segmented.download_segments(_FlakyResponse(data, 0), open_range, str(target), len(data), 2)
+
+    assert written == len(data)
+    assert target.read_bytes() == data
+    half = len(data) // 2
+    assert calls == [(half, len(data) - 1), (half + 100, len(data) - 1)]
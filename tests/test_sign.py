@@ -0,0 +1,86 @@
+import pytest
+
+from src.api import sign as douyin_sign
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36 Edg/145.0.0.0"
+)
+QUERY = "device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7380011223344556677&msToken=abc"
+SPIDER_BODY = "aweme_id=1&text=hi"
+
+SM3_VECTORS = [
+    (b"", "1ab21d8355cfa17f8e61194831e81a8f22bec8c728fefb747ed035eb5082aa2b"),
+    (b"abc", "66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0"),
+    (b"abcd" * 16, "debe9ff92275b8a138604889c18e5a4d6fdb70e5387e5765293dcba39c0c5732"),
+    (b"cus", "417d9419cff0742bacd41b07de88334d86546560873f7912a6adcbe82b8161bf"),
+    (bytes(range(256)) * 3, "9fc8d5a910965de08dbd81fa00771f102d400b071d873d089cbcc35e6f3f9db1"),
+]
+
+GOLDEN_SIGN_DETAIL = (
+    "DfmhQDgDDDDkDD6D56KLfY3qV31TYQTr0SVkMfCb4xyYFcgG/4sa9exYN7zvMYMWSbP1VRgpoZVuCDOrus5DkfXiaMkWxaFl5H8JJUa9Iw88"
+    "zOz-rHWbeQh31dGAtFH8svM-iAi8owVtSYmdlnArmhOUbf9jaHh8HLtHGIxGZV7B9P6Q3ccmPYUJRdux5wafp4pE5D-WzBT-Ax4cyBL=="
+)
+GOLDEN_SIGN_REPLY = (
+    "DfmhQDgDDDDkDD6D56KLfY3qV31TYQTr0SVkMfob4xyY8PbG/4sa9exYN7zvMYMWSbP1VRgphIKuCDOrus5DkfXiaMk5xaFl5H8JJUa9Iw88"
+    "zOz-rHWbeQh31dGAtFH8svM-iAi8owVtSYmdlnArmhOUbf9jaHh8HLtHGIxGZV7B9P6Q3ccmPYUJRdux5wafp4pE5D-WzBT-Ax4cydy=="
+)
+GOLDEN_SIGN_SPIDER = (
+    "EJmh/m8fDkdpgD6f56KLfY3qVA2JYpKI0SVkMDheH1N7qL39HMTa9exEIBGvXFEewG/-Ieujy4hbTrOgrQcjMZwf9Skw/2A2mESkKl5Q5xSS"
+    "s1XyeykgJUhimktRSeo2RkBlrOXBwwpHzYYm09oHmhK4bIOwu3GMzE=="
+)
+
+
+@pytest.fixture(params=douyin_sign.available_sm3_backends())
+def sm3_backend(request):
+    previous = douyin_sign.get_sm3_backend()
+    douyin_sign.set_sm3_backend(request.param)
+    yield request.param
+    douyin_sign.set_sm3_backend(previous)
+
+
+@pytest.mark.parametrize("data, expected", SM3_VECTORS)
+def test_sm3_backends_match_reference_vectors(sm3_backend, data, expected):
+    assert douyin_sign.sm3_hash(data).hex() == expected
+
+
+def test_a_bogus_golden_vectors_are_backend_independent(frozen_sign, sm3_backend):
+    assert frozen_sign.sign_detail(QUERY, USER_AGENT) == GOLDEN_SIGN_DETAIL
+    assert frozen_sign.sign_reply(QUERY, USER_AGENT) == GOLDEN_SIGN_REPLY
+    assert frozen_sign.sign_spider_publish(QUERY, SPIDER_BODY) == GOLDEN_SIGN_SPIDER
+
+
+def test_python_backend_is_always_available():
+    assert "python" in douyin_sign.available_sm3_backends()
+    with pytest.raises(ValueError):
+        douyin_sign.set_sm3_backend("missing")
+
+
+def test_signer_context_is_cached_per_user_agent_and_args():
+    context = douyin_sign.get_signer_context(USER_AGENT, (0, 1, 14))
+    assert douyin_sign.get_signer_context(USER_AGENT, (0, 1, 14)) is context
+    assert douyin_sign.get_signer_context(USER_AGENT, (0, 1, 8)) is not context
+    assert len(context.template) == 73
+
+
+def test_rc4_encrypt_with_fixed_key_matches_precomputed_state():
+    assert douyin_sign.rc4_encrypt(b"hello world", b"y").hex() == "2de1c82eebc73e5a9bccce"
+    assert douyin_sign._rc4_encrypt_y(b"hello world") == douyin_sign.rc4_encrypt(b"hello world", b"y")
+
+
+def test_sign_many_matches_scalar_signatures(frozen_sign, sm3_backend):
+    queries = [QUERY, "", "a=1", QUERY * 5]
+    expected = [frozen_sign.sign_detail(query, USER_AGENT) for query in queries]
+    assert frozen_sign.sign_many(queries, USER_AGENT) == expected
+    assert frozen_sign.sign_many([QUERY], USER_AGENT) == [GOLDEN_SIGN_DETAIL]
+    assert frozen_sign.sign_many([], USER_AGENT) == []
+
+
+def test_numpy_sm3_batch_matches_reference_vectors():
+    sm3_batch = pytest.importorskip("src.api.sm3_batch")
+    if not sm3_batch.AVAILABLE:
+        pytest.skip("numpy is not installed")
+    messages = [data for data, _ in SM3_VECTORS]
+    assert [digest.hex() for digest in sm3_batch.sm3_hash_many(messages)] == [
+        expected for _, expected in SM3_VECTORS
+    ]
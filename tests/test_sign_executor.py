@@ -0,0 +1,96 @@
+import asyncio
+
+from src.api import sign as douyin_sign
+from src.api import sign_executor
+from src.config.config import Config
+
+
+def test_thread_executor_matches_inline_signature_shape_and_counts_calls():
+    executor = sign_executor.SignExecutor('thread', 2)
+    try:
+        async def run():
+            return await asyncio.gather(*(
+                executor.run(douyin_sign.sign_detail, f'aweme_id={index}', 'UA')
+                for index in range(8)
+            ))
+
+        signatures = asyncio.run(run())
+        stats = executor.stats()
+    finally:
+        executor.shutdown(wait=True)
+
+    assert len(signatures) == 8
+    assert all(isinstance(value, str) and value.endswith('=') for value in signatures)
+    assert stats['mode'] == 'thread'
+    assert stats['completed'] == 8
+    assert stats['failed'] == 0
+    assert stats['in_flight'] == 0
+    assert stats['peak_in_flight'] >= 1
+
+
+def test_broken_process_pool_falls_back_to_threads():
+    executor = sign_executor.SignExecutor('process', 1)
+
+    class BrokenPool:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError('pool unavailable')
+
+        def shutdown(self, *args, **kwargs):
+            pass
+
+    executor._pool = BrokenPool()
+    try:
+        result = asyncio.run(executor.run(douyin_sign.sign_reply, 'cursor=0', 'UA'))
+        stats = executor.stats()
+    finally:
+        executor.shutdown(wait=True)
+
+    assert result.endswith('=')
+    assert stats['mode'] == 'thread'
+    assert stats['fallbacks'] == 1
+    assert stats['completed'] == 1
+
+
+def test_global_executor_follows_config():
+    previous_mode = Config.SIGN_EXECUTOR
+    previous_workers = Config.SIGN_WORKERS
+    Config.SIGN_EXECUTOR = 'inline'
+    Config.SIGN_WORKERS = 3
+    try:
+        executor = sign_executor.get_sign_executor()
+        assert executor.mode == 'inline'
+        assert executor.max_workers == 3
+        assert asyncio.run(sign_executor.sign_detail('a=1', 'UA')).endswith('=')
+    finally:
+        Config.SIGN_EXECUTOR = previous_mode
+        Config.SIGN_WORKERS = previous_workers
+        sign_executor.get_sign_executor().shutdown(wait=True)
+
+
+def test_concurrent_signatures_are_batched_through_sign_many(monkeypatch):
+    batches = []
+    real_sign_many = douyin_sign.sign_many
+
+    def recording_sign_many(queries, user_agent, args):
+        batches.append((list(queries), args))
+        return real_sign_many(queries, user_agent, args)
+
+    monkeypatch.setattr(douyin_sign, 'sign_many', recording_sign_many)
+    previous_mode = Config.SIGN_EXECUTOR
+    Config.SIGN_EXECUTOR = 'inline'
+    try:
+        async def run():
+            replies = await asyncio.gather(*(
+                sign_executor.sign_reply(f'comment_id={index}', 'UA') for index in range(4)
+            ))
+            single = await sign_executor.sign_detail('aweme_id=1', 'UA')
+            return replies, single
+
+        replies, single = asyncio.run(run())
+    finally:
+        Config.SIGN_EXECUTOR = previous_mode
+        sign_executor.get_sign_executor().shutdown(wait=True)
+
+    assert batches == [([f'comment_id={index}' for index in range(4)], (0, 1, 8))]
+    assert len(set(replies)) == 4
+    assert all(value.endswith('=') for value in [*replies, single])
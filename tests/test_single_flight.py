@@ -0,0 +1,98 @@
+import asyncio
+
+from src.api.single_flight import SingleFlight
+
+
+def test_every_caller_gets_an_unshared_copy():
+    async def run():
+        flight = SingleFlight('test')
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'aweme_list': [{'id': 1}]}
+
+        async def caller():
+            result = await flight.do('key', fetch)
+            # 调用方会就地修改返回值
+            seen = [item['id'] for item in result['aweme_list']]
+            result['aweme_list'].append({'id': 'mutated'})
+            return seen
+
+        results = await asyncio.gather(*(caller() for _ in range(3)))
+        return calls, results, flight.stats()
+
+    calls, results, stats = asyncio.run(run())
+    assert calls == [1]
+    assert results == [[1], [1], [1]]
+    assert stats['coalesced'] == 2
+
+
+def test_upstream_is_cancelled_only_when_every_waiter_leaves():
+    async def run():
+        flight = SingleFlight('test')
+        events = []
+        release = asyncio.Event()
+
+        async def fetch():
+            events.append('started')
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                events.append('upstream cancelled')
+                raise
+            return 'ok'
+
+        first = asyncio.ensure_future(flight.do('key', fetch))
+        second = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        # 还有等待者，上游继续执行
+        assert events == ['started']
+        release.set()
+        assert await second == 'ok'
+
+        release.clear()
+        only = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        only.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return events, first.cancelled(), only.cancelled(), flight.stats()
+
+    events, first_cancelled, only_cancelled, stats = asyncio.run(run())
+    assert events == ['started', 'started', 'upstream cancelled']
+    assert first_cancelled and only_cancelled
+    assert stats['cancelled'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_only_coalesced_callers_pay_for_a_copy(monkeypatch):
+    import src.api.single_flight as single_flight
+
+    copies = []
+    real_deepcopy = single_flight.copy.deepcopy
+    monkeypatch.setattr(single_flight.copy, 'deepcopy', lambda value: copies.append(1) or real_deepcopy(value))
+
+    async def run():
+        flight = SingleFlight('test')
+        produced = []
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            produced.append({'aweme_list': [{'id': 1}]})
+            return produced[-1]
+
+        alone = await flight.do('solo', fetch)
+        solo_copies = len(copies)
+        shared = await asyncio.gather(*(flight.do('key', fetch) for _ in range(3)))
+        return produced, alone, solo_copies, shared
+
+    produced, alone, solo_copies, shared = asyncio.run(run())
+    assert alone is produced[0]
+    assert solo_copies == 0
+    assert len(copies) == 2
+    assert sum(result is produced[1] for result in shared) == 1
+    assert len({id(result) for result in shared}) == 3
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+
+from src.api import token_manager
+from src.api.token_manager import TokenManager
+
+
+def test_tokens_persist_across_instances_per_cookie_scope(tmp_path):
+    path = str(tmp_path / 'token_cache.json')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return '7380011223344556677'
+
+    async def run():
+        manager = TokenManager(path, token_manager.cookie_scope('sessionid=a'))
+        return await asyncio.gather(*(manager.get('webid', fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ['7380011223344556677'] * 5
+    assert len(calls) == 1
+
+    reloaded = TokenManager(path, token_manager.cookie_scope('sessionid=a'))
+    assert asyncio.run(reloaded.get('webid', fetch)) == '7380011223344556677'
+    assert len(calls) == 1
+    assert TokenManager(path, token_manager.cookie_scope('sessionid=b')).peek('webid') is None
+    assert 'sessionid' not in (tmp_path / 'token_cache.json').read_text(encoding='utf-8')
+
+
+def test_failed_fetch_is_not_retried_immediately(tmp_path):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    async def run():
+        manager = TokenManager(str(tmp_path / 'token_cache.json'), 'anonymous')
+        return [await manager.get('webid', fetch) for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert len(calls) == 1
+
+
+def test_token_near_expiry_is_served_and_refreshed_in_background(tmp_path):
+    path = tmp_path / 'token_cache.json'
+    fetched_at = time.time() - (token_manager.TOKEN_TTLS['csrf_token'] - 10)
+    path.write_text(json.dumps({'anonymous': {'csrf_token': {'value': 'old', 'fetched_at': fetched_at}}}), encoding='utf-8')
+
+    async def fetch():
+        return 'new'
+
+    async def run():
+        manager = TokenManager(str(path), 'anonymous')
+        first = await manager.get('csrf_token', fetch)
+        await asyncio.sleep(0.01)
+        return first, manager.peek('csrf_token')
+
+    assert asyncio.run(run()) == ('old', 'new')
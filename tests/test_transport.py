@@ -0,0 +1,78 @@
+import asyncio
+
+from aiohttp import web
+
+from src.api import transport
+from src.config.config import Config
+
+SIGNED_PARAMS = {
+    'aweme_id': '7380011223344556677',
+    'keyword': '猫 猫+狗/鱼',
+    'skip': None,
+    'a_bogus': 'DfmhQDgD/4sa9exYN7zvMYMWSbP1VRgp+oZVu==',
+}
+
+
+async def _serve(handler, run):
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await run(f'http://127.0.0.1:{port}')
+    finally:
+        await transport.close_current_loop_session()
+        await runner.cleanup()
+
+
+def _with_transport(name, coro_factory):
+    previous = Config.API_TRANSPORT
+    Config.API_TRANSPORT = name
+    try:
+        return asyncio.run(coro_factory())
+    finally:
+        Config.API_TRANSPORT = previous
+
+
+def test_aiohttp_transport_sends_the_same_query_and_form_as_requests():
+    seen = {}
+
+    async def handler(request):
+        seen.setdefault(request.method, []).append((request.rel_url.raw_query_string, await request.text()))
+        return web.json_response({'status_code': 0})
+
+    async def run(base_url):
+        get_response = await transport.request('GET', f'{base_url}/aweme/v1/web/aweme/detail/', params=SIGNED_PARAMS)
+        post_response = await transport.request('POST', f'{base_url}/aweme/v1/web/comment/', data=SIGNED_PARAMS)
+        return get_response.json(), post_response.status_code
+
+    assert _with_transport('requests', lambda: _serve(handler, run)) == ({'status_code': 0}, 200)
+    assert _with_transport('aiohttp', lambda: _serve(handler, run)) == ({'status_code': 0}, 200)
+    assert seen['GET'][0] == seen['GET'][1]
+    assert seen['POST'][0] == seen['POST'][1]
+
+
+def test_aiohttp_transport_retries_idempotent_requests_on_gateway_errors():
+    calls = {'GET': 0, 'POST': 0}
+
+    async def handler(request):
+        calls[request.method] += 1
+        if calls[request.method] < 3:
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        return web.json_response({'ok': True})
+
+    async def run(base_url):
+        get_response = await transport.request('GET', f'{base_url}/feed')
+        post_response = await transport.request('POST', f'{base_url}/feed', data=b'payload')
+        return get_response.status_code, post_response.status_code
+
+    assert _with_transport('aiohttp', lambda: _serve(handler, run)) == (200, 503)
+    assert calls == {'GET': 3, 'POST': 1}
+
+
+def test_unknown_transport_falls_back_to_requests():
+    assert Config.normalize_api_transport('curl') == 'requests'
+    assert Config.normalize_api_transport(' AIOHTTP ') == 'aiohttp'